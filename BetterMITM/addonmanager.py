@@ -1,18 +1,24 @@
+import asyncio
+import concurrent.futures
 import contextlib
 import inspect
 import logging
+import multiprocessing
 import pprint
 import sys
+import time
 import traceback
 import types
 from collections.abc import Callable
 from collections.abc import Sequence
 from dataclasses import dataclass
+from dataclasses import field
 from typing import Any
 
 from BetterMITM import exceptions
 from BetterMITM import flow
 from BetterMITM import hooks
+from BetterMITM.utils import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -128,16 +134,144 @@ class LoadHook(hooks.Hook):
     loader: Loader
 
 
+@dataclass
+class HookTiming:
+    """
+    Latency statistics for a hook handler that runs off the event loop.
+    """
+
+    pool: str
+    calls: int = 0
+    errors: int = 0
+    queued: float = 0.0
+    """Total time spent waiting for a free executor, in seconds."""
+    elapsed: float = 0.0
+    """Total time spent running the handler, in seconds."""
+    max_elapsed: float = 0.0
+    recent: list[float] = field(default_factory=list)
+
+    def add(self, queued: float, elapsed: float) -> None:
+        self.calls += 1
+        self.queued += queued
+        self.elapsed += elapsed
+        self.max_elapsed = max(self.max_elapsed, elapsed)
+        self.recent.append(elapsed)
+        if len(self.recent) > 100:
+            del self.recent[:-100]
+
+    def get_state(self) -> dict:
+        recent = sorted(self.recent)
+        return {
+            "pool": self.pool,
+            "calls": self.calls,
+            "errors": self.errors,
+            "avgQueued": self.queued / self.calls if self.calls else 0,
+            "avgElapsed": self.elapsed / self.calls if self.calls else 0,
+            "maxElapsed": self.max_elapsed,
+            "p95Elapsed": recent[int(len(recent) * 0.95)] if recent else 0,
+        }
+
+
+def _timed_call(func, args):
+    start = time.perf_counter()
+    if inspect.iscoroutinefunction(func):
+        asyncio.run(func(*args))
+    else:
+        func(*args)
+    return start, time.perf_counter()
+
+
+def _call_in_process(func, states):
+    flows = [flow.Flow.from_state(s) for s in states]
+    start, end = _timed_call(func, flows)
+    return [f.get_state() for f in flows], start, end
+
+
 class AddonManager:
     def __init__(self, master):
         self.lookup = {}
         self.chain = []
         self.master = master
+        self.hook_timings: dict[str, HookTiming] = {}
+        self.offloaded_pending = 0
+        """Number of offloaded hook invocations that are queued or running."""
+        self._thread_pool: concurrent.futures.ThreadPoolExecutor | None = None
+        self._process_pool: concurrent.futures.ProcessPoolExecutor | None = None
         master.options.changed.connect(self._configure_all)
 
     def _configure_all(self, updated):
+        if "hook_threads" in updated or "hook_processes" in updated:
+            self.shutdown_executors()
         self.trigger(hooks.ConfigureHook(updated))
 
+    def executor(self, pool: str) -> concurrent.futures.Executor:
+        """
+        The thread (`pool="thread"`) or process (`pool="process"`) pool for offloaded hooks,
+        sized by the `hook_threads` and `hook_processes` options.
+        Addons may submit other CPU-bound work to it instead of creating pools of their own.
+        """
+        if pool == "thread":
+            if self._thread_pool is None:
+                self._thread_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.master.options.hook_threads or None,
+                    thread_name_prefix="addon-hook",
+                )
+            return self._thread_pool
+        else:
+            if self._process_pool is None:
+                self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.master.options.hook_processes or None,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._process_pool
+
+    def shutdown_executors(self) -> None:
+        """
+        Shut down the executor pools for offloaded hooks. They are recreated on demand.
+        """
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = None
+        self._process_pool = None
+
+    async def _invoke_offloaded(self, addon, func, event: hooks.Hook):
+        pool = func.offload_pool
+        args = event.args()
+        loop = asyncio.get_running_loop()
+        key = f"{_get_name(addon)}.{event.name}"
+        timing = self.hook_timings.setdefault(key, HookTiming(pool))
+        submitted = time.perf_counter()
+        self.offloaded_pending += 1
+        try:
+            if pool == "process":
+                if not args or not all(isinstance(a, flow.Flow) for a in args):
+                    raise exceptions.AddonManagerError(
+                        f"Addon handler {event.name} ({addon}) cannot run in a process pool"
+                    )
+                states, start, end = await loop.run_in_executor(
+                    self.executor(pool),
+                    _call_in_process,
+                    func,
+                    [a.get_state() for a in args],
+                )
+                for f, state in zip(args, states):
+                    state["client_conn"] = f.client_conn.get_state()
+                    state["server_conn"] = f.server_conn.get_state()
+                    f.set_state(state)
+            else:
+                start, end = await loop.run_in_executor(
+                    self.executor(pool), _timed_call, func, args
+                )
+        except Exception:
+            timing.errors += 1
+            raise
+        finally:
+            self.offloaded_pending -= 1
+        timing.add(max(start - submitted, 0), end - start)
+        if metrics.registry.enabled:
+            metrics.record_hook(_get_name(addon), event.name, end - start)
+
     def clear(self):
         """
         Remove all addons.
@@ -266,10 +400,18 @@ class AddonManager:
         Asynchronously invoke an event on an addon and all its children.
         """
         for addon, func in self._iter_hooks(addon, event):
+            if getattr(func, "offload_pool", None):
+                await self._invoke_offloaded(addon, func, event)
+                continue
+            start = time.perf_counter() if metrics.registry.enabled else None
             res = func(*event.args())
 
             if res is not None and inspect.isawaitable(res):
                 await res
+            if start is not None:
+                metrics.record_hook(
+                    _get_name(addon), event.name, time.perf_counter() - start
+                )
 
     def invoke_addon_sync(self, addon, event: hooks.Hook):
         """
@@ -280,7 +422,12 @@ class AddonManager:
                 raise exceptions.AddonManagerError(
                     f"Async handler {event.name} ({addon}) cannot be called from sync context"
                 )
+            start = time.perf_counter() if metrics.registry.enabled else None
             func(*event.args())
+            if start is not None:
+                metrics.record_hook(
+                    _get_name(addon), event.name, time.perf_counter() - start
+                )
 
     async def trigger_event(self, event: hooks.Hook):
         """
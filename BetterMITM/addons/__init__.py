@@ -1,3 +1,4 @@
+from BetterMITM.addons import analytics
 from BetterMITM.addons import anticache
 from BetterMITM.addons import anticomp
 from BetterMITM.addons import block
@@ -23,10 +24,12 @@ from BetterMITM.addons import rate_limiter
 from BetterMITM.addons import mock_responses
 from BetterMITM.addons import web_script_executor
 from BetterMITM.addons import proxyauth
+from BetterMITM.addons import proxymetrics
 from BetterMITM.addons import proxyserver
 from BetterMITM.addons import save
 from BetterMITM.addons import savehar
 from BetterMITM.addons import script
+from BetterMITM.addons import securityscan
 from BetterMITM.addons import serverplayback
 from BetterMITM.addons import stickyauth
 from BetterMITM.addons import stickycookie
@@ -34,6 +37,7 @@ from BetterMITM.addons import strip_dns_https_records
 from BetterMITM.addons import tlsconfig
 from BetterMITM.addons import update_alt_svc
 from BetterMITM.addons import upstream_auth
+from BetterMITM.addons import workers
 
 
 def default_addons():
@@ -71,7 +75,11 @@ def default_addons():
         stickycookie.StickyCookie(),
         save.Save(),
         savehar.SaveHar(),
+        analytics.Analytics(),
+        proxymetrics.ProxyMetrics(),
+        securityscan.SecurityScan(),
         tlsconfig.TlsConfig(),
         upstream_auth.UpstreamAuth(),
         update_alt_svc.UpdateAltSvc(),
+        workers.Workers(),
     ]
@@ -0,0 +1,177 @@
+"""
+Incremental traffic analytics.
+
+Flows are accounted for once when they complete, into buckets of `BUCKET_SECONDS`.
+Each bucket holds counters and mergeable sketches (latency quantiles, top hosts and paths),
+so that statistics for any time window are computed by merging a bounded number of buckets,
+independent of the number of flows.
+"""
+
+import collections
+import time
+from typing import Any
+
+from BetterMITM import command
+from BetterMITM import ctx
+from BetterMITM import dns
+from BetterMITM import exceptions
+from BetterMITM import flow
+from BetterMITM import http
+from BetterMITM import tcp
+from BetterMITM import udp
+from BetterMITM.utils.sketches import DDSketch
+from BetterMITM.utils.sketches import TopK
+
+BUCKET_SECONDS = 10
+
+
+class _Bucket:
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.flows: collections.Counter[str] = collections.Counter()
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.status_codes: collections.Counter[int] = collections.Counter()
+        self.latency = DDSketch()
+        self.hosts = TopK()
+        self.paths = TopK()
+
+
+class Analytics:
+    def __init__(self) -> None:
+        self.buckets: collections.deque[_Bucket] = collections.deque()
+
+    def load(self, loader):
+        loader.add_option(
+            "analytics_retention",
+            int,
+            3600,
+            "Number of seconds for which traffic analytics are kept.",
+        )
+
+    def configure(self, updated):
+        if "analytics_retention" in updated:
+            if ctx.options.analytics_retention < BUCKET_SECONDS:
+                raise exceptions.OptionsError(
+                    f"analytics_retention must be at least {BUCKET_SECONDS} seconds."
+                )
+            self._expire(time.time())
+
+    def _bucket(self, now: float) -> _Bucket:
+        start = int(now) // BUCKET_SECONDS * BUCKET_SECONDS
+        if not self.buckets or self.buckets[-1].start != start:
+            self.buckets.append(_Bucket(start))
+            self._expire(now)
+        return self.buckets[-1]
+
+    def _expire(self, now: float) -> None:
+        oldest = now - ctx.options.analytics_retention
+        while self.buckets and self.buckets[0].start + BUCKET_SECONDS <= oldest:
+            self.buckets.popleft()
+
+    def account(self, f: flow.Flow) -> None:
+        """Add a completed flow to the current bucket."""
+        b = self._bucket(time.time())
+        b.flows[f.type] += 1
+        if f.error:
+            b.errors += 1
+        if isinstance(f, http.HTTPFlow):
+            b.bytes_in += f.request.raw_size
+            b.hosts.add(f.request.pretty_host)
+            b.paths.add(f.request.path.split("?", 1)[0])
+            if f.response:
+                b.bytes_out += f.response.raw_size
+                b.status_codes[f.response.status_code] += 1
+                if f.response.timestamp_end and f.request.timestamp_start:
+                    b.latency.add(f.response.timestamp_end - f.request.timestamp_start)
+        elif isinstance(f, (tcp.TCPFlow, udp.UDPFlow)):
+            for m in f.messages:
+                if m.from_client:
+                    b.bytes_in += len(m.content)
+                else:
+                    b.bytes_out += len(m.content)
+        elif isinstance(f, dns.DNSFlow):
+            b.bytes_in += f.request.size
+            if f.response:
+                b.bytes_out += f.response.size
+
+    def stats(self, window: int | None = None) -> dict[str, Any]:
+        """
+        Traffic statistics for the last `window` seconds, or for the whole retention period.
+        """
+        now = time.time()
+        self._expire(now)
+        since = now - window if window else 0
+        buckets = [b for b in self.buckets if b.start + BUCKET_SECONDS > since]
+        by_type: collections.Counter[str] = collections.Counter()
+        status_codes: collections.Counter[int] = collections.Counter()
+        latency = DDSketch()
+        for b in buckets:
+            by_type.update(b.flows)
+            status_codes.update(b.status_codes)
+            latency.merge(b.latency)
+        flows = sum(by_type.values())
+        errors = sum(b.errors for b in buckets)
+        return {
+            "window": window or ctx.options.analytics_retention,
+            "flows": flows,
+            "flows_by_type": dict(by_type),
+            "errors": errors,
+            "error_rate": errors / flows if flows else 0.0,
+            "bytes_in": sum(b.bytes_in for b in buckets),
+            "bytes_out": sum(b.bytes_out for b in buckets),
+            "status_codes": {str(k): v for k, v in sorted(status_codes.items())},
+            "latency": {
+                "count": latency.count,
+                "avg": latency.sum / latency.count if latency.count else None,
+                "p50": latency.quantile(0.5),
+                "p90": latency.quantile(0.9),
+                "p99": latency.quantile(0.99),
+            },
+            "top_hosts": TopK.combine([b.hosts for b in buckets]).top(),
+            "top_paths": TopK.combine([b.paths for b in buckets]).top(),
+        }
+
+    @command.command("analytics.stats")
+    def stats_cmd(self, window: int = 0) -> str:
+        """
+        Summarize the traffic of the last `window` seconds (0 for the whole retention period).
+        """
+        s = self.stats(window or None)
+        ret = (
+            f"{s['flows']} flows in {s['window']}s, "
+            f"{s['error_rate']:.1%} errors, "
+            f"{s['bytes_in']} bytes in, {s['bytes_out']} bytes out"
+        )
+        if s["latency"]["count"]:
+            ret += (
+                f", latency p50 {s['latency']['p50'] * 1000:.0f}ms"
+                f" p99 {s['latency']['p99'] * 1000:.0f}ms"
+            )
+        return ret
+
+    def response(self, f: http.HTTPFlow):
+        self.account(f)
+
+    def error(self, f: http.HTTPFlow):
+        if not f.response:
+            self.account(f)
+
+    def tcp_end(self, f: tcp.TCPFlow):
+        self.account(f)
+
+    def tcp_error(self, f: tcp.TCPFlow):
+        self.account(f)
+
+    def udp_end(self, f: udp.UDPFlow):
+        self.account(f)
+
+    def udp_error(self, f: udp.UDPFlow):
+        self.account(f)
+
+    def dns_response(self, f: dns.DNSFlow):
+        self.account(f)
+
+    def dns_error(self, f: dns.DNSFlow):
+        self.account(f)
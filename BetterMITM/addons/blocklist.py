@@ -1,12 +1,36 @@
+import asyncio
+import logging
+import os
+from collections.abc import Iterable
 from collections.abc import Sequence
 from typing import NamedTuple
 
+from BetterMITM import command
 from BetterMITM import ctx
+from BetterMITM import dns
 from BetterMITM import exceptions
 from BetterMITM import flowfilter
 from BetterMITM import http
+from BetterMITM import tls
 from BetterMITM import version
 from BetterMITM.net.http.status_codes import NO_RESPONSE
+from BetterMITM.proxy import server_hooks
+from BetterMITM.utils import asyncio_utils
+
+logger = logging.getLogger(__name__)
+
+BLOCK_DOMAINS_POLL_INTERVAL = 5
+"""Number of seconds between checks whether a domain blocklist file has changed."""
+
+_HOSTS_FILE_NAMES = {
+    "localhost",
+    "localhost.localdomain",
+    "local",
+    "broadcasthost",
+    "ip6-localhost",
+    "ip6-loopback",
+    "0.0.0.0",
+}
 
 
 class BlockSpec(NamedTuple):
@@ -36,9 +60,57 @@ def parse_spec(option: str) -> BlockSpec:
     return BlockSpec(matches=flow_filter, status_code=status_code)
 
 
+def parse_domains(lines: Iterable[str]) -> set[str]:
+    """
+    Parse a domain list in hosts file format ("0.0.0.0 example.com") or with one domain per line.
+    Comments starting with # are ignored.
+    """
+    domains = set()
+    for line in lines:
+        line = line.partition("#")[0]
+        fields = line.split()
+        if not fields:
+            continue
+        if len(fields) > 1:
+            fields = fields[1:]
+        for name in fields:
+            name = name.strip(".").lower()
+            if name and name not in _HOSTS_FILE_NAMES:
+                domains.add(name)
+    return domains
+
+
+def load_domains(paths: Sequence[str]) -> frozenset[str]:
+    domains: set[str] = set()
+    for path in paths:
+        with open(os.path.expanduser(path), encoding="utf8", errors="replace") as f:
+            domains |= parse_domains(f)
+    return frozenset(domains)
+
+
+def domain_matches(domains: frozenset[str], host: str | None) -> bool:
+    """
+    Check if a host or any of its parent domains is in the given set.
+    This takes one set lookup per label of the host.
+    """
+    if not host or not domains:
+        return False
+    host = host.rstrip(".").lower()
+    while True:
+        if host in domains:
+            return True
+        _, dot, host = host.partition(".")
+        if not dot:
+            return False
+
+
 class BlockList:
     def __init__(self) -> None:
         self.items: list[BlockSpec] = []
+        self.domains: frozenset[str] = frozenset()
+        self._domains_mtimes: dict[str, float] = {}
+        self._reload_task: asyncio.Task | None = None
+        self._watch_task: asyncio.Task | None = None
 
     def load(self, loader):
         loader.add_option(
@@ -53,6 +125,26 @@ class BlockList:
             Setting a non-standard status code of 444 will close the connection without sending a response.
             """,
         )
+        loader.add_option(
+            "block_domains",
+            Sequence[str],
+            [],
+            """
+            Block all requests to the domains (and their subdomains) listed in these files.
+            Files may be in hosts file format or list one domain per line.
+            Blocked hosts are rejected before a server connection is made, DNS queries
+            for them are answered with NXDOMAIN. Files are reloaded when they change.
+            """,
+        )
+        loader.add_option(
+            "block_domains_status",
+            int,
+            403,
+            """
+            The HTTP status code to return for requests blocked by block_domains.
+            Setting a non-standard status code of 444 will close the connection without sending a response.
+            """,
+        )
 
     def configure(self, updated):
         if "block_list" in updated:
@@ -65,17 +157,119 @@ class BlockList:
                         f"Cannot parse block_list option {option}: {e}"
                     ) from e
                 self.items.append(spec)
+        if "block_domains" in updated:
+            for path in ctx.options.block_domains:
+                if not os.path.isfile(os.path.expanduser(path)):
+                    raise exceptions.OptionsError(
+                        f"Cannot read block_domains file: {path}"
+                    )
+            self.reload_domains()
+
+    def running(self) -> None:
+        self._watch_task = asyncio_utils.create_task(
+            self.watch_domains(),
+            name="watch domain blocklists",
+            keep_ref=False,
+        )
+
+    def done(self) -> None:
+        for task in (self._reload_task, self._watch_task):
+            if task:
+                task.cancel()
+
+    @command.command("blocklist.reload")
+    def reload_domains(self) -> None:
+        """
+        Reload the domain blocklist files.
+        With a running event loop, the files are parsed in a background thread and the
+        current blocklist is kept in place until loading has completed.
+        """
+        paths = list(ctx.options.block_domains)
+        self._domains_mtimes = self._mtimes(paths)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.domains = load_domains(paths)
+            return
+        if self._reload_task:
+            self._reload_task.cancel()
+        self._reload_task = asyncio_utils.create_task(
+            self._load_domains(paths),
+            name="load domain blocklists",
+            keep_ref=False,
+        )
+
+    async def _load_domains(self, paths: list[str]) -> None:
+        try:
+            self.domains = await asyncio.to_thread(load_domains, paths)
+        except OSError as e:
+            logger.error(f"Error loading domain blocklist: {e}")
+        else:
+            if paths:
+                logger.info(f"Loaded {len(self.domains)} blocked domains.")
+
+    @staticmethod
+    def _mtimes(paths: Sequence[str]) -> dict[str, float]:
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.stat(os.path.expanduser(path)).st_mtime
+            except OSError:
+                pass
+        return mtimes
+
+    async def watch_domains(self) -> None:
+        while True:
+            await asyncio.sleep(BLOCK_DOMAINS_POLL_INTERVAL)
+            if self._domains_mtimes != self._mtimes(ctx.options.block_domains):
+                self.reload_domains()
+
+    def is_blocked_host(self, *hosts: str | None) -> bool:
+        return any(domain_matches(self.domains, host) for host in hosts)
+
+    def block(self, flow: http.HTTPFlow, status_code: int) -> None:
+        flow.metadata["blocklisted"] = True
+        if status_code == NO_RESPONSE:
+            flow.kill()
+        else:
+            flow.response = http.Response.make(
+                status_code, headers={"Server": version.MITMPROXY}
+            )
+
+    def http_connect(self, flow: http.HTTPFlow) -> None:
+        if flow.response or flow.error or not flow.live:
+            return
+        if self.is_blocked_host(flow.request.host):
+            self.block(flow, ctx.options.block_domains_status)
 
     def request(self, flow: http.HTTPFlow) -> None:
         if flow.response or flow.error or not flow.live:
             return
 
+        if self.is_blocked_host(flow.request.pretty_host):
+            self.block(flow, ctx.options.block_domains_status)
+            return
+
         for spec in self.items:
             if spec.matches(flow):
-                flow.metadata["blocklisted"] = True
-                if spec.status_code == NO_RESPONSE:
-                    flow.kill()
-                else:
-                    flow.response = http.Response.make(
-                        spec.status_code, headers={"Server": version.MITMPROXY}
-                    )
+                self.block(flow, spec.status_code)
+
+    def tls_clienthello(self, data: tls.ClientHelloData) -> None:
+        if self.is_blocked_host(data.client_hello.sni):
+            # Connecting upstream right away hits server_connect below,
+            # which rejects the connection before the client handshake completes.
+            data.establish_server_tls_first = True
+
+    def server_connect(self, data: server_hooks.ServerConnectionHookData) -> None:
+        if data.server.error:
+            return
+        address = data.server.address[0] if data.server.address else None
+        if self.is_blocked_host(data.client.sni, data.server.sni, address):
+            data.server.error = "Blocked by domain blocklist."
+
+    def dns_request(self, flow: dns.DNSFlow) -> None:
+        if flow.response or flow.error or not flow.live:
+            return
+        if any(domain_matches(self.domains, q.name) for q in flow.request.questions):
+            flow.metadata["blocklisted"] = True
+            flow.response = flow.request.fail(dns.response_codes.NXDOMAIN)
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import collections
 import logging
 import time
+import weakref
 from collections.abc import Sequence
+from dataclasses import dataclass
 from types import TracebackType
 from typing import cast
 from typing import Literal
@@ -29,9 +32,21 @@ from BetterMITM.proxy.layer import CommandGenerator
 from BetterMITM.proxy.layers.http import HTTPMode
 from BetterMITM.proxy.mode_specs import UpstreamMode
 from BetterMITM.utils import asyncio_utils
+from BetterMITM.utils import human
+from BetterMITM.utils.sketches import DDSketch
 
 logger = logging.getLogger(__name__)
 
+KEEPALIVE_TIMEOUT = 60.0
+"""Seconds an idle connection opened by `ClientPlayback.send` is kept open for reuse."""
+
+
+@dataclass
+class SendRequest(events.Event):
+    """Send another request through an already started replay handler."""
+
+    flow: http.HTTPFlow
+
 
 class MockServer(layers.http.HttpConnection):
     """
@@ -44,29 +59,13 @@ class MockServer(layers.http.HttpConnection):
     def __init__(self, flow: http.HTTPFlow, context: Context):
         super().__init__(context, context.client)
         self.flow = flow
+        self.next_stream_id = 1
 
     def _handle_event(self, event: events.Event) -> CommandGenerator[None]:
         if isinstance(event, events.Start):
-            content = self.flow.request.raw_content
-            self.flow.request.timestamp_start = self.flow.request.timestamp_end = (
-                time.time()
-            )
-            yield layers.http.ReceiveHttp(
-                layers.http.RequestHeaders(
-                    1,
-                    self.flow.request,
-                    end_stream=not (content or self.flow.request.trailers),
-                    replay_flow=self.flow,
-                )
-            )
-            if content:
-                yield layers.http.ReceiveHttp(layers.http.RequestData(1, content))
-            if self.flow.request.trailers:
-
-                yield layers.http.ReceiveHttp(
-                    layers.http.RequestTrailers(1, self.flow.request.trailers)
-                )
-            yield layers.http.ReceiveHttp(layers.http.RequestEndOfMessage(1))
+            yield from self.send_request(self.flow)
+        elif isinstance(event, SendRequest):
+            yield from self.send_request(event.flow)
         elif isinstance(
             event,
             (
@@ -81,6 +80,37 @@ class MockServer(layers.http.HttpConnection):
         else:
             logger.warning(f"Unexpected event during replay: {event}")
 
+    def send_request(self, flow: http.HTTPFlow) -> CommandGenerator[None]:
+        stream_id = self.next_stream_id
+        self.next_stream_id += 2
+        content = flow.request.raw_content
+        flow.request.timestamp_start = flow.request.timestamp_end = time.time()
+        yield layers.http.ReceiveHttp(
+            layers.http.RequestHeaders(
+                stream_id,
+                flow.request,
+                end_stream=not (content or flow.request.trailers),
+                replay_flow=flow,
+            )
+        )
+        if content:
+            yield layers.http.ReceiveHttp(layers.http.RequestData(stream_id, content))
+        if flow.request.trailers:
+            yield layers.http.ReceiveHttp(
+                layers.http.RequestTrailers(stream_id, flow.request.trailers)
+            )
+        yield layers.http.ReceiveHttp(layers.http.RequestEndOfMessage(stream_id))
+
+
+class ReplayLayer(layers.HttpLayer):
+    """An HTTP layer that additionally accepts `SendRequest` events."""
+
+    def _handle_event(self, event: events.Event):
+        if isinstance(event, SendRequest):
+            yield from self.event_to_child(self.connections[self.context.client], event)
+        else:
+            yield from super()._handle_event(event)
+
 
 class ReplayHandler(server.ConnectionHandler):
     layer: layers.HttpLayer
@@ -102,9 +132,9 @@ class ReplayHandler(server.ConnectionHandler):
         super().__init__(context)
 
         if options.mode and options.mode[0].startswith("upstream:"):
-            self.layer = layers.HttpLayer(context, HTTPMode.upstream)
+            self.layer = ReplayLayer(context, HTTPMode.upstream)
         else:
-            self.layer = layers.HttpLayer(context, HTTPMode.transparent)
+            self.layer = ReplayLayer(context, HTTPMode.transparent)
         self.layer.connections[client] = MockServer(flow, context.fork())
         self.flow = flow
         self.done = asyncio.Event()
@@ -130,33 +160,134 @@ class ReplayHandler(server.ConnectionHandler):
         if isinstance(data, flow.Flow):
             await data.wait_for_resume()
         if isinstance(hook, (layers.http.HttpResponseHook, layers.http.HttpErrorHook)):
-            if self.transports:
+            assert isinstance(data, http.HTTPFlow)
+            await self.finish(data)
+
+    async def finish(self, f: http.HTTPFlow) -> None:
+        await self.close()
+        self.done.set()
+
+    async def close(self) -> None:
+        if self.transports:
+            for x in self.transports.values():
+                if x.handler:
+                    x.handler.cancel()
+            await asyncio.wait(
+                [x.handler for x in self.transports.values() if x.handler]
+            )
 
-                for x in self.transports.values():
-                    if x.handler:
-                        x.handler.cancel()
-                await asyncio.wait(
-                    [x.handler for x in self.transports.values() if x.handler]
-                )
 
-            self.done.set()
+class KeepAliveReplayHandler(ReplayHandler):
+    """
+    A replay handler that keeps its server connection open after a response has been
+    received, so that further requests to the same server can reuse it.
+    """
+
+    def __init__(self, flow: http.HTTPFlow, options: Options) -> None:
+        super().__init__(flow, options)
+        self.started = False
+        self.lock = asyncio.Lock()
+        self.waiting: dict[str, asyncio.Event] = {}
+        self.last_used = time.monotonic()
+
+    async def send(self, f: http.HTTPFlow) -> None:
+        """Send a request and wait until its response or error hook has completed."""
+        async with self.lock:
+            done = self.waiting[f.id] = asyncio.Event()
+            try:
+                if self.started:
+                    await self.server_event(SendRequest(f))
+                else:
+                    assert f is self.flow
+                    self.started = True
+                    await self.server_event(events.Start())
+                await done.wait()
+            finally:
+                self.waiting.pop(f.id, None)
+                self.last_used = time.monotonic()
+
+    async def finish(self, f: http.HTTPFlow) -> None:
+        if done := self.waiting.get(f.id):
+            done.set()
+
+
+class ReplayReport:
+    """Latency and error statistics of a client replay run."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.finished: float | None = None
+        self.requests = 0
+        self.responses = 0
+        self.latency = DDSketch()
+        self.status_codes: collections.Counter[int] = collections.Counter()
+        self.errors: collections.Counter[str] = collections.Counter()
+
+    def add(self, f: http.HTTPFlow, duration: float) -> None:
+        self.requests += 1
+        if f.response:
+            self.responses += 1
+            self.status_codes[f.response.status_code] += 1
+            self.latency.add(duration)
+        else:
+            self.errors[f.error.msg if f.error else "no response"] += 1
+
+    def __str__(self) -> str:
+        elapsed = (self.finished or time.monotonic()) - self.started
+        lines = [
+            f"Client replay: {self.requests} requests in {human.pretty_duration(elapsed)} "
+            f"({self.requests / elapsed if elapsed else 0:.1f}/s), "
+            f"{self.responses} responses, {self.errors.total()} errors."
+        ]
+        if self.latency.count:
+            lines.append(
+                "Latency: "
+                + ", ".join(
+                    f"{name} {human.pretty_duration(self.latency.quantile(q))}"
+                    for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+                )
+                + f", avg {human.pretty_duration(self.latency.sum / self.latency.count)}"
+            )
+            lines.append(
+                "Status codes: "
+                + ", ".join(f"{c}: {n}" for c, n in sorted(self.status_codes.items()))
+            )
+        for msg, n in self.errors.most_common(5):
+            lines.append(f"Error: {msg} ({n}x)")
+        return "\n".join(lines)
 
 
 class ClientPlayback:
     playback_task: asyncio.Task | None = None
-    inflight: http.HTTPFlow | None
+    inflight: set[http.HTTPFlow]
     queue: asyncio.Queue
     options: Options
     replay_tasks: set[asyncio.Task]
+    keepalive: dict[tuple, list[KeepAliveReplayHandler]]
+    report: ReplayReport | None
 
     def __init__(self):
         self.queue = asyncio.Queue()
-        self.inflight = None
+        self.inflight = set()
         self.task = None
         self.replay_tasks = set()
+        self.keepalive = {}
+        self._idle_task: asyncio.Task | None = None
+        self.report = None
+        self.waiting: http.HTTPFlow | None = None
+        self._inflight_changed = asyncio.Condition()
+        self._next_send = 0.0
+        self._timing_base: tuple[float, float] | None = None
+        # Replaying a flow overwrites its timestamps, so the recorded ones are kept here.
+        self._recorded_start: weakref.WeakKeyDictionary[http.HTTPFlow, float] = (
+            weakref.WeakKeyDictionary()
+        )
 
     def running(self):
         self.options = ctx.options
+        self._start_playback()
+
+    def _start_playback(self) -> None:
         self.playback_task = asyncio_utils.create_task(
             self.playback(),
             name="client playback",
@@ -164,37 +295,146 @@ class ClientPlayback:
         )
 
     async def done(self):
-        if self.playback_task:
-            self.playback_task.cancel()
-            try:
-                await self.playback_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self.playback_task, self._idle_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await self.close_idle(0)
 
     async def playback(self):
         while True:
-            self.inflight = await self.queue.get()
-            try:
-                assert self.inflight
-                h = ReplayHandler(self.inflight, self.options)
-                if ctx.options.client_replay_concurrency == -1:
-                    t = asyncio_utils.create_task(
-                        h.replay(),
-                        name="client playback awaiting response",
-                        keep_ref=False,
-                    )
-
-                    self.replay_tasks.add(t)
-                    t.add_done_callback(self.replay_tasks.remove)
-                else:
-                    await h.replay()
-            except Exception:
-                logger.exception(f"Client replay has crashed!")
-            self.queue.task_done()
-            self.inflight = None
+            self.waiting = f = await self.queue.get()
+            async with self._inflight_changed:
+                await self._inflight_changed.wait_for(self._has_capacity)
+            if self.report is None or self.report.finished:
+                self.report = ReplayReport()
+                self._timing_base = None
+            await self._pace(f)
+            self.inflight.add(f)
+            self.waiting = None
+            t = asyncio_utils.create_task(
+                self._replay(f, self.report),
+                name="client playback awaiting response",
+                keep_ref=False,
+            )
+            self.replay_tasks.add(t)
+            t.add_done_callback(self.replay_tasks.discard)
+
+    def _has_capacity(self) -> bool:
+        limit = ctx.options.client_replay_concurrency
+        return limit == -1 or len(self.inflight) < limit
+
+    async def _pace(self, f: http.HTTPFlow) -> None:
+        """Wait until `f` may be sent according to the replay rate and timing options."""
+        now = time.monotonic()
+        at = now
+        if speed := ctx.options.client_replay_speed:
+            timestamp = self._recorded_start.get(f, f.request.timestamp_start)
+            if self._timing_base is None:
+                self._timing_base = (now, timestamp)
+            start, recorded = self._timing_base
+            at = max(at, start + (timestamp - recorded) / speed)
+        if rate := ctx.options.client_replay_rate:
+            at = max(at, self._next_send)
+            self._next_send = at + 1 / rate
+        if at > now:
+            await asyncio.sleep(at - now)
+
+    async def _replay(self, f: http.HTTPFlow, report: ReplayReport) -> None:
+        start = time.monotonic()
+        try:
+            if ctx.options.client_replay_keepalive:
+                await self.send(f)
+            else:
+                await ReplayHandler(f, self.options).replay()
+        except Exception:
+            logger.exception(f"Client replay has crashed!")
+        report.add(f, time.monotonic() - start)
+        self.inflight.discard(f)
+        self.queue.task_done()
+        if not self.inflight and not self.waiting and self.queue.empty():
+            report.finished = time.monotonic()
+            logger.log(ALERT, str(report))
+        async with self._inflight_changed:
+            self._inflight_changed.notify()
+
+    async def send(self, f: http.HTTPFlow, timeout: float | None = None) -> None:
+        """
+        Send a new request through the proxy and wait for its response.
+
+        Unlike replays from the queue, server connections are kept open afterwards,
+        so that subsequent requests to the same server can reuse them.
+        """
+        await self.close_idle(KEEPALIVE_TIMEOUT)
+        f.is_replay = "request"
+        key = (
+            f.request.scheme,
+            f.request.host,
+            f.request.port,
+            ctx.options.mode[0] if ctx.options.mode else None,
+        )
+        handlers = self.keepalive.setdefault(key, [])
+        h = next((h for h in handlers if not h.lock.locked()), None)
+        if h is None:
+            h = KeepAliveReplayHandler(f, ctx.options)
+            handlers.append(h)
+        if self._idle_task is None:
+            self._idle_task = asyncio_utils.create_task(
+                self._close_idle_loop(),
+                name="close idle replay connections",
+                keep_ref=False,
+            )
+        error = None
+        try:
+            await asyncio.wait_for(h.send(f), timeout)
+        except TimeoutError:
+            error = "Request timed out."
+        except Exception:
+            logger.exception("Sending request has crashed!")
+            error = "Sending request has crashed."
+        if error or f.error:
+            await self._discard(key, h)
+        if error:
+            f.error = flow.Error(error)
+            ctx.master.addons.trigger(UpdateHook([f]))
+
+    async def close_idle(self, timeout: float) -> None:
+        """Close connections opened by `send` that have been idle for `timeout` seconds."""
+        now = time.monotonic()
+        for key, handlers in list(self.keepalive.items()):
+            for h in list(handlers):
+                if not h.lock.locked() and now - h.last_used >= timeout:
+                    await self._discard(key, h)
+
+    async def _close_idle_loop(self) -> None:
+        """Close idle connections as soon as they time out, for as long as there are any."""
+        try:
+            while self.keepalive:
+                idle = [
+                    h.last_used
+                    for handlers in self.keepalive.values()
+                    for h in handlers
+                    if not h.lock.locked()
+                ]
+                expiry = min(idle, default=time.monotonic()) + KEEPALIVE_TIMEOUT
+                await asyncio.sleep(max(expiry - time.monotonic(), 0))
+                await self.close_idle(KEEPALIVE_TIMEOUT)
+        finally:
+            self._idle_task = None
+
+    async def _discard(self, key: tuple, h: KeepAliveReplayHandler) -> None:
+        handlers = self.keepalive.get(key, [])
+        if h in handlers:
+            handlers.remove(h)
+            if not handlers:
+                del self.keepalive[key]
+        await h.close()
 
     def check(self, f: flow.Flow) -> str | None:
-        if f.live or f == self.inflight:
+        if f.live or f in self.inflight or f is self.waiting:
             return "Can't replay live flow."
         if f.intercepted:
             return "Can't replay intercepted flow."
@@ -220,7 +460,28 @@ class ClientPlayback:
             "client_replay_concurrency",
             int,
             1,
-            "Concurrency limit on in-flight client replay requests. Currently the only valid values are 1 and -1 (no limit).",
+            "Concurrency limit on in-flight client replay requests, -1 for no limit.",
+        )
+        loader.add_option(
+            "client_replay_rate",
+            float,
+            0,
+            "Maximum number of client replay requests started per second, 0 for no limit.",
+        )
+        loader.add_option(
+            "client_replay_speed",
+            float,
+            0,
+            """
+            Replay client requests with their original inter-arrival timing, sped up by
+            this factor (e.g. 2 replays twice as fast). 0 sends requests as soon as possible.
+            """,
+        )
+        loader.add_option(
+            "client_replay_keepalive",
+            bool,
+            False,
+            "Reuse server connections for client replay requests to the same host.",
         )
 
     def configure(self, updated):
@@ -232,17 +493,30 @@ class ClientPlayback:
             self.start_replay(flows)
 
         if "client_replay_concurrency" in updated:
-            if ctx.options.client_replay_concurrency not in [-1, 1]:
+            concurrency = ctx.options.client_replay_concurrency
+            if concurrency < 1 and concurrency != -1:
                 raise exceptions.OptionsError(
-                    "Currently the only valid client_replay_concurrency values are -1 and 1."
+                    "client_replay_concurrency must be a positive number or -1."
                 )
+        for name in ("client_replay_rate", "client_replay_speed"):
+            if name in updated and getattr(ctx.options, name) < 0:
+                raise exceptions.OptionsError(f"{name} must not be negative.")
 
     @command.command("replay.client.count")
     def count(self) -> int:
         """
         Approximate number of flows queued for replay.
         """
-        return self.queue.qsize() + int(bool(self.inflight))
+        return self.queue.qsize() + len(self.inflight) + int(bool(self.waiting))
+
+    @command.command("replay.client.report")
+    def get_report(self) -> str:
+        """
+        Summary of the current or last client replay run.
+        """
+        if self.report is None:
+            return "No client replay has been run."
+        return str(self.report)
 
     @command.command("replay.client.stop")
     def stop_replay(self) -> None:
@@ -250,6 +524,15 @@ class ClientPlayback:
         Clear the replay queue.
         """
         updated = []
+        if f := self.waiting:
+            # The flow has already been taken from the queue and waits for its turn.
+            self.waiting = None
+            if self.playback_task:
+                self.playback_task.cancel()
+                self._start_playback()
+            self.queue.task_done()
+            f.revert()
+            updated.append(f)
         while True:
             try:
                 f = self.queue.get_nowait()
@@ -276,6 +559,9 @@ class ClientPlayback:
                 continue
 
             http_flow = cast(http.HTTPFlow, f)
+            self._recorded_start.setdefault(
+                http_flow, http_flow.request.timestamp_start
+            )
 
 
             http_flow.backup()
@@ -1,8 +1,13 @@
+import asyncio
+import collections
 import logging
 import mimetypes
 import re
+import time
 import urllib.parse
 from collections.abc import Sequence
+from email.utils import formatdate
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from typing import NamedTuple
 
@@ -13,8 +18,18 @@ from BetterMITM import exceptions
 from BetterMITM import flowfilter
 from BetterMITM import http
 from BetterMITM import version
+from BetterMITM.net.http.headers import parse_range
 from BetterMITM.utils.spec import parse_spec
 
+RESOLVE_CACHE_TTL = 1.0
+"""Number of seconds for which the local file that serves a URL is cached before it is looked up again."""
+RESOLVE_CACHE_ENTRIES = 4096
+"""Maximum number of URLs for which the local file is cached."""
+CONTENT_CACHE_SIZE = 32 * 1024 * 1024
+"""Total size of the in-memory cache for small files."""
+SMALL_FILE_SIZE = 1024 * 1024
+"""Files up to this size are cached in memory, larger files are served from disk."""
+
 
 class MapLocalSpec(NamedTuple):
     matches: flowfilter.TFilter
@@ -79,9 +94,69 @@ def file_candidates(url: str, spec: MapLocalSpec) -> list[Path]:
         return [spec.local_path / "index.html"]
 
 
+class LocalFile(NamedTuple):
+    path: Path
+    size: int
+    mtime_ns: int
+    mimetype: str | None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.mtime_ns:x}-{self.size:x}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime_ns / 1e9, usegmt=True)
+
+
+def resolve_local_file(
+    url: str, spec: MapLocalSpec
+) -> tuple[list[Path], LocalFile | OSError | None]:
+    """
+    Find the local file that serves a URL. This does blocking file system calls.
+    Returns all candidates and either the file, the error that occurred when accessing it,
+    or `None` if none of the candidates exist.
+    """
+    if spec.local_path.is_file():
+        candidates = [spec.local_path]
+    else:
+        candidates = file_candidates(url, spec)
+    for candidate in candidates:
+        if candidate.is_file():
+            try:
+                st = candidate.stat()
+            except OSError as e:
+                return candidates, e
+            mimetype = mimetypes.guess_type(str(candidate))[0]
+            file = LocalFile(candidate, st.st_size, st.st_mtime_ns, mimetype)
+            return candidates, file
+    return candidates, None
+
+
+def not_modified(request: http.Request, file: LocalFile) -> bool:
+    """Check the conditional request headers against a local file."""
+    if if_none_match := request.headers.get("If-None-Match"):
+        etags = [x.strip() for x in if_none_match.split(",")]
+        return "*" in etags or file.etag in etags
+    if if_modified_since := request.headers.get("If-Modified-Since"):
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return file.mtime_ns // 1_000_000_000 <= since
+    return False
+
+
 class MapLocal:
     def __init__(self) -> None:
         self.replacements: list[MapLocalSpec] = []
+        self._resolved: collections.OrderedDict[
+            tuple[int, str], tuple[float, list[Path], LocalFile | None]
+        ] = collections.OrderedDict()
+        self._contents: collections.OrderedDict[Path, tuple[int, int, bytes]] = (
+            collections.OrderedDict()
+        )
+        self._contents_size = 0
 
     def load(self, loader):
         loader.add_option(
@@ -107,42 +182,114 @@ class MapLocal:
                     ) from e
 
                 self.replacements.append(spec)
+            self._resolved.clear()
+            self._contents.clear()
+            self._contents_size = 0
 
-    def request(self, flow: http.HTTPFlow) -> None:
+    async def resolve(
+        self, i: int, url: str
+    ) -> tuple[list[Path], LocalFile | OSError | None]:
+        """Look up the local file for a URL, using recent results from the cache."""
+        now = time.monotonic()
+        if cached := self._resolved.get((i, url)):
+            timestamp, candidates, file = cached
+            if now - timestamp < RESOLVE_CACHE_TTL:
+                self._resolved.move_to_end((i, url))
+                return candidates, file
+        candidates, result = await asyncio.to_thread(
+            resolve_local_file, url, self.replacements[i]
+        )
+        if not isinstance(result, OSError):
+            self._resolved[(i, url)] = (now, candidates, result)
+            self._resolved.move_to_end((i, url))
+            if len(self._resolved) > RESOLVE_CACHE_ENTRIES:
+                self._resolved.popitem(last=False)
+        return candidates, result
+
+    async def read(self, file: LocalFile) -> bytes:
+        """Read a small file, using the in-memory cache if the file has not changed."""
+        if cached := self._contents.get(file.path):
+            mtime_ns, size, contents = cached
+            if (mtime_ns, size) == (file.mtime_ns, file.size):
+                self._contents.move_to_end(file.path)
+                return contents
+            self._contents_size -= len(contents)
+            del self._contents[file.path]
+        contents = await asyncio.to_thread(file.path.read_bytes)
+        self._contents[file.path] = (file.mtime_ns, file.size, contents)
+        self._contents_size += len(contents)
+        while self._contents_size > CONTENT_CACHE_SIZE:
+            _, (_, _, evicted) = self._contents.popitem(last=False)
+            self._contents_size -= len(evicted)
+        return contents
+
+    async def serve(self, flow: http.HTTPFlow, file: LocalFile) -> None:
+        headers = {
+            "Server": version.MITMPROXY,
+            "ETag": file.etag,
+            "Last-Modified": file.last_modified,
+            "Accept-Ranges": "bytes",
+        }
+        if file.mimetype:
+            headers["Content-Type"] = file.mimetype
+
+        if not_modified(flow.request, file):
+            flow.response = http.Response.make(304, b"", headers)
+            del flow.response.headers["Content-Length"]
+            return
+
+        status_code = 200
+        start, stop = 0, file.size
+        if_range = flow.request.headers.get("If-Range")
+        if if_range is None or if_range in (file.etag, file.last_modified):
+            try:
+                r = parse_range(flow.request.headers.get("Range"), file.size)
+            except ValueError:
+                headers["Content-Range"] = f"bytes */{file.size}"
+                flow.response = http.Response.make(416, b"", headers)
+                return
+            if r:
+                start, stop = r
+                status_code = 206
+                headers["Content-Range"] = f"bytes {start}-{stop - 1}/{file.size}"
+
+        if file.size <= SMALL_FILE_SIZE:
+            contents = await self.read(file)
+            flow.response = http.Response.make(
+                status_code, contents[start:stop], headers
+            )
+        else:
+            # Large files are not read here, they are sent from disk in chunks.
+            flow.response = http.Response.make(status_code, b"", headers)
+            flow.response.data.content = None
+            flow.response.body_file = http.BodyFile(
+                None, stop - start, str(file.path), offset=start
+            )
+            flow.response.headers["Content-Length"] = str(stop - start)
+
+    async def request(self, flow: http.HTTPFlow) -> None:
         if flow.response or flow.error or not flow.live:
             return
 
         url = flow.request.pretty_url
 
         all_candidates = []
-        for spec in self.replacements:
+        for i, spec in enumerate(self.replacements):
             if spec.matches(flow) and re.search(spec.regex, url):
-                if spec.local_path.is_file():
-                    candidates = [spec.local_path]
-                else:
-                    candidates = file_candidates(url, spec)
+                candidates, local_file = await self.resolve(i, url)
                 all_candidates.extend(candidates)
 
-                local_file = None
-                for candidate in candidates:
-                    if candidate.is_file():
-                        local_file = candidate
-                        break
+                if isinstance(local_file, OSError):
+                    logging.warning(f"Could not read file: {local_file}")
+                    continue
 
                 if local_file:
-                    headers = {"Server": version.MITMPROXY}
-                    mimetype = mimetypes.guess_type(str(local_file))[0]
-                    if mimetype:
-                        headers["Content-Type"] = mimetype
-
                     try:
-                        contents = local_file.read_bytes()
+                        await self.serve(flow, local_file)
                     except OSError as e:
+                        self._resolved.pop((i, url), None)
                         logging.warning(f"Could not read file: {e}")
                         continue
-
-                    flow.response = http.Response.make(200, contents, headers)
-
                     return
         if all_candidates:
             flow.response = http.Response.make(404)
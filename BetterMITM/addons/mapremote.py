@@ -7,6 +7,8 @@ from BetterMITM import exceptions
 from BetterMITM import flowfilter
 from BetterMITM import http
 from BetterMITM.utils.spec import parse_spec
+from BetterMITM.utils.spec import required_literal
+from BetterMITM.utils.spec import SpecDispatch
 
 
 class MapRemoteSpec(NamedTuple):
@@ -29,6 +31,10 @@ def parse_map_remote_spec(option: str) -> MapRemoteSpec:
 class MapRemote:
     def __init__(self) -> None:
         self.replacements: list[MapRemoteSpec] = []
+        self.patterns: list[re.Pattern[str]] = []
+        self.literals: list[str | None] = []
+        """For each spec, a string that the URL must contain for the spec's regex to match."""
+        self.dispatch = SpecDispatch([])
 
     def load(self, loader):
         loader.add_option(
@@ -54,15 +60,30 @@ class MapRemote:
                     ) from e
 
                 self.replacements.append(spec)
+            self.patterns = [re.compile(spec.subject) for spec in self.replacements]
+            self.literals = [required_literal(p) for p in self.patterns]
+            self.dispatch = SpecDispatch([spec.matches for spec in self.replacements])
 
     def request(self, flow: http.HTTPFlow) -> None:
         if flow.response or flow.error or not flow.live:
             return
-        for spec in self.replacements:
-            if spec.matches(flow):
-                url = flow.request.pretty_url
-                new_url = re.sub(spec.subject, spec.replacement, url)
-
+        candidates = self.dispatch.candidates(flow)
+        pos = 0
+        while pos < len(candidates):
+            i = candidates[pos]
+            pos += 1
+            url = flow.request.pretty_url
+            literal = self.literals[i]
+            if literal is not None and literal not in url:
+                continue
+            if self.replacements[i].matches(flow):
+                new_url = self.patterns[i].sub(self.replacements[i].replacement, url)
 
                 if url != new_url:
+                    host = (flow.request.host, flow.request.pretty_host)
                     flow.request.url = new_url
+                    if (flow.request.host, flow.request.pretty_host) != host:
+                        candidates = [
+                            j for j in self.dispatch.candidates(flow) if j > i
+                        ]
+                        pos = 0
@@ -14,6 +14,12 @@ logger = logging.getLogger(__name__)
 class ModifyBody:
     def __init__(self) -> None:
         self.replacements: list[ModifySpec] = []
+        self.patterns: list[re.Pattern[bytes]] = []
+        self.combined: re.Pattern[bytes] | None = None
+        """
+        All patterns combined into one, used to skip bodies that none of them match.
+        `None` if the patterns cannot be combined safely (e.g. because they use groups).
+        """
 
     def load(self, loader):
         loader.add_option(
@@ -39,6 +45,10 @@ class ModifyBody:
                     ) from e
 
                 self.replacements.append(spec)
+            self.patterns = [
+                re.compile(spec.subject, re.DOTALL) for spec in self.replacements
+            ]
+            self.combined = combine_patterns(self.patterns)
 
         stream_and_modify_conflict = (
             ctx.options.modify_body
@@ -63,21 +73,35 @@ class ModifyBody:
         self.run(flow)
 
     def run(self, flow):
-        for spec in self.replacements:
+        if not self.replacements:
+            return
+        message = flow.response or flow.request
+        content = message.content
+        if content is None:
+            return
+        if self.combined is not None and not self.combined.search(content):
+            return
+        for spec, pattern in zip(self.replacements, self.patterns):
             if spec.matches(flow):
                 try:
                     replacement = spec.read_replacement()
                 except OSError as e:
                     logging.warning(f"Could not read replacement file: {e}")
                     continue
-                if flow.response:
-                    flow.response.content = re.sub(
-                        spec.subject,
-                        replacement,
-                        flow.response.content,
-                        flags=re.DOTALL,
-                    )
-                else:
-                    flow.request.content = re.sub(
-                        spec.subject, replacement, flow.request.content, flags=re.DOTALL
-                    )
+                content, count = pattern.subn(replacement, content)
+                if count:
+                    message.content = content
+
+
+def combine_patterns(patterns: list[re.Pattern[bytes]]) -> re.Pattern[bytes] | None:
+    """
+    Combine patterns into a single alternation that matches wherever any of them matches.
+    """
+    if not patterns or any(p.groups or p.flags & re.VERBOSE for p in patterns):
+        return None
+    try:
+        return re.compile(
+            b"|".join(b"(?:%s)" % p.pattern for p in patterns), re.DOTALL
+        )
+    except re.error:
+        return None
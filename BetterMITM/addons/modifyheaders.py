@@ -11,6 +11,7 @@ from BetterMITM import http
 from BetterMITM.http import Headers
 from BetterMITM.utils import strutils
 from BetterMITM.utils.spec import parse_spec
+from BetterMITM.utils.spec import SpecDispatch
 
 
 class ModifySpec(NamedTuple):
@@ -56,6 +57,7 @@ def parse_modify_spec(option: str, subject_is_regex: bool) -> ModifySpec:
 class ModifyHeaders:
     def __init__(self) -> None:
         self.replacements: list[ModifySpec] = []
+        self.dispatch = SpecDispatch([])
 
     def load(self, loader):
         loader.add_option(
@@ -80,6 +82,7 @@ class ModifyHeaders:
                         f"Cannot parse modify_headers option {option}: {e}"
                     ) from e
                 self.replacements.append(spec)
+            self.dispatch = SpecDispatch([spec.matches for spec in self.replacements])
 
     def requestheaders(self, flow):
         if flow.response or flow.error or not flow.live:
@@ -92,26 +95,21 @@ class ModifyHeaders:
         self.run(flow, flow.response.headers)
 
     def run(self, flow: http.HTTPFlow, hdrs: Headers) -> None:
-        matches = []
-
-
-        for spec in self.replacements:
-            matches.append(spec.matches(flow))
-
-
-        for i, spec in enumerate(self.replacements):
-            if matches[i]:
-                hdrs.pop(spec.subject, None)
-
-
-
-        for i, spec in enumerate(self.replacements):
-            if matches[i]:
-                try:
-                    replacement = spec.read_replacement()
-                except OSError as e:
-                    logging.warning(f"Could not read replacement file: {e}")
-                    continue
-                else:
-                    if replacement:
-                        hdrs.add(spec.subject, replacement)
+        matches = [
+            self.replacements[i]
+            for i in self.dispatch.candidates(flow)
+            if self.replacements[i].matches(flow)
+        ]
+
+        for spec in matches:
+            hdrs.pop(spec.subject, None)
+
+        for spec in matches:
+            try:
+                replacement = spec.read_replacement()
+            except OSError as e:
+                logging.warning(f"Could not read replacement file: {e}")
+                continue
+            else:
+                if replacement:
+                    hdrs.add(spec.subject, replacement)
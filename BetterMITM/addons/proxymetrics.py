@@ -0,0 +1,128 @@
+"""
+Instrumentation of the proxy itself: addon hook timings, event loop lag, layer events,
+active connections and streams, TLS handshake and certificate generation durations,
+throughput and queue depths. See `BetterMITM.utils.metrics`.
+"""
+
+import asyncio
+
+from BetterMITM import ctx
+from BetterMITM.proxy.layers.http import HttpLayer
+from BetterMITM.utils import asyncio_utils
+from BetterMITM.utils import metrics
+
+SAMPLE_INTERVAL = 1.0
+"""Seconds between event loop lag and throughput samples."""
+
+event_loop_lag = metrics.registry.histogram(
+    "bettermitm_event_loop_lag_seconds",
+    "Delay of scheduled event loop callbacks.",
+)
+bytes_per_second = metrics.registry.gauge(
+    "bettermitm_bytes_per_second",
+    "Number of bytes received from clients and servers per second.",
+)
+active_connections = metrics.registry.gauge(
+    "bettermitm_active_connections",
+    "Number of open client and server connections.",
+    ("side",),
+)
+active_streams = metrics.registry.gauge(
+    "bettermitm_active_streams",
+    "Number of HTTP requests in progress.",
+)
+queue_depth = metrics.registry.gauge(
+    "bettermitm_queue_depth",
+    "Number of items waiting in internal queues.",
+    ("queue",),
+)
+
+
+class ProxyMetrics:
+    def __init__(self) -> None:
+        self._sampler: asyncio.Task | None = None
+
+    def load(self, loader):
+        loader.add_option(
+            "proxy_metrics",
+            bool,
+            False,
+            "Collect performance metrics of the proxy core, which are exposed at the /metrics endpoint of mitmweb.",
+        )
+        if self.collect not in metrics.registry.collectors:
+            metrics.registry.collectors.append(self.collect)
+
+    def configure(self, updated):
+        if "proxy_metrics" in updated:
+            metrics.registry.enabled = ctx.options.proxy_metrics
+            if ctx.options.proxy_metrics:
+                try:
+                    asyncio.get_running_loop()
+                except RuntimeError:
+                    pass
+                else:
+                    self._start_sampler()
+            else:
+                self._stop_sampler()
+
+    def running(self):
+        if ctx.options.proxy_metrics:
+            self._start_sampler()
+
+    def done(self):
+        self._stop_sampler()
+        metrics.registry.enabled = False
+        if self.collect in metrics.registry.collectors:
+            metrics.registry.collectors.remove(self.collect)
+
+    def _start_sampler(self) -> None:
+        if self._sampler is None or self._sampler.done():
+            self._sampler = asyncio_utils.create_task(
+                self.sample(),
+                name="proxy metrics sampler",
+                keep_ref=False,
+            )
+
+    def _stop_sampler(self) -> None:
+        if self._sampler:
+            self._sampler.cancel()
+            self._sampler = None
+
+    async def sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+        last_bytes = sum(metrics.bytes_received.values.values())
+        while True:
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            now = loop.time()
+            event_loop_lag.observe(max(now - last - SAMPLE_INTERVAL, 0))
+            total = sum(metrics.bytes_received.values.values())
+            bytes_per_second.set((total - last_bytes) / (now - last))
+            last, last_bytes = now, total
+
+    def collect(self) -> None:
+        """Update gauges that are computed from the current proxy state."""
+        clients = servers = streams = paused = 0
+        proxyserver = ctx.master.addons.get("proxyserver")
+        for handler in getattr(proxyserver, "connections", {}).values():
+            clients += 1
+            servers += sum(
+                1
+                for conn, io in handler.transports.items()
+                if conn is not handler.client and io.writer is not None
+            )
+            for layer in handler.layer.context.layers:
+                paused += len(layer._paused_event_queue)
+                if isinstance(layer, HttpLayer):
+                    streams += len(layer.streams)
+                    for stream in layer.streams.values():
+                        paused += len(stream._paused_event_queue)
+        active_connections.set(clients, "client")
+        active_connections.set(servers, "server")
+        active_streams.set(streams)
+        queue_depth.set(paused, "paused_layer_events")
+        queue_depth.set(ctx.master.addons.offloaded_pending, "offloaded_hooks")
+        try:
+            queue_depth.set(len(asyncio.all_tasks()), "event_loop_tasks")
+        except RuntimeError:
+            pass
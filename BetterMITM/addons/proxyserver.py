@@ -8,6 +8,8 @@ import asyncio
 import collections
 import ipaddress
 import logging
+import os
+import socket
 from collections.abc import Iterable
 from collections.abc import Iterator
 from contextlib import contextmanager
@@ -234,6 +236,19 @@ class Proxyserver(ServerManager):
                     f"Invalid stream_large_bodies specification: "
                     f"{ctx.options.stream_large_bodies}"
                 )
+        if "body_spool_size" in updated:
+            try:
+                human.parse_size(ctx.options.body_spool_size)
+            except ValueError:
+                raise exceptions.OptionsError(
+                    f"Invalid body_spool_size specification: "
+                    f"{ctx.options.body_spool_size}"
+                )
+        if "body_spool_dir" in updated and ctx.options.body_spool_dir:
+            if not os.path.isdir(ctx.options.body_spool_dir):
+                raise exceptions.OptionsError(
+                    f"body_spool_dir does not exist: {ctx.options.body_spool_dir}"
+                )
         if "body_size_limit" in updated:
             try:
                 human.parse_size(ctx.options.body_size_limit)
@@ -242,6 +257,18 @@ class Proxyserver(ServerManager):
                     f"Invalid body_size_limit specification: "
                     f"{ctx.options.body_size_limit}"
                 )
+        if "proxy_workers" in updated:
+            if ctx.options.proxy_workers < 0:
+                raise exceptions.OptionsError("proxy_workers must not be negative.")
+            if ctx.options.proxy_workers and not hasattr(socket, "SO_REUSEPORT"):
+                raise exceptions.OptionsError(
+                    "proxy_workers is not supported on this platform."
+                )
+        for option in ("http2_stream_window", "http2_connection_window"):
+            if option in updated and not 65535 <= getattr(ctx.options, option) < 2**31:
+                raise exceptions.OptionsError(
+                    f"{option} must be between 65535 and {2**31 - 1} bytes."
+                )
         if "connect_addr" in updated:
             try:
                 if ctx.options.connect_addr:
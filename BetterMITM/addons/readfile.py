@@ -41,8 +41,10 @@ class ReadFile:
                 self.filter = None
 
     async def load_flows(self, fo: BinaryIO) -> int:
+        return await self.load_reader(io.FlowReader(fo))
+
+    async def load_reader(self, freader: io.FlowReader | io.SegmentedFlowReader) -> int:
         cnt = 0
-        freader = io.FlowReader(fo)
         try:
             for flow in freader.stream():
                 if self.filter and not self.filter(flow):
@@ -61,6 +63,8 @@ class ReadFile:
     async def load_flows_from_path(self, path: str) -> int:
         path = os.path.expanduser(path)
         try:
+            if io.is_manifest(path):
+                return await self.load_reader(io.SegmentedFlowReader(path))
             with open(path, "rb") as f:
                 return await self.load_flows(f)
         except OSError as e:
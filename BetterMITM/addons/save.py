@@ -41,7 +41,7 @@ def _mode(path: str) -> Literal["ab", "wb"]:
 
 class Save:
     def __init__(self) -> None:
-        self.stream: io.FilteredFlowWriter | None = None
+        self.stream: io.FilteredFlowWriter | io.SegmentedFlowWriter | None = None
         self.filt: flowfilter.TFilter | None = None
         self.active_flows: set[flow.Flow] = set()
         self.current_path: str | None = None
@@ -64,6 +64,35 @@ class Save:
             None,
             "Filter which flows are written to file.",
         )
+        loader.add_option(
+            "save_stream_rotate_size",
+            int,
+            0,
+            """
+            Start a new segment once the stream file exceeds this many bytes.
+            If this or save_stream_rotate_interval is set when the stream file is opened,
+            save_stream_file is a manifest that lists the segments, which are stored next to it.
+            The manifest can be read like a regular flow file. 0 disables size-based rotation.
+            """,
+        )
+        loader.add_option(
+            "save_stream_rotate_interval",
+            int,
+            0,
+            "Start a new segment after this many seconds. 0 disables time-based rotation.",
+        )
+        loader.add_option(
+            "save_stream_retain",
+            int,
+            0,
+            "Maximum number of segments to keep, the oldest are deleted first. 0 keeps all segments.",
+        )
+        loader.add_option(
+            "save_stream_compress",
+            bool,
+            False,
+            "Compress finished segments with zstd in a background thread.",
+        )
 
     def configure(self, updated):
         if "save_stream_filter" in updated:
@@ -74,11 +103,23 @@ class Save:
                     raise exceptions.OptionsError(str(e)) from e
             else:
                 self.filt = None
+        for name in (
+            "save_stream_rotate_size",
+            "save_stream_rotate_interval",
+            "save_stream_retain",
+        ):
+            if name in updated and getattr(ctx.options, name) < 0:
+                raise exceptions.OptionsError(f"{name} must not be negative.")
+        if isinstance(self.stream, io.SegmentedFlowWriter):
+            self.stream.max_size = ctx.options.save_stream_rotate_size
+            self.stream.max_age = ctx.options.save_stream_rotate_interval
+            self.stream.retain = ctx.options.save_stream_retain
+            self.stream.compress = ctx.options.save_stream_compress
         if "save_stream_file" in updated or "save_stream_filter" in updated:
             if ctx.options.save_stream_file:
                 try:
                     self.maybe_rotate_to_new_file()
-                except OSError as e:
+                except (OSError, exceptions.FlowReadException) as e:
                     raise exceptions.OptionsError(str(e)) from e
                 assert self.stream
                 self.stream.flt = self.filt
@@ -91,16 +132,38 @@ class Save:
             return
 
         if self.stream:
-            self.stream.fo.close()
-            self.stream = None
+            self._close_stream()
 
         new_log_file = Path(path)
         new_log_file.parent.mkdir(parents=True, exist_ok=True)
 
-        f = new_log_file.open(_mode(ctx.options.save_stream_file))
-        self.stream = io.FilteredFlowWriter(f, self.filt)
+        if (
+            ctx.options.save_stream_rotate_size
+            or ctx.options.save_stream_rotate_interval
+        ):
+            self.stream = io.SegmentedFlowWriter(
+                new_log_file,
+                self.filt,
+                ctx.options.dedup_bodies,
+                max_size=ctx.options.save_stream_rotate_size,
+                max_age=ctx.options.save_stream_rotate_interval,
+                retain=ctx.options.save_stream_retain,
+                compress=ctx.options.save_stream_compress,
+                append=_mode(ctx.options.save_stream_file) == "ab",
+            )
+        else:
+            f = new_log_file.open(_mode(ctx.options.save_stream_file))
+            self.stream = io.FilteredFlowWriter(f, self.filt, ctx.options.dedup_bodies)
         self.current_path = path
 
+    def _close_stream(self) -> None:
+        assert self.stream
+        if isinstance(self.stream, io.SegmentedFlowWriter):
+            self.stream.close()
+        else:
+            self.stream.fo.close()
+        self.stream = None
+
     def save_flow(self, flow: flow.Flow) -> None:
         """
         Write the flow to the stream, but first check if we need to rotate to a new file.
@@ -126,8 +189,7 @@ class Save:
             self.active_flows.clear()
 
             self.current_path = None
-            self.stream.fo.close()
-            self.stream = None
+            self._close_stream()
 
     @command.command("save.file")
     def save(self, flows: Sequence[flow.Flow], path: BetterMITM.types.Path) -> None:
@@ -137,7 +199,7 @@ class Save:
         """
         try:
             with open(_path(path), _mode(path)) as f:
-                stream = io.FlowWriter(f)
+                stream = io.FlowWriter(f, ctx.options.dedup_bodies)
                 for i in flows:
                     stream.add(i)
         except OSError as e:
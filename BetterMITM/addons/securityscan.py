@@ -0,0 +1,592 @@
+"""
+Security tests for HTTP flows.
+
+All payloads of the selected tests are compiled into a single `PatternSet`, and every part
+of a flow (URL, headers, request and response body) is decoded and scanned only once,
+independent of the number of tests. The `SecurityScan` addon runs the scanner passively on
+live traffic, the web API uses it for on-demand scans.
+"""
+
+import concurrent.futures
+from collections.abc import Generator
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from BetterMITM import ctx
+from BetterMITM import exceptions
+from BetterMITM import http
+from BetterMITM.utils import patternset
+
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+"""On-demand scans are only distributed over a process pool if there is at least this much text to scan."""
+
+SECURITY_HEADERS = [
+    "Content-Security-Policy",
+    "X-Frame-Options",
+    "X-Content-Type-Options",
+    "Strict-Transport-Security",
+    "X-XSS-Protection",
+]
+WEAK_CRYPTO_PATTERNS = ["md5", "sha1", "des", "rc4"]
+
+TESTS: dict[str, dict[str, Any]] = {
+    "sql_injection": {
+        "name": "SQL Injection",
+        "payloads": [
+            "' OR '1'='1",
+            "'; DROP TABLE users--",
+            "1' UNION SELECT NULL--",
+            "' OR 1=1--",
+            "admin'--",
+            "' UNION SELECT username, password FROM users--",
+            "1' AND '1'='1",
+            "1' OR '1'='1'/*",
+            "1' OR '1'='1'#",
+            "1' UNION SELECT user(),database(),version()--",
+        ],
+        "severity": "high",
+        "cwe": "CWE-89",
+        "owasp": "A03:2021 – Injection",
+    },
+    "nosql_injection": {
+        "name": "NoSQL Injection",
+        "payloads": [
+            "{$ne: null}",
+            "{$gt: ''}",
+            "{$where: 'this.username == this.password'}",
+            "'; return true; var x='",
+        ],
+        "severity": "high",
+        "cwe": "CWE-943",
+        "owasp": "A03:2021 – Injection",
+    },
+    "ldap_injection": {
+        "name": "LDAP Injection",
+        "payloads": ["*)(uid=*))(|(uid=*", "*))%00", "*()|&"],
+        "severity": "high",
+        "cwe": "CWE-90",
+        "owasp": "A03:2021 – Injection",
+    },
+    "command_injection": {
+        "name": "Command Injection",
+        "payloads": [
+            "; ls",
+            "| ls",
+            "& ls",
+            "&& ls",
+            "|| ls",
+            "; cat /etc/passwd",
+            "| cat /etc/passwd",
+            "; whoami",
+            "| whoami",
+        ],
+        "severity": "high",
+        "cwe": "CWE-78",
+        "owasp": "A03:2021 – Injection",
+    },
+    "path_traversal": {
+        "name": "Path Traversal",
+        "payloads": [
+            "../",
+            "../../",
+            "../../../",
+            "../../../../",
+            "..\\",
+            "..\\..\\",
+            "..%2F",
+            "..%5C",
+            "%2e%2e%2f",
+            "....//",
+        ],
+        "severity": "high",
+        "cwe": "CWE-22",
+        "owasp": "A01:2021 – Broken Access Control",
+    },
+    "xxe": {
+        "name": "XML External Entity (XXE)",
+        "payloads": [
+            '<?xml version="1.0"?><!DOCTYPE foo [<!ENTITY xxe SYSTEM "file:///etc/passwd">]><foo>&xxe;</foo>',
+            '<?xml version="1.0"?><!DOCTYPE foo [<!ENTITY xxe SYSTEM "http://evil.com/xxe">]><foo>&xxe;</foo>',
+        ],
+        "severity": "high",
+        "cwe": "CWE-611",
+        "owasp": "A05:2021 – Security Misconfiguration",
+    },
+    "ssrf": {
+        "name": "Server-Side Request Forgery (SSRF)",
+        "payloads": [
+            "http://127.0.0.1",
+            "http://localhost",
+            "http://0.0.0.0",
+            "http://[::1]",
+            "http://169.254.169.254",
+            "file:///etc/passwd",
+        ],
+        "severity": "high",
+        "cwe": "CWE-918",
+        "owasp": "A10:2021 – Server-Side Request Forgery",
+    },
+    "xss": {
+        "name": "Cross-Site Scripting (XSS)",
+        "payloads": [
+            "<script>alert('XSS')</script>",
+            "<img src=x onerror=alert('XSS')>",
+            "javascript:alert('XSS')",
+            "<svg onload=alert('XSS')>",
+            "<body onload=alert('XSS')>",
+            "<iframe src=javascript:alert('XSS')>",
+        ],
+        "severity": "high",
+        "cwe": "CWE-79",
+        "owasp": "A03:2021 – Injection",
+    },
+    "csrf": {
+        "name": "CSRF Protection",
+        "payloads": [],
+        "severity": "medium",
+        "cwe": "CWE-352",
+        "owasp": "A01:2021 – Broken Access Control",
+    },
+    "auth_bypass": {
+        "name": "Authentication Bypass",
+        "payloads": [
+            "admin",
+            "admin'--",
+            "' OR '1'='1",
+            "../admin",
+            "admin' OR '1'='1'--",
+            "' OR 1=1--",
+        ],
+        "severity": "high",
+        "cwe": "CWE-287",
+        "owasp": "A07:2021 – Identification and Authentication Failures",
+    },
+    "idor": {
+        "name": "Insecure Direct Object Reference (IDOR)",
+        "payloads": [
+            "../1",
+            "../2",
+            "../3",
+            "../admin",
+            "?id=1",
+            "?id=2",
+            "?user_id=1",
+        ],
+        "severity": "medium",
+        "cwe": "CWE-639",
+        "owasp": "A01:2021 – Broken Access Control",
+    },
+    "header_security": {
+        "name": "Header Security Analysis",
+        "payloads": [],
+        "severity": "medium",
+        "cwe": "CWE-693",
+        "owasp": "A05:2021 – Security Misconfiguration",
+    },
+    "ssl_tls": {
+        "name": "SSL/TLS Configuration",
+        "payloads": [],
+        "severity": "medium",
+        "cwe": "CWE-295",
+        "owasp": "A02:2021 – Cryptographic Failures",
+    },
+    "weak_crypto": {
+        "name": "Weak Cryptography",
+        "payloads": [],
+        "severity": "high",
+        "cwe": "CWE-327",
+        "owasp": "A02:2021 – Cryptographic Failures",
+    },
+}
+
+RECOMMENDATIONS: dict[str, list[str]] = {
+    "sql_injection": [
+        "Use parameterized queries or prepared statements",
+        "Implement input validation and sanitization",
+        "Use an ORM framework",
+        "Apply the principle of least privilege to database accounts",
+    ],
+    "nosql_injection": [
+        "Use parameterized queries for NoSQL databases",
+        "Validate and sanitize all user input",
+        "Use type-safe query builders",
+    ],
+    "xss": [
+        "Implement Content Security Policy (CSP)",
+        "Encode all user input before rendering",
+        "Use framework's built-in XSS protection",
+    ],
+    "command_injection": [
+        "Avoid executing system commands with user input",
+        "Use safe APIs instead of system commands",
+        "Validate and sanitize all user input",
+    ],
+    "path_traversal": [
+        "Validate and sanitize file paths",
+        "Use whitelist-based path validation",
+        "Store files outside the web root",
+    ],
+    "xxe": [
+        "Disable XML external entity processing",
+        "Use simpler data formats like JSON",
+        "Validate and sanitize XML input",
+    ],
+    "ssrf": [
+        "Validate and sanitize all URLs",
+        "Use whitelist-based URL validation",
+        "Block access to internal IP ranges",
+    ],
+    "csrf": [
+        "Implement CSRF tokens",
+        "Use SameSite cookie attribute",
+        "Verify the Origin header",
+    ],
+    "auth_bypass": [
+        "Implement strong authentication mechanisms",
+        "Use multi-factor authentication",
+        "Implement account lockout policies",
+    ],
+    "idor": [
+        "Implement proper access controls",
+        "Use indirect object references",
+        "Validate user permissions for each request",
+    ],
+    "header_security": [
+        "Implement Content-Security-Policy header",
+        "Set X-Frame-Options to DENY or SAMEORIGIN",
+        "Set X-Content-Type-Options to nosniff",
+    ],
+    "ssl_tls": [
+        "Use HTTPS for all connections",
+        "Disable weak cipher suites",
+        "Use TLS 1.2 or higher",
+    ],
+    "weak_crypto": [
+        "Use strong cryptographic algorithms (SHA-256, AES-256)",
+        "Avoid deprecated algorithms (MD5, SHA1, DES)",
+        "Use proper key management",
+    ],
+}
+
+
+def resolve_tests(
+    tests: Sequence[dict[str, Any]] = (), test_ids: Sequence[str] = ()
+) -> dict[str, dict[str, Any]]:
+    """
+    Build test definitions from custom tests (with an `id` and optional `payloads`)
+    or from the ids of built-in tests.
+    """
+    if tests:
+        configs = {test["id"]: test for test in tests}
+    else:
+        configs = {
+            tid: TESTS.get(tid, {"name": tid, "payloads": [], "severity": "medium"})
+            for tid in test_ids
+        }
+    ret = {}
+    for test_id, config in configs.items():
+        definition = TESTS.get(test_id, config)
+        ret[test_id] = {
+            **definition,
+            "name": definition.get("name", config.get("name", test_id)),
+            "payloads": config.get("payloads", definition.get("payloads", [])),
+        }
+    return ret
+
+
+@dataclass
+class FlowParts:
+    """The decoded parts of an HTTP flow that are scanned."""
+
+    flow_id: str
+    method: str
+    scheme: str
+    host: str
+    url: str
+    request_body: str
+    request_headers: list[tuple[str, str]]
+    response_body: str
+    response_headers: list[tuple[str, str]]
+
+    @classmethod
+    def from_flow(cls, flow: http.HTTPFlow, max_bytes: int = 0) -> "FlowParts":
+        """
+        Extract the parts of a flow. If `max_bytes` is set, only that many characters
+        are taken from the flow in total (URL first, then headers and bodies).
+        """
+        budget = max_bytes or None
+
+        def take(text: str) -> str:
+            nonlocal budget
+            if budget is None:
+                return text
+            text = text[:budget]
+            budget -= len(text)
+            return text
+
+        def body(message: http.Message | None) -> str:
+            if not message or budget == 0:
+                return ""
+            # Cut the body to the budget before decoding, so that large bodies are not
+            # decompressed and decoded in full. Decoding never yields more characters than bytes.
+            content = message.get_content(strict=False, limit=budget)
+            return take(content.decode("utf-8", errors="ignore")) if content else ""
+
+        request, response = flow.request, flow.response
+        url = take(request.pretty_url or "")
+        request_headers = [(k, take(v)) for k, v in request.headers.items()]
+        response_headers = (
+            [(k, take(v)) for k, v in response.headers.items()] if response else []
+        )
+        return cls(
+            flow_id=flow.id,
+            method=request.method,
+            scheme=request.scheme,
+            host=request.host,
+            url=url,
+            request_body=body(request),
+            request_headers=request_headers,
+            response_body=body(response),
+            response_headers=response_headers,
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.url) + len(self.request_body) + len(self.response_body)
+
+    def texts(self) -> list[str]:
+        """The texts that are searched for payloads, in the order `Scanner.results` expects."""
+        return [
+            self.request_body,
+            "\n".join(v for _, v in self.request_headers),
+            self.url,
+            self.response_body,
+        ]
+
+
+class Scanner:
+    def __init__(self, tests: dict[str, dict[str, Any]]) -> None:
+        self.tests = tests
+        self.patterns = patternset.PatternSet(
+            p for test in tests.values() for p in test.get("payloads", [])
+        )
+
+    def scan(
+        self, flow: http.HTTPFlow, stop_on_first: bool = False, max_bytes: int = 0
+    ) -> list[dict[str, Any]]:
+        parts = FlowParts.from_flow(flow, max_bytes)
+        found = [self.patterns.search(text) for text in parts.texts()]
+        return self.results(parts, found, stop_on_first)
+
+    def results(
+        self,
+        parts: FlowParts,
+        found: list[set[str]],
+        stop_on_first: bool = False,
+    ) -> list[dict[str, Any]]:
+        """
+        Build the test results for a flow from the payloads found in each of its texts.
+        If `stop_on_first` is set, no further tests are evaluated after the first finding.
+        """
+        in_body, in_headers, in_url, in_response = found
+        results = []
+        for test_id, test in self.tests.items():
+            result = self._result(
+                parts, test_id, test, in_body, in_headers, in_url, in_response
+            )
+            results.append(result)
+            if stop_on_first and result["vulnerable"]:
+                break
+        return results
+
+    def _result(
+        self,
+        parts: FlowParts,
+        test_id: str,
+        test: dict[str, Any],
+        in_body: set[str],
+        in_headers: set[str],
+        in_url: set[str],
+        in_response: set[str],
+    ) -> dict[str, Any]:
+        name = test["name"]
+        result: dict[str, Any] = {
+            "test_id": test_id,
+            "test_name": name,
+            "flow_id": parts.flow_id,
+            "vulnerable": False,
+            "severity": test.get("severity", "medium"),
+            "description": f"No vulnerabilities detected for {name}",
+            "details": [],
+            "found_payloads": [],
+            "recommendations": [],
+            "cwe": test.get("cwe"),
+            "owasp": test.get("owasp"),
+        }
+
+        def finding(payload: str | None, detail: str) -> None:
+            result["vulnerable"] = True
+            if payload is not None:
+                result["found_payloads"].append(payload)
+            result["details"].append(detail)
+
+        for payload in test.get("payloads", []):
+            if payload in in_body:
+                finding(payload, f"Payload found in request body: {payload}")
+            if payload in in_headers:
+                for key, value in parts.request_headers:
+                    if payload in value:
+                        finding(
+                            payload,
+                            f"Payload found in request header {key}: {payload}",
+                        )
+            if payload in in_url:
+                finding(payload, f"Payload found in URL: {payload}")
+            if payload in in_response:
+                finding(payload, f"Payload reflected in response: {payload}")
+
+        if test_id == "csrf":
+            has_csrf_token = any(
+                "csrf" in k.lower() or "xsrf" in k.lower()
+                for k, _ in parts.request_headers
+            )
+            if not has_csrf_token and parts.method in [
+                "POST",
+                "PUT",
+                "DELETE",
+                "PATCH",
+            ]:
+                finding(None, "CSRF token missing in request headers")
+
+        if test_id == "header_security":
+            present = {k.lower() for k, _ in parts.response_headers}
+            missing = [h for h in SECURITY_HEADERS if h.lower() not in present]
+            if missing:
+                finding(None, f"Missing security headers: {', '.join(missing)}")
+
+        if test_id == "ssl_tls":
+            if parts.scheme == "http" and "localhost" not in parts.host.lower():
+                finding(None, "HTTP connection detected (should use HTTPS)")
+
+        if test_id == "weak_crypto":
+            response_lower = parts.response_body.lower()
+            for pattern in WEAK_CRYPTO_PATTERNS:
+                if pattern in response_lower:
+                    finding(None, f"Potential weak cryptography detected: {pattern}")
+
+        if result["vulnerable"]:
+            result["description"] = (
+                f"Vulnerability detected: {'; '.join(result['details'])}"
+            )
+            result["recommendations"] = RECOMMENDATIONS.get(
+                test_id,
+                ["Review security best practices", "Implement proper input validation"],
+            )
+        return result
+
+
+def scan_flows(
+    scanner: Scanner,
+    flows: Sequence[http.HTTPFlow],
+    stop_on_first: bool = False,
+    workers: int = 1,
+    executor: concurrent.futures.Executor | None = None,
+) -> Generator[tuple[int, int] | concurrent.futures.Future, Any, list[dict[str, Any]]]:
+    """
+    Scan multiple flows as a background job (see `BetterMITM.tools.web.jobs`).
+
+    Flows are decoded on the event loop. If an `executor` is passed, `workers` is larger than one
+    and there is enough text, the payload search is split into `workers` batches that run on
+    the executor, usually the addon manager's process pool.
+    """
+    total = len(flows)
+    parts = []
+    for i, flow in enumerate(flows):
+        parts.append(FlowParts.from_flow(flow))
+        yield i + 1, 2 * total
+
+    found: list[list[set[str]]] = []
+    if (
+        executor is not None
+        and workers > 1
+        and total > 1
+        and sum(p.size for p in parts) >= PARALLEL_MIN_BYTES
+    ):
+        batch_size = -(-total // workers)
+        batches = [parts[i : i + batch_size] for i in range(0, total, batch_size)]
+        futures = [
+            executor.submit(
+                patternset.search_all,
+                scanner.patterns.patterns,
+                [text for p in batch for text in p.texts()],
+            )
+            for batch in batches
+        ]
+        try:
+            for future in futures:
+                texts = yield future
+                found.extend(texts[i : i + 4] for i in range(0, len(texts), 4))
+                yield total + len(found), 2 * total
+        finally:
+            # The executor is shared, only drop the batches of this scan.
+            for future in futures:
+                future.cancel()
+    else:
+        for p in parts:
+            found.append([scanner.patterns.search(text) for text in p.texts()])
+            yield total + len(found), 2 * total
+
+    results = []
+    for p, f in zip(parts, found):
+        results.extend(scanner.results(p, f, stop_on_first))
+    return results
+
+
+class SecurityScan:
+    """Passively run security tests on all HTTP responses."""
+
+    def __init__(self) -> None:
+        self.scanner: Scanner | None = None
+
+    def load(self, loader):
+        loader.add_option(
+            "security_scan",
+            Sequence[str],
+            [],
+            f"Security tests that are run on every HTTP response, findings are stored in the "
+            f"flow's metadata. Available tests: {', '.join(TESTS)}.",
+        )
+        loader.add_option(
+            "security_scan_max_bytes",
+            int,
+            64 * 1024,
+            "Maximum number of characters of each flow that are scanned by security_scan.",
+        )
+
+    def configure(self, updated):
+        if "security_scan" in updated:
+            unknown = [t for t in ctx.options.security_scan if t not in TESTS]
+            if unknown:
+                raise exceptions.OptionsError(
+                    f"Unknown security test: {', '.join(unknown)}"
+                )
+            if ctx.options.security_scan:
+                self.scanner = Scanner(
+                    resolve_tests(test_ids=ctx.options.security_scan)
+                )
+            else:
+                self.scanner = None
+
+    def response(self, flow: http.HTTPFlow) -> None:
+        if self.scanner is None:
+            return
+        findings = [
+            r
+            for r in self.scanner.scan(
+                flow, max_bytes=ctx.options.security_scan_max_bytes
+            )
+            if r["vulnerable"]
+        ]
+        if findings:
+            flow.metadata["security_scan"] = findings
@@ -1,7 +1,9 @@
+import collections
 import hashlib
 import logging
 import urllib
 from collections.abc import Hashable
+from collections.abc import Iterable
 from collections.abc import Sequence
 from typing import Any
 
@@ -23,16 +25,28 @@ HASH_OPTIONS = [
     "server_replay_ignore_payload_params",
     "server_replay_ignore_port",
     "server_replay_use_headers",
+    "server_replay_fuzzy",
 ]
 
 
 class ServerPlayback:
-    flowmap: dict[Hashable, list[http.HTTPFlow]]
+    flowmap: dict[Hashable, collections.deque[http.HTTPFlow]]
+    fuzzymap: dict[Hashable, dict[str, http.HTTPFlow]]
+    """Flows indexed by a key without parameter values and content, see `server_replay_fuzzy`."""
     configured: bool
 
     def __init__(self):
         self.flowmap = {}
+        self.fuzzymap = {}
         self.configured = False
+        self._keys: dict[
+            str, tuple[Hashable, Hashable, frozenset[tuple[str, str]]]
+        ] = {}
+        """The exact key, fuzzy key and query parameters of each indexed flow."""
+        self._spool: io.BodySpool | None = None
+        self._offloaded: dict[str, int] = {}
+        """The number of bytes each flow with offloaded bodies holds in the spool."""
+        self._options: dict[str, Any] | None = None
 
     def load(self, loader):
         loader.add_option(
@@ -134,13 +148,33 @@ class ServerPlayback:
             to replay.
             """,
         )
+        loader.add_option(
+            "server_replay_fuzzy",
+            bool,
+            False,
+            """
+            If no saved flow matches exactly, replay a saved flow whose request
+            only differs in parameter values or content, preferring the one with
+            the most matching parameters. Useful for volatile parameters such as
+            timestamps or cache busters.
+            """,
+        )
+        loader.add_option(
+            "server_replay_offload",
+            bool,
+            False,
+            """
+            Keep message bodies of flows loaded from server_replay files in a
+            temporary file instead of memory until they are replayed.
+            """,
+        )
 
     @command.command("replay.server")
     def load_flows(self, flows: Sequence[flow.Flow]) -> None:
         """
         Replay server responses from flows.
         """
-        self.flowmap = {}
+        self._reset()
         self.add_flows(flows)
 
     @command.command("replay.server.add")
@@ -148,106 +182,232 @@ class ServerPlayback:
         """
         Add responses from flows to server replay list.
         """
+        self._add(flows)
+        ctx.master.addons.trigger(hooks.UpdateHook([]))
+
+    def _add(self, flows: Iterable[flow.Flow], offload: bool = False) -> None:
         for f in flows:
             if isinstance(f, http.HTTPFlow):
-                lst = self.flowmap.setdefault(self._hash(f), [])
-                lst.append(f)
-        ctx.master.addons.trigger(hooks.UpdateHook([]))
+                self._index(f)
+                if offload:
+                    self._offload(f)
+
+    def _index(self, f: http.HTTPFlow) -> None:
+        keys = self._keys[f.id] = self._fingerprint(f.request)
+        self.flowmap.setdefault(keys[0], collections.deque()).append(f)
+        if self._match_options["server_replay_fuzzy"]:
+            self.fuzzymap.setdefault(keys[1], {})[f.id] = f
+
+    def _load_paths(self, paths: Sequence[str]) -> None:
+        if ctx.options.server_replay_offload:
+            self._reset()
+            try:
+                self._add(io.stream_flows_from_paths(paths), offload=True)
+            except exceptions.FlowReadException:
+                self._reset()
+                raise
+            ctx.master.addons.trigger(hooks.UpdateHook([]))
+        else:
+            self.load_flows(io.read_flows_from_paths(paths))
 
     @command.command("replay.server.file")
     def load_file(self, path: BetterMITM.types.Path) -> None:
         try:
-            flows = io.read_flows_from_paths([path])
+            self._load_paths([path])
         except exceptions.FlowReadException as e:
             raise exceptions.CommandError(str(e))
-        self.load_flows(flows)
 
     @command.command("replay.server.stop")
     def clear(self) -> None:
         """
         Stop server replay.
         """
-        self.flowmap = {}
+        self._reset()
         ctx.master.addons.trigger(hooks.UpdateHook([]))
 
+    def _reset(self) -> None:
+        self.flowmap = {}
+        self.fuzzymap = {}
+        self._keys = {}
+        self._offloaded = {}
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+
     @command.command("replay.server.count")
     def count(self) -> int:
         return sum(len(i) for i in self.flowmap.values())
 
+    def _offload(self, f: http.HTTPFlow) -> None:
+        """
+        Move the message bodies of a flow into the on-disk spool.
+        They are read back from disk whenever they are accessed.
+        """
+        if self._spool is None:
+            self._spool = io.BodySpool()
+        size = 0
+        for part in ("request", "response"):
+            message = getattr(f, part)
+            if message is None or message.body_file is not None:
+                continue
+            if message.raw_content:
+                message.body_file = self._spool.write_body(message.raw_content)
+                message.data.content = None
+                size += len(message.body_file)
+        if size:
+            self._offloaded[f.id] = size
+
+    def _compact_spool(self) -> None:
+        """Copy the bodies of all flows that are still indexed into a new spool."""
+        assert self._spool
+        old, self._spool = self._spool, io.BodySpool()
+        for lst in self.flowmap.values():
+            for f in lst:
+                if f.id not in self._offloaded:
+                    continue
+                for message in (f.request, f.response):
+                    if message is not None and message.body_file is not None:
+                        if message.body_file.path == old.path:
+                            message.body_file = self._spool.write_body(
+                                message.body_file.read()
+                            )
+        old.close()
+
     def _hash(self, flow: http.HTTPFlow) -> Hashable:
         """
         Calculates a loose hash of the flow request.
         """
-        r = flow.request
-        _, _, path, _, query, _ = urllib.parse.urlparse(r.url)
-        queriesArray = urllib.parse.parse_qsl(query, keep_blank_values=True)
+        return self._fingerprint(flow.request)[0]
 
-        key: list[Any] = [str(r.scheme), str(r.method), str(path)]
-        if not ctx.options.server_replay_ignore_content:
-            if ctx.options.server_replay_ignore_payload_params and r.multipart_form:
-                key.extend(
-                    (k, v)
-                    for k, v in r.multipart_form.items(multi=True)
-                    if k.decode(errors="replace")
-                    not in ctx.options.server_replay_ignore_payload_params
-                )
-            elif ctx.options.server_replay_ignore_payload_params and r.urlencoded_form:
-                key.extend(
-                    (k, v)
-                    for k, v in r.urlencoded_form.items(multi=True)
-                    if k not in ctx.options.server_replay_ignore_payload_params
-                )
-            else:
-                key.append(str(r.raw_content))
+    def _params(self, r: http.Request) -> tuple[str, list[tuple[str, str]]]:
+        _, _, path, _, query, _ = urllib.parse.urlparse(r.url)
+        ignore_params = self._match_options["server_replay_ignore_params"]
+        return path, [
+            p
+            for p in urllib.parse.parse_qsl(query, keep_blank_values=True)
+            if p[0] not in ignore_params
+        ]
 
-        if not ctx.options.server_replay_ignore_host:
-            key.append(r.pretty_host)
-        if not ctx.options.server_replay_ignore_port:
-            key.append(r.port)
+    def _content_key(self, r: http.Request) -> Hashable:
+        if self._match_options["server_replay_ignore_content"]:
+            return None
+        ignore = self._match_options["server_replay_ignore_payload_params"]
+        if ignore and r.multipart_form:
+            return tuple(
+                (k, v)
+                for k, v in r.multipart_form.items(multi=True)
+                if k.decode(errors="replace") not in ignore
+            )
+        elif ignore and r.urlencoded_form:
+            return tuple(
+                (k, v)
+                for k, v in r.urlencoded_form.items(multi=True)
+                if k not in ignore
+            )
+        elif r.raw_content:
+            return hashlib.blake2b(r.raw_content, digest_size=16).digest()
+        return r.raw_content
 
-        filtered = []
-        ignore_params = ctx.options.server_replay_ignore_params or []
-        for p in queriesArray:
-            if p[0] not in ignore_params:
-                filtered.append(p)
-        for p in filtered:
-            key.append(p[0])
-            key.append(p[1])
+    def _fingerprint(
+        self, r: http.Request
+    ) -> tuple[Hashable, Hashable, frozenset[tuple[str, str]]]:
+        """
+        Calculates the exact and the fuzzy key of a request, as well as its query parameters.
+        The fuzzy key only includes parameter names, not their values or the request content.
+        """
+        o = self._match_options
+        path, params = self._params(r)
+        key: tuple = (r.scheme, r.method, path)
+        if not o["server_replay_ignore_host"]:
+            key += (r.pretty_host,)
+        if not o["server_replay_ignore_port"]:
+            key += (r.port,)
+        if o["server_replay_use_headers"]:
+            key += (
+                tuple((h, r.headers.get(h)) for h in o["server_replay_use_headers"]),
+            )
+        return (
+            (*key, self._content_key(r), tuple(params)),
+            (*key, tuple(sorted({k for k, _ in params}))),
+            frozenset(params),
+        )
 
-        if ctx.options.server_replay_use_headers:
-            headers = []
-            for i in ctx.options.server_replay_use_headers:
-                v = r.headers.get(i)
-                headers.append((i, v))
-            key.append(headers)
-        return hashlib.sha256(repr(key).encode("utf8", "surrogateescape")).digest()
+    @property
+    def _match_options(self) -> dict[str, Any]:
+        """
+        Options used for matching requests, looked up once per configuration
+        change instead of once per request.
+        """
+        if self._options is None:
+            self._options = {name: getattr(ctx.options, name) for name in HASH_OPTIONS}
+            self._options["reuse"] = (
+                ctx.options.server_replay_reuse or ctx.options.server_replay_nopop
+            )
+        return self._options
 
     def next_flow(self, flow: http.HTTPFlow) -> http.HTTPFlow | None:
         """
         Returns the next flow object, or None if no matching flow was
         found.
         """
-        hash = self._hash(flow)
-        if hash in self.flowmap:
-            if ctx.options.server_replay_reuse or ctx.options.server_replay_nopop:
-                return next(
-                    (flow for flow in self.flowmap[hash] if flow.response), None
-                )
-            else:
-                ret = self.flowmap[hash].pop(0)
-                while not ret.response:
-                    if self.flowmap[hash]:
-                        ret = self.flowmap[hash].pop(0)
-                    else:
-                        del self.flowmap[hash]
-                        return None
-                if not self.flowmap[hash]:
-                    del self.flowmap[hash]
-                return ret
-        else:
+        key, fuzzy_key, params = self._fingerprint(flow.request)
+        reuse = self._match_options["reuse"]
+        ret = self._next_exact(key, reuse)
+        if ret is None and self._match_options["server_replay_fuzzy"]:
+            ret = self._next_fuzzy(fuzzy_key, params, reuse)
+        return ret
+
+    def _next_exact(self, key: Hashable, reuse: bool) -> http.HTTPFlow | None:
+        flows = self.flowmap.get(key)
+        if flows is None:
+            return None
+        if reuse:
+            return next((f for f in flows if f.response), None)
+        ret = None
+        while flows and ret is None:
+            f = flows.popleft()
+            self._forget(f)
+            if f.response:
+                ret = f
+        if not flows:
+            del self.flowmap[key]
+        return ret
+
+    def _next_fuzzy(
+        self, fuzzy_key: Hashable, params: frozenset[tuple[str, str]], reuse: bool
+    ) -> http.HTTPFlow | None:
+        candidates = self.fuzzymap.get(fuzzy_key)
+        if not candidates:
             return None
+        ret = max(
+            (f for f in candidates.values() if f.response),
+            key=lambda f: len(params & self._keys[f.id][2]),
+            default=None,
+        )
+        if ret is not None and not reuse:
+            key = self._keys[ret.id][0]
+            self.flowmap[key].remove(ret)
+            if not self.flowmap[key]:
+                del self.flowmap[key]
+            self._forget(ret)
+        return ret
+
+    def _forget(self, f: http.HTTPFlow) -> None:
+        """Remove a flow that has been replayed from the fuzzy index and the spool."""
+        if self._spool and (size := self._offloaded.pop(f.id, 0)):
+            self._spool.discard(size)
+            if self._spool.needs_compaction:
+                self._compact_spool()
+        if (keys := self._keys.pop(f.id, None)) is None:
+            return
+        _, fuzzy_key, _ = keys
+        if (candidates := self.fuzzymap.get(fuzzy_key)) is not None:
+            candidates.pop(f.id, None)
+            if not candidates:
+                del self.fuzzymap[fuzzy_key]
 
     def configure(self, updated):
+        self._options = None
         if ctx.options.server_replay_kill_extra:
             logger.warning(
                 "server_replay_kill_extra has been deprecated, "
@@ -260,10 +420,9 @@ class ServerPlayback:
         if not self.configured and ctx.options.server_replay:
             self.configured = True
             try:
-                flows = io.read_flows_from_paths(ctx.options.server_replay)
+                self._load_paths(ctx.options.server_replay)
             except exceptions.FlowReadException as e:
                 raise exceptions.OptionsError(str(e))
-            self.load_flows(flows)
         if any(option in updated for option in HASH_OPTIONS):
             self.recompute_hashes()
 
@@ -273,7 +432,12 @@ class ServerPlayback:
         see https://github.com/mitmproxy/mitmproxy/issues/4506
         """
         flows = [flow for lst in self.flowmap.values() for flow in lst]
-        self.load_flows(flows)
+        self.flowmap = {}
+        self.fuzzymap = {}
+        self._keys = {}
+        for f in flows:
+            self._index(f)
+        ctx.master.addons.trigger(hooks.UpdateHook([]))
 
     def request(self, f: http.HTTPFlow) -> None:
         if self.flowmap:
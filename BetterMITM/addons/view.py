@@ -9,9 +9,12 @@ The View:
   removed from the store.
 """
 
+import asyncio
 import collections
 import logging
+import os
 import re
+import time
 from collections.abc import Iterator
 from collections.abc import MutableMapping
 from collections.abc import Sequence
@@ -33,8 +36,18 @@ from BetterMITM import io
 from BetterMITM import tcp
 from BetterMITM import udp
 from BetterMITM.log import ALERT
+from BetterMITM.utils import asyncio_utils
 from BetterMITM.utils import human
 from BetterMITM.utils import signals
+from BetterMITM.utils.flowtable import FlowTable
+
+REFILTER_CHUNK_SIZE = 2000
+"""
+Stores larger than this are refiltered and reordered in chunks of this size,
+yielding to the event loop between chunks.
+"""
+REFILTER_PROGRESS_INTERVAL = 0.5
+"""Minimum number of seconds between progressive view refreshes while refiltering."""
 
 
 
@@ -129,6 +142,77 @@ class OrderKeySize(_OrderKey):
             raise NotImplementedError()
 
 
+def approx_flow_size(f: BetterMITM.flow.Flow) -> int:
+    """
+    Rough estimate of the memory held by a flow, dominated by message bodies.
+    """
+    size = FLOW_OVERHEAD
+    if isinstance(f, http.HTTPFlow):
+        for m in (f.request, f.response):
+            if m is None:
+                continue
+            size += sum(len(k) + len(v) for k, v in m.headers.fields)
+            # Bodies that are kept in a file do not take up memory.
+            if m.body_file is None and m.raw_content:
+                size += len(m.raw_content)
+        if f.websocket:
+            size += sum(len(m.content) for m in f.websocket.messages)
+    elif isinstance(f, (tcp.TCPFlow, udp.UDPFlow)):
+        size += sum(len(m.content) for m in f.messages)
+    elif isinstance(f, dns.DNSFlow):
+        size += f.request.size
+        if f.response:
+            size += f.response.size
+    return size
+
+
+FLOW_OVERHEAD = 2048
+"""Fixed per-flow allowance for connection metadata, timestamps and Python object overhead."""
+
+
+class _BodyStore:
+    """
+    A reference-counted store of HTTP message bodies, keyed by their SHA-256 hash,
+    so that flows with identical bodies share a single buffer.
+    """
+
+    def __init__(self) -> None:
+        self.bodies: dict[str, bytes] = {}
+        self.refs: dict[str, int] = {}
+        self.bytes = 0
+        self.saved_bytes = 0
+
+    def get(self, digest: str) -> bytes | None:
+        return self.bodies.get(digest)
+
+    def acquire(self, content: bytes) -> tuple[str, bytes, bool]:
+        """
+        Add a reference to a body. Returns the body's hash, the shared buffer
+        and whether the body is new to the store.
+        """
+        digest = io.body_digest(content)
+        if body := self.bodies.get(digest):
+            self.refs[digest] += 1
+            self.saved_bytes += len(body)
+            return digest, body, False
+        self.bodies[digest] = content
+        self.refs[digest] = 1
+        self.bytes += len(content)
+        return digest, content, True
+
+    def release(self, digest: str) -> int:
+        """Drop a reference to a body. Returns the number of bytes freed."""
+        size = len(self.bodies[digest])
+        self.refs[digest] -= 1
+        if self.refs[digest]:
+            self.saved_bytes -= size
+            return 0
+        del self.bodies[digest]
+        del self.refs[digest]
+        self.bytes -= size
+        return size
+
+
 orders = [
     ("t", "time"),
     ("m", "method"),
@@ -137,6 +221,14 @@ orders = [
 ]
 
 
+def _loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
 def _signal_with_flow(flow: BetterMITM.flow.Flow) -> None: ...
 
 
@@ -186,6 +278,27 @@ class View(collections.abc.Sequence):
         self.focus = Focus(self)
         self.settings = Settings(self)
 
+        self.max_flows = 0
+        self.max_memory: int | None = None
+        self.offload = False
+        self.offload_dir: str | None = None
+        self.evict_path: str | None = None
+        self._sizes: dict[str, int] = {}
+        self._store_bytes = 0
+        self._resident: collections.OrderedDict[str, None] = collections.OrderedDict()
+        self._offloaded: dict[str, dict[str, http.BodyFile]] = {}
+        self._spool: io.BodySpool | None = None
+        self.dedup = False
+        self._bodies = _BodyStore()
+        self._body_refs: dict[str, dict[str, str]] = {}
+        self._evict_writer: io.FlowWriter | None = None
+        self.evicted_count = 0
+        self.table: FlowTable | None = None
+
+        self._refilter_task: asyncio.Task | None = None
+        self._reorder_task: asyncio.Task | None = None
+        self._pending_order: _OrderKey | None = None
+
     def load(self, loader):
         loader.add_option(
             "view_filter", Optional[str], None, "Limit the view to matching flows."
@@ -203,6 +316,61 @@ class View(collections.abc.Sequence):
         loader.add_option(
             "console_focus_follow", bool, False, "Focus follows new flows."
         )
+        loader.add_option(
+            "view_max_flows",
+            int,
+            0,
+            """
+            Maximum number of flows kept in the view store. When exceeded, the
+            oldest unmarked flows are evicted. 0 means unlimited.
+            """,
+        )
+        loader.add_option(
+            "view_max_memory",
+            Optional[str],
+            None,
+            """
+            Approximate memory budget for the view store, e.g. 512m or 2g.
+            When exceeded, message bodies of the oldest flows are offloaded to
+            disk (see view_offload_bodies) and then the oldest unmarked flows
+            are evicted.
+            """,
+        )
+        loader.add_option(
+            "view_offload_bodies",
+            bool,
+            False,
+            """
+            Offload HTTP message bodies of old flows to a temporary file before
+            evicting flows to stay within view_max_memory. Flow metadata stays
+            in memory and bodies are read back on demand.
+            """,
+        )
+        loader.add_option(
+            "view_offload_dir",
+            Optional[str],
+            None,
+            "Directory for the offloaded body spool. Defaults to the system temp directory.",
+        )
+        loader.add_option(
+            "view_columnar",
+            bool,
+            False,
+            """
+            Maintain a columnar table of flow metadata (type, status code, method,
+            host, sizes, timings). Filters on these fields and flow statistics are
+            then computed from the table instead of visiting every flow.
+            """,
+        )
+        loader.add_option(
+            "view_evict_file",
+            Optional[str],
+            None,
+            """
+            Append flows that are evicted from the view store to this file
+            before they are dropped.
+            """,
+        )
 
     def store_count(self):
         return len(self._store)
@@ -248,14 +416,54 @@ class View(collections.abc.Sequence):
         self._view.add(f)
 
     def _refilter(self):
+        if self._refilter_task:
+            self._refilter_task.cancel()
+            self._refilter_task = None
         self._view.clear()
-        for i in self._store.values():
-            if self.show_marked and not i.marked:
-                continue
-            if self.filter(i):
+        sync = len(self._store) <= REFILTER_CHUNK_SIZE or not _loop_running()
+        if self.table is not None and (sync or self.table.is_columnar(self.filter)):
+            for i in self.table.filter(self.filter):
+                if self.show_marked and not i.marked:
+                    continue
                 self._base_add(i)
+        elif sync:
+            for i in self._store.values():
+                if self.show_marked and not i.marked:
+                    continue
+                if self.filter(i):
+                    self._base_add(i)
+        else:
+            self._refilter_task = asyncio_utils.create_task(
+                self._refilter_chunked(list(self._store.values())),
+                name="view refilter",
+                keep_ref=True,
+            )
+        self.sig_view_refresh.send()
+
+    async def _refilter_chunked(self, flows: list[BetterMITM.flow.Flow]) -> None:
+        last_refresh = time.monotonic()
+        for start in range(0, len(flows), REFILTER_CHUNK_SIZE):
+            for f in flows[start : start + REFILTER_CHUNK_SIZE]:
+                if f.id not in self._store or f in self._view:
+                    continue
+                if self.show_marked and not f.marked:
+                    continue
+                if self.filter(f):
+                    self._base_add(f)
+            if time.monotonic() - last_refresh > REFILTER_PROGRESS_INTERVAL:
+                self.sig_view_refresh.send()
+                last_refresh = time.monotonic()
+            await asyncio.sleep(0)
+        self._refilter_task = None
         self.sig_view_refresh.send()
 
+    @property
+    def refiltering(self) -> bool:
+        """
+        True while a refilter or reorder of a large store is still in progress.
+        """
+        return self._refilter_task is not None or self._reorder_task is not None
+
     """ View API """
 
 
@@ -321,11 +529,42 @@ class View(collections.abc.Sequence):
         if order_key not in self.orders:
             raise exceptions.CommandError("Unknown flow order: %s" % order_key)
         key = self.orders[order_key]
+        if self._reorder_task:
+            self._reorder_task.cancel()
+            self._reorder_task = None
+            self._pending_order = None
+        if len(self._view) <= REFILTER_CHUNK_SIZE or not _loop_running():
+            self._apply_order(key)
+        else:
+            self._pending_order = key
+            self._reorder_task = asyncio_utils.create_task(
+                self._reorder_chunked(key),
+                name="view reorder",
+                keep_ref=True,
+            )
+
+    def _apply_order(self, key: _OrderKey) -> None:
         self.order_key = key
         newview = sortedcontainers.SortedListWithKey(key=key)
         newview.update(self._view)
         self._view = newview
 
+    async def _reorder_chunked(self, key: _OrderKey) -> None:
+        """
+        Precompute (and cache) the new sort keys in chunks, then swap in the
+        reordered list in one step.
+        """
+        flows = list(self._view)
+        for start in range(0, len(flows), REFILTER_CHUNK_SIZE):
+            for f in flows[start : start + REFILTER_CHUNK_SIZE]:
+                if f.id in self._store:
+                    key(f)
+            await asyncio.sleep(0)
+        self._reorder_task = None
+        self._pending_order = None
+        self._apply_order(key)
+        self.sig_view_refresh.send()
+
     @command.command("view.order")
     def get_order(self) -> str:
         """
@@ -363,6 +602,7 @@ class View(collections.abc.Sequence):
         """
         self._store.clear()
         self._view.clear()
+        self._reset_accounting()
         self.sig_view_refresh.send()
         self.sig_store_refresh.send()
 
@@ -374,6 +614,7 @@ class View(collections.abc.Sequence):
         for flow in self._store.copy().values():
             if not flow.marked:
                 self._store.pop(flow.id)
+                self._forget(flow)
 
         self._refilter()
         self.sig_store_refresh.send()
@@ -441,6 +682,7 @@ class View(collections.abc.Sequence):
                     self._view.remove(f)
                     self.sig_view_remove.send(flow=f, index=idx)
                 del self._store[f.id]
+                self._forget(f)
                 self.sig_store_remove.send(flow=f)
         if len(flows) > 1:
             logging.log(ALERT, "Removed %s flows" % len(flows))
@@ -470,6 +712,8 @@ class View(collections.abc.Sequence):
                 filt = flowfilter.parse(flow_spec)
             except ValueError as e:
                 raise exceptions.CommandError(str(e)) from e
+            if self.table is not None:
+                return self.table.filter(filt)
             return [i for i in self._store.values() if filt(i)]
 
     @command.command("view.flows.create")
@@ -497,6 +741,10 @@ class View(collections.abc.Sequence):
         Load flows into the view, without processing them with addons.
         """
         try:
+            if io.is_manifest(path):
+                for i in io.SegmentedFlowReader(path).stream():
+                    self.add([i.copy()])
+                return
             with open(path, "rb") as f:
                 for i in io.FlowReader(f).stream():
 
@@ -516,11 +764,13 @@ class View(collections.abc.Sequence):
         for f in flows:
             if f.id not in self._store:
                 self._store[f.id] = f
+                self._account(f)
                 if self.filter(f):
                     self._base_add(f)
                     if self.focus_follow:
                         self.focus.flow = f
                     self.sig_view_add.send(flow=f)
+        self._enforce_limits()
 
     def get_by_id(self, flow_id: str) -> BetterMITM.flow.Flow | None:
         """
@@ -579,6 +829,39 @@ class View(collections.abc.Sequence):
             self.set_reversed(ctx.options.view_order_reversed)
         if "console_focus_follow" in updated:
             self.focus_follow = ctx.options.console_focus_follow
+        if "view_max_flows" in updated:
+            if ctx.options.view_max_flows < 0:
+                raise exceptions.OptionsError("view_max_flows must not be negative.")
+            self.max_flows = ctx.options.view_max_flows
+        if "view_max_memory" in updated:
+            try:
+                self.max_memory = human.parse_size(ctx.options.view_max_memory)
+            except ValueError:
+                raise exceptions.OptionsError(
+                    f"Invalid view_max_memory specification: "
+                    f"{ctx.options.view_max_memory}"
+                )
+        if "view_offload_bodies" in updated:
+            self.offload = ctx.options.view_offload_bodies
+        if "view_offload_dir" in updated:
+            self.offload_dir = ctx.options.view_offload_dir
+        if "dedup_bodies" in updated:
+            self.dedup = ctx.options.dedup_bodies
+            for f in self._store.values():
+                self._account(f)
+        if "view_columnar" in updated:
+            if ctx.options.view_columnar:
+                if self.table is None:
+                    self.table = FlowTable.from_flows(self._store.values())
+            else:
+                self.table = None
+        if "view_evict_file" in updated:
+            self.evict_path = ctx.options.view_evict_file
+            if self._evict_writer:
+                self._evict_writer.fo.close()
+                self._evict_writer = None
+        if "view_max_flows" in updated or "view_max_memory" in updated:
+            self._enforce_limits()
 
     def requestheaders(self, f):
         self.add([f])
@@ -637,6 +920,9 @@ class View(collections.abc.Sequence):
         """
         for f in flows:
             if f.id in self._store:
+                self._account(f)
+                if self._pending_order:
+                    self.settings[f].pop(self._pending_order._key(), None)
                 if self.filter(f):
                     if f not in self._view:
                         self._base_add(f)
@@ -658,6 +944,270 @@ class View(collections.abc.Sequence):
                     else:
                         self._view.remove(f)
                         self.sig_view_remove.send(flow=f, index=idx)
+        self._enforce_limits()
+
+    """ Store memory management """
+
+    def _account(self, f: BetterMITM.flow.Flow) -> None:
+        if self.table is not None:
+            self.table.update(f)
+        if f.id in self._offloaded:
+            self._discard_offloaded(f, replaced_only=True)
+        # Shared bodies are accounted for once by the body store, not per flow.
+        size = approx_flow_size(f) - self._dedup_bodies(f)
+        self._store_bytes += size - self._sizes.get(f.id, 0)
+        self._sizes[f.id] = size
+        if isinstance(f, http.HTTPFlow) and f.id not in self._offloaded:
+            self._resident[f.id] = None
+
+    def _dedup_bodies(self, f: BetterMITM.flow.Flow) -> int:
+        """
+        Replace the bodies of a flow with shared buffers from the body store.
+        Returns the size of the flow's bodies that are held by the store.
+        """
+        if not isinstance(f, http.HTTPFlow):
+            return 0
+        if not self.dedup and f.id not in self._body_refs:
+            return 0
+        refs = self._body_refs.setdefault(f.id, {})
+        shared = 0
+        for part in ("request", "response"):
+            message: http.Message | None = getattr(f, part)
+            if message is None or message.body_file is not None:
+                content = None
+            else:
+                content = message.raw_content
+            if digest := refs.get(part):
+                if self.dedup and content is self._bodies.get(digest):
+                    assert content is not None
+                    shared += len(content)
+                    continue
+                self._store_bytes -= self._bodies.release(refs.pop(part))
+            if not self.dedup or content is None or len(content) < io.DEDUP_MIN_SIZE:
+                continue
+            assert message is not None
+            digest, body, new = self._bodies.acquire(content)
+            if new:
+                self._store_bytes += len(body)
+            message.data.content = body
+            refs[part] = digest
+            shared += len(body)
+        if not refs:
+            del self._body_refs[f.id]
+        return shared
+
+    def _release_bodies(self, f: BetterMITM.flow.Flow) -> None:
+        for digest in self._body_refs.pop(f.id, {}).values():
+            self._store_bytes -= self._bodies.release(digest)
+
+    def _forget(self, f: BetterMITM.flow.Flow) -> None:
+        if self.table is not None:
+            self.table.remove(f.id)
+        self._release_bodies(f)
+        self._store_bytes -= self._sizes.pop(f.id, 0)
+        self._resident.pop(f.id, None)
+        self._discard_offloaded(f)
+
+    def _reset_accounting(self) -> None:
+        if self.table is not None:
+            self.table.clear()
+        self._sizes.clear()
+        self._store_bytes = 0
+        self._resident.clear()
+        self._offloaded.clear()
+        self._bodies = _BodyStore()
+        self._body_refs.clear()
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+
+    def _over_budget(self) -> bool:
+        return self.max_memory is not None and self._store_bytes > self.max_memory
+
+    def _enforce_limits(self) -> None:
+        if self._over_budget() and self.offload:
+            self._offload_oldest()
+        if not self._over_budget() and not (
+            self.max_flows and len(self._store) > self.max_flows
+        ):
+            return
+        victims = []
+        excess_flows = len(self._store) - self.max_flows if self.max_flows else 0
+        excess_bytes = self._store_bytes - self.max_memory if self._over_budget() else 0
+        for f in self._store.values():
+            if excess_flows <= 0 and excess_bytes <= 0:
+                break
+            if f.marked or f.live:
+                continue
+            victims.append(f)
+            excess_flows -= 1
+            excess_bytes -= self._sizes.get(f.id, 0)
+        for f in victims:
+            self._evict(f)
+
+    def _offload_oldest(self) -> None:
+        assert self.max_memory is not None
+        for fid in list(self._resident):
+            if self._store_bytes <= self.max_memory:
+                break
+            f = self._store[fid]
+            if not f.live:
+                self.offload_bodies(f)
+
+    def offload_bodies(self, f: http.HTTPFlow) -> None:
+        """
+        Move the message bodies of a flow into the on-disk spool, keeping all
+        other flow data in memory. Offloaded bodies are read back from disk
+        whenever they are accessed.
+        """
+        if f.id not in self._store or f.id in self._offloaded:
+            return
+        if self._spool is None:
+            self._spool = io.BodySpool(self.offload_dir)
+        self._release_bodies(f)
+        bodies = {}
+        for part in ("request", "response"):
+            message = getattr(f, part)
+            if message is None or message.body_file is not None:
+                continue
+            if message.raw_content:
+                bodies[part] = self._spool.write_body(message.raw_content)
+                message.body_file = bodies[part]
+                message.data.content = None
+        self._resident.pop(f.id, None)
+        if not bodies:
+            return
+        self._offloaded[f.id] = bodies
+        size = approx_flow_size(f)
+        self._store_bytes += size - self._sizes.get(f.id, 0)
+        self._sizes[f.id] = size
+
+    def is_offloaded(self, f: BetterMITM.flow.Flow) -> bool:
+        return f.id in self._offloaded
+
+    def restore_bodies(self, f: BetterMITM.flow.Flow) -> None:
+        """
+        Load previously offloaded message bodies back into memory.
+        This is a no-op for flows whose bodies were never offloaded.
+        """
+        bodies = self._offloaded.get(f.id)
+        if not bodies:
+            return
+        assert isinstance(f, http.HTTPFlow)
+        for part in bodies:
+            message = getattr(f, part)
+            if message is not None and message.body_file is bodies[part]:
+                message.raw_content = message.body_file.read()
+        self._account(f)
+
+    def _discard_offloaded(
+        self, f: BetterMITM.flow.Flow, replaced_only: bool = False
+    ) -> None:
+        """
+        Release the spool space of a flow's offloaded bodies, or only of those
+        that have been replaced with new content in the meantime.
+        """
+        bodies = self._offloaded.get(f.id)
+        if not bodies:
+            return
+        assert self._spool
+        for part, body in list(bodies.items()):
+            message = getattr(f, part)
+            if replaced_only and message is not None and message.body_file is body:
+                continue
+            self._spool.discard(len(body))
+            del bodies[part]
+        if not bodies:
+            del self._offloaded[f.id]
+        if self._spool.needs_compaction:
+            self._compact_spool()
+
+    def _compact_spool(self) -> None:
+        """
+        Copy all offloaded bodies that are still in use into a new spool.
+        The old spool file is removed once no body refers to it anymore.
+        """
+        assert self._spool
+        old, self._spool = self._spool, None
+        for fid, bodies in list(self._offloaded.items()):
+            f = self._store[fid]
+            for part, body in list(bodies.items()):
+                message = getattr(f, part)
+                if message is None or message.body_file is not body:
+                    del bodies[part]
+                    continue
+                if self._spool is None:
+                    self._spool = io.BodySpool(self.offload_dir)
+                message.body_file = bodies[part] = self._spool.write_body(body.read())
+            if not bodies:
+                del self._offloaded[fid]
+        old.close()
+
+    def _evict(self, f: BetterMITM.flow.Flow) -> None:
+        if self.evict_path:
+            try:
+                if self._evict_writer is None:
+                    path = os.path.expanduser(self.evict_path)
+                    self._evict_writer = io.FlowWriter(
+                        open(path, "ab"), ctx.options.dedup_bodies
+                    )
+                self._evict_writer.add(f)
+                self._evict_writer.fo.flush()
+            except OSError as e:
+                logging.error(f"Error writing evicted flow: {e}")
+        if f in self._view:
+            idx = self._view.index(f)
+            self._view.remove(f)
+            self.sig_view_remove.send(flow=f, index=idx)
+        del self._store[f.id]
+        self._forget(f)
+        self.evicted_count += 1
+        self.sig_store_remove.send(flow=f)
+
+    def store_stats(self) -> dict[str, Any]:
+        """
+        Statistics about the current memory usage of the flow store.
+        """
+        return {
+            "flows": len(self._store),
+            "bytes": self._store_bytes,
+            "maxFlows": self.max_flows,
+            "maxMemory": self.max_memory,
+            "offloadedFlows": len(self._offloaded),
+            "offloadedBytes": self._spool.live_bytes if self._spool else 0,
+            "evictedFlows": self.evicted_count,
+            "dedupBodies": len(self._bodies.bodies),
+            "dedupBytes": self._bodies.bytes,
+            "dedupSavedBytes": self._bodies.saved_bytes,
+        }
+
+    @command.command("view.store.stats")
+    def store_stats_cmd(self) -> str:
+        """
+        Describe the memory usage of the flow store.
+        """
+        s = self.store_stats()
+        ret = (
+            f"{s['flows']} flows, ~{human.pretty_size(s['bytes'])} in memory, "
+            f"{s['offloadedFlows']} offloaded, {s['evictedFlows']} evicted"
+        )
+        if self.dedup:
+            ret += (
+                f", {human.pretty_size(s['dedupSavedBytes'])} saved by "
+                f"deduplicating {s['dedupBodies']} bodies"
+            )
+        return ret
+
+    def done(self):
+        for task in (self._refilter_task, self._reorder_task):
+            if task:
+                task.cancel()
+        if self._evict_writer:
+            self._evict_writer.fo.close()
+            self._evict_writer = None
+        if self._spool:
+            self._spool.close()
+            self._spool = None
 
 
 class Focus:
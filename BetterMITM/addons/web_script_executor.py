@@ -17,7 +17,7 @@ from BetterMITM import command
 from BetterMITM import ctx
 from BetterMITM import flow
 from BetterMITM import hooks
-from BetterMITM.net import http
+from BetterMITM import http
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +29,8 @@ class WebScriptExecutor:
     """
 
     def __init__(self):
+        # Scripts are only updated on the event loop, and always by replacing the dict,
+        # so that offloaded hooks can keep iterating over the snapshot they started with.
         self.scripts: Dict[str, Dict[str, Any]] = {}
         self.script_contexts: Dict[str, Any] = {}
 
@@ -38,27 +40,26 @@ class WebScriptExecutor:
 
     def running(self):
         """Called when BetterMITM starts."""
-        pass
+        self.sync_scripts()
+
+    def sync_scripts(self) -> None:
+        """Replace the registered scripts with the ones managed by the web interface."""
+        self.scripts = dict(getattr(ctx.master, "_scripts", {}))
 
+    @hooks.offload
     def request(self, f: http.HTTPFlow) -> None:
         """Execute scripts on request."""
         self._execute_scripts_for_trigger(f, "request")
 
+    @hooks.offload
     def response(self, f: http.HTTPFlow) -> None:
         """Execute scripts on response."""
         self._execute_scripts_for_trigger(f, "response")
 
     def _execute_scripts_for_trigger(self, flow_obj: flow.Flow, trigger: str) -> None:
         """Execute all scripts that match the trigger."""
-
-        if hasattr(ctx.master, "_scripts"):
-            master_scripts = ctx.master._scripts
-
-            for script_id, script_data in master_scripts.items():
-                if script_id not in self.scripts or self.scripts[script_id] != script_data:
-                    self.scripts[script_id] = script_data
-
-        for script_id, script in self.scripts.items():
+        scripts = self.scripts
+        for script_id, script in scripts.items():
             if not script.get("enabled", True):
                 continue
 
@@ -536,12 +537,12 @@ class WebScriptExecutor:
 
     def register_script(self, script_id: str, script_data: Dict[str, Any]):
         """Register a script for execution."""
-        self.scripts[script_id] = script_data
+        self.scripts = {**self.scripts, script_id: script_data}
 
     def unregister_script(self, script_id: str):
         """Unregister a script."""
         if script_id in self.scripts:
-            del self.scripts[script_id]
+            self.scripts = {k: v for k, v in self.scripts.items() if k != script_id}
 
     def _apply_script_modifications(self, flow_obj: flow.Flow, modifications: Dict[str, Any]) -> None:
         """Apply modifications made by script to the flow."""
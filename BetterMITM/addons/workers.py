@@ -0,0 +1,224 @@
+"""
+Multi-process worker mode for the proxy data plane.
+
+When `proxy_workers` is set, the primary process spawns worker processes that
+accept connections on the same TCP listen addresses via SO_REUSEPORT, so that the
+kernel distributes incoming connections across all processes. Each worker runs
+the full layer stack and addon chain and forwards completed flows to the primary
+over a local IPC socket. The primary then feeds them through its own addons
+(view, save, ...) in the same way as flows that are loaded from a file.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from BetterMITM import ctx
+from BetterMITM import flow
+from BetterMITM import http
+from BetterMITM.io import compat
+from BetterMITM.io import tnetstring
+from BetterMITM.proxy import mode_specs
+from BetterMITM.utils import asyncio_utils
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_ONLY_OPTIONS = {
+    "proxy_workers",
+    "proxy_worker_ipc",
+    "rfile",
+    "save_stream_file",
+    "hardump",
+    "client_replay",
+}
+"""Options that only make sense in the primary process and are not passed on to workers."""
+
+WORKER_MODES = ("regular", "upstream", "reverse", "socks5", "transparent")
+"""Proxy modes that can be served by workers. All of them are TCP-based asyncio servers."""
+
+
+def worker_modes(modes: list[str]) -> list[str]:
+    """
+    Select the proxy modes that are shared with workers. UDP-based servers
+    and OS-level redirectors keep running in the primary process only,
+    workers only serve the TCP part of modes that listen on both.
+    """
+    ret = []
+    for spec in modes:
+        mode = mode_specs.ProxyMode.parse(spec)
+        if mode.type_name in WORKER_MODES and mode.transport_protocol != "udp":
+            ret.append(spec)
+    return ret
+
+
+def encode_flow(f: flow.Flow, with_bodies: bool) -> bytes:
+    state = f.get_state()
+    if not with_bodies and isinstance(f, http.HTTPFlow):
+        for part in ("request", "response"):
+            if state.get(part):
+                state[part]["content"] = None
+    return tnetstring.dumps(state)
+
+
+async def read_flow(reader: asyncio.StreamReader) -> flow.Flow:
+    """
+    Read a single tnetstring-encoded flow from a stream.
+
+    Raises `asyncio.IncompleteReadError` if the stream ends.
+    """
+    header = await reader.readuntil(b":")
+    length = int(header[:-1])
+    payload = await reader.readexactly(length + 1)
+    state = tnetstring.loads(header + payload)
+    if not isinstance(state, dict):
+        raise ValueError(f"Invalid flow: {state!r}")
+    return flow.Flow.from_state(compat.migrate_flow(state))
+
+
+class Workers:
+    def __init__(self) -> None:
+        self.processes: list[asyncio.subprocess.Process] = []
+        self.ipc_dir: str | None = None
+        self.ipc_server: asyncio.Server | None = None
+        self.received = 0
+        self._primary: asyncio.StreamWriter | None = None
+        self._stopping = False
+
+    async def running(self) -> None:
+        if ctx.options.proxy_worker_ipc:
+            await self.connect_primary(ctx.options.proxy_worker_ipc)
+        elif ctx.options.proxy_workers:
+            await self.start_workers(ctx.options.proxy_workers)
+
+    async def done(self) -> None:
+        await self.stop_workers()
+        if self._primary:
+            self._primary.close()
+            self._primary = None
+
+    async def start_workers(self, count: int) -> None:
+        modes = worker_modes(ctx.options.mode)
+        if not modes:
+            logger.warning("proxy_workers is set, but no proxy mode can be shared.")
+            return
+        if any(
+            mode_specs.ProxyMode.parse(m).listen_port(ctx.options.listen_port) == 0
+            for m in modes
+        ):
+            logger.warning("proxy_workers requires a fixed listen port.")
+            return
+
+        self.ipc_dir = tempfile.mkdtemp(prefix="BetterMITM-workers-")
+        ipc_path = os.path.join(self.ipc_dir, "ipc.sock")
+        self.ipc_server = await asyncio.start_unix_server(
+            self.handle_worker, ipc_path
+        )
+
+        worker_options = {
+            k: getattr(ctx.options, k)
+            for k in ctx.options.keys()
+            if ctx.options.has_changed(k) and k not in PRIMARY_ONLY_OPTIONS
+        }
+        worker_options.update(
+            mode=modes,
+            proxy_worker_ipc=ipc_path,
+            termlog_verbosity="error",
+        )
+        options_path = os.path.join(self.ipc_dir, "options.json")
+        with open(options_path, "w") as f:
+            json.dump(worker_options, f)
+
+        for _ in range(count):
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "BetterMITM.tools.worker",
+                options_path,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+            )
+            self.processes.append(proc)
+            asyncio_utils.create_task(
+                self.watch_worker(proc),
+                name=f"proxy worker {proc.pid}",
+                keep_ref=True,
+            )
+        logger.info(f"Started {count} proxy worker processes.")
+
+    async def watch_worker(self, proc: asyncio.subprocess.Process) -> None:
+        returncode = await proc.wait()
+        if not self._stopping:
+            logger.error(f"Proxy worker {proc.pid} exited with code {returncode}.")
+
+    async def stop_workers(self) -> None:
+        self._stopping = True
+        for proc in self.processes:
+            if proc.returncode is None:
+                proc.terminate()
+        for proc in self.processes:
+            try:
+                await asyncio.wait_for(proc.wait(), 5)
+            except TimeoutError:
+                proc.kill()
+        self.processes.clear()
+        if self.ipc_server:
+            self.ipc_server.close()
+            self.ipc_server = None
+        if self.ipc_dir:
+            shutil.rmtree(self.ipc_dir, ignore_errors=True)
+            self.ipc_dir = None
+        self._stopping = False
+
+    async def handle_worker(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                f = await read_flow(reader)
+                self.received += 1
+                await ctx.master.load_flow(f)
+        except asyncio.IncompleteReadError:
+            pass
+        except (ValueError, TypeError) as e:
+            logger.error(f"Invalid data from proxy worker: {e}")
+        finally:
+            writer.close()
+
+    async def connect_primary(self, ipc_path: str) -> None:
+        reader, self._primary = await asyncio.open_unix_connection(ipc_path)
+        asyncio_utils.create_task(
+            self.watch_primary(reader),
+            name="watch primary process",
+            keep_ref=True,
+        )
+
+    async def watch_primary(self, reader: asyncio.StreamReader) -> None:
+        """Shut down this worker once the primary process goes away."""
+        await reader.read()
+        ctx.master.shutdown()
+
+    def forward(self, f: flow.Flow) -> None:
+        if self._primary is None or self._primary.is_closing():
+            return
+        self._primary.write(encode_flow(f, ctx.options.proxy_worker_bodies))
+
+    def response(self, f: http.HTTPFlow) -> None:
+        if not f.websocket:
+            self.forward(f)
+
+    def error(self, f: http.HTTPFlow) -> None:
+        if not f.websocket:
+            self.forward(f)
+
+    def websocket_end(self, f: http.HTTPFlow) -> None:
+        self.forward(f)
+
+    def tcp_end(self, f: flow.Flow) -> None:
+        self.forward(f)
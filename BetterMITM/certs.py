@@ -4,6 +4,7 @@ import ipaddress
 import logging
 import os
 import sys
+import time
 import warnings
 from collections.abc import Iterable
 from dataclasses import dataclass
@@ -26,6 +27,7 @@ from cryptography.x509 import ExtendedKeyUsageOID
 from cryptography.x509 import NameOID
 
 from BetterMITM.coretypes import serializable
+from BetterMITM.utils import metrics
 
 if sys.version_info < (3, 13):
     from typing_extensions import deprecated
@@ -689,15 +691,19 @@ class CertStore:
         if name:
             entry = self.certs[name]
         else:
+            start = time.perf_counter()
+            cert = dummy_cert(
+                self.default_privatekey,
+                self.default_ca._cert,
+                commonname,
+                sans,
+                organization,
+                crl_url,
+            )
+            if metrics.registry.enabled:
+                metrics.cert_generation_duration.observe(time.perf_counter() - start)
             entry = CertStoreEntry(
-                cert=dummy_cert(
-                    self.default_privatekey,
-                    self.default_ca._cert,
-                    commonname,
-                    sans,
-                    organization,
-                    crl_url,
-                ),
+                cert=cert,
                 privatekey=self.default_privatekey,
                 chain_file=self.default_chain_file,
                 chain_certs=self.default_chain_certs,
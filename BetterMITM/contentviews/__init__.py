@@ -6,6 +6,9 @@ bodies, the may be used in other contexts, e.g. to decode WebSocket messages.
 See "Custom Contentviews" in the mitmproxy documentation for examples.
 """
 
+import dataclasses
+import hashlib
+import itertools
 import logging
 import sys
 import traceback
@@ -16,6 +19,7 @@ from ..addonmanager import cut_traceback
 from ._api import Contentview
 from ._api import InteractiveContentview
 from ._api import Metadata
+from ._api import StreamingContentview
 from ._api import SyntaxHighlight
 from ._compat import get
 from ._compat import LegacyContentview
@@ -42,6 +46,7 @@ from ._view_xml_html import xml_html
 from .base import View
 import mitmproxy_rs.contentviews
 from BetterMITM import flow
+from BetterMITM import http
 from BetterMITM.utils import strutils
 
 logger = logging.getLogger(__name__)
@@ -58,12 +63,52 @@ class ContentviewResult:
 registry = ContentviewRegistry()
 
 
+def _cache_key(
+    message: ContentviewMessage,
+    flow: flow.Flow,
+    data: bytes,
+    enc: str,
+    metadata: Metadata,
+) -> tuple | None:
+    # Views may also look at the flow or the message, so we only share results between
+    # identical bodies of the same kind of message in the same flow.
+    if not data or not isinstance(message, http.Message):
+        return None
+    return (
+        hashlib.blake2b(data, digest_size=16).digest(),
+        enc,
+        flow.id,
+        isinstance(message, http.Request),
+        metadata.content_type,
+        metadata.protobuf_definitions,
+    )
+
+
+def _prettify(
+    view: Contentview, data: bytes, metadata: Metadata, max_lines: int | None
+) -> str:
+    if not max_lines:
+        return view.prettify(data, metadata)
+    if isinstance(view, StreamingContentview):
+        return "".join(
+            itertools.islice(view.prettify_lines(data, metadata), max_lines)
+        )
+    return strutils.cut_after_n_lines(view.prettify(data, metadata), max_lines)
+
+
 def prettify_message(
     message: ContentviewMessage,
     flow: flow.Flow,
     view_name: str = "auto",
     registry: ContentviewRegistry = registry,
+    max_lines: int | None = None,
 ) -> ContentviewResult:
+    """
+    Prettify a message's content.
+
+    If `max_lines` is given, only the first `max_lines` lines are returned.
+    Results for HTTP messages are cached in `registry.render_cache`.
+    """
     data, enc = get_data(message)
     if data is None:
         return ContentviewResult(
@@ -73,14 +118,23 @@ def prettify_message(
             view_name=None,
         )
 
-
     metadata = make_metadata(message, flow)
-    view = registry.get_view(data, metadata, view_name)
-
+    cache_key = _cache_key(message, flow, data, enc, metadata)
+    if cache_key is not None:
+        if cached := registry.render_cache.get((cache_key, view_name, max_lines)):
+            return dataclasses.replace(cached)
+
+    view = None
+    if cache_key is not None and view_name == "auto":
+        view = registry.render_cache.get(cache_key)
+    if view is None:
+        view = registry.get_view(data, metadata, view_name)
+        if cache_key is not None and view_name == "auto":
+            registry.render_cache.put(cache_key, view)
 
     try:
         ret = ContentviewResult(
-            text=view.prettify(data, metadata),
+            text=_prettify(view, data, metadata, max_lines),
             syntax_highlight=view.syntax_highlight,
             view_name=view.name,
             description=enc,
@@ -90,7 +144,7 @@ def prettify_message(
         if view_name == "auto":
 
             ret = ContentviewResult(
-                text=raw.prettify(data, metadata),
+                text=_prettify(raw, data, metadata, max_lines),
                 syntax_highlight=raw.syntax_highlight,
                 view_name=raw.name,
                 description=f"{enc}[failed to parse as {view.name}]",
@@ -98,7 +152,7 @@ def prettify_message(
         else:
 
             exc, value, tb = sys.exc_info()
-            tb_cut = cut_traceback(tb, "prettify_message")
+            tb_cut = cut_traceback(tb, "_prettify")
             if (
                 tb_cut == tb
             ):
@@ -113,6 +167,12 @@ def prettify_message(
             )
 
     ret.text = strutils.escape_control_characters(ret.text)
+    if cache_key is not None:
+        registry.render_cache.put(
+            (cache_key, view_name, max_lines),
+            dataclasses.replace(ret),
+            len(ret.text),
+        )
     return ret
 
 
@@ -187,6 +247,7 @@ __all__ = [
 
     "Contentview",
     "InteractiveContentview",
+    "StreamingContentview",
     "SyntaxHighlight",
     "add",
     "Metadata",
@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 import typing
 from abc import abstractmethod
+from collections.abc import Iterator
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Literal
@@ -82,6 +83,27 @@ class InteractiveContentview(Contentview, typing.Protocol):
         """
 
 
+@typing.runtime_checkable
+class StreamingContentview(Contentview, typing.Protocol):
+    """
+    A contentview that can produce its output incrementally.
+
+    When only the first few lines of a large message are displayed,
+    `prettify_lines` is used instead of `prettify` so that the remaining output is never rendered.
+    """
+
+    @abstractmethod
+    def prettify_lines(
+        self,
+        data: bytes,
+        metadata: Metadata,
+    ) -> Iterator[str]:
+        """
+        Like `prettify`, but yield the output line by line, including line endings.
+        Joining all lines must produce the same result as `prettify`.
+        """
+
+
 @dataclass
 class Metadata:
     """
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import collections
 import logging
 import typing
+from collections.abc import Hashable
 from collections.abc import Mapping
 
 from ..utils import signals
@@ -14,10 +16,53 @@ logger = logging.getLogger(__name__)
 def _on_change(view: Contentview) -> None: ...
 
 
+class RenderCache:
+    """
+    A least-recently-used cache for rendered content,
+    bounded both by the number of entries and their total size.
+    """
+
+    def __init__(self, max_entries: int = 64, max_size: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self._entries: collections.OrderedDict[Hashable, tuple[typing.Any, int]] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> typing.Any | None:
+        try:
+            value, _ = self._entries[key]
+        except KeyError:
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: typing.Any, size: int = 0) -> None:
+        if size > self.max_size:
+            return
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
 class ContentviewRegistry(Mapping[str, Contentview]):
     def __init__(self):
         self._by_name: dict[str, Contentview] = {}
         self.on_change = signals.SyncSignal(_on_change)
+        self.render_cache = RenderCache()
+        """Rendered content and automatically selected views, cleared whenever a view is registered."""
 
     def register(self, instance: Contentview | type[Contentview]) -> None:
         if isinstance(instance, type):
@@ -26,6 +71,7 @@ class ContentviewRegistry(Mapping[str, Contentview]):
         if name in self._by_name:
             logger.info(f"Replacing existing {name} contentview.")
         self._by_name[name] = instance
+        self.render_cache.clear()
         self.on_change.send(instance)
 
     def available_views(self) -> list[str]:
@@ -1,6 +1,7 @@
 import io
 import typing
 from collections.abc import Iterable
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
@@ -63,7 +64,11 @@ def get_data(
         content = message.raw_content
         enc = "[cannot decode]"
     else:
-        if isinstance(message, http.Message) and content != message.raw_content:
+        if (
+            isinstance(message, http.Message)
+            and "content-encoding" in message.headers
+            and content != message.raw_content
+        ):
             enc = "[decoded {}]".format(message.headers.get("content-encoding"))
         else:
             enc = ""
@@ -71,6 +76,24 @@ def get_data(
     return content, enc
 
 
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Reassemble a stream of text chunks into lines, keeping line endings.
+    """
+    pending: list[str] = []
+    for chunk in chunks:
+        start = 0
+        while (end := chunk.find("\n", start)) >= 0:
+            pending.append(chunk[start : end + 1])
+            yield "".join(pending)
+            pending.clear()
+            start = end + 1
+        if start < len(chunk):
+            pending.append(chunk[start:])
+    if pending:
+        yield "".join(pending)
+
+
 def yaml_dumps(d: Any) -> str:
     if not d:
         return ""
@@ -1,16 +1,22 @@
 import json
+from collections.abc import Iterator
 
-from BetterMITM.contentviews._api import Contentview
 from BetterMITM.contentviews._api import Metadata
+from BetterMITM.contentviews._api import StreamingContentview
+from BetterMITM.contentviews._utils import iter_lines
 
 
-class JSONContentview(Contentview):
+class JSONContentview(StreamingContentview):
     syntax_highlight = "yaml"
 
     def prettify(self, data: bytes, metadata: Metadata) -> str:
         data = json.loads(data)
         return json.dumps(data, indent=4, ensure_ascii=False)
 
+    def prettify_lines(self, data: bytes, metadata: Metadata) -> Iterator[str]:
+        encoder = json.JSONEncoder(indent=4, ensure_ascii=False)
+        return iter_lines(encoder.iterencode(json.loads(data)))
+
     def render_priority(self, data: bytes, metadata: Metadata) -> float:
         if not data:
             return 0
@@ -1,11 +1,22 @@
-from ._api import Contentview
+from collections.abc import Iterator
+
 from ._api import Metadata
+from ._api import StreamingContentview
 
 
-class RawContentview(Contentview):
+class RawContentview(StreamingContentview):
     def prettify(self, data: bytes, metadata: Metadata) -> str:
         return data.decode("utf-8", "backslashreplace")
 
+    def prettify_lines(self, data: bytes, metadata: Metadata) -> Iterator[str]:
+        # b"\n" never occurs within a multi-byte UTF-8 sequence.
+        start = 0
+        while (end := data.find(b"\n", start)) >= 0:
+            yield data[start : end + 1].decode("utf-8", "backslashreplace")
+            start = end + 1
+        if start < len(data):
+            yield data[start:].decode("utf-8", "backslashreplace")
+
     def render_priority(
         self,
         data: bytes,
@@ -83,6 +83,8 @@ class _Token:
 class _Action(_Token):
     code: ClassVar[str]
     help: ClassVar[str]
+    cost: ClassVar[int] = 1
+    """Estimated evaluation cost, used to check cheap conditions first."""
 
     @classmethod
     def make(klass, s, loc, toks):
@@ -180,6 +182,7 @@ class FAll(_Action):
 class _Rex(_Action):
     flags = 0
     is_binary = True
+    cost = 3
 
     def __init__(self, expr):
         self.expr = expr
@@ -201,6 +204,7 @@ def _check_content_type(rex, message):
 class FAsset(_Action):
     code = "a"
     help = "Match asset in response: CSS, JavaScript, images, fonts."
+    cost = 5
     ASSET_TYPES = [
         re.compile(x)
         for x in [
@@ -226,6 +230,7 @@ class FAsset(_Action):
 class FContentType(_Rex):
     code = "t"
     help = "Content-type header"
+    cost = 5
 
     @only(http.HTTPFlow)
     def __call__(self, f):
@@ -239,6 +244,7 @@ class FContentType(_Rex):
 class FContentTypeRequest(_Rex):
     code = "tq"
     help = "Request Content-Type header"
+    cost = 5
 
     @only(http.HTTPFlow)
     def __call__(self, f):
@@ -248,6 +254,7 @@ class FContentTypeRequest(_Rex):
 class FContentTypeResponse(_Rex):
     code = "ts"
     help = "Response Content-Type header"
+    cost = 5
 
     @only(http.HTTPFlow)
     def __call__(self, f):
@@ -259,6 +266,7 @@ class FContentTypeResponse(_Rex):
 class FHead(_Rex):
     code = "h"
     help = "Header"
+    cost = 5
     flags = re.MULTILINE
 
     @only(http.HTTPFlow)
@@ -273,6 +281,7 @@ class FHead(_Rex):
 class FHeadRequest(_Rex):
     code = "hq"
     help = "Request header"
+    cost = 5
     flags = re.MULTILINE
 
     @only(http.HTTPFlow)
@@ -284,6 +293,7 @@ class FHeadRequest(_Rex):
 class FHeadResponse(_Rex):
     code = "hs"
     help = "Response header"
+    cost = 5
     flags = re.MULTILINE
 
     @only(http.HTTPFlow)
@@ -295,6 +305,7 @@ class FHeadResponse(_Rex):
 class FBod(_Rex):
     code = "b"
     help = "Body"
+    cost = 10
     flags = re.DOTALL
 
     @only(http.HTTPFlow, tcp.TCPFlow, udp.UDPFlow, dns.DNSFlow)
@@ -331,6 +342,7 @@ class FBod(_Rex):
 class FBodRequest(_Rex):
     code = "bq"
     help = "Request body"
+    cost = 10
     flags = re.DOTALL
 
     @only(http.HTTPFlow, tcp.TCPFlow, udp.UDPFlow, dns.DNSFlow)
@@ -358,6 +370,7 @@ class FBodRequest(_Rex):
 class FBodResponse(_Rex):
     code = "bs"
     help = "Response body"
+    cost = 10
     flags = re.DOTALL
 
     @only(http.HTTPFlow, tcp.TCPFlow, udp.UDPFlow, dns.DNSFlow)
@@ -385,6 +398,7 @@ class FBodResponse(_Rex):
 class FMethod(_Rex):
     code = "m"
     help = "Method"
+    cost = 2
 
     @only(http.HTTPFlow)
     def __call__(self, f):
@@ -523,32 +537,50 @@ class FAnd(_Token):
     def __init__(self, lst):
         self.lst = lst
 
+    @property
+    def cost(self) -> int:
+        return sum(i.cost for i in self.lst)
+
     def dump(self, indent=0, fp=sys.stdout):
         super().dump(indent, fp)
         for i in self.lst:
             i.dump(indent + 1, fp)
 
     def __call__(self, f):
-        return all(i(f) for i in self.lst)
+        for i in self.lst:
+            if not i(f):
+                return False
+        return True
 
 
 class FOr(_Token):
     def __init__(self, lst):
         self.lst = lst
 
+    @property
+    def cost(self) -> int:
+        return sum(i.cost for i in self.lst)
+
     def dump(self, indent=0, fp=sys.stdout):
         super().dump(indent, fp)
         for i in self.lst:
             i.dump(indent + 1, fp)
 
     def __call__(self, f):
-        return any(i(f) for i in self.lst)
+        for i in self.lst:
+            if i(f):
+                return True
+        return False
 
 
 class FNot(_Token):
     def __init__(self, itm):
         self.itm = itm[0]
 
+    @property
+    def cost(self) -> int:
+        return self.itm.cost
+
     def dump(self, indent=0, fp=sys.stdout):
         super().dump(indent, fp)
         self.itm.dump(indent + 1, fp)
@@ -557,6 +589,61 @@ class FNot(_Token):
         return not self.itm(f)
 
 
+def _key(flt: _Token) -> tuple:
+    """A key that is equal for filters that always give the same result."""
+    if isinstance(flt, (FAnd, FOr)):
+        return type(flt), tuple(_key(i) for i in flt.lst)
+    if isinstance(flt, FNot):
+        return FNot, _key(flt.itm)
+    return type(flt), getattr(flt, "expr", None), getattr(flt, "num", None)
+
+
+def _is_const(flt: _Token, value: bool) -> bool:
+    if isinstance(flt, FNot):
+        return _is_const(flt.itm, not value)
+    return value and isinstance(flt, FAll)
+
+
+def optimize(flt: _Token) -> _Token:
+    """
+    Rewrite a parsed filter so that it is cheaper to evaluate, without changing which flows it matches:
+
+    - nested `&` and `|` expressions are flattened and double negations are removed,
+    - duplicate operands of `&` and `|` are dropped,
+    - constant operands (`~all`, `!~all`) are folded,
+    - the remaining operands are ordered by their estimated cost, so that cheap checks
+      (flags, method, response code) short-circuit before URL, header and body matching.
+    """
+    if isinstance(flt, FNot):
+        flt.itm = optimize(flt.itm)
+        if isinstance(flt.itm, FNot):
+            return flt.itm.itm
+        return flt
+    if not isinstance(flt, (FAnd, FOr)):
+        return flt
+    # An operand that decides the result on its own (False for &, True for |)
+    # and one that does not change it.
+    absorbing = isinstance(flt, FOr)
+    lst: list[_Token] = []
+    seen: set[tuple] = set()
+    for child in flt.lst:
+        child = optimize(child)
+        for i in child.lst if type(child) is type(flt) else [child]:
+            if _is_const(i, absorbing):
+                return i
+            if _is_const(i, not absorbing) or (key := _key(i)) in seen:
+                continue
+            seen.add(key)
+            lst.append(i)
+    if not lst:
+        return FAll() if not absorbing else FNot([FAll()])
+    if len(lst) == 1:
+        return lst[0]
+    lst.sort(key=lambda i: i.cost)
+    flt.lst = lst
+    return flt
+
+
 filter_unary: Sequence[type[_Action]] = [
     FAsset,
     FErr,
@@ -653,15 +740,19 @@ class TFilter(Protocol):
     def __call__(self, f: flow.Flow) -> Any: ...
 
 
+@functools.lru_cache(maxsize=1024)
 def parse(s: str) -> TFilter:
     """
     Parse a filter expression and return the compiled filter function.
     If the filter syntax is invalid, `ValueError` is raised.
+
+    Filters are optimized for evaluation (see `optimize`) and cached by expression,
+    so parsing the same expression again returns the same filter object.
     """
     if not s:
         raise ValueError("Empty filter expression")
     try:
-        flt = bnf.parseString(s, parseAll=True)[0]
+        flt = optimize(bnf.parseString(s, parseAll=True)[0])
         flt.pattern = s
         return flt
     except (pp.ParseException, ValueError) as e:
@@ -53,6 +53,37 @@ class Hook:
 
 all_hooks: dict[str, type[Hook]] = {}
 
+OFFLOAD_POOLS = ("thread", "process")
+
+
+def offload(fn=None, *, pool: str = "thread"):
+    """
+    Mark an addon hook handler to be run off the event loop.
+
+    The flow is suspended while the handler runs in the addon manager's
+    thread pool (`pool="thread"`) or process pool (`pool="process"`).
+    Handlers for the process pool must be picklable (module-level functions
+    or static methods); they receive a copy of the flow and changes to it are
+    copied back once they return. Async handlers are run in an event loop of
+    their own in the worker.
+
+        @hooks.offload
+        def response(self, flow): ...
+
+    This is the preferred way to run blocking hooks. `BetterMITM.script.concurrent`
+    is kept for existing scripts and is equivalent to `@hooks.offload`.
+    """
+    if pool not in OFFLOAD_POOLS:
+        raise ValueError(f"Unknown executor pool: {pool!r}")
+
+    def decorator(fn):
+        fn.offload_pool = pool
+        return fn
+
+    if fn is None:
+        return decorator
+    return decorator(fn)
+
 
 @dataclass
 class ConfigureHook(Hook):
@@ -1,9 +1,14 @@
 import binascii
+import collections
+import contextlib
+import contextvars
 import json
+import mmap
 import os
 import time
 import urllib.parse
 import warnings
+import weakref
 from collections.abc import Callable
 from collections.abc import Iterable
 from collections.abc import Iterator
@@ -15,6 +20,7 @@ from email.utils import formatdate
 from email.utils import mktime_tz
 from email.utils import parsedate_tz
 from typing import Any
+from typing import BinaryIO
 from typing import cast
 
 from BetterMITM import flow
@@ -230,6 +236,139 @@ class ResponseData(MessageData):
     reason: bytes
 
 
+_file_refs: collections.Counter[str] = collections.Counter()
+"""Number of live `BodyFile` instances that own each file."""
+
+
+def _release_file(path: str) -> None:
+    _file_refs[path] -= 1
+    if _file_refs[path] <= 0:
+        del _file_refs[path]
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class BodyFile:
+    """
+    A raw message body that is kept in a file instead of in memory.
+    The file is mapped into memory on demand whenever the body is accessed.
+
+    Bodies are either kept in an open file, or in a named file that is only opened while it is read.
+    The body may also be a section of the file, starting at `offset`.
+    If `delete` is set, the named file is removed once no `BodyFile` refers to it anymore.
+
+    *See also:* `Message.body_file`
+    """
+
+    file: BinaryIO | None
+    path: str | None
+    size: int
+    offset: int
+
+    def __init__(
+        self,
+        file: BinaryIO | None,
+        size: int,
+        path: str | None = None,
+        offset: int = 0,
+        delete: bool = False,
+    ) -> None:
+        if (file is None) == (path is None):
+            raise ValueError("BodyFile requires either an open file or a path.")
+        self.file = file
+        self.path = path
+        self.size = size
+        self.offset = offset
+        if delete:
+            assert path is not None
+            _file_refs[path] += 1
+            weakref.finalize(self, _release_file, path)
+
+    @classmethod
+    def from_path(cls, path: str) -> "BodyFile":
+        return cls(None, os.path.getsize(path), path)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @contextlib.contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """
+        Map the file into memory and yield a read-only view of it.
+        The view must not be used after the context has been left.
+
+        If a named file has been truncated in the meantime, the view only covers the remaining part.
+        """
+        if self.size == 0:
+            yield memoryview(b"")
+            return
+        with contextlib.ExitStack() as stack:
+            if self.file is not None:
+                fileno = self.file.fileno()
+            else:
+                assert self.path is not None
+                fileno = stack.enter_context(open(self.path, "rb")).fileno()
+            aligned = self.offset - self.offset % mmap.ALLOCATIONGRANULARITY
+            start = self.offset - aligned
+            length = min(start + self.size, os.fstat(fileno).st_size - aligned)
+            if length <= start:
+                yield memoryview(b"")
+                return
+            m = mmap.mmap(fileno, length, access=mmap.ACCESS_READ, offset=aligned)
+            base = memoryview(m)
+            v = base[start:]
+            try:
+                yield v
+            finally:
+                v.release()
+                base.release()
+                try:
+                    m.close()
+                except BufferError:
+                    pass
+
+    def read(self, start: int = 0, stop: int | None = None) -> bytes:
+        """
+        Read the body, or the given byte range of it.
+        This creates a single copy of the requested contents in memory.
+        """
+        with self.view() as v:
+            return bytes(v[start:stop])
+
+    def iter_chunks(
+        self, chunk_size: int = 1024 * 1024, start: int = 0, stop: int | None = None
+    ) -> Iterator[bytes]:
+        """Read the body, or the given byte range of it, in chunks of at most `chunk_size` bytes."""
+        if stop is None or stop > self.size:
+            stop = self.size
+        while start < stop:
+            end = min(start + chunk_size, stop)
+            yield self.read(start, end)
+            start = end
+
+
+_body_views: contextvars.ContextVar[contextlib.ExitStack | None] = (
+    contextvars.ContextVar("body_views", default=None)
+)
+
+
+@contextlib.contextmanager
+def body_file_views() -> Iterator[None]:
+    """
+    Within this context, `Message.get_state` returns bodies that are kept in a `BodyFile`
+    as views of the mapped file instead of reading them into memory. This is used to
+    serialize flows with large bodies. The views must not be used after the context has been left.
+    """
+    with contextlib.ExitStack() as stack:
+        token = _body_views.set(stack)
+        try:
+            yield
+        finally:
+            _body_views.reset(token)
+
+
 class Message(serializable.Serializable):
     """Base class for `Request` and `Response`."""
 
@@ -238,12 +377,30 @@ class Message(serializable.Serializable):
         return cls(**state)
 
     def get_state(self):
-        return self.data.get_state()
+        if self._pending_content is not None:
+            self._encode_pending()
+        state = self.data.get_state()
+        if self.body_file is not None:
+            views = _body_views.get()
+            if views is None:
+                state["content"] = self.body_file.read()
+            else:
+                state["content"] = views.enter_context(self.body_file.view())
+        return state
 
     def set_state(self, state):
+        self._pending_content = None
+        self.body_file = None
         self.data.set_state(state)
 
     data: MessageData
+    _pending_content: tuple[bytes, str] | None = None
+    body_file: BodyFile | None = None
+    """
+    If set, the raw message body is kept in a file instead of in memory and read from there
+    on every access to `Message.raw_content`. mitmproxy does this for bodies that exceed `body_spool_size`.
+    Assigning new content discards the file.
+    """
     stream: Callable[[bytes], Iterable[bytes] | bytes] | bool = False
     """
     This attribute controls if the message body should be streamed.
@@ -321,12 +478,33 @@ class Message(serializable.Serializable):
 
         *See also:* `Message.content`, `Message.text`
         """
+        if self._pending_content is not None:
+            self._encode_pending()
+        if self.body_file is not None:
+            return self.body_file.read()
         return self.data.content
 
     @raw_content.setter
     def raw_content(self, content: bytes | None) -> None:
+        self._pending_content = None
+        self.body_file = None
         self.data.content = content
 
+    @property
+    def raw_size(self) -> int:
+        """
+        The size of `Message.raw_content` in bytes, or `0` if the content is missing.
+
+        In contrast to `len(message.raw_content)`, this neither reads bodies kept in a `Message.body_file`
+        nor compresses a modified body. For a modified body that has not been compressed yet,
+        the uncompressed size is returned.
+        """
+        if self.body_file is not None:
+            return len(self.body_file)
+        if self._pending_content is not None:
+            return len(self._pending_content[0])
+        return len(self.data.content or b"")
+
     @property
     def content(self) -> bytes | None:
         """
@@ -334,6 +512,11 @@ class Message(serializable.Serializable):
 
         Accessing this attribute may raise a `ValueError` when the HTTP content-encoding is invalid.
 
+        When a compressed body is modified, it is only re-compressed once `Message.raw_content` is accessed
+        (for example when the message is sent), so that repeated modifications by multiple addons
+        only pay for compression once. `content-length` is updated at that point, so it may be stale
+        until then.
+
         *See also:* `Message.raw_content`, `Message.text`
         """
         return self.get_content()
@@ -366,7 +549,19 @@ class Message(serializable.Serializable):
                 f"Message content must be bytes, not {type(value).__name__}. "
                 "Please use .text if you want to assign a str."
             )
-        ce = self.headers.get("content-encoding")
+        ce = self.data.headers.get("content-encoding")
+        if ce and ce.lower() in encoding.COMPRESSIONS:
+            self._pending_content = (value, ce)
+            return
+        self._set_encoded_content(value, ce)
+
+    def _encode_pending(self) -> None:
+        assert self._pending_content is not None
+        value, ce = self._pending_content
+        self._pending_content = None
+        self._set_encoded_content(value, ce)
+
+    def _set_encoded_content(self, value: bytes, ce: str | None) -> None:
         try:
             self.raw_content = encoding.encode(value, ce or "identity")
         except ValueError:
@@ -382,17 +577,37 @@ class Message(serializable.Serializable):
         else:
             self.headers["content-length"] = str(len(self.raw_content))
 
-    def get_content(self, strict: bool = True) -> bytes | None:
+    def get_content(
+        self, strict: bool = True, limit: int | None = None
+    ) -> bytes | None:
         """
         Similar to `Message.content`, but does not raise if `strict` is `False`.
         Instead, the compressed message body is returned as-is.
-        """
-        if self.raw_content is None:
+
+        If `limit` is set, at most that many bytes are returned,
+        and only as much of the body is read and decompressed as necessary.
+        """
+        if self._pending_content is not None:
+            return self._pending_content[0][:limit]
+        if limit is None:
+            return self._decode_content(self.raw_content, strict)
+        if self.body_file is not None:
+            with self.body_file.view() as raw:
+                return self._decode_content(raw, strict, limit)
+        return self._decode_content(self.data.content, strict, limit)
+
+    def _decode_content(
+        self, raw: bytes | memoryview | None, strict: bool, limit: int | None = None
+    ) -> bytes | None:
+        if raw is None:
             return None
         ce = self.headers.get("content-encoding")
         if ce:
             try:
-                content = encoding.decode(self.raw_content, ce)
+                if limit is None:
+                    content = encoding.decode(raw, ce)
+                else:
+                    content = encoding.decode_prefix(raw, ce, limit)
 
                 if isinstance(content, str):
                     raise ValueError(f"Invalid Content-Encoding: {ce}")
@@ -400,27 +615,27 @@ class Message(serializable.Serializable):
             except ValueError:
                 if strict:
                     raise
-                return self.raw_content
-        else:
-            return self.raw_content
+        if limit is None:
+            return cast(bytes, raw)
+        return bytes(raw[:limit])
 
     def set_text(self, text: str | None) -> None:
         if text is None:
             self.content = None
             return
-        enc = infer_content_encoding(self.headers.get("content-type", ""))
+        enc = infer_content_encoding(self.data.headers.get("content-type", ""))
 
         try:
             self.content = cast(bytes, encoding.encode(text, enc))
         except ValueError:
 
-            ct = parse_content_type(self.headers.get("content-type", "")) or (
+            ct = parse_content_type(self.data.headers.get("content-type", "")) or (
                 "text",
                 "plain",
                 {},
             )
             ct[2]["charset"] = "utf-8"
-            self.headers["content-type"] = assemble_content_type(*ct)
+            self.data.headers["content-type"] = assemble_content_type(*ct)
             enc = "utf8"
             self.content = text.encode(enc, "surrogateescape")
 
@@ -432,7 +647,9 @@ class Message(serializable.Serializable):
         content = self.get_content(strict)
         if content is None:
             return None
-        enc = infer_content_encoding(self.headers.get("content-type", ""), content)
+        enc = infer_content_encoding(
+            self.data.headers.get("content-type", ""), content
+        )
         try:
             return cast(str, encoding.decode(content, enc))
         except ValueError:
@@ -490,6 +707,8 @@ class Message(serializable.Serializable):
         """
         self.headers["content-encoding"] = encoding
         self.content = self.raw_content
+        if self._pending_content is not None:
+            self._encode_pending()
         if "content-encoding" not in self.headers:
             raise ValueError(f"Invalid content encoding {encoding!r}")
 
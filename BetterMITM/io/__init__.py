@@ -1,6 +1,25 @@
+from .io import body_digest
+from .io import DEDUP_MIN_SIZE
 from .io import FilteredFlowWriter
 from .io import FlowReader
 from .io import FlowWriter
 from .io import read_flows_from_paths
+from .io import stream_flows_from_paths
+from .segments import is_manifest
+from .segments import SegmentedFlowReader
+from .segments import SegmentedFlowWriter
+from .spool import BodySpool
 
-__all__ = ["FlowWriter", "FlowReader", "FilteredFlowWriter", "read_flows_from_paths"]
+__all__ = [
+    "FlowWriter",
+    "FlowReader",
+    "FilteredFlowWriter",
+    "read_flows_from_paths",
+    "stream_flows_from_paths",
+    "body_digest",
+    "DEDUP_MIN_SIZE",
+    "SegmentedFlowWriter",
+    "SegmentedFlowReader",
+    "is_manifest",
+    "BodySpool",
+]
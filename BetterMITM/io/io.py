@@ -1,6 +1,9 @@
+import collections
+import hashlib
 import json
 import os
 from collections.abc import Iterable
+from collections.abc import Iterator
 from io import BufferedReader
 from typing import Any
 from typing import BinaryIO
@@ -10,18 +13,66 @@ from typing import Union
 from BetterMITM import exceptions
 from BetterMITM import flow
 from BetterMITM import flowfilter
+from BetterMITM import http
 from BetterMITM.io import compat
 from BetterMITM.io import tnetstring
 from BetterMITM.io.har import request_to_flow
 
+DEDUP_MIN_SIZE = 1024
+"""Bodies smaller than this are never deduplicated, hashing them is not worth it."""
+
+DEDUP_MAX_BODIES = 16384
+"""
+Number of body hashes a writer remembers, and number of bodies a reader keeps to resolve references.
+Bodies that have been forgotten are written again.
+"""
+
+
+def body_digest(content: bytes | memoryview) -> str:
+    return hashlib.sha256(content).hexdigest()
+
 
 class FlowWriter:
-    def __init__(self, fo):
+    """
+    Write flows to a file.
+
+    If `dedup_bodies` is set, each HTTP message body is only written once. The first occurrence
+    is tagged with its hash (`content_hash`), later occurrences only refer to it (`content_ref`).
+    Only the `DEDUP_MAX_BODIES` most recently used hashes are remembered, so that long-running
+    streams do not grow without bound.
+    """
+
+    def __init__(self, fo, dedup_bodies: bool = False):
         self.fo = fo
+        self.dedup_bodies = dedup_bodies
+        self._written_bodies: collections.OrderedDict[str, None] = (
+            collections.OrderedDict()
+        )
 
     def add(self, f: flow.Flow) -> None:
-        d = f.get_state()
-        tnetstring.dump(d, self.fo)
+        with http.body_file_views():
+            state = f.get_state()
+            if self.dedup_bodies and isinstance(f, http.HTTPFlow):
+                self._dedup(state)
+            tnetstring.dump(state, self.fo)
+
+    def _dedup(self, state: dict) -> None:
+        for part in ("request", "response"):
+            message = state.get(part)
+            if not message or message["content"] is None:
+                continue
+            if len(message["content"]) < DEDUP_MIN_SIZE:
+                continue
+            digest = body_digest(message["content"])
+            if digest in self._written_bodies:
+                self._written_bodies.move_to_end(digest)
+                message["content"] = None
+                message["content_ref"] = digest
+            else:
+                message["content_hash"] = digest
+                self._written_bodies[digest] = None
+                if len(self._written_bodies) > DEDUP_MAX_BODIES:
+                    self._written_bodies.popitem(last=False)
 
 
 class FlowReader:
@@ -29,6 +80,7 @@ class FlowReader:
 
     def __init__(self, fo: BinaryIO):
         self.fo = fo
+        self._bodies: collections.OrderedDict[str, bytes] = collections.OrderedDict()
 
     def peek(self, n: int) -> bytes:
         try:
@@ -72,7 +124,9 @@ class FlowReader:
                     try:
                         if not isinstance(loaded, dict):
                             raise ValueError(f"Invalid flow: {loaded=}")
-                        yield flow.Flow.from_state(compat.migrate_flow(loaded))
+                        state = compat.migrate_flow(loaded)
+                        self._resolve_bodies(state)
+                        yield flow.Flow.from_state(state)
                     except ValueError as e:
                         raise exceptions.FlowReadException(e) from e
             except (ValueError, TypeError, IndexError) as e:
@@ -80,17 +134,40 @@ class FlowReader:
                     return
                 raise exceptions.FlowReadException("Invalid data format.") from e
 
-
-class FilteredFlowWriter:
-    def __init__(self, fo: BinaryIO, flt: flowfilter.TFilter | None):
-        self.fo = fo
+    def _resolve_bodies(self, state: dict) -> None:
+        """Resolve bodies that were deduplicated by `FlowWriter`, so that identical bodies share a buffer."""
+        for part in ("request", "response"):
+            message = state.get(part)
+            if not isinstance(message, dict):
+                continue
+            # The writer evicts hashes in the same order, so every reference it writes is still known here.
+            if (digest := message.pop("content_hash", None)) is not None:
+                self._bodies[digest] = message["content"]
+                self._bodies.move_to_end(digest)
+                if len(self._bodies) > DEDUP_MAX_BODIES:
+                    self._bodies.popitem(last=False)
+            elif (digest := message.pop("content_ref", None)) is not None:
+                try:
+                    message["content"] = self._bodies[digest]
+                except KeyError:
+                    raise ValueError(f"Unknown body reference: {digest}") from None
+                self._bodies.move_to_end(digest)
+
+
+class FilteredFlowWriter(FlowWriter):
+    def __init__(
+        self,
+        fo: BinaryIO,
+        flt: flowfilter.TFilter | None,
+        dedup_bodies: bool = False,
+    ):
+        super().__init__(fo, dedup_bodies)
         self.flt = flt
 
     def add(self, f: flow.Flow) -> None:
         if self.flt and not flowfilter.match(self.flt, f):
             return
-        d = f.get_state()
-        tnetstring.dump(d, self.fo)
+        super().add(f)
         self.fo.flush()
 
 
@@ -103,12 +180,26 @@ def read_flows_from_paths(paths) -> list[flow.Flow]:
     Raises:
         FlowReadException, if any error occurs.
     """
+    return list(stream_flows_from_paths(paths))
+
+
+def stream_flows_from_paths(paths) -> Iterator[flow.Flow]:
+    """
+    Given a list of filepaths, yield all flows one at a time.
+    Errors are only raised once the affected file is reached.
+
+    Raises:
+        FlowReadException, if any error occurs.
+    """
+    from BetterMITM.io import segments
+
     try:
-        flows: list[flow.Flow] = []
         for path in paths:
             path = os.path.expanduser(path)
+            if segments.is_manifest(path):
+                yield from segments.SegmentedFlowReader(path).stream()
+                continue
             with open(path, "rb") as f:
-                flows.extend(FlowReader(f).stream())
+                yield from FlowReader(f).stream()
     except OSError as e:
         raise exceptions.FlowReadException(e.strerror)
-    return flows
@@ -0,0 +1,219 @@
+"""
+Rolling flow capture: flows are written to a sequence of segment files, which are described
+by a small JSON manifest. Closed segments can be compressed with zstd, and old segments are
+removed once a retention limit is reached.
+
+The manifest lives at the path that was passed to `SegmentedFlowWriter`, the segments are
+stored next to it as `<name>.000001`, `<name>.000002.zst`, ...
+"""
+
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable
+from io import BufferedReader
+from pathlib import Path
+from typing import Any
+
+import zstandard as zstd
+
+from BetterMITM import exceptions
+from BetterMITM import flow
+from BetterMITM import flowfilter
+from BetterMITM.io.io import FlowReader
+from BetterMITM.io.io import FlowWriter
+
+MANIFEST_KEY = "flow_segments"
+"""The first key of every manifest, used to tell manifests apart from flow dumps and HAR files."""
+
+
+def is_manifest(path: str | os.PathLike) -> bool:
+    """Check if the file at the given path is a segment manifest."""
+    prefix = f'{{"{MANIFEST_KEY}"'.encode()
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(prefix)) == prefix
+    except OSError:
+        return False
+
+
+def load_manifest(path: str | os.PathLike) -> list[dict[str, Any]]:
+    """Load the list of segments from a manifest."""
+    try:
+        with open(path, "rb") as f:
+            manifest = json.load(f)
+        version, segments = manifest[MANIFEST_KEY], manifest["segments"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise exceptions.FlowReadException(f"Invalid segment manifest: {e}") from e
+    if version != 1:
+        raise exceptions.FlowReadException(
+            f"Unsupported segment manifest version: {version}"
+        )
+    return segments
+
+
+def compress_file(src: Path, dst: Path, level: int = 3) -> None:
+    """Compress `src` into `dst` using zstd."""
+    tmp = dst.with_name(dst.name + ".tmp")
+    cctx = zstd.ZstdCompressor(level=level)
+    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+        cctx.copy_stream(fin, fout)
+    os.replace(tmp, dst)
+
+
+class SegmentedFlowWriter:
+    """
+    Write flows to a rotating set of segment files.
+
+    A new segment is started once the current one is larger than `max_size` bytes or older
+    than `max_age` seconds (0 disables the respective limit). If `retain` is set, only that
+    many segments are kept. If `compress` is set, finished segments are compressed with zstd
+    in a background thread. The manifest is replaced atomically whenever a segment is started,
+    finished, compressed or removed, so that readers always see a consistent set of segments.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        flt: flowfilter.TFilter | None = None,
+        dedup_bodies: bool = False,
+        *,
+        max_size: int = 0,
+        max_age: float = 0,
+        retain: int = 0,
+        compress: bool = False,
+        append: bool = False,
+    ):
+        self.path = Path(path)
+        self.flt = flt
+        self.dedup_bodies = dedup_bodies
+        self.max_size = max_size
+        self.max_age = max_age
+        self.retain = retain
+        self.compress = compress
+
+        self._lock = threading.Lock()
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._writer: FlowWriter | None = None
+        self._segment: dict[str, Any] | None = None
+
+        self.segments: list[dict[str, Any]] = []
+        if append and is_manifest(self.path):
+            self.segments = load_manifest(self.path)
+        self._index = max((s["index"] for s in self.segments), default=0)
+        self._write_manifest()
+
+    def add(self, f: flow.Flow) -> None:
+        if self.flt and not flowfilter.match(self.flt, f):
+            return
+        if self._writer is None:
+            self._open_segment()
+        assert self._writer and self._segment
+        self._writer.add(f)
+        self._writer.fo.flush()
+        self._segment["flows"] += 1
+        self._segment["size"] = self._writer.fo.tell()
+        if (self.max_size and self._segment["size"] >= self.max_size) or (
+            self.max_age and time.time() - self._segment["start"] >= self.max_age
+        ):
+            self.rotate()
+
+    def rotate(self) -> None:
+        """Finish the current segment, the next flow will start a new one."""
+        if self._writer is None:
+            return
+        assert self._segment
+        self._writer.fo.close()
+        segment, self._writer, self._segment = self._segment, None, None
+        with self._lock:
+            segment["end"] = time.time()
+            self._write_manifest()
+        if self.compress:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="segment-compress"
+                )
+            self._executor.submit(self._compress, segment)
+
+    def close(self) -> None:
+        """Finish the current segment and wait for pending compressions."""
+        self.rotate()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _open_segment(self) -> None:
+        self._index += 1
+        name = f"{self.path.name}.{self._index:06d}"
+        fo = open(self.path.with_name(name), "wb")
+        self._writer = FlowWriter(fo, self.dedup_bodies)
+        now = time.time()
+        self._segment = {
+            "index": self._index,
+            "file": name,
+            "compression": None,
+            "flows": 0,
+            "size": 0,
+            "start": now,
+            "end": now,
+        }
+        with self._lock:
+            self.segments.append(self._segment)
+            expired = []
+            if self.retain and len(self.segments) > self.retain:
+                expired = self.segments[: -self.retain]
+                del self.segments[: -self.retain]
+            self._write_manifest()
+        for segment in expired:
+            self.path.with_name(segment["file"]).unlink(missing_ok=True)
+
+    def _compress(self, segment: dict[str, Any]) -> None:
+        src = self.path.with_name(segment["file"])
+        dst = src.with_name(src.name + ".zst")
+        try:
+            compress_file(src, dst)
+        except OSError:  # pragma: no cover
+            dst.unlink(missing_ok=True)
+            return
+        with self._lock:
+            expired = segment not in self.segments
+            if not expired:
+                segment["file"] = dst.name
+                segment["compression"] = "zstd"
+                segment["size"] = dst.stat().st_size
+                self._write_manifest()
+        src.unlink(missing_ok=True)
+        if expired:
+            dst.unlink(missing_ok=True)
+
+    def _write_manifest(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({MANIFEST_KEY: 1, "segments": self.segments}, f)
+        os.replace(tmp, self.path)
+
+
+class SegmentedFlowReader:
+    """
+    Read the flows of a segmented capture. Only the manifest is read upfront,
+    segments are opened (and decompressed) one at a time while streaming.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        self.segments = load_manifest(self.path)
+
+    def stream(self) -> Iterable[flow.Flow]:
+        for segment in self.segments:
+            with open(self.path.with_name(segment["file"]), "rb") as f:
+                if segment["compression"] == "zstd":
+                    with zstd.ZstdDecompressor().stream_reader(f) as reader:
+                        yield from FlowReader(BufferedReader(reader)).stream()
+                elif segment["compression"] is None:
+                    yield from FlowReader(f).stream()
+                else:
+                    raise exceptions.FlowReadException(
+                        f"Unknown segment compression: {segment['compression']}"
+                    )
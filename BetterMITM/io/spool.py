@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+from BetterMITM import http
+
+COMPACT_MIN_SIZE = 16 * 1024 * 1024
+"""Minimum amount of discarded data before a spool is worth compacting."""
+
+
+class BodySpool:
+    """
+    An append-only temporary file holding HTTP message bodies that have been
+    offloaded from memory.
+
+    Bodies that are no longer needed can be discarded, which only updates the accounting.
+    Once `needs_compaction` signals that most of the file is garbage,
+    owners should copy the remaining bodies into a new spool and close this one.
+    """
+
+    def __init__(self, directory: str | None = None) -> None:
+        self.fo = tempfile.NamedTemporaryFile(
+            prefix="BetterMITM-bodies-", dir=directory, delete=False
+        )
+        self.path = self.fo.name
+        # The file is removed once the spool is closed and no body refers to it anymore.
+        self._ref: http.BodyFile | None = http.BodyFile(None, 0, self.path, delete=True)
+        self.bytes_written = 0
+        self.live_bytes = 0
+
+    def write(self, data: bytes) -> tuple[int, int]:
+        self.fo.seek(0, os.SEEK_END)
+        offset = self.fo.tell()
+        self.fo.write(data)
+        self.fo.flush()
+        self.bytes_written += len(data)
+        self.live_bytes += len(data)
+        return offset, len(data)
+
+    def write_body(self, data: bytes) -> http.BodyFile:
+        """
+        Write a body and return a `BodyFile` that reads it back from the spool on demand.
+        The spool file is kept on disk for as long as the `BodyFile` exists.
+        """
+        offset, length = self.write(data)
+        return http.BodyFile(None, length, self.path, offset=offset, delete=True)
+
+    def read(self, offset: int, length: int) -> bytes:
+        self.fo.seek(offset)
+        return self.fo.read(length)
+
+    def discard(self, length: int) -> None:
+        """Mark a previously written body of the given length as no longer needed."""
+        self.live_bytes -= length
+
+    @property
+    def needs_compaction(self) -> bool:
+        garbage = self.bytes_written - self.live_bytes
+        return garbage >= COMPACT_MIN_SIZE and garbage > self.live_bytes
+
+    def close(self) -> None:
+        self.fo.close()
+        self._ref = None
@@ -44,7 +44,7 @@ import collections
 from typing import BinaryIO
 from typing import Union
 
-TSerializable = Union[None, str, bool, int, float, bytes, list, tuple, dict]
+TSerializable = Union[None, str, bool, int, float, bytes, memoryview, list, tuple, dict]
 
 
 def dumps(value: TSerializable) -> bytes:
@@ -63,8 +63,11 @@ def dump(value: TSerializable, file_handle: BinaryIO) -> None:
     """
     This function dumps a python object as a tnetstring and
     writes it to the given file.
+    Binary values are written as they are, without joining them into a single string first.
     """
-    file_handle.write(dumps(value))
+    q: collections.deque = collections.deque()
+    _rdumpq(q, 0, value)
+    file_handle.writelines(q)
 
 
 def _rdumpq(q: collections.deque, size: int, value: TSerializable) -> int:
@@ -109,7 +112,7 @@ def _rdumpq(q: collections.deque, size: int, value: TSerializable) -> int:
         span = str(ldata).encode()
         write(b"%s:%s^" % (span, data))
         return size + 2 + len(span) + ldata
-    elif isinstance(value, bytes):
+    elif isinstance(value, (bytes, memoryview)):
         data = value
         ldata = len(data)
         span = str(ldata).encode()
@@ -105,6 +105,7 @@ class Master:
 
     async def done(self) -> None:
         await self.addons.trigger_event(hooks.DoneHook())
+        self.addons.shutdown_executors()
         self._legacy_log_events.uninstall()
         if self._termlog_addon is not None:
             self._termlog_addon.uninstall()
@@ -16,6 +16,9 @@ import zstandard as zstd
 
 
 
+COMPRESSIONS = ("gzip", "deflate", "deflateraw", "br", "zstd")
+"""Content encodings that actually transform the body (as opposed to identity)."""
+
 CachedDecode = collections.namedtuple("CachedDecode", "encoded encoding errors decoded")
 _cache = CachedDecode(None, None, None, None)
 
@@ -62,7 +65,7 @@ def decode(
             decoded = custom_decode[encoding](encoded)
         except KeyError:
             decoded = codecs.decode(encoded, encoding, errors)
-        if encoding in ("gzip", "deflate", "deflateraw", "br", "zstd"):
+        if encoding in COMPRESSIONS:
             _cache = CachedDecode(encoded, encoding, errors, decoded)
         return decoded
     except TypeError:
@@ -120,7 +123,7 @@ def encode(
             encoded = custom_encode[encoding](decoded)
         except KeyError:
             encoded = codecs.encode(decoded, encoding, errors)
-        if encoding in ("gzip", "deflate", "deflateraw", "br", "zstd"):
+        if encoding in COMPRESSIONS:
             _cache = CachedDecode(encoded, encoding, errors, decoded)
         return encoded
     except TypeError:
@@ -136,6 +139,56 @@ def encode(
         )
 
 
+DECODE_PREFIX_CHUNK_SIZE = 16 * 1024
+"""Amount of compressed input that `decode_prefix` feeds to the decompressor at once."""
+
+
+def decode_prefix(encoded: bytes | memoryview, encoding: str, size: int) -> bytes:
+    """
+    Decode only the beginning of a body and return at most `size` bytes of it.
+    Compressed input is decompressed incrementally, so that the work done depends on `size`
+    rather than on the length of the body.
+
+    Raises:
+        ValueError, if decoding fails or the encoding is not supported.
+    """
+    encoding = encoding.lower()
+    if encoding in ("none", "identity"):
+        return bytes(encoded[:size])
+    try:
+        if encoding == "zstd":
+            reader = zstd.ZstdDecompressor().stream_reader(
+                BytesIO(encoded), read_across_frames=True
+            )
+            return reader.read(size)
+        if encoding == "br":
+            return _decode_prefix(brotli.Decompressor().process, encoded, size)
+        if encoding == "gzip":
+            return _decode_prefix(zlib.decompressobj(47).decompress, encoded, size)
+        if encoding in ("deflate", "deflateraw"):
+            try:
+                return _decode_prefix(zlib.decompressobj().decompress, encoded, size)
+            except zlib.error:
+                return _decode_prefix(
+                    zlib.decompressobj(-15).decompress, encoded, size
+                )
+    except Exception as e:
+        raise ValueError(
+            f"{type(e).__name__} when decoding {repr(encoded)[:10]} with {encoding!r}: {e!r}"
+        ) from None
+    raise ValueError(f"Unsupported encoding: {encoding!r}")
+
+
+def _decode_prefix(decompress, encoded: bytes | memoryview, size: int) -> bytes:
+    decoded = bytearray()
+    view = memoryview(encoded)
+    for i in range(0, len(view), DECODE_PREFIX_CHUNK_SIZE):
+        decoded += decompress(bytes(view[i : i + DECODE_PREFIX_CHUNK_SIZE]))
+        if len(decoded) >= size:
+            break
+    return bytes(decoded[:size])
+
+
 def identity(content):
     """
     Returns content unchanged. Identity is the default value of
@@ -232,4 +285,4 @@ custom_encode = {
     "zstd": encode_zstd,
 }
 
-__all__ = ["encode", "decode"]
+__all__ = ["encode", "decode", "decode_prefix"]
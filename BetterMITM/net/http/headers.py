@@ -111,3 +111,29 @@ def infer_content_encoding(content_type: str, content: bytes = b"") -> str:
         enc = "gb18030"
 
     return enc
+
+
+def parse_range(value: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single-range `Range: bytes=...` header for a body of the given size
+    into a `(start, stop)` tuple.
+
+    Returns `None` if the header is missing or invalid (including a last byte position before
+    the first one), in which case the entire body should be sent.
+    Raises a `ValueError` if the range starts at or past the end of the body.
+    """
+    if not value:
+        return None
+    m = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", value)
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    if not m.group(1):
+        start, stop = max(size - int(m.group(2)), 0), size
+    else:
+        start = int(m.group(1))
+        if m.group(2) and int(m.group(2)) < start:
+            return None
+        stop = min(int(m.group(2)) + 1, size) if m.group(2) else size
+    if start >= stop:
+        raise ValueError("Requested range not satisfiable.")
+    return start, stop
@@ -1,11 +1,10 @@
 def assemble_request(request):
-    if request.data.content is None:
+    content = request.raw_content
+    if content is None:
         raise ValueError("Cannot assemble flow with missing content")
     head = assemble_request_head(request)
     body = b"".join(
-        assemble_body(
-            request.data.headers, [request.data.content], request.data.trailers
-        )
+        assemble_body(request.data.headers, [content], request.data.trailers)
     )
     return head + body
 
@@ -17,13 +16,12 @@ def assemble_request_head(request):
 
 
 def assemble_response(response):
-    if response.data.content is None:
+    content = response.raw_content
+    if content is None:
         raise ValueError("Cannot assemble flow with missing content")
     head = assemble_response_head(response)
     body = b"".join(
-        assemble_body(
-            response.data.headers, [response.data.content], response.data.trailers
-        )
+        assemble_body(response.data.headers, [content], response.data.trailers)
     )
     return head + body
 
@@ -144,6 +144,54 @@ class Options(optmanager.OptManager):
             Set to 0 to disable this feature.
             """,
         )
+        self.add_option(
+            "body_spool_size",
+            Optional[str],
+            None,
+            """
+            Keep HTTP request and response bodies that exceed the given size in a temporary file
+            instead of in memory. The file is read on demand whenever the body is accessed,
+            and removed once the body is no longer used.
+            Understands k/m/g suffixes, i.e. 3m for 3 megabytes.
+            """,
+        )
+        self.add_option(
+            "body_spool_dir",
+            Optional[str],
+            None,
+            """
+            Store bodies that exceed body_spool_size in this directory instead of in the system's
+            temporary directory. Files are named after the SHA-256 hash of the body, so that identical
+            bodies are only stored once. A file is removed once no flow refers to it anymore,
+            e.g. after the flows have been cleared from the view.
+            """,
+        )
+        self.add_option(
+            "dedup_bodies",
+            bool,
+            False,
+            """
+            Deduplicate identical HTTP message bodies. Flows in the view share a single
+            in-memory copy of each body, and flow files store each body only once.
+            Flow files written with this option cannot be read by older versions.
+            """,
+        )
+        self.add_option(
+            "http2_stream_window",
+            int,
+            16 * 1024 * 1024,
+            """
+            Receive window for each HTTP/2 stream in bytes. Data we have received is only
+            acknowledged once it has been forwarded, so this bounds how much data a peer can
+            push to us while the other side of the stream is slow to read.
+            """,
+        )
+        self.add_option(
+            "http2_connection_window",
+            int,
+            64 * 1024 * 1024,
+            "Receive window for each HTTP/2 connection in bytes.",
+        )
         self.add_option(
             "http3",
             bool,
@@ -245,5 +293,56 @@ class Options(optmanager.OptManager):
             Timeout in seconds for inactive TCP connections. Connections will be closed after this period of inactivity.
             """,
         )
+        self.add_option(
+            "passthrough_relay",
+            bool,
+            True,
+            """
+            Relay data of ignored TCP connections directly between client and server,
+            bypassing the proxy's protocol layers.
+            """,
+        )
+        self.add_option(
+            "hook_threads",
+            int,
+            0,
+            """
+            Size of the thread pool for addon hooks that are marked to run off the event loop.
+            By default, the pool size is derived from the number of CPUs.
+            """,
+        )
+        self.add_option(
+            "hook_processes",
+            int,
+            0,
+            """
+            Size of the process pool for addon hooks that are marked to run in a separate process.
+            By default, one process per CPU is used.
+            """,
+        )
+        self.add_option(
+            "proxy_workers",
+            int,
+            0,
+            """
+            Number of additional worker processes that accept connections on the same
+            TCP listen addresses (using SO_REUSEPORT) and forward completed flows to
+            this process. Only TCP-based proxy modes are shared with workers.
+            Interception and flow modification from the UI only apply to connections
+            handled by the main process. Linux only.
+            """,
+        )
+        self.add_option(
+            "proxy_worker_bodies",
+            bool,
+            False,
+            "Include HTTP message bodies in flows forwarded from worker processes.",
+        )
+        self.add_option(
+            "proxy_worker_ipc",
+            Optional[str],
+            None,
+            "Internal: IPC socket of the main process. Set for worker processes only.",
+        )
 
         self.update(**kwargs)
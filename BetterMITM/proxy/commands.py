@@ -111,6 +111,37 @@ class CloseTcpConnection(CloseConnection):
         self.half_close = half_close
 
 
+class RelayConnection(ConnectionCommand):
+    """
+    Relay all further data between a connection and its peer directly,
+    without passing it through the layer stack. Connection close events are still passed to the layers.
+
+    Layers that transform data for either connection must not pass this command on.
+    This command is an optimization hint; the proxy server may ignore it.
+    """
+
+    peer: Connection
+
+    def __init__(self, connection: Connection, peer: Connection):
+        super().__init__(connection)
+        self.peer = peer
+
+
+class PauseReading(ConnectionCommand):
+    """
+    Stop reading from a connection until `ResumeReading` is issued for it,
+    so that the peer is throttled by TCP backpressure.
+
+    This command is an optimization hint; the proxy server may ignore it.
+    """
+
+
+class ResumeReading(ConnectionCommand):
+    """
+    Continue reading from a connection that has been paused with `PauseReading`.
+    """
+
+
 class StartHook(Command, BetterMITM.hooks.Hook):
     """
     Start an event hook in the mitmproxy core.
@@ -20,6 +20,7 @@ from BetterMITM.proxy import events
 from BetterMITM.proxy.commands import Command
 from BetterMITM.proxy.commands import StartHook
 from BetterMITM.proxy.context import Context
+from BetterMITM.utils import metrics
 
 T = TypeVar("T")
 CommandGenerator = Generator[Command, Any, T]
@@ -129,6 +130,8 @@ class Layer:
         yield from ()
 
     def handle_event(self, event: events.Event) -> CommandGenerator[None]:
+        if metrics.registry.enabled:
+            metrics.layer_events.inc(1, type(self).__name__, type(event).__name__)
         if self._paused:
 
             pause_finished = (
@@ -1,6 +1,7 @@
 import collections
 import enum
 import time
+from collections.abc import Iterator
 from dataclasses import dataclass
 from functools import cached_property
 from logging import DEBUG
@@ -28,6 +29,7 @@ from ._events import ResponseEndOfMessage
 from ._events import ResponseHeaders
 from ._events import ResponseProtocolError
 from ._events import ResponseTrailers
+from ._events import StreamBackpressure
 from ._hooks import HttpConnectedHook
 from ._hooks import HttpConnectErrorHook
 from ._hooks import HttpConnectHook
@@ -156,12 +158,24 @@ class DropStream(HttpCommand):
     stream_id: StreamId
 
 
+def set_body(message: http.Message, buf: ReceiveBuffer) -> None:
+    """Move the contents of a body buffer into a message, without copying spooled bodies into memory."""
+    body = buf.take()
+    if isinstance(body, http.BodyFile):
+        message.data.content = None
+        message.body_file = body
+    else:
+        message.data.content = body
+
+
 class HttpStream(layer.Layer):
     request_body_buf: ReceiveBuffer
     response_body_buf: ReceiveBuffer
     flow: http.HTTPFlow
     stream_id: StreamId
     child_layer: layer.Layer | None = None
+    response_chunks: Iterator[bytes] | None = None
+    """The remaining chunks of a response body that is sent from a file."""
 
     @cached_property
     def mode(self) -> HTTPMode:
@@ -172,8 +186,10 @@ class HttpStream(layer.Layer):
 
     def __init__(self, context: Context, stream_id: int) -> None:
         super().__init__(context)
-        self.request_body_buf = ReceiveBuffer()
-        self.response_body_buf = ReceiveBuffer()
+        spool_size = human.parse_size(context.options.body_spool_size)
+        spool_dir = context.options.body_spool_dir
+        self.request_body_buf = ReceiveBuffer(spool_size, spool_dir)
+        self.response_body_buf = ReceiveBuffer(spool_size, spool_dir)
         self.client_state = self.state_uninitialized
         self.server_state = self.state_uninitialized
         self.stream_id = stream_id
@@ -190,10 +206,13 @@ class HttpStream(layer.Layer):
                 f")"
             )
 
-    @expect(events.Start, HttpEvent)
+    @expect(events.Start, events.Wakeup, HttpEvent)
     def _handle_event(self, event: events.Event) -> layer.CommandGenerator[None]:
         if isinstance(event, events.Start):
             self.client_state = self.state_wait_for_request_headers
+        elif isinstance(event, events.Wakeup):
+            if self.response_chunks is not None:
+                yield from self.send_response_chunk()
         elif isinstance(event, (RequestProtocolError, ResponseProtocolError)):
             yield from self.handle_protocol_error(event)
         elif isinstance(
@@ -342,8 +361,7 @@ class HttpStream(layer.Layer):
                     )
 
             if self.context.options.store_streamed_bodies:
-                self.flow.request.data.content = bytes(self.request_body_buf)
-                self.request_body_buf.clear()
+                set_body(self.flow.request, self.request_body_buf)
             self.flow.request.timestamp_end = time.time()
             yield HttpRequestHook(self.flow)
             self.client_state = self.state_done
@@ -356,7 +374,7 @@ class HttpStream(layer.Layer):
                 )
             yield SendHttp(event, self.context.server)
 
-            if self.server_state == self.state_done:
+            if self.server_state == self.state_done and self.response_chunks is None:
                 yield from self.flow_done()
 
     @expect(RequestData, RequestTrailers, RequestEndOfMessage)
@@ -371,8 +389,7 @@ class HttpStream(layer.Layer):
             self.flow.request.trailers = event.trailers
         elif isinstance(event, RequestEndOfMessage):
             self.flow.request.timestamp_end = time.time()
-            self.flow.request.data.content = bytes(self.request_body_buf)
-            self.request_body_buf.clear()
+            set_body(self.flow.request, self.request_body_buf)
             self.client_state = self.state_done
             yield HttpRequestHook(self.flow)
             if (yield from self.check_killed(True)):
@@ -390,6 +407,7 @@ class HttpStream(layer.Layer):
                 if not ok:
                     return
 
+                # Reading raw_content compresses a modified body and updates content-length.
                 content = self.flow.request.raw_content
                 done_after_headers = not (content or self.flow.request.trailers)
                 yield SendHttp(
@@ -471,8 +489,7 @@ class HttpStream(layer.Layer):
                         ResponseData(self.stream_id, chunk), self.context.client
                     )
             if self.context.options.store_streamed_bodies:
-                self.flow.response.data.content = bytes(self.response_body_buf)
-                self.response_body_buf.clear()
+                set_body(self.flow.response, self.response_body_buf)
             yield from self.send_response(already_streamed=True)
 
     @expect(ResponseData, ResponseTrailers, ResponseEndOfMessage)
@@ -487,8 +504,7 @@ class HttpStream(layer.Layer):
             self.flow.response.trailers = event.trailers
         elif isinstance(event, ResponseEndOfMessage):
             assert self.flow.response
-            self.flow.response.data.content = bytes(self.response_body_buf)
-            self.response_body_buf.clear()
+            set_body(self.flow.response, self.response_body_buf)
             yield from self.send_response()
 
     def send_response(self, already_streamed: bool = False):
@@ -514,17 +530,45 @@ class HttpStream(layer.Layer):
             return
 
         if not already_streamed:
-            content = self.flow.response.raw_content
-            done_after_headers = not (content or self.flow.response.trailers)
+            body_file = self.flow.response.body_file
+            # Reading raw_content compresses a modified body and updates content-length,
+            # so it must happen before the headers are sent.
+            content = self.flow.response.raw_content if body_file is None else None
+            done_after_headers = not (
+                body_file or content or self.flow.response.trailers
+            )
             yield SendHttp(
                 ResponseHeaders(self.stream_id, self.flow.response, done_after_headers),
                 self.context.client,
             )
+            if body_file:
+                self.response_chunks = body_file.iter_chunks()
+                yield from self.send_response_chunk()
+                return
             if content:
                 yield SendHttp(
                     ResponseData(self.stream_id, content), self.context.client
                 )
 
+        yield from self.send_response_end()
+
+    def send_response_chunk(self) -> layer.CommandGenerator[None]:
+        """
+        Send the next chunk of a response body that is kept in a file.
+
+        Chunks are sent one at a time with a wakeup in between, so that the body is never
+        read into memory as a whole and writes to the client are drained in between.
+        """
+        assert self.response_chunks is not None
+        if chunk := next(self.response_chunks, None):
+            yield SendHttp(ResponseData(self.stream_id, chunk), self.context.client)
+            yield commands.RequestWakeup(0)
+        else:
+            self.response_chunks = None
+            yield from self.send_response_end()
+
+    def send_response_end(self) -> layer.CommandGenerator[None]:
+        assert self.flow.response
         if self.flow.response.trailers:
             yield SendHttp(
                 ResponseTrailers(self.stream_id, self.flow.response.trailers),
@@ -723,6 +767,7 @@ class HttpStream(layer.Layer):
     def handle_protocol_error(
         self, event: RequestProtocolError | ResponseProtocolError
     ) -> layer.CommandGenerator[None]:
+        self.response_chunks = None
         is_client_error_but_we_already_talk_upstream = (
             isinstance(event, RequestProtocolError)
             and self.client_state in (self.state_stream_request_body, self.state_done)
@@ -932,6 +977,8 @@ class HttpLayer(layer.Layer):
     command_sources: dict[commands.Command, layer.Layer]
     streams: dict[int, HttpStream]
     connections: dict[Connection, layer.Layer]
+    paused_peers: dict[int, layer.Layer]
+    """connections that have been asked to pause on behalf of a stream"""
     waiting_for_establishment: collections.defaultdict[
         Connection, list[GetHttpConnection]
     ]
@@ -944,6 +991,7 @@ class HttpLayer(layer.Layer):
         self.streams = {}
         self.command_sources = {}
         self.connections = {}
+        self.paused_peers = {}
 
     def __repr__(self):
         return f"HttpLayer({self.mode.name}, conns: {len(self.connections)})"
@@ -1031,7 +1079,11 @@ class HttpLayer(layer.Layer):
             if command.blocking or isinstance(command, commands.RequestWakeup):
                 self.command_sources[command] = child
 
-            if isinstance(command, ReceiveHttp):
+            if isinstance(command, ReceiveHttp) and isinstance(
+                command.event, StreamBackpressure
+            ):
+                yield from self.forward_backpressure(child, command.event)
+            elif isinstance(command, ReceiveHttp):
                 if isinstance(command.event, RequestHeaders):
                     yield from self.make_stream(command.event.stream_id)
                 try:
@@ -1047,6 +1099,10 @@ class HttpLayer(layer.Layer):
                 yield from self.event_to_child(conn, command.event)
             elif isinstance(command, DropStream):
                 self.streams.pop(command.stream_id, None)
+                if peer := self.paused_peers.pop(command.stream_id, None):
+                    yield from self.event_to_child(
+                        peer, StreamBackpressure(command.stream_id, False)
+                    )
             elif isinstance(command, GetHttpConnection):
                 yield from self.get_connection(command)
             elif isinstance(command, RegisterHttpConnection):
@@ -1054,11 +1110,53 @@ class HttpLayer(layer.Layer):
             elif isinstance(command, commands.OpenConnection):
                 self.connections[command.connection] = child
                 yield command
+            elif isinstance(command, commands.RelayConnection):
+                if all(
+                    self.is_raw(conn) for conn in (command.connection, command.peer)
+                ):
+                    yield command
             elif isinstance(command, commands.Command):
                 yield command
             else:
                 raise AssertionError(f"Not a command: {event}")
 
+    def forward_backpressure(
+        self, child: layer.Layer, event: StreamBackpressure
+    ) -> layer.CommandGenerator[None]:
+        """
+        Pass a backpressure signal from one side of a stream to the connection on the other side.
+        HTTP/2 connections stop acknowledging data for the stream, HTTP/1 connections stop reading
+        from their transport. HTTP/3 connections are throttled by QUIC flow control already.
+        """
+        if not event.paused:
+            peer = self.paused_peers.pop(event.stream_id, None)
+        elif stream := self.streams.get(event.stream_id):
+            if child is self.connections.get(stream.context.client):
+                peer = self.connections.get(stream.context.server)
+            else:
+                peer = self.connections.get(stream.context.client)
+        else:
+            peer = None
+        handler = peer
+        while handler is not None and not isinstance(handler, HttpConnection):
+            handler = getattr(handler, "child_layer", None)
+        if peer is not None and isinstance(
+            handler, (Http1Connection, Http2Client, Http2Server)
+        ):
+            if event.paused:
+                self.paused_peers[event.stream_id] = peer
+            yield from self.event_to_child(peer, event)
+
+    def is_raw(self, conn: Connection) -> bool:
+        """
+        True if data for the given connection is passed through as-is,
+        i.e. it is owned by a stream or an HTTP/1 connection that has switched to passthrough mode.
+        """
+        handler = self.connections.get(conn)
+        if isinstance(handler, Http1Connection):
+            return handler.state == handler.passthrough
+        return handler is None or isinstance(handler, HttpStream)
+
     def make_stream(self, stream_id: int) -> layer.CommandGenerator[None]:
         ctx = self.context.fork()
         self.streams[stream_id] = HttpStream(ctx, stream_id)
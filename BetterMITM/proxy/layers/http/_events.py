@@ -151,6 +151,22 @@ class ResponseProtocolError(HttpEvent):
         self.code = code
 
 
+@dataclass
+class StreamBackpressure(HttpEvent):
+    """
+    Emitted by an HTTP/2 connection when the send buffer of a stream runs full (`paused=True`)
+    or has drained again (`paused=False`). The HTTP layer passes it on to the connection
+    on the other side of the stream, which stops acknowledging received data (HTTP/2)
+    or stops reading from its transport (HTTP/1) in the meantime.
+    """
+
+    paused: bool
+
+    def __init__(self, stream_id: int, paused: bool):
+        self.stream_id = stream_id
+        self.paused = paused
+
+
 __all__ = [
     "ErrorCode",
     "HttpEvent",
@@ -164,4 +180,5 @@ __all__ = [
     "ResponseEndOfMessage",
     "RequestProtocolError",
     "ResponseProtocolError",
+    "StreamBackpressure",
 ]
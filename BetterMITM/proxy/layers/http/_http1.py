@@ -21,6 +21,7 @@ from ._events import ResponseData
 from ._events import ResponseEndOfMessage
 from ._events import ResponseHeaders
 from ._events import ResponseProtocolError
+from ._events import StreamBackpressure
 from BetterMITM import http
 from BetterMITM import version
 from BetterMITM.connection import Connection
@@ -44,6 +45,7 @@ class Http1Connection(HttpConnection, metaclass=abc.ABCMeta):
     response: http.Response | None = None
     request_done: bool = False
     response_done: bool = False
+    reading_paused: bool = False
 
     state: Callable[[events.Event], layer.CommandGenerator[None]] | Callable
     body_reader: TBodyReader
@@ -68,7 +70,9 @@ class Http1Connection(HttpConnection, metaclass=abc.ABCMeta):
         yield from ()
 
     def _handle_event(self, event: events.Event) -> layer.CommandGenerator[None]:
-        if isinstance(event, HttpEvent):
+        if isinstance(event, StreamBackpressure):
+            yield from self.pause_reading(event.paused)
+        elif isinstance(event, HttpEvent):
             yield from self.send(event)
         else:
             if (
@@ -122,6 +126,19 @@ class Http1Connection(HttpConnection, metaclass=abc.ABCMeta):
                 yield from self.mark_done(request=is_request, response=not is_request)
                 return
 
+    def pause_reading(self, paused: bool) -> layer.CommandGenerator[None]:
+        """
+        Stop or continue reading from our connection while the other side of the proxy is slow to accept data.
+        HTTP/1 has no flow control of its own, so we rely on TCP backpressure instead.
+        """
+        if paused == self.reading_paused:
+            return
+        self.reading_paused = paused
+        if paused:
+            yield commands.PauseReading(self.conn)
+        else:
+            yield commands.ResumeReading(self.conn)
+
     def wait(self, event: events.Event) -> layer.CommandGenerator[None]:
         """
         We wait for the current flow to be finished before parsing the next message,
@@ -178,6 +195,7 @@ class Http1Connection(HttpConnection, metaclass=abc.ABCMeta):
         if self.request_done and self.response_done:
             assert self.request
             assert self.response
+            yield from self.pause_reading(False)
             if should_make_pipe(self.request, self.response):
                 yield from self.make_pipe()
                 return
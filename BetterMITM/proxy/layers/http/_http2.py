@@ -40,6 +40,7 @@ from . import ResponseEndOfMessage
 from . import ResponseHeaders
 from . import ResponseProtocolError
 from . import ResponseTrailers
+from . import StreamBackpressure
 from ._base import format_error
 from ._base import HttpConnection
 from ._base import HttpEvent
@@ -74,6 +75,12 @@ class Http2Connection(HttpConnection):
     h2_conn: BufferedH2Connection
     streams: dict[int, StreamState]
     """keep track of all active stream ids to send protocol errors on teardown"""
+    paused_streams: set[int]
+    """streams for which the other side of the proxy cannot keep up, so we stop acknowledging received data"""
+    unacknowledged: dict[int, int]
+    """received but not yet acknowledged bytes for paused streams"""
+    backpressured_streams: set[int]
+    """streams for which we have asked the other side of the proxy to pause"""
 
     ReceiveProtocolError: type[RequestProtocolError | ResponseProtocolError]
     ReceiveData: type[RequestData | ResponseData]
@@ -89,8 +96,15 @@ class Http2Connection(HttpConnection):
         self.h2_conf.validate_inbound_headers = (
             self.context.options.validate_inbound_headers
         )
-        self.h2_conn = BufferedH2Connection(self.h2_conf)
+        self.h2_conn = BufferedH2Connection(
+            self.h2_conf,
+            stream_window=self.context.options.http2_stream_window,
+            connection_window=self.context.options.http2_connection_window,
+        )
         self.streams = {}
+        self.paused_streams = set()
+        self.unacknowledged = {}
+        self.backpressured_streams = set()
 
     def is_closed(self, stream_id: int) -> bool:
         """Check if a non-idle stream is closed"""
@@ -185,11 +199,18 @@ class Http2Connection(HttpConnection):
                             case other:
                                 assert_never(other)
                         self.h2_conn.reset_stream(event.stream_id, error_code.value)
+                        self.release_stream(event.stream_id)
+            elif isinstance(event, StreamBackpressure):
+                if event.paused:
+                    self.paused_streams.add(event.stream_id)
+                else:
+                    self.release_stream(event.stream_id)
             else:
                 raise AssertionError(f"Unexpected event: {event}")
             data_to_send = self.h2_conn.data_to_send()
             if data_to_send:
                 yield SendData(self.conn, data_to_send)
+            yield from self.update_backpressure()
 
         elif isinstance(event, DataReceived):
             try:
@@ -216,12 +237,37 @@ class Http2Connection(HttpConnection):
             data_to_send = self.h2_conn.data_to_send()
             if data_to_send:
                 yield SendData(self.conn, data_to_send)
+            yield from self.update_backpressure()
 
         elif isinstance(event, ConnectionClosed):
             yield from self.close_connection("peer closed connection")
         else:
             raise AssertionError(f"Unexpected event: {event!r}")
 
+    def release_stream(self, stream_id: int) -> None:
+        """Resume acknowledging received data for a stream, including everything that has been held back so far."""
+        self.paused_streams.discard(stream_id)
+        if pending := self.unacknowledged.pop(stream_id, 0):
+            self.h2_conn.acknowledge_received_data(pending, stream_id)
+
+    def update_backpressure(self) -> CommandGenerator[None]:
+        """
+        Ask the other side of the proxy to pause streams whose send buffer exceeds the stream window,
+        and to resume them once the buffer has drained to half of it.
+        """
+        high_watermark = self.context.options.http2_stream_window
+        for stream_id, buffered in self.h2_conn.buffered_bytes.items():
+            if (
+                buffered > high_watermark
+                and stream_id not in self.backpressured_streams
+            ):
+                self.backpressured_streams.add(stream_id)
+                yield ReceiveHttp(StreamBackpressure(stream_id, True))
+        for stream_id in list(self.backpressured_streams):
+            if self.h2_conn.buffered_bytes.get(stream_id, 0) <= high_watermark // 2:
+                self.backpressured_streams.discard(stream_id)
+                yield ReceiveHttp(StreamBackpressure(stream_id, False))
+
     def handle_h2_event(self, event: h2.events.Event) -> CommandGenerator[bool]:
         """returns true if further processing should be stopped."""
         if isinstance(event, h2.events.DataReceived):
@@ -235,13 +281,20 @@ class Http2Connection(HttpConnection):
                     f"Received HTTP/2 data frame, expected headers."
                 )
                 return True
-            self.h2_conn.acknowledge_received_data(
-                event.flow_controlled_length, event.stream_id
-            )
+            if event.stream_id in self.paused_streams:
+                self.unacknowledged[event.stream_id] = (
+                    self.unacknowledged.get(event.stream_id, 0)
+                    + event.flow_controlled_length
+                )
+            else:
+                self.h2_conn.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id
+                )
         elif isinstance(event, h2.events.TrailersReceived):
             trailers = http.Headers(event.headers)
             yield ReceiveHttp(self.ReceiveTrailers(event.stream_id, trailers))
         elif isinstance(event, h2.events.StreamEnded):
+            self.release_stream(event.stream_id)
             state = self.streams.get(event.stream_id, None)
             if state is StreamState.HEADERS_RECEIVED:
                 yield ReceiveHttp(self.ReceiveEndOfMessage(event.stream_id))
@@ -250,6 +303,7 @@ class Http2Connection(HttpConnection):
             if self.is_closed(event.stream_id):
                 self.streams.pop(event.stream_id, None)
         elif isinstance(event, h2.events.StreamReset):
+            self.release_stream(event.stream_id)
             if event.stream_id in self.streams:
                 try:
                     err_str = h2.errors.ErrorCodes(event.error_code).name
@@ -508,6 +562,8 @@ class Http2Client(Http2Connection):
 
         if isinstance(event, HttpEvent):
             ours = self.our_stream_id.get(event.stream_id, None)
+            if ours is None and isinstance(event, StreamBackpressure):
+                return
             if ours is None:
                 no_free_streams = self.h2_conn.open_outbound_streams >= (
                     self.provisional_max_concurrency
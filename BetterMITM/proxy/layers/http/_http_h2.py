@@ -46,24 +46,35 @@ class BufferedH2Connection(h2.connection.H2Connection):
 
     stream_buffers: collections.defaultdict[int, collections.deque[SendH2Data]]
     stream_trailers: dict[int, list[tuple[bytes, bytes]]]
+    buffered_bytes: dict[int, int]
+    """The number of bytes currently held in the send buffer of each stream."""
+    connection_window: int
 
-    def __init__(self, config: h2.config.H2Configuration):
+    def __init__(
+        self,
+        config: h2.config.H2Configuration,
+        stream_window: int = 2**31 - 1,
+        connection_window: int = 2**31 - 1,
+    ):
         super().__init__(config)
-        self.local_settings.initial_window_size = 2**31 - 1
+        self.local_settings.initial_window_size = stream_window
         self.local_settings.max_frame_size = 2**17
         self.max_inbound_frame_size = 2**17
 
         self.local_settings.acknowledge()
         self.stream_buffers = collections.defaultdict(collections.deque)
         self.stream_trailers = {}
+        self.buffered_bytes = {}
+        self.connection_window = connection_window
 
     def initiate_connection(self):
         super().initiate_connection()
 
 
-        self.increment_flow_control_window(
-            2**31 - 1 - self.inbound_flow_control_window
-        )
+        if self.connection_window > self.inbound_flow_control_window:
+            self.increment_flow_control_window(
+                self.connection_window - self.inbound_flow_control_window
+            )
 
     def send_data(
         self,
@@ -90,7 +101,7 @@ class BufferedH2Connection(h2.connection.H2Connection):
 
         if self.stream_buffers.get(stream_id, None):
 
-            self.stream_buffers[stream_id].append(SendH2Data(data, end_stream))
+            self.buffer_data(stream_id, data, end_stream)
         else:
             available_window = self.local_flow_control_window(stream_id)
             if frame_size <= available_window:
@@ -101,7 +112,17 @@ class BufferedH2Connection(h2.connection.H2Connection):
                     super().send_data(stream_id, can_send_now, end_stream=False)
                     data = data[available_window:]
 
-                self.stream_buffers[stream_id].append(SendH2Data(data, end_stream))
+                self.buffer_data(stream_id, data, end_stream)
+
+    def buffer_data(self, stream_id: int, data: bytes, end_stream: bool) -> None:
+        self.stream_buffers[stream_id].append(SendH2Data(data, end_stream))
+        self.buffered_bytes[stream_id] = self.buffered_bytes.get(stream_id, 0) + len(
+            data
+        )
+
+    def drop_buffer(self, stream_id: int) -> None:
+        self.stream_buffers.pop(stream_id, None)
+        self.buffered_bytes.pop(stream_id, None)
 
     def send_trailers(self, stream_id: int, trailers: list[tuple[bytes, bytes]]):
         if self.stream_buffers.get(stream_id, None):
@@ -116,7 +137,7 @@ class BufferedH2Connection(h2.connection.H2Connection):
         self.send_data(stream_id, b"", end_stream=True)
 
     def reset_stream(self, stream_id: int, error_code: int = 0) -> None:
-        self.stream_buffers.pop(stream_id, None)
+        self.drop_buffer(stream_id)
         super().reset_stream(stream_id, error_code)
 
     def receive_data(self, data: bytes):
@@ -136,9 +157,10 @@ class BufferedH2Connection(h2.connection.H2Connection):
                 ):
                     self.connection_window_updated()
             elif isinstance(event, h2.events.StreamReset):
-                self.stream_buffers.pop(event.stream_id, None)
+                self.drop_buffer(event.stream_id)
             elif isinstance(event, h2.events.ConnectionTerminated):
                 self.stream_buffers.clear()
+                self.buffered_bytes.clear()
             ret.append(event)
         return ret
 
@@ -157,7 +179,7 @@ class BufferedH2Connection(h2.connection.H2Connection):
                 h2.stream.StreamState.HALF_CLOSED_REMOTE,
             )
         if stream_was_reset:
-            self.stream_buffers.pop(stream_id, None)
+            self.drop_buffer(stream_id)
             return False
 
         available_window = self.local_flow_control_window(stream_id)
@@ -180,8 +202,10 @@ class BufferedH2Connection(h2.connection.H2Connection):
             super().send_data(stream_id, data=chunk.data, end_stream=chunk.end_stream)
 
             available_window -= len(chunk.data)
+            self.buffered_bytes[stream_id] -= len(chunk.data)
             if not self.stream_buffers[stream_id]:
                 del self.stream_buffers[stream_id]
+                del self.buffered_bytes[stream_id]
                 if stream_id in self.stream_trailers:
                     self.send_headers(
                         stream_id, self.stream_trailers.pop(stream_id), end_stream=True
@@ -64,6 +64,7 @@ class TCPLayer(layer.Layer):
     """
 
     flow: tcp.TCPFlow | None
+    relay_requested: bool = False
 
     def __init__(self, context: Context, ignore: bool = False):
         super().__init__(context)
@@ -118,6 +119,11 @@ class TCPLayer(layer.Layer):
                 yield commands.SendData(send_to, tcp_message.content)
             else:
                 yield commands.SendData(send_to, event.data)
+                if not self.relay_requested and self.context.options.passthrough_relay:
+                    self.relay_requested = True
+                    yield commands.RelayConnection(
+                        self.context.client, self.context.server
+                    )
 
         elif isinstance(event, events.ConnectionClosed):
             all_done = not (
@@ -27,6 +27,7 @@ from BetterMITM.tls import ClientHello
 from BetterMITM.tls import ClientHelloData
 from BetterMITM.tls import TlsData
 from BetterMITM.utils import human
+from BetterMITM.utils import metrics
 
 
 def handshake_record_contents(data: bytes) -> Iterator[bytes]:
@@ -242,6 +243,7 @@ class TlsFailedServerHook(StartHook):
 class TLSLayer(tunnel.TunnelLayer):
     tls: SSL.Connection = None
     """The OpenSSL connection object"""
+    handshake_start: float = 0.0
 
     def __init__(self, context: context.Context, conn: connection.Connection):
         super().__init__(
@@ -265,6 +267,10 @@ class TLSLayer(tunnel.TunnelLayer):
     def proto_name(self):
         return "DTLS" if self.is_dtls else "TLS"
 
+    @property
+    def _metrics_side(self) -> str:
+        return "client" if self.conn == self.context.client else "server"
+
     def start_tls(self) -> layer.CommandGenerator[None]:
         assert not self.tls
 
@@ -281,6 +287,7 @@ class TLSLayer(tunnel.TunnelLayer):
             return
         assert tls_start.ssl_conn
         self.tls = tls_start.ssl_conn
+        self.handshake_start = time.perf_counter()
 
     def tls_interact(self) -> layer.CommandGenerator[None]:
         while True:
@@ -377,6 +384,10 @@ class TLSLayer(tunnel.TunnelLayer):
                     self.conn.certificate_list.append(parsed_cert)
 
             self.conn.timestamp_tls_setup = time.time()
+            if metrics.registry.enabled:
+                metrics.tls_handshake_duration.observe(
+                    time.perf_counter() - self.handshake_start, self._metrics_side
+                )
             self.conn.alpn = self.tls.get_alpn_proto_negotiated()
             self.conn.cipher = self.tls.get_cipher_name()
             self.conn.tls_version = typing.cast(
@@ -399,6 +410,8 @@ class TLSLayer(tunnel.TunnelLayer):
 
     def on_handshake_error(self, err: str) -> layer.CommandGenerator[None]:
         self.conn.error = err
+        if metrics.registry.enabled:
+            metrics.tls_handshake_failures.inc(1, self._metrics_side)
         if self.conn == self.context.client:
             yield TlsFailedClientHook(TlsData(self.conn, self.context, self.tls))
         else:
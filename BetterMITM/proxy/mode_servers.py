@@ -304,8 +304,16 @@ class AsyncioServerInstance(ServerInstance[M], metaclass=ABCMeta):
             | mitmproxy_rs.wireguard.WireGuardServer
         ] = []
         if self.mode.transport_protocol in ("tcp", "both"):
-            servers.append(await asyncio.start_server(self.handle_stream, host, port))
-        if self.mode.transport_protocol in ("udp", "both"):
+            kwargs = {}
+            if ctx.options.proxy_workers or ctx.options.proxy_worker_ipc:
+                kwargs["reuse_port"] = True
+            servers.append(
+                await asyncio.start_server(self.handle_stream, host, port, **kwargs)
+            )
+        if (
+            self.mode.transport_protocol in ("udp", "both")
+            and not ctx.options.proxy_worker_ipc
+        ):
 
 
             if host == "":
@@ -17,6 +17,7 @@ from collections.abc import Callable
 from collections.abc import MutableMapping
 from contextlib import contextmanager
 from dataclasses import dataclass
+from dataclasses import field
 from types import TracebackType
 from typing import Literal
 
@@ -40,12 +41,18 @@ from BetterMITM.proxy.context import Context
 from BetterMITM.proxy.layers.http import HTTPMode
 from BetterMITM.utils import asyncio_utils
 from BetterMITM.utils import human
+from BetterMITM.utils import metrics
 from BetterMITM.utils.data import pkg_data
 
 logger = logging.getLogger(__name__)
 
 UDP_TIMEOUT = 20
 
+READ_SIZE_MIN = 65535
+"""Initial and minimum number of bytes requested per read from a transport."""
+READ_SIZE_MAX = 1024 * 1024
+"""Upper bound for the read size on connections with sustained throughput."""
+
 
 class TimeoutWatchdog:
     last_activity: float
@@ -88,11 +95,45 @@ class TimeoutWatchdog:
                 self.can_timeout.set()
 
 
+def _set_event() -> asyncio.Event:
+    event = asyncio.Event()
+    event.set()
+    return event
+
+
 @dataclass
 class ConnectionIO:
     handler: asyncio.Task | None = None
     reader: asyncio.StreamReader | mitmproxy_rs.Stream | None = None
     writer: asyncio.StreamWriter | mitmproxy_rs.Stream | None = None
+    relay_to: Connection | None = None
+    """If set, received data is written to this connection directly instead of being passed to the layers."""
+    bytes_relayed: int = 0
+    reading: asyncio.Event = field(default_factory=_set_event)
+    """Cleared while reading from the connection is paused, see `commands.PauseReading`."""
+    read_size: int = READ_SIZE_MIN
+    """
+    The number of bytes requested per read. This doubles whenever a read fills the whole buffer
+    and shrinks again when reads come back mostly empty.
+    """
+
+    def adjust_read_size(self, received: int) -> None:
+        if received >= self.read_size:
+            self.read_size = min(self.read_size * 2, READ_SIZE_MAX)
+        elif received < self.read_size // 4:
+            self.read_size = max(self.read_size // 2, READ_SIZE_MIN)
+
+
+def write_all(
+    writer: asyncio.StreamWriter | mitmproxy_rs.Stream, chunks: list[bytes]
+) -> None:
+    """Write multiple chunks to a transport, using a single vectored write if possible."""
+    if len(chunks) == 1:
+        writer.write(chunks[0])
+    elif isinstance(writer, asyncio.StreamWriter):
+        writer.writelines(chunks)
+    else:
+        writer.write(b"".join(chunks))
 
 
 class ConnectionHandler(metaclass=abc.ABCMeta):
@@ -123,6 +164,7 @@ class ConnectionHandler(metaclass=abc.ABCMeta):
 
 
         self._drain_lock = asyncio.Lock()
+        self._written: set[Connection] = set()
 
     async def handle_client(self) -> None:
         asyncio_utils.set_current_task_debug_info(
@@ -270,6 +312,7 @@ class ConnectionHandler(metaclass=abc.ABCMeta):
         assert task is not None
         self.wakeup_timer.discard(task)
         await self.server_event(events.Wakeup(request))
+        await self.drain_writers()
 
     async def handle_connection(self, connection: Connection) -> None:
         """
@@ -278,27 +321,43 @@ class ConnectionHandler(metaclass=abc.ABCMeta):
         but then possibly also keep on waiting for our side of the connection to be closed.
         """
         cancelled = None
-        reader = self.transports[connection].reader
+        io = self.transports[connection]
+        reader = io.reader
         assert reader
         while True:
             try:
-                data = await reader.read(65535)
+                if not io.reading.is_set():
+                    await io.reading.wait()
+                data = await reader.read(io.read_size)
                 if not data:
                     raise OSError("Connection closed by peer.")
+                io.adjust_read_size(len(data))
+                if metrics.registry.enabled:
+                    metrics.bytes_received.inc(
+                        len(data), "client" if connection is self.client else "server"
+                    )
             except OSError:
                 break
             except asyncio.CancelledError as e:
                 cancelled = e
                 break
 
-            await self.server_event(events.DataReceived(connection, data))
-
             try:
-                await self.drain_writers()
+                if io.relay_to is not None:
+                    await self.relay(io, data)
+                else:
+                    await self.server_event(events.DataReceived(connection, data))
+                    await self.drain_writers()
             except asyncio.CancelledError as e:
                 cancelled = e
                 break
 
+        if io.bytes_relayed:
+            self.log(
+                f"relayed {human.pretty_size(io.bytes_relayed)} from {human.format_address(connection.peername)}",
+                logging.DEBUG,
+            )
+
         if cancelled is None and connection.transport_protocol == "tcp":
 
             connection.state &= ~ConnectionState.CAN_READ
@@ -327,14 +386,53 @@ class ConnectionHandler(metaclass=abc.ABCMeta):
         if cancelled:
             raise cancelled
 
+    async def relay(self, io: ConnectionIO, data: bytes) -> None:
+        """
+        Write data received on a relayed connection to its peer, bypassing the layers.
+        """
+        assert io.relay_to is not None
+        self.timeout_watchdog.register_activity()
+        io.bytes_relayed += len(data)
+        try:
+            peer = self.transports[io.relay_to]
+        except KeyError:
+            return
+        writer = peer.writer
+        assert writer
+        if writer.is_closing():
+            return
+        writer.write(data)
+        try:
+            await writer.drain()
+        except OSError as e:
+            if peer.handler is not None:
+                peer.handler.cancel(f"Error sending data: {e}")
+
+    def start_relay(self, command: commands.RelayConnection) -> None:
+        a = self.transports.get(command.connection)
+        b = self.transports.get(command.peer)
+        if a is None or b is None or a.writer is None or b.writer is None:
+            return
+        if not (
+            command.connection.transport_protocol == "tcp"
+            and command.peer.transport_protocol == "tcp"
+        ):
+            return
+        self.log(f"relaying {command.connection} <-> {command.peer}", logging.DEBUG)
+        a.relay_to = command.peer
+        b.relay_to = command.connection
+
     async def drain_writers(self):
         """
-        Drain all writers to create some backpressure. We won't continue reading until there's space available in our
-        write buffers, so if we cannot write fast enough our own read buffers run full and the TCP recv stream is throttled.
+        Drain all writers that have been written to since the last call to create some backpressure.
+        We won't continue reading until there's space available in our write buffers, so if we cannot write
+        fast enough our own read buffers run full and the TCP recv stream is throttled.
         """
         async with self._drain_lock:
-            for transport in list(self.transports.values()):
-                if transport.writer is not None:
+            written, self._written = self._written, set()
+            for connection in written:
+                transport = self.transports.get(connection)
+                if transport is not None and transport.writer is not None:
                     try:
                         await transport.writer.drain()
                     except OSError as e:
@@ -385,9 +483,16 @@ class ConnectionHandler(metaclass=abc.ABCMeta):
 
 
             self.timeout_watchdog.register_activity()
+            pending: dict[Connection, list[bytes]] = {}
             try:
                 layer_commands = self.layer.handle_event(event)
                 for command in layer_commands:
+                    if (
+                        pending
+                        and isinstance(command, commands.ConnectionCommand)
+                        and not isinstance(command, commands.SendData)
+                    ):
+                        self.flush_writes(pending)
                     if isinstance(command, commands.OpenConnection):
                         assert command.connection not in self.transports
                         handler = asyncio_utils.create_task(
@@ -413,11 +518,14 @@ class ConnectionHandler(metaclass=abc.ABCMeta):
                         and command.connection not in self.transports
                     ):
                         pass
+                    elif isinstance(command, commands.RelayConnection):
+                        self.start_relay(command)
+                    elif isinstance(command, commands.PauseReading):
+                        self.transports[command.connection].reading.clear()
+                    elif isinstance(command, commands.ResumeReading):
+                        self.transports[command.connection].reading.set()
                     elif isinstance(command, commands.SendData):
-                        writer = self.transports[command.connection].writer
-                        assert writer
-                        if not writer.is_closing():
-                            writer.write(command.data)
+                        pending.setdefault(command.connection, []).append(command.data)
                     elif isinstance(command, commands.CloseTcpConnection):
                         self.close_connection(command.connection, command.half_close)
                     elif isinstance(command, commands.CloseConnection):
@@ -435,6 +543,23 @@ class ConnectionHandler(metaclass=abc.ABCMeta):
                         raise RuntimeError(f"Unexpected command: {command}")
             except Exception:
                 self.log(f"mitmproxy has crashed!", logging.ERROR, exc_info=True)
+            self.flush_writes(pending)
+
+    def flush_writes(self, pending: dict[Connection, list[bytes]]) -> None:
+        """
+        Write all data that has been queued up by SendData commands while handling an event.
+        Consecutive writes to the same connection are coalesced into a single vectored write.
+        """
+        for connection, chunks in pending.items():
+            io = self.transports.get(connection)
+            if io is None:
+                continue
+            writer = io.writer
+            assert writer
+            if not writer.is_closing():
+                write_all(writer, chunks)
+                self._written.add(connection)
+        pending.clear()
 
     def close_connection(
         self, connection: Connection, half_close: bool = False
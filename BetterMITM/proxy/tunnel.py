@@ -115,7 +115,17 @@ class TunnelLayer(layer.Layer):
     def _handle_command(
         self, command: commands.Command
     ) -> layer.CommandGenerator[None]:
-        if (
+        if isinstance(command, commands.RelayConnection) and self.conn in (
+            command.connection,
+            command.peer,
+        ):
+            if self.is_transparent:
+                if command.connection == self.conn:
+                    command.connection = self.tunnel_connection
+                else:
+                    command.peer = self.tunnel_connection
+                yield command
+        elif (
             isinstance(command, commands.ConnectionCommand)
             and command.connection == self.conn
         ):
@@ -126,6 +136,9 @@ class TunnelLayer(layer.Layer):
                     self.conn.state &= ~connection.ConnectionState.CAN_WRITE
                     command.connection = self.tunnel_connection
                 yield from self.send_close(command)
+            elif isinstance(command, (commands.PauseReading, commands.ResumeReading)):
+                command.connection = self.tunnel_connection
+                yield command
             elif isinstance(command, commands.OpenConnection):
 
                 self.command_to_reply_to = command
@@ -143,6 +156,17 @@ class TunnelLayer(layer.Layer):
         else:
             yield command
 
+    @property
+    def is_transparent(self) -> bool:
+        """
+        True if the tunnel is established and passes data through unmodified.
+        """
+        return (
+            self.tunnel_state is TunnelState.OPEN
+            and type(self).send_data is TunnelLayer.send_data
+            and type(self).receive_data is TunnelLayer.receive_data
+        )
+
     def event_to_child(self, event: events.Event) -> layer.CommandGenerator[None]:
         if (
             self.tunnel_state is TunnelState.ESTABLISHING
@@ -3,7 +3,12 @@ Utility decorators that help build state machines
 """
 
 import functools
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO
 
+from BetterMITM import http
 from BetterMITM.proxy import events
 
 
@@ -39,25 +44,76 @@ def expect(*event_types):
 class ReceiveBuffer:
     """
     A data structure to collect stream contents efficiently in O(n).
+
+    Chunks are only joined once the contents are taken out of the buffer.
+    If `spool_size` is set, the contents are moved to a temporary file as soon as they grow beyond it.
+    The file is closed once the contents are taken out, and removed when the resulting `BodyFile`
+    is no longer used. If `spool_dir` is set as well, spooled contents are stored in that directory
+    instead, in a file named after the SHA-256 hash of the contents. Identical bodies share the same file,
+    which is removed once none of them is used anymore.
     """
 
     _chunks: list[bytes]
     _len: int
+    _file: BinaryIO | None
+    _hash: "hashlib._Hash | None"
+    spool_size: int | None
+    spool_dir: str | None
 
-    def __init__(self):
+    def __init__(self, spool_size: int | None = None, spool_dir: str | None = None):
         self._chunks = []
         self._len = 0
+        self._file = None
+        self._hash = None
+        self.spool_size = spool_size
+        self.spool_dir = spool_dir
 
     def __iadd__(self, other: bytes):
         assert isinstance(other, bytes)
-        self._chunks.append(other)
         self._len += len(other)
+        if self._file is not None:
+            self._write(other)
+        elif self.spool_size is not None and self._len > self.spool_size:
+            if self.spool_dir:
+                self._file = tempfile.NamedTemporaryFile(
+                    dir=self.spool_dir, prefix=".spool-", delete=False
+                )
+                self._hash = hashlib.sha256()
+            else:
+                self._file = tempfile.NamedTemporaryFile(
+                    prefix="BetterMITM-body-", delete=False
+                )
+            for chunk in self._chunks:
+                self._write(chunk)
+            self._write(other)
+            self._chunks.clear()
+        else:
+            self._chunks.append(other)
         return self
 
+    def _write(self, data: bytes) -> None:
+        assert self._file is not None
+        self._file.write(data)
+        if self._hash is not None:
+            self._hash.update(data)
+
+    def _close_file(self) -> None:
+        assert self._file is not None
+        self._file.close()
+        os.unlink(self._file.name)
+        self._file = None
+        self._hash = None
+
     def __len__(self):
         return self._len
 
     def __bytes__(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file.seek(0)
+            data = self._file.read()
+            self._file.seek(0, os.SEEK_END)
+            return data
         return b"".join(self._chunks)
 
     def __bool__(self):
@@ -66,3 +122,33 @@ class ReceiveBuffer:
     def clear(self):
         self._chunks.clear()
         self._len = 0
+        if self._file is not None:
+            self._close_file()
+
+    def take(self) -> bytes | http.BodyFile:
+        """
+        Return the buffer contents and reset the buffer.
+        Spooled contents are handed over as a `BodyFile` without reading them back into memory.
+        """
+        if self._file is not None and self._hash is not None:
+            assert self.spool_dir is not None
+            path = os.path.join(self.spool_dir, self._hash.hexdigest())
+            self._file.close()
+            if os.path.exists(path):
+                os.unlink(self._file.name)
+            else:
+                os.replace(self._file.name, path)
+            body = http.BodyFile(None, self._len, path, delete=True)
+            self._file = None
+            self._hash = None
+            self._len = 0
+            return body
+        if self._file is not None:
+            self._file.close()
+            body = http.BodyFile(None, self._len, self._file.name, delete=True)
+            self._file = None
+            self._len = 0
+            return body
+        data = b"".join(self._chunks)
+        self.clear()
+        return data
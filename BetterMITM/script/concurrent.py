@@ -1,32 +1,20 @@
 """
 This module provides a @concurrent decorator primitive to
 offload computations from mitmproxy's main master thread.
-"""
 
-import asyncio
-import inspect
+New addons should use `BetterMITM.hooks.offload` instead, which also supports process pools.
+"""
 
 from BetterMITM import hooks
 
 
 def concurrent(fn):
+    """
+    Run a hook handler in the addon manager's thread pool (see the `hook_threads` option).
+    This is equivalent to `@hooks.offload`.
+    """
     if fn.__name__ not in set(hooks.all_hooks.keys()) - {"load", "configure"}:
         raise NotImplementedError(
             "Concurrent decorator not supported for '%s' method." % fn.__name__
         )
-
-    async def _concurrent(*args):
-        def run():
-            if inspect.iscoroutinefunction(fn):
-
-                loop = asyncio.new_event_loop()
-                try:
-                    loop.run_until_complete(fn(*args))
-                finally:
-                    loop.close()
-            else:
-                fn(*args)
-
-        await asyncio.get_running_loop().run_in_executor(None, run)
-
-    return _concurrent
+    return hooks.offload(fn)
@@ -25,11 +25,13 @@ import tornado.escape
 import tornado.web
 import tornado.websocket
 
+import BetterMITM.addons.view
 import BetterMITM.flow
 import BetterMITM.tools.web.master
 import mitmproxy_rs
 from BetterMITM import certs
 from BetterMITM import command
+from BetterMITM import connection
 from BetterMITM import contentviews
 from BetterMITM import flowfilter
 from BetterMITM import http
@@ -37,17 +39,21 @@ from BetterMITM import io
 from BetterMITM import log
 from BetterMITM import optmanager
 from BetterMITM import version
+from BetterMITM.addons import securityscan
 from BetterMITM.dns import DNSFlow
 from BetterMITM.http import HTTPFlow
+from BetterMITM.net.http.headers import parse_range
 from BetterMITM.tcp import TCPFlow
 from BetterMITM.tcp import TCPMessage
+from BetterMITM.tools.web import jobs
 from BetterMITM.tools.web.webaddons import WebAuth
 from BetterMITM.udp import UDPFlow
 from BetterMITM.udp import UDPMessage
 from BetterMITM.utils import asyncio_utils
+from BetterMITM.utils import metrics as proxy_metrics
 from BetterMITM.utils.emoji import emoji
+from BetterMITM.utils.flowtable import FlowTable
 from BetterMITM.utils.strutils import always_str
-from BetterMITM.utils.strutils import cut_after_n_lines
 from BetterMITM.websocket import WebSocketMessage
 
 logger = logging.getLogger(__name__)
@@ -58,6 +64,9 @@ TRANSPARENT_PNG = (
     b"\x00\x02\x00\x01\xfc\xa8Q\rh\x00\x00\x00\x00IEND\xaeB`\x82"
 )
 
+JOB_RESULT_CHUNK_SIZE = 1024 * 1024
+"""Job results are sent in chunks of this size, flushing in between."""
+
 logger = logging.getLogger(__name__)
 
 
@@ -377,6 +386,24 @@ class RequestHandler(AuthRequestHandler):
         else:
             raise APIError(404, "Flow not found.")
 
+    def write_job(
+        self, kind: str, work: jobs.Work, headers: dict[str, str] | None = None
+    ) -> None:
+        """
+        Run a long-running operation and write its result. If the request has a
+        `background=1` argument, the operation is started as a background job instead and
+        the job is returned, its result can be fetched from /jobs/<id>/result.
+        """
+        if self.get_argument("background", "0").lower() in ("1", "true"):
+            job = self.master.jobs.submit(kind, work, headers)
+            self.set_status(202)
+            self.write(job.to_json())
+        else:
+            result = jobs.run_sync(work)
+            for name, value in (headers or {}).items():
+                self.set_header(name, value)
+            self.write(result)
+
     def write_error(self, status_code: int, **kwargs):
         if "exc_info" in kwargs and isinstance(kwargs["exc_info"][1], APIError):
             self.finish(kwargs["exc_info"][1].log_message)
@@ -454,6 +481,13 @@ class ClientConnection(WebSocketEventBroadcaster):
     def __init__(self, application: Application, request, **kwargs):
         super().__init__(application, request, **kwargs)
         self.filters: dict[str, flowfilter.TFilter] = {}
+        self._filter_tasks: dict[str, asyncio.Task[None]] = {}
+
+    def on_close(self):
+        super().on_close()
+        for task in self._filter_tasks.values():
+            task.cancel()
+        self._filter_tasks.clear()
 
     @classmethod
     def broadcast_flow_reset(cls) -> None:
@@ -491,14 +525,48 @@ class ClientConnection(WebSocketEventBroadcaster):
         self.send(message)
 
     def update_filter(self, name: str, expr: str) -> None:
+        if task := self._filter_tasks.pop(name, None):
+            task.cancel()
         if expr:
             filt = flowfilter.parse(expr)
             self.filters[name] = filt
-            matching_flow_ids = [f.id for f in self.application.master.view if filt(f)]
+            flows = list(self.application.master.view)
+            if len(flows) > BetterMITM.addons.view.REFILTER_CHUNK_SIZE:
+                self._filter_tasks[name] = asyncio_utils.create_task(
+                    self._update_filter_chunked(name, filt, flows),
+                    name=f"filter update {name}",
+                    keep_ref=False,
+                )
+                return
+            matching_flow_ids = [f.id for f in flows if filt(f)]
         else:
             self.filters.pop(name, None)
             matching_flow_ids = None
+        self._send_filter_update(name, matching_flow_ids)
 
+    async def _update_filter_chunked(
+        self,
+        name: str,
+        filt: flowfilter.TFilter,
+        flows: list[BetterMITM.flow.Flow],
+    ) -> None:
+        """
+        Evaluate a filter over a large view in chunks, yielding to the event loop in between.
+        This task is cancelled if the client sends a new expression for the same filter.
+        """
+        chunk_size = BetterMITM.addons.view.REFILTER_CHUNK_SIZE
+        matching_flow_ids = []
+        for start in range(0, len(flows), chunk_size):
+            matching_flow_ids.extend(
+                f.id for f in flows[start : start + chunk_size] if filt(f)
+            )
+            await asyncio.sleep(0)
+        self._filter_tasks.pop(name, None)
+        self._send_filter_update(name, matching_flow_ids)
+
+    def _send_filter_update(
+        self, name: str, matching_flow_ids: list[str] | None
+    ) -> None:
         message = self._json_dumps(
             {
                 "type": "flows/filterUpdate",
@@ -530,9 +598,6 @@ class Flows(RequestHandler):
 
 class DumpFlows(RequestHandler):
     def get(self) -> None:
-        self.set_header("Content-Disposition", "attachment; filename=flows")
-        self.set_header("Content-Type", "application/octet-stream")
-
         match: Callable[[BetterMITM.flow.Flow], bool]
         try:
             match = flowfilter.parse(self.request.arguments["filter"][0].decode())
@@ -546,12 +611,23 @@ class DumpFlows(RequestHandler):
             def match(_) -> bool:
                 return True
 
+        self.write_job(
+            "dump",
+            self._dump(list(self.view), match),
+            {
+                "Content-Disposition": "attachment; filename=flows",
+                "Content-Type": "application/octet-stream",
+            },
+        )
+
+    def _dump(self, flows, match) -> jobs.Work:
         with BytesIO() as bio:
-            fw = io.FlowWriter(bio)
-            for f in self.view:
+            fw = io.FlowWriter(bio, self.master.options.dedup_bodies)
+            for i, f in enumerate(flows):
                 if match(f):
                     fw.add(f)
-            self.write(bio.getvalue())
+                yield i + 1, len(flows)
+            return bio.getvalue()
 
     async def post(self):
         self.view.clear()
@@ -725,7 +801,7 @@ class FlowContent(RequestHandler):
         message.content = self.filecontents
         self.view.update([self.flow])
 
-    def get(self, flow_id, message):
+    async def get(self, flow_id, message):
         message = getattr(self.flow, message)
         assert isinstance(self.flow, HTTPFlow)
 
@@ -743,7 +819,29 @@ class FlowContent(RequestHandler):
         self.set_header("Content-Type", "application/text")
         self.set_header("X-Content-Type-Options", "nosniff")
         self.set_header("X-Frame-Options", "DENY")
-        self.write(message.get_content(strict=False))
+
+        body_file = message.body_file
+        if body_file is None or "content-encoding" in message.headers:
+            self.write(message.get_content(strict=False))
+            return
+
+        # Spooled bodies are sent in chunks and support range requests,
+        # so that they never need to be loaded into memory as a whole.
+        self.set_header("Accept-Ranges", "bytes")
+        start, stop = 0, len(body_file)
+        try:
+            r = parse_range(self.request.headers.get("Range"), len(body_file))
+        except ValueError as e:
+            raise APIError(416, str(e))
+        if r:
+            start, stop = r
+            self.set_status(206)
+            self.set_header(
+                "Content-Range", f"bytes {start}-{stop - 1}/{len(body_file)}"
+            )
+        for chunk in body_file.iter_chunks(start=start, stop=stop):
+            self.write(chunk)
+            await self.flush()
 
 
 class FlowContentView(RequestHandler):
@@ -758,9 +856,9 @@ class FlowContentView(RequestHandler):
     ):
         if view_name and view_name.lower() == "auto":
             view_name = "auto"
-        pretty = contentviews.prettify_message(message, flow, view_name=view_name)
-        if max_lines:
-            pretty.text = cut_after_n_lines(pretty.text, max_lines)
+        pretty = contentviews.prettify_message(
+            message, flow, view_name=view_name, max_lines=max_lines
+        )
 
         ret: dict[str, Any] = dict(
             text=pretty.text,
@@ -896,6 +994,7 @@ class State(RequestHandler):
             },
             "platform": sys.platform,
             "localModeUnavailable": mitmproxy_rs.local.LocalRedirector.unavailable_reason(),
+            "viewStore": master.view.store_stats(),
         }
 
     def get(self):
@@ -1214,43 +1313,45 @@ class FlowStateControl(RequestHandler):
 
 class RequestBuilderSend(RequestHandler):
     def post(self):
-        data = tornado.escape.json_decode(self.request.body)
-        method = data.get("method", "GET")
+        data = self.json
         url = data.get("url", "")
-        headers = data.get("headers", {})
-        body = data.get("body")
-
         if not url:
             raise APIError(400, "URL is required")
-
+        timeout = data.get("timeout", 30000)
+        if (
+            not isinstance(timeout, (int, float))
+            or isinstance(timeout, bool)
+            or timeout <= 0
+        ):
+            raise APIError(400, "Timeout must be a positive number of milliseconds.")
         try:
-            import urllib.request
-            import urllib.parse
-            from urllib.error import HTTPError, URLError
-
-            req = urllib.request.Request(url, data=body.encode() if body else None, headers=headers, method=method)
-
-            try:
-                with urllib.request.urlopen(req, timeout=30) as response:
-                    response_body = response.read().decode('utf-8', errors='replace')
-                    result = {
-                        "status": response.getcode(),
-                        "statusText": response.msg or "OK",
-                        "headers": dict(response.headers),
-                        "body": response_body,
-                    }
-                    self.write(result)
-            except HTTPError as e:
-                response_body = e.read().decode('utf-8', errors='replace')
-                result = {
-                    "status": e.code,
-                    "statusText": e.reason or "Error",
-                    "headers": dict(e.headers),
-                    "body": response_body,
-                }
-                self.write(result)
-        except Exception as e:
-            raise APIError(500, f"Failed to send request: {str(e)}")
+            req = http.Request.make(
+                data.get("method", "GET").upper(),
+                url,
+                data.get("body") or b"",
+                data.get("headers", {}),
+            )
+        except (ValueError, TypeError) as e:
+            raise APIError(400, f"Invalid request: {e}")
+        if "host" not in req.headers:
+            req.headers.insert(0, "Host", req.pretty_host)
+
+        f = http.HTTPFlow(
+            connection.Client(
+                peername=("", 0),
+                sockname=("", 0),
+                timestamp_start=req.timestamp_start,
+            ),
+            connection.Server(address=(req.host, req.port)),
+        )
+        f.request = req
+        asyncio_utils.create_task(
+            self.master.addons.get("clientplayback").send(f, timeout / 1000),
+            name="request builder",
+            keep_ref=True,
+        )
+        self.set_status(202)
+        self.write({"id": f.id})
 
 
 class MockResponses(RequestHandler):
@@ -1466,6 +1567,15 @@ class ScriptHandler(RequestHandler):
             **self.master._scripts[script_id],
             **data,
         }
+
+
+        try:
+            from BetterMITM.addons.web_script_executor import get_web_script_executor
+            executor = get_web_script_executor()
+            executor.register_script(script_id, self.master._scripts[script_id])
+        except Exception:
+            pass
+
         self.write(self.master._scripts[script_id])
 
     def delete(self, script_id):
@@ -1586,332 +1696,33 @@ class TransformerHandler(RequestHandler):
 
 class SecurityTest(RequestHandler):
     def post(self):
-        import re
         data = tornado.escape.json_decode(self.request.body)
         flow_ids = data.get("flow_ids", [])
-        tests = data.get("tests", [])
-        test_ids = data.get("test_ids", [])
-        timeout = data.get("timeout", 30)
         concurrent = data.get("concurrent", 5)
         stop_on_first = data.get("stop_on_first", False)
 
+        scanner = securityscan.Scanner(
+            securityscan.resolve_tests(data.get("tests", []), data.get("test_ids", []))
+        )
+        flows = [
+            flow
+            for flow_id in flow_ids
+            if (flow := self.view.get_by_id(flow_id)) and flow.type == "http"
+        ]
+        self.write_job(
+            "security_test",
+            self._run(scanner, flows, stop_on_first, concurrent),
+        )
 
-        test_definitions = {
-            "sql_injection": {
-                "name": "SQL Injection",
-                "payloads": [
-                    "' OR '1'='1", "'; DROP TABLE users--", "1' UNION SELECT NULL--", "' OR 1=1--",
-                    "admin'--", "' UNION SELECT username, password FROM users--", "1' AND '1'='1",
-                    "1' OR '1'='1'/*", "1' OR '1'='1'#", "1' UNION SELECT user(),database(),version()--",
-                ],
-                "severity": "high",
-                "cwe": "CWE-89",
-                "owasp": "A03:2021 – Injection",
-            },
-            "nosql_injection": {
-                "name": "NoSQL Injection",
-                "payloads": ["{$ne: null}", "{$gt: ''}", "{$where: 'this.username == this.password'}", "'; return true; var x='"],
-                "severity": "high",
-                "cwe": "CWE-943",
-                "owasp": "A03:2021 – Injection",
-            },
-            "ldap_injection": {
-                "name": "LDAP Injection",
-                "payloads": ["*)(uid=*))(|(uid=*", "*))%00", "*()|&"],
-                "severity": "high",
-                "cwe": "CWE-90",
-                "owasp": "A03:2021 – Injection",
-            },
-            "command_injection": {
-                "name": "Command Injection",
-                "payloads": ["; ls", "| ls", "& ls", "&& ls", "|| ls", "; cat /etc/passwd", "| cat /etc/passwd", "; whoami", "| whoami"],
-                "severity": "high",
-                "cwe": "CWE-78",
-                "owasp": "A03:2021 – Injection",
-            },
-            "path_traversal": {
-                "name": "Path Traversal",
-                "payloads": ["../", "../../", "../../../", "../../../../", "..\\", "..\\..\\", "..%2F", "..%5C", "%2e%2e%2f", "....//"],
-                "severity": "high",
-                "cwe": "CWE-22",
-                "owasp": "A01:2021 – Broken Access Control",
-            },
-            "xxe": {
-                "name": "XML External Entity (XXE)",
-                "payloads": [
-                    '<?xml version="1.0"?><!DOCTYPE foo [<!ENTITY xxe SYSTEM "file:///etc/passwd">]><foo>&xxe;</foo>',
-                    '<?xml version="1.0"?><!DOCTYPE foo [<!ENTITY xxe SYSTEM "http://evil.com/xxe">]><foo>&xxe;</foo>',
-                ],
-                "severity": "high",
-                "cwe": "CWE-611",
-                "owasp": "A05:2021 – Security Misconfiguration",
-            },
-            "ssrf": {
-                "name": "Server-Side Request Forgery (SSRF)",
-                "payloads": ["http://127.0.0.1", "http://localhost", "http://0.0.0.0", "http://[::1]", "http://169.254.169.254", "file:///etc/passwd"],
-                "severity": "high",
-                "cwe": "CWE-918",
-                "owasp": "A10:2021 – Server-Side Request Forgery",
-            },
-            "xss": {
-                "name": "Cross-Site Scripting (XSS)",
-                "payloads": [
-                    "<script>alert('XSS')</script>", "<img src=x onerror=alert('XSS')>", "javascript:alert('XSS')",
-                    "<svg onload=alert('XSS')>", "<body onload=alert('XSS')>", "<iframe src=javascript:alert('XSS')>",
-                ],
-                "severity": "high",
-                "cwe": "CWE-79",
-                "owasp": "A03:2021 – Injection",
-            },
-            "csrf": {
-                "name": "CSRF Protection",
-                "payloads": [],
-                "severity": "medium",
-                "cwe": "CWE-352",
-                "owasp": "A01:2021 – Broken Access Control",
-            },
-            "auth_bypass": {
-                "name": "Authentication Bypass",
-                "payloads": ["admin", "admin'--", "' OR '1'='1", "../admin", "admin' OR '1'='1'--", "' OR 1=1--"],
-                "severity": "high",
-                "cwe": "CWE-287",
-                "owasp": "A07:2021 – Identification and Authentication Failures",
-            },
-            "idor": {
-                "name": "Insecure Direct Object Reference (IDOR)",
-                "payloads": ["../1", "../2", "../3", "../admin", "?id=1", "?id=2", "?user_id=1"],
-                "severity": "medium",
-                "cwe": "CWE-639",
-                "owasp": "A01:2021 – Broken Access Control",
-            },
-            "header_security": {
-                "name": "Header Security Analysis",
-                "payloads": [],
-                "severity": "medium",
-                "cwe": "CWE-693",
-                "owasp": "A05:2021 – Security Misconfiguration",
-            },
-            "ssl_tls": {
-                "name": "SSL/TLS Configuration",
-                "payloads": [],
-                "severity": "medium",
-                "cwe": "CWE-295",
-                "owasp": "A02:2021 – Cryptographic Failures",
-            },
-            "weak_crypto": {
-                "name": "Weak Cryptography",
-                "payloads": [],
-                "severity": "high",
-                "cwe": "CWE-327",
-                "owasp": "A02:2021 – Cryptographic Failures",
-            },
-        }
-
-        all_results = []
-
-
-        if tests:
-
-            test_configs = {test["id"]: test for test in tests}
-        else:
-
-            test_configs = {tid: test_definitions.get(tid, {"name": tid, "payloads": [], "severity": "medium"}) for tid in test_ids}
-
-        for flow_id in flow_ids:
-            flow = self.view.get_by_id(flow_id)
-            if not flow or flow.type != "http":
-                continue
-
-            flow_results = []
-
-            for test_id, test_config in test_configs.items():
-                if stop_on_first and any(r.get("vulnerable") for r in flow_results):
-                    break
-
-                test_def = test_definitions.get(test_id, test_config)
-                test_name = test_def.get("name", test_config.get("name", test_id))
-                payloads = test_config.get("payloads", test_def.get("payloads", []))
-
-                result = self._run_security_test(flow, test_id, test_name, payloads, test_def)
-                if result:
-                    flow_results.append(result)
-                    if stop_on_first and result.get("vulnerable"):
-                        break
-
-            all_results.extend(flow_results)
-
-        self.write({"tests": all_results})
-
-    def _run_security_test(self, flow, test_id, test_name, payloads, test_def):
-        """Run a specific security test on a flow."""
-        import re
-
-        result = {
-            "test_id": test_id,
-            "test_name": test_name,
-            "flow_id": flow.id,
-            "vulnerable": False,
-            "severity": test_def.get("severity", "medium"),
-            "description": f"No vulnerabilities detected for {test_name}",
-            "details": [],
-            "found_payloads": [],
-            "recommendations": [],
-            "cwe": test_def.get("cwe"),
-            "owasp": test_def.get("owasp"),
-        }
-
-        if not flow.request:
-            return result
-
-        request_text = flow.request.content.decode("utf-8", errors="ignore") if flow.request.content else ""
-        request_headers = dict(flow.request.headers) if flow.request.headers else {}
-        request_url = flow.request.pretty_url or ""
-        response_text = flow.response.content.decode("utf-8", errors="ignore") if flow.response and flow.response.content else ""
-        response_headers = dict(flow.response.headers) if flow.response and flow.response.headers else {}
-
-
-        for payload in payloads:
-
-            if payload in request_text:
-                result["vulnerable"] = True
-                result["found_payloads"].append(payload)
-                result["details"].append(f"Payload found in request body: {payload}")
-
-
-            for key, value in request_headers.items():
-                if payload in str(value):
-                    result["vulnerable"] = True
-                    result["found_payloads"].append(payload)
-                    result["details"].append(f"Payload found in request header {key}: {payload}")
-
-
-            if payload in request_url:
-                result["vulnerable"] = True
-                result["found_payloads"].append(payload)
-                result["details"].append(f"Payload found in URL: {payload}")
-
-
-            if payload in response_text:
-                result["vulnerable"] = True
-                result["found_payloads"].append(payload)
-                result["details"].append(f"Payload reflected in response: {payload}")
-
-
-        if test_id == "csrf":
-            has_csrf_token = any("csrf" in k.lower() or "xsrf" in k.lower() for k in request_headers.keys())
-            if not has_csrf_token and flow.request.method in ["POST", "PUT", "DELETE", "PATCH"]:
-                result["vulnerable"] = True
-                result["details"].append("CSRF token missing in request headers")
-
-        if test_id == "header_security":
-            security_headers = [
-                "Content-Security-Policy",
-                "X-Frame-Options",
-                "X-Content-Type-Options",
-                "Strict-Transport-Security",
-                "X-XSS-Protection",
-            ]
-            missing_headers = []
-            for header in security_headers:
-                if not any(k.lower() == header.lower() for k in response_headers.keys()):
-                    missing_headers.append(header)
-            if missing_headers:
-                result["vulnerable"] = True
-                result["details"].append(f"Missing security headers: {', '.join(missing_headers)}")
-
-        if test_id == "ssl_tls":
-            if flow.request.scheme == "http" and "localhost" not in flow.request.host.lower():
-                result["vulnerable"] = True
-                result["details"].append("HTTP connection detected (should use HTTPS)")
-
-        if test_id == "weak_crypto":
-
-            weak_hash_patterns = ["md5", "sha1", "des", "rc4"]
-            response_lower = response_text.lower()
-            for pattern in weak_hash_patterns:
-                if pattern in response_lower:
-                    result["vulnerable"] = True
-                    result["details"].append(f"Potential weak cryptography detected: {pattern}")
-
-        if result["vulnerable"]:
-            result["description"] = f"Vulnerability detected: {'; '.join(result['details'])}"
-            result["recommendations"] = self._get_recommendations(test_id)
-        else:
-            result["description"] = f"No vulnerabilities detected for {test_name}"
-
-        return result
-
-    def _get_recommendations(self, test_id):
-        """Get security recommendations for a test."""
-        recommendations_map = {
-            "sql_injection": [
-                "Use parameterized queries or prepared statements",
-                "Implement input validation and sanitization",
-                "Use an ORM framework",
-                "Apply the principle of least privilege to database accounts",
-            ],
-            "nosql_injection": [
-                "Use parameterized queries for NoSQL databases",
-                "Validate and sanitize all user input",
-                "Use type-safe query builders",
-            ],
-            "xss": [
-                "Implement Content Security Policy (CSP)",
-                "Encode all user input before rendering",
-                "Use framework's built-in XSS protection",
-            ],
-            "command_injection": [
-                "Avoid executing system commands with user input",
-                "Use safe APIs instead of system commands",
-                "Validate and sanitize all user input",
-            ],
-            "path_traversal": [
-                "Validate and sanitize file paths",
-                "Use whitelist-based path validation",
-                "Store files outside the web root",
-            ],
-            "xxe": [
-                "Disable XML external entity processing",
-                "Use simpler data formats like JSON",
-                "Validate and sanitize XML input",
-            ],
-            "ssrf": [
-                "Validate and sanitize all URLs",
-                "Use whitelist-based URL validation",
-                "Block access to internal IP ranges",
-            ],
-            "csrf": [
-                "Implement CSRF tokens",
-                "Use SameSite cookie attribute",
-                "Verify the Origin header",
-            ],
-            "auth_bypass": [
-                "Implement strong authentication mechanisms",
-                "Use multi-factor authentication",
-                "Implement account lockout policies",
-            ],
-            "idor": [
-                "Implement proper access controls",
-                "Use indirect object references",
-                "Validate user permissions for each request",
-            ],
-            "header_security": [
-                "Implement Content-Security-Policy header",
-                "Set X-Frame-Options to DENY or SAMEORIGIN",
-                "Set X-Content-Type-Options to nosniff",
-            ],
-            "ssl_tls": [
-                "Use HTTPS for all connections",
-                "Disable weak cipher suites",
-                "Use TLS 1.2 or higher",
-            ],
-            "weak_crypto": [
-                "Use strong cryptographic algorithms (SHA-256, AES-256)",
-                "Avoid deprecated algorithms (MD5, SHA1, DES)",
-                "Use proper key management",
-            ],
-        }
-        return recommendations_map.get(test_id, ["Review security best practices", "Implement proper input validation"])
+    def _run(self, scanner, flows, stop_on_first, concurrent) -> jobs.Work:
+        results = yield from securityscan.scan_flows(
+            scanner,
+            flows,
+            stop_on_first,
+            concurrent,
+            self.master.addons.executor("process"),
+        )
+        return {"tests": results}
 
 
 class Certificates(RequestHandler):
@@ -2078,13 +1889,16 @@ class MacroPlay(RequestHandler):
             raise APIError(404, "Macro not found")
 
         macro = self.master._macros[macro_id]
-        for action in macro.get("actions", []):
+        self.write_job("macro", self._play(list(macro.get("actions", []))))
+
+    def _play(self, actions) -> jobs.Work:
+        for i, action in enumerate(actions):
             try:
                 self.master.commands.call(action)
             except Exception as e:
                 logger.warning(f"Failed to execute macro action {action}: {e}")
-
-        self.write({"success": True})
+            yield i + 1, len(actions)
+        return {"success": True}
 
 
 class TestCases(RequestHandler):
@@ -2133,8 +1947,12 @@ class TestRun(RequestHandler):
         if not hasattr(self.master, "_test_cases"):
             self.master._test_cases = {}
 
+        self.write_job("test_run", self._run(test_case_ids))
+
+    def _run(self, test_case_ids) -> jobs.Work:
         results = []
-        for test_id in test_case_ids:
+        for i, test_id in enumerate(test_case_ids):
+            yield i, len(test_case_ids)
             test_case = self.master._test_cases.get(test_id)
             if not test_case:
                 continue
@@ -2182,7 +2000,7 @@ class TestRun(RequestHandler):
                 "assertions": assertion_results,
             })
 
-        self.write({"results": results})
+        return {"results": results}
 
 
 class Templates(RequestHandler):
@@ -2263,6 +2081,8 @@ class PerformanceMetrics(RequestHandler):
         metrics = self.master._performance_metrics
         now = int(time.time())
 
+        metrics["slow_operations"] = list(proxy_metrics.registry.slow_operations)
+        metrics["proxy"] = proxy_metrics.registry.get_state()
         metrics["cpu_usage"].append(cpu_percent)
         metrics["memory_usage"].append(memory_info.rss / 1024 / 1024 if hasattr(memory_info, "rss") else 0)
         metrics["timestamp"].append(now)
@@ -2275,6 +2095,12 @@ class PerformanceMetrics(RequestHandler):
         self.write(metrics)
 
 
+class PrometheusMetrics(RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(proxy_metrics.registry.render())
+
+
 class PerformanceStart(RequestHandler):
     def post(self):
         if not hasattr(self.master, "_performance_metrics"):
@@ -2298,91 +2124,151 @@ class ExportFlows(RequestHandler):
         format_type = data.get("format", "postman")
         flow_ids = data.get("flow_ids", [])
 
-        flows_to_export = [f for f in self.view if f.id in flow_ids]
+        flows_to_export = [f for f in self.view if f.id in flow_ids and f.type == "http"]
 
         if format_type == "postman":
-            collection = {
-                "info": {
-                    "name": "BetterMITM Export",
-                    "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json",
-                },
-                "item": [],
-            }
-            for flow in flows_to_export:
-                if flow.type == "http":
-                    item = {
-                        "name": flow.request.path,
-                        "request": {
-                            "method": flow.request.method,
-                            "header": [{"key": k, "value": v} for k, v in flow.request.headers.items()],
-                            "url": {
-                                "raw": flow.request.pretty_url,
-                                "host": [flow.request.pretty_host],
-                                "path": flow.request.path.split("/"),
-                            },
-                        },
-                    }
-                    if flow.request.content:
-                        item["request"]["body"] = {"mode": "raw", "raw": flow.request.content}
-                    collection["item"].append(item)
-            self.set_header("Content-Type", "application/json")
-            self.write(json.dumps(collection, indent=2))
+            work, content_type = self._postman(flows_to_export), "application/json"
         elif format_type == "har":
-            har = {
-                "log": {
-                    "version": "1.2",
-                    "creator": {"name": "BetterMITM", "version": "1.0"},
-                    "entries": [],
-                }
-            }
-            for flow in flows_to_export:
-                if flow.type == "http":
-                    entry = {
-                        "request": {
-                            "method": flow.request.method,
-                            "url": flow.request.pretty_url,
-                            "headers": [{"name": k, "value": v} for k, v in flow.request.headers.items()],
-                            "bodySize": len(flow.request.content or ""),
-                        },
-                        "response": {},
-                        "time": 0,
-                    }
-                    if flow.response:
-                        entry["response"] = {
-                            "status": flow.response.status_code,
-                            "statusText": flow.response.reason,
-                            "headers": [{"name": k, "value": v} for k, v in flow.response.headers.items()],
-                            "bodySize": len(flow.response.content or ""),
-                        }
-                    har["log"]["entries"].append(entry)
-            self.set_header("Content-Type", "application/json")
-            self.write(json.dumps(har, indent=2))
+            work, content_type = self._har(flows_to_export), "application/json"
         elif format_type == "curl":
-            curl_commands = []
-            for flow in flows_to_export:
-                if flow.type == "http":
-                    cmd = f"curl -X {flow.request.method} '{flow.request.pretty_url}'"
-                    for k, v in flow.request.headers.items():
-                        cmd += f" -H '{k}: {v}'"
-                    if flow.request.content:
-                        cmd += f" -d '{flow.request.content}'"
-                    curl_commands.append(cmd)
-            self.set_header("Content-Type", "text/plain")
-            self.write("\n".join(curl_commands))
+            work, content_type = self._curl(flows_to_export), "text/plain"
         else:
             raise APIError(400, f"Unsupported format: {format_type}")
+        self.write_job("export", work, {"Content-Type": content_type})
+
+    def _postman(self, flows) -> jobs.Work:
+        collection = {
+            "info": {
+                "name": "BetterMITM Export",
+                "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json",
+            },
+            "item": [],
+        }
+        for i, flow in enumerate(flows):
+            item = {
+                "name": flow.request.path,
+                "request": {
+                    "method": flow.request.method,
+                    "header": [{"key": k, "value": v} for k, v in flow.request.headers.items()],
+                    "url": {
+                        "raw": flow.request.pretty_url,
+                        "host": [flow.request.pretty_host],
+                        "path": flow.request.path.split("/"),
+                    },
+                },
+            }
+            if flow.request.content:
+                item["request"]["body"] = {"mode": "raw", "raw": flow.request.content}
+            collection["item"].append(item)
+            yield i + 1, len(flows)
+        return json.dumps(collection, indent=2)
+
+    def _har(self, flows) -> jobs.Work:
+        har = {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "BetterMITM", "version": "1.0"},
+                "entries": [],
+            }
+        }
+        for i, flow in enumerate(flows):
+            entry = {
+                "request": {
+                    "method": flow.request.method,
+                    "url": flow.request.pretty_url,
+                    "headers": [{"name": k, "value": v} for k, v in flow.request.headers.items()],
+                    "bodySize": len(flow.request.content or ""),
+                },
+                "response": {},
+                "time": 0,
+            }
+            if flow.response:
+                entry["response"] = {
+                    "status": flow.response.status_code,
+                    "statusText": flow.response.reason,
+                    "headers": [{"name": k, "value": v} for k, v in flow.response.headers.items()],
+                    "bodySize": len(flow.response.content or ""),
+                }
+            har["log"]["entries"].append(entry)
+            yield i + 1, len(flows)
+        return json.dumps(har, indent=2)
+
+    def _curl(self, flows) -> jobs.Work:
+        curl_commands = []
+        for i, flow in enumerate(flows):
+            cmd = f"curl -X {flow.request.method} '{flow.request.pretty_url}'"
+            for k, v in flow.request.headers.items():
+                cmd += f" -H '{k}: {v}'"
+            if flow.request.content:
+                cmd += f" -d '{flow.request.content}'"
+            curl_commands.append(cmd)
+            yield i + 1, len(flows)
+        return "\n".join(curl_commands)
 
 
 class AnalyticsStats(RequestHandler):
     def get(self):
-        flows = self.view
-        stats = {
-            "total_flows": len(flows),
-            "http_flows": sum(1 for f in flows if f.type == "http"),
-            "tcp_flows": sum(1 for f in flows if f.type == "tcp"),
-            "udp_flows": sum(1 for f in flows if f.type == "udp"),
-        }
-        self.write(stats)
+        view = self.view
+        if view.table is None:
+            self.write(FlowTable.from_flows(view).stats())
+        elif len(view) == view.store_count():
+            self.write(view.table.stats())
+        else:
+            self.write(view.table.stats(view))
+
+
+class AnalyticsTraffic(RequestHandler):
+    def get(self):
+        try:
+            window = int(self.get_argument("window", "0"))
+        except ValueError:
+            raise APIError(400, "Invalid window.")
+        if window < 0:
+            raise APIError(400, "Invalid window.")
+        analytics = self.master.addons.get("analytics")
+        if analytics is None:
+            raise APIError(404, "Traffic analytics are not available.")
+        self.write(analytics.stats(window or None))
+
+
+class Jobs(RequestHandler):
+    def get(self):
+        self.write([job.to_json() for job in self.master.jobs.jobs.values()])
+
+
+class JobHandler(RequestHandler):
+    @property
+    def job(self) -> jobs.Job:
+        job = self.master.jobs.get(self.path_kwargs["job_id"])
+        if job is None:
+            raise APIError(404, "Job not found.")
+        return job
+
+    def get(self, job_id):
+        self.write(self.job.to_json())
+
+
+class CancelJob(JobHandler):
+    def post(self, job_id):
+        if not self.master.jobs.cancel(self.job):
+            raise APIError(409, "Job has already finished.")
+        self.write(self.job.to_json())
+
+
+class JobResult(JobHandler):
+    async def get(self, job_id):
+        job = self.job
+        if job.state != "done":
+            raise APIError(409, f"Job is {job.state}.")
+        for name, value in job.headers.items():
+            self.set_header(name, value)
+        if isinstance(job.result, (str, bytes)):
+            data = job.result.encode() if isinstance(job.result, str) else job.result
+            for start in range(0, len(data), JOB_RESULT_CHUNK_SIZE):
+                self.write(data[start : start + JOB_RESULT_CHUNK_SIZE])
+                await self.flush()
+        else:
+            self.write(job.result)
 
 
 class GZipContentAndFlowFiles(tornado.web.GZipContentEncoding):
@@ -2426,6 +2312,11 @@ handlers = [
     (r"/mock-responses", MockResponses),
     (r"/mock-responses/(?P<response_id>[0-9a-f]+)", MockResponseHandler),
     (r"/analytics/stats", AnalyticsStats),
+    (r"/analytics/traffic", AnalyticsTraffic),
+    (r"/jobs(?:\.json)?", Jobs),
+    (r"/jobs/(?P<job_id>[0-9a-f]+)", JobHandler),
+    (r"/jobs/(?P<job_id>[0-9a-f]+)/cancel", CancelJob),
+    (r"/jobs/(?P<job_id>[0-9a-f]+)/result", JobResult),
     (r"/flows/(?P<flow_id>[0-9a-f\-]+)/bookmark", FlowBookmark),
     (r"/flows/(?P<flow_id>[0-9a-f\-]+)/tags", FlowTags),
     (r"/export/flows", ExportFlows),
@@ -2454,6 +2345,7 @@ handlers = [
     (r"/templates", Templates),
     (r"/templates/apply", TemplateApply),
     (r"/mock-responses/generate", MockResponseGenerate),
+    (r"/metrics", PrometheusMetrics),
     (r"/performance/metrics", PerformanceMetrics),
     (r"/performance/start", PerformanceStart),
     (r"/performance/stop", PerformanceStop),
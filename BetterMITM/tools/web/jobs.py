@@ -0,0 +1,166 @@
+"""
+Background jobs for long-running web API operations.
+
+A job's work is a generator that yields `(done, total)` progress tuples and returns its
+result. Jobs run cooperatively on the event loop: the generator is advanced for at most
+`CHUNK_SECONDS` at a time before control is given back to the loop, so that proxying
+continues while a large scan or export is in progress. Work that should run in a thread or
+process pool can yield a `concurrent.futures.Future`, the generator is resumed with its
+result once it has completed.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import secrets
+import time
+from collections.abc import Generator
+from typing import Any
+from typing import Literal
+
+from BetterMITM.utils import asyncio_utils
+from BetterMITM.utils import signals
+
+CHUNK_SECONDS = 0.01
+"""Maximum time a job may block the event loop at once."""
+NOTIFY_INTERVAL = 0.25
+"""Minimum time between two progress notifications for the same job."""
+MAX_FINISHED_JOBS = 100
+
+type Work = Generator[tuple[int, int] | concurrent.futures.Future, Any, Any]
+type JobState = Literal["pending", "running", "done", "failed", "cancelled"]
+
+
+def run_sync(work: Work) -> Any:
+    """Run a job's work to completion in the calling thread and return its result."""
+    reply = None
+    while True:
+        try:
+            item = work.send(reply)
+        except StopIteration as e:
+            return e.value
+        if isinstance(item, concurrent.futures.Future):
+            reply = item.result()
+        else:
+            reply = None
+
+
+class Job:
+    def __init__(self, kind: str, headers: dict[str, str] | None = None) -> None:
+        self.id = secrets.token_hex(8)
+        self.kind = kind
+        self.headers = headers or {}
+        self.state: JobState = "pending"
+        self.done = 0
+        self.total = 0
+        self.result: Any = None
+        self.error: str | None = None
+        self.created = time.time()
+        self.finished: float | None = None
+        self.task: asyncio.Task | None = None
+        self._last_notify = 0.0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+def _sig_job(job: Job) -> None:
+    pass
+
+
+class JobManager:
+    def __init__(self) -> None:
+        self.jobs: dict[str, Job] = {}
+        self.sig_update = signals.SyncSignal(_sig_job)
+        """Fired whenever a job changes its state, and periodically while it makes progress."""
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def submit(
+        self, kind: str, work: Work, headers: dict[str, str] | None = None
+    ) -> Job:
+        """
+        Start running a job in the background.
+        `headers` are sent along with the result once it is fetched.
+        """
+        job = Job(kind, headers)
+        self.jobs[job.id] = job
+        job.task = asyncio_utils.create_task(
+            self._run(job, work),
+            name=f"web job {kind} ({job.id})",
+            keep_ref=True,
+        )
+        self._notify(job)
+        self._expire()
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        """Cancel a job, returns False if it has already finished."""
+        if job.is_finished:
+            return False
+        assert job.task
+        job.task.cancel()
+        if job.state == "pending":
+            job.state = "cancelled"
+            job.finished = time.time()
+            self._notify(job)
+        return True
+
+    async def _run(self, job: Job, work: Work) -> None:
+        job.state = "running"
+        try:
+            deadline = time.monotonic() + CHUNK_SECONDS
+            reply = None
+            while True:
+                try:
+                    item = work.send(reply)
+                except StopIteration as e:
+                    job.result = e.value
+                    break
+                reply = None
+                if isinstance(item, concurrent.futures.Future):
+                    reply = await asyncio.wrap_future(item)
+                    deadline = time.monotonic() + CHUNK_SECONDS
+                    continue
+                job.done, job.total = item
+                if time.monotonic() >= deadline:
+                    self._notify(job, throttle=True)
+                    await asyncio.sleep(0)
+                    deadline = time.monotonic() + CHUNK_SECONDS
+        except asyncio.CancelledError:
+            work.close()
+            job.state = "cancelled"
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e) or repr(e)
+        else:
+            job.state = "done"
+            job.done = job.total = max(job.done, job.total)
+        job.finished = time.time()
+        self._notify(job)
+
+    def _notify(self, job: Job, throttle: bool = False) -> None:
+        now = time.monotonic()
+        if throttle and now - job._last_notify < NOTIFY_INTERVAL:
+            return
+        job._last_notify = now
+        self.sig_update.send(job)
+
+    def _expire(self) -> None:
+        finished = collections.deque(j for j in self.jobs.values() if j.is_finished)
+        while len(finished) > MAX_FINISHED_JOBS:
+            del self.jobs[finished.popleft().id]
@@ -18,6 +18,7 @@ from BetterMITM.addons import readfile
 from BetterMITM.addons import view
 from BetterMITM.addons.proxyserver import Proxyserver
 from BetterMITM.tools.web import app
+from BetterMITM.tools.web import jobs
 from BetterMITM.tools.web import static_viewer
 from BetterMITM.tools.web import webaddons
 
@@ -39,6 +40,9 @@ class WebMaster(master.Master):
 
         self.options.changed.connect(self._sig_options_update)
 
+        self.jobs = jobs.JobManager()
+        self.jobs.sig_update.connect(self._sig_job_update)
+
         self.addons.add(*addons.default_addons())
         self.addons.add(
             webaddons.WebAddon(),
@@ -87,6 +91,12 @@ class WebMaster(master.Master):
             payload=options_dict,
         )
 
+    def _sig_job_update(self, job: jobs.Job) -> None:
+        app.ClientConnection.broadcast(
+            type="jobs/update",
+            payload=job.to_json(),
+        )
+
     def _sig_servers_changed(self) -> None:
         app.ClientConnection.broadcast(
             type="state/update",
@@ -0,0 +1,43 @@
+"""
+Entry point for proxy worker processes, see `BetterMITM.addons.workers`.
+
+Usage: python -m BetterMITM.tools.worker OPTIONS_FILE
+"""
+
+import asyncio
+import logging
+import signal
+import sys
+
+from BetterMITM import exceptions
+from BetterMITM import options
+from BetterMITM import optmanager
+from BetterMITM.tools import dump
+
+
+def run(options_path: str) -> None:
+    async def main() -> None:
+        logging.getLogger().setLevel(logging.DEBUG)
+        logging.getLogger("hpack").setLevel(logging.WARNING)
+        logging.getLogger("quic").setLevel(logging.WARNING)
+
+        opts = options.Options()
+        master = dump.DumpMaster(opts, with_dumper=False)
+        try:
+            optmanager.load_paths(opts, options_path)
+        except exceptions.OptionsError as e:
+            print(f"proxy worker: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, master.shutdown)
+        loop.add_signal_handler(signal.SIGINT, master.shutdown)
+        signal.signal(signal.SIGPIPE, signal.SIG_IGN)
+
+        await master.run()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run(sys.argv[1])
@@ -0,0 +1,332 @@
+"""
+A columnar table of flow metadata.
+
+Simple per-flow fields (type, timestamps, status code, sizes, ...) are kept in compact
+`array` columns, methods and hosts are dictionary-encoded. This allows filters on these
+fields and aggregate statistics to be computed without visiting flow objects: regular
+expressions for `~m` and `~d` are evaluated once per distinct value instead of once per
+flow. All other filter expressions are evaluated per flow, but only for the rows that
+remain after the columnar part of the filter has been applied.
+"""
+
+import collections
+import math
+from array import array
+from collections.abc import Callable
+from collections.abc import Iterable
+from typing import Any
+from typing import Generic
+from typing import TypeVar
+
+from BetterMITM import dns
+from BetterMITM import flow
+from BetterMITM import flowfilter
+from BetterMITM import http
+from BetterMITM import tcp
+from BetterMITM import udp
+
+KINDS: dict[type, int] = {
+    http.HTTPFlow: 1,
+    tcp.TCPFlow: 2,
+    udp.UDPFlow: 3,
+    dns.DNSFlow: 4,
+}
+"""Values of the `kind` column. 0 marks rows of removed flows."""
+HTTP, TCP, UDP, DNS = KINDS.values()
+
+HAS_RESPONSE = 1
+HAS_ERROR = 2
+
+COMPACT_MIN_ROWS = 1024
+"""Removed rows are only compacted away once there are at least this many of them."""
+
+T = TypeVar("T")
+
+
+class _Dictionary(Generic[T]):
+    """Maps values to small integer ids."""
+
+    def __init__(self) -> None:
+        self.values: list[T] = []
+        self.ids: dict[T, int] = {}
+
+    def encode(self, value: T) -> int:
+        try:
+            return self.ids[value]
+        except KeyError:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+            return self.ids[value]
+
+    def matching(self, pred: Callable[[T], Any]) -> set[int]:
+        return {i for i, value in enumerate(self.values) if pred(value)}
+
+
+class FlowTable:
+    def __init__(self) -> None:
+        self.clear()
+
+    @classmethod
+    def from_flows(cls, flows: Iterable[flow.Flow]) -> "FlowTable":
+        table = cls()
+        for f in flows:
+            table.update(f)
+        return table
+
+    def clear(self) -> None:
+        self.flows: list[flow.Flow | None] = []
+        self.rows: dict[str, int] = {}
+        self.kind = array("B")
+        self.flags = array("B")
+        self.timestamp = array("d")
+        self.duration = array("d")
+        self.status_code = array("H")
+        self.request_size = array("q")
+        self.response_size = array("q")
+        self.method = array("L")
+        self.host = array("L")
+        self.methods: _Dictionary[bytes] = _Dictionary()
+        self.hosts: _Dictionary[tuple[str, str]] = _Dictionary()
+        self._removed = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def update(self, f: flow.Flow) -> None:
+        """Add a flow to the table, or refresh its row if it is already present."""
+        kind = KINDS.get(type(f), 0)
+        flags = 0
+        timestamp = f.timestamp_created
+        duration = math.nan
+        status_code = request_size = response_size = method = host = 0
+        if isinstance(f, http.HTTPFlow):
+            flags |= HAS_RESPONSE if f.response else 0
+            method = self.methods.encode(f.request.data.method)
+            host = self.hosts.encode((f.request.host, f.request.pretty_host))
+            request_size = f.request.raw_size
+            if f.response:
+                status_code = f.response.status_code
+                response_size = f.response.raw_size
+                if f.response.timestamp_end:
+                    duration = f.response.timestamp_end - f.request.timestamp_start
+        elif isinstance(f, (tcp.TCPFlow, udp.UDPFlow)):
+            for m in f.messages:
+                if m.from_client:
+                    request_size += len(m.content)
+                else:
+                    response_size += len(m.content)
+        elif isinstance(f, dns.DNSFlow):
+            flags |= HAS_RESPONSE if f.response else 0
+            request_size = f.request.size
+            response_size = f.response.size if f.response else 0
+        flags |= HAS_ERROR if f.error else 0
+
+        row = self.rows.get(f.id)
+        if row is None:
+            self.rows[f.id] = len(self.flows)
+            self.flows.append(f)
+            self.kind.append(kind)
+            self.flags.append(flags)
+            self.timestamp.append(timestamp)
+            self.duration.append(duration)
+            self.status_code.append(status_code)
+            self.request_size.append(request_size)
+            self.response_size.append(response_size)
+            self.method.append(method)
+            self.host.append(host)
+        else:
+            self.flows[row] = f
+            self.kind[row] = kind
+            self.flags[row] = flags
+            self.timestamp[row] = timestamp
+            self.duration[row] = duration
+            self.status_code[row] = status_code
+            self.request_size[row] = request_size
+            self.response_size[row] = response_size
+            self.method[row] = method
+            self.host[row] = host
+
+    def remove(self, flow_id: str) -> None:
+        row = self.rows.pop(flow_id, None)
+        if row is None:
+            return
+        self.flows[row] = None
+        self.kind[row] = 0
+        self._removed += 1
+        if self._removed >= COMPACT_MIN_ROWS and self._removed * 2 > len(self.flows):
+            self._compact()
+
+    def _compact(self) -> None:
+        keep = [row for row, kind in enumerate(self.kind) if kind]
+        self.flows = [self.flows[row] for row in keep]
+        for name in (
+            "kind",
+            "flags",
+            "timestamp",
+            "duration",
+            "status_code",
+            "request_size",
+            "response_size",
+            "method",
+            "host",
+        ):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[row] for row in keep]))
+        self.rows = {f.id: row for row, f in enumerate(self.flows) if f}
+        self._removed = 0
+
+    def all_rows(self) -> list[int]:
+        return [row for row, kind in enumerate(self.kind) if kind]
+
+    def is_columnar(self, flt: flowfilter.TFilter) -> bool:
+        """Check if a filter can be evaluated without visiting individual flows."""
+        if isinstance(flt, (flowfilter.FAnd, flowfilter.FOr)):
+            return all(self.is_columnar(i) for i in flt.lst)
+        if isinstance(flt, flowfilter.FNot):
+            return self.is_columnar(flt.itm)
+        return type(flt) in _COLUMNAR
+
+    def filter(self, flt: flowfilter.TFilter) -> list[flow.Flow]:
+        """Return all flows that match the filter, in the order they were added."""
+        flows = self.flows
+        return [flows[row] for row in self.select(flt, self.all_rows())]  # type: ignore[misc]
+
+    def select(self, flt: flowfilter.TFilter, rows: list[int]) -> list[int]:
+        """Return the subset of rows that match the filter, preserving their order."""
+        if isinstance(flt, flowfilter.FAnd):
+            for i in flt.lst:
+                if not rows:
+                    break
+                rows = self.select(i, rows)
+            return rows
+        if isinstance(flt, flowfilter.FOr):
+            matched: set[int] = set()
+            remaining = rows
+            for i in flt.lst:
+                if not remaining:
+                    break
+                matched.update(self.select(i, remaining))
+                remaining = [row for row in remaining if row not in matched]
+            return [row for row in rows if row in matched]
+        if isinstance(flt, flowfilter.FNot):
+            excluded = set(self.select(flt.itm, rows))
+            return [row for row in rows if row not in excluded]
+        if (columnar := _COLUMNAR.get(type(flt))) is not None:
+            return columnar(self, flt, rows)
+        flows = self.flows
+        return [row for row in rows if flt(flows[row])]
+
+    def stats(self, flows: Iterable[flow.Flow] | None = None) -> dict[str, Any]:
+        """
+        Aggregate statistics over the given flows, or over all flows in the table.
+        """
+        if flows is None:
+            rows = self.all_rows()
+        else:
+            rows = [self.rows[f.id] for f in flows if f.id in self.rows]
+        kinds = collections.Counter(self.kind[row] for row in rows)
+        http_rows = [row for row in rows if self.kind[row] == HTTP]
+        status_codes = collections.Counter(
+            self.status_code[row] for row in http_rows if self.flags[row] & HAS_RESPONSE
+        )
+        methods = collections.Counter(self.method[row] for row in http_rows)
+        hosts = collections.Counter(self.host[row] for row in http_rows)
+        durations = sorted(
+            d for row in http_rows if not math.isnan(d := self.duration[row])
+        )
+        return {
+            "total_flows": len(rows),
+            "http_flows": kinds[HTTP],
+            "tcp_flows": kinds[TCP],
+            "udp_flows": kinds[UDP],
+            "dns_flows": kinds[DNS],
+            "error_flows": sum(1 for row in rows if self.flags[row] & HAS_ERROR),
+            "status_codes": {str(k): v for k, v in sorted(status_codes.items())},
+            "methods": {
+                self.methods.values[k].decode(errors="replace"): v
+                for k, v in methods.most_common()
+            },
+            "top_hosts": [
+                [self.hosts.values[k][1], v] for k, v in hosts.most_common(10)
+            ],
+            "request_bytes": sum(self.request_size[row] for row in rows),
+            "response_bytes": sum(self.response_size[row] for row in rows),
+            "duration_avg": sum(durations) / len(durations) if durations else None,
+            "duration_p50": _percentile(durations, 0.5),
+            "duration_p95": _percentile(durations, 0.95),
+        }
+
+
+def _percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _kind(kind: int):
+    def select(table: FlowTable, flt, rows: list[int]) -> list[int]:
+        column = table.kind
+        return [row for row in rows if column[row] == kind]
+
+    return select
+
+
+def _all(table: FlowTable, flt, rows: list[int]) -> list[int]:
+    return rows
+
+
+def _response(table: FlowTable, flt, rows: list[int]) -> list[int]:
+    kind, flags = table.kind, table.flags
+    return [
+        row for row in rows if kind[row] in (HTTP, DNS) and flags[row] & HAS_RESPONSE
+    ]
+
+
+def _request(table: FlowTable, flt, rows: list[int]) -> list[int]:
+    kind, flags = table.kind, table.flags
+    return [
+        row
+        for row in rows
+        if kind[row] in (HTTP, DNS) and not flags[row] & HAS_RESPONSE
+    ]
+
+
+def _error(table: FlowTable, flt, rows: list[int]) -> list[int]:
+    flags = table.flags
+    return [row for row in rows if flags[row] & HAS_ERROR]
+
+
+def _code(table: FlowTable, flt: flowfilter.FCode, rows: list[int]) -> list[int]:
+    kind, flags, code = table.kind, table.flags, table.status_code
+    return [
+        row
+        for row in rows
+        if kind[row] == HTTP and flags[row] & HAS_RESPONSE and code[row] == flt.num
+    ]
+
+
+def _method(table: FlowTable, flt: flowfilter.FMethod, rows: list[int]) -> list[int]:
+    ids = table.methods.matching(flt.re.search)
+    kind, method = table.kind, table.method
+    return [row for row in rows if kind[row] == HTTP and method[row] in ids]
+
+
+def _domain(table: FlowTable, flt: flowfilter.FDomain, rows: list[int]) -> list[int]:
+    ids = table.hosts.matching(lambda h: flt.re.search(h[0]) or flt.re.search(h[1]))
+    kind, host = table.kind, table.host
+    return [row for row in rows if kind[row] == HTTP and host[row] in ids]
+
+
+_COLUMNAR: dict[type, Callable[[FlowTable, Any, list[int]], list[int]]] = {
+    flowfilter.FAll: _all,
+    flowfilter.FHTTP: _kind(HTTP),
+    flowfilter.FTCP: _kind(TCP),
+    flowfilter.FUDP: _kind(UDP),
+    flowfilter.FDNS: _kind(DNS),
+    flowfilter.FResp: _response,
+    flowfilter.FReq: _request,
+    flowfilter.FErr: _error,
+    flowfilter.FCode: _code,
+    flowfilter.FMethod: _method,
+    flowfilter.FDomain: _domain,
+}
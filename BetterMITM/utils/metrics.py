@@ -0,0 +1,289 @@
+"""
+Instrumentation of the proxy core.
+
+Instrumentation points check `registry.enabled` before recording anything, so that metrics
+cost a single attribute lookup while they are disabled. The registry can be rendered in the
+Prometheus text exposition format or as a JSON-compatible dict.
+"""
+
+import collections
+import math
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+from typing import Any
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+"""Histogram bucket upper bounds in seconds, the last bucket is always +Inf."""
+
+SLOW_HOOK_SECONDS = 0.1
+"""Addon hook invocations taking longer than this are recorded as slow operations."""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    type: str = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def clear(self) -> None:
+        raise NotImplementedError  # pragma: no cover
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        """(name suffix, label string, value) triples for all label combinations."""
+        raise NotImplementedError  # pragma: no cover
+
+    def get_state(self) -> Any:
+        raise NotImplementedError  # pragma: no cover
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.help)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.values: collections.defaultdict[tuple[str, ...], float] = (
+            collections.defaultdict(float)
+        )
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        self.values[labels] += amount
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        return [
+            ("", _labels(self.labelnames, k), v) for k, v in sorted(self.values.items())
+        ]
+
+    def get_state(self) -> Any:
+        if not self.labelnames:
+            return self.values.get((), 0)
+        return [
+            {**dict(zip(self.labelnames, k)), "value": v}
+            for k, v in sorted(self.values.items())
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = (*buckets, math.inf)
+        self.values: dict[tuple[str, ...], _HistogramValue] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        try:
+            v = self.values[labels]
+        except KeyError:
+            v = self.values[labels] = _HistogramValue(len(self.buckets))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                v.counts[i] += 1
+                break
+        v.sum += value
+        v.count += 1
+        if value > v.max:
+            v.max = value
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        ret = []
+        for k, v in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, v.counts):
+                cumulative += count
+                ret.append(
+                    (
+                        "_bucket",
+                        _labels(self.labelnames, k, le=_format_value(bound)),
+                        cumulative,
+                    )
+                )
+            labels = _labels(self.labelnames, k)
+            ret.append(("_sum", labels, v.sum))
+            ret.append(("_count", labels, v.count))
+        return ret
+
+    def get_state(self) -> Any:
+        return [
+            {
+                **dict(zip(self.labelnames, k)),
+                "count": v.count,
+                "sum": v.sum,
+                "avg": v.sum / v.count if v.count else 0,
+                "max": v.max,
+            }
+            for k, v in sorted(self.values.items())
+        ]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.metrics: dict[str, _Metric] = {}
+        self.collectors: list[Callable[[], None]] = []
+        """Callbacks that refresh gauges right before the registry is rendered."""
+        self.slow_operations: collections.deque[dict[str, Any]] = collections.deque(
+            maxlen=100
+        )
+
+    def _add(self, metric: _Metric) -> Any:
+        existing = self.metrics.setdefault(metric.name, metric)
+        if type(existing) is not type(metric):
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        return existing
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def clear(self) -> None:
+        for m in self.metrics.values():
+            m.clear()
+        self.slow_operations.clear()
+
+    def collect(self) -> None:
+        for collector in self.collectors:
+            collector()
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        self.collect()
+        return "\n".join(m.render() for m in self.metrics.values()) + "\n"
+
+    def get_state(self) -> dict[str, Any]:
+        self.collect()
+        return {
+            "enabled": self.enabled,
+            "metrics": {name: m.get_state() for name, m in self.metrics.items()},
+            "slow_operations": list(self.slow_operations),
+        }
+
+
+registry = Registry()
+
+hook_duration = registry.histogram(
+    "bettermitm_hook_duration_seconds",
+    "Time spent running addon hooks.",
+    ("addon", "hook"),
+)
+layer_events = registry.counter(
+    "bettermitm_layer_events_total",
+    "Number of events handled by each protocol layer.",
+    ("layer", "event"),
+)
+tls_handshake_duration = registry.histogram(
+    "bettermitm_tls_handshake_duration_seconds",
+    "Duration of successful TLS handshakes.",
+    ("side",),
+)
+tls_handshake_failures = registry.counter(
+    "bettermitm_tls_handshake_failures_total",
+    "Number of failed TLS handshakes.",
+    ("side",),
+)
+cert_generation_duration = registry.histogram(
+    "bettermitm_cert_generation_duration_seconds",
+    "Time spent generating interception certificates.",
+)
+bytes_received = registry.counter(
+    "bettermitm_bytes_received_total",
+    "Number of bytes received from clients and servers.",
+    ("peer",),
+)
+
+
+def record_hook(addon: str, hook: str, duration: float) -> None:
+    hook_duration.observe(duration, addon, hook)
+    if duration >= SLOW_HOOK_SECONDS:
+        registry.slow_operations.append(
+            {
+                "name": f"{addon}.{hook}",
+                "duration": duration,
+                "timestamp": time.time(),
+            }
+        )
@@ -0,0 +1,53 @@
+"""
+Search for many literal patterns at once.
+"""
+
+import functools
+from collections.abc import Iterable
+
+
+class PatternSet:
+    """
+    A set of literal patterns that can be searched for in texts.
+
+    Every distinct pattern is searched for at most once per text. Patterns are searched in
+    order of increasing length, and a pattern is skipped if a shorter pattern it contains has
+    already been ruled out. For typical payload lists (`../`, `../../`, ...) most patterns are
+    never searched for in texts that do not contain them.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: tuple[str, ...] = tuple(
+            sorted({p for p in patterns if p}, key=lambda p: (len(p), p))
+        )
+        self._requires: dict[str, tuple[str, ...]] = {
+            p: tuple(q for q in self.patterns[:i] if q in p)
+            for i, p in enumerate(self.patterns)
+        }
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def search(self, text: str) -> set[str]:
+        """Return all patterns that occur in the text."""
+        found: set[str] = set()
+        if not text:
+            return found
+        for p in self.patterns:
+            if all(q in found for q in self._requires[p]) and p in text:
+                found.add(p)
+        return found
+
+
+@functools.lru_cache(maxsize=16)
+def _compiled(patterns: tuple[str, ...]) -> PatternSet:
+    return PatternSet(patterns)
+
+
+def search_all(patterns: tuple[str, ...], texts: list[str]) -> list[set[str]]:
+    """
+    Search for the given patterns in multiple texts.
+    This is a plain function so that it can be run in a process pool.
+    """
+    ps = _compiled(patterns)
+    return [ps.search(text) for text in texts]
@@ -0,0 +1,122 @@
+"""
+Small mergeable summaries of value streams, used for incremental traffic analytics.
+"""
+
+import collections
+import math
+from array import array
+from collections.abc import Sequence
+
+
+class DDSketch:
+    """
+    A quantile sketch with relative error guarantees (DDSketch, Masson et al. 2019).
+
+    Values are counted in logarithmically sized bins, so that every quantile is estimated
+    within `relative_accuracy` of the true value, while the number of bins only grows with
+    the logarithm of the value range. Sketches with the same accuracy can be merged.
+    """
+
+    MIN_VALUE = 1e-9
+    """Values below this are counted as zero."""
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: collections.Counter[int] = collections.Counter()
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float) -> None:
+        if value < self.MIN_VALUE:
+            self.zero_count += 1
+        else:
+            self.bins[math.ceil(math.log(value) / self._log_gamma)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy.")
+        self.bins.update(other.bins)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate the `q`-quantile (0 <= q <= 1), or return None if the sketch is empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return 2 * self.gamma**key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)  # pragma: no cover
+
+
+class TopK:
+    """
+    Approximate top-k counts of a stream of keys.
+
+    Counts are kept in a count-min sketch, which never underestimates. The current
+    candidates for the top `k` (and some reserve) are tracked along with their estimates.
+    Sketches with the same dimensions can be merged.
+    """
+
+    def __init__(self, k: int = 10, width: int = 256, depth: int = 4) -> None:
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self.rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+        self.candidates: dict[str, int] = {}
+
+    def _indices(self, key: str) -> list[int]:
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def estimate(self, key: str) -> int:
+        return min(row[i] for row, i in zip(self.rows, self._indices(key)))
+
+    def add(self, key: str, count: int = 1) -> None:
+        for row, i in zip(self.rows, self._indices(key)):
+            row[i] += count
+        self.candidates[key] = self.estimate(key)
+        self._trim()
+
+    @classmethod
+    def combine(cls, sketches: Sequence["TopK"]) -> "TopK":
+        """Merge any number of sketches with the same dimensions into a new one."""
+        if not sketches:
+            return cls()
+        first = sketches[0]
+        if any(
+            (s.k, s.width, s.depth) != (first.k, first.width, first.depth)
+            for s in sketches
+        ):
+            raise ValueError("Cannot merge sketches with different dimensions.")
+        ret = cls(first.k, first.width, first.depth)
+        ret.rows = [
+            array("I", map(sum, zip(*(s.rows[d] for s in sketches))))
+            for d in range(first.depth)
+        ]
+        for key in set().union(*(s.candidates for s in sketches)):
+            ret.candidates[key] = ret.estimate(key)
+        ret._trim()
+        return ret
+
+    def _trim(self) -> None:
+        if len(self.candidates) > 2 * self.k:
+            keep = sorted(self.candidates.items(), key=lambda x: x[1], reverse=True)
+            self.candidates = dict(keep[: self.k])
+
+    def top(self) -> list[tuple[str, int]]:
+        return sorted(self.candidates.items(), key=lambda x: x[1], reverse=True)[
+            : self.k
+        ]
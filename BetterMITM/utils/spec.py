@@ -1,4 +1,12 @@
+import collections
+import re
+from collections.abc import Sequence
+
 from BetterMITM import flowfilter
+from BetterMITM import http
+
+DISPATCH_CACHE_ENTRIES = 4096
+"""Maximum number of hosts for which `SpecDispatch` caches the candidate specs."""
 
 
 def parse_spec(option: str) -> tuple[flowfilter.TFilter, str, str]:
@@ -19,3 +27,92 @@ def parse_spec(option: str) -> tuple[flowfilter.TFilter, str, str]:
         return flow_filter, subject, replacement
     else:
         raise ValueError("Invalid number of parameters (2 or 3 are expected)")
+
+
+def domain_filters(flt: flowfilter.TFilter) -> list[flowfilter.FDomain]:
+    """Return the `~d` filters that a flow must match for the given filter to match."""
+    if isinstance(flt, flowfilter.FDomain):
+        return [flt]
+    if isinstance(flt, flowfilter.FAnd):
+        return [d for f in flt.lst for d in domain_filters(f)]
+    return []
+
+
+def required_literal(pattern: re.Pattern[str], min_length: int = 3) -> str | None:
+    """
+    Find the longest literal string that every match of a regular expression contains.
+    Returns `None` if there is no such literal of at least `min_length` characters.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    try:
+        best = _longest_literal(pattern)
+    except Exception:
+        # The regular expression parser is private to the re module and may change
+        # between Python versions. Patterns are then just not prefiltered.
+        return None
+    return best if len(best) >= min_length else None
+
+
+def _longest_literal(pattern: re.Pattern[str]) -> str:
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+
+    tree = sre_parse.parse(pattern.pattern, pattern.flags)
+    best = ""
+    current: list[str] = []
+
+    def flush() -> None:
+        nonlocal best
+        if len(current) > len(best):
+            best = "".join(current)
+        current.clear()
+
+    def walk(items) -> None:
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                current.append(chr(av))
+            elif op is sre_constants.AT:
+                pass
+            elif op is sre_constants.SUBPATTERN and not av[1] & re.IGNORECASE:
+                walk(av[-1])
+            else:
+                flush()
+
+    walk(tree)
+    flush()
+    return best
+
+
+class SpecDispatch:
+    """
+    Select the specs that may apply to a flow, so that only those need to be evaluated.
+
+    Specs whose flow filter requires a domain (`~d`) are only candidates for hosts that match it,
+    all other specs are candidates for every host. Candidates are computed once per host and cached.
+    """
+
+    def __init__(self, filters: Sequence[flowfilter.TFilter]) -> None:
+        self.domains = [domain_filters(f) for f in filters]
+        self.generic = all(not d for d in self.domains)
+        self._cache: collections.OrderedDict[tuple[str, str], list[int]] = (
+            collections.OrderedDict()
+        )
+
+    def candidates(self, flow: http.HTTPFlow) -> list[int]:
+        """The indices of all specs that may match the flow, in order."""
+        if self.generic:
+            return list(range(len(self.domains)))
+        key = (flow.request.host, flow.request.pretty_host)
+        if (ret := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            return ret
+        ret = [
+            i
+            for i, domains in enumerate(self.domains)
+            if all(d.re.search(key[0]) or d.re.search(key[1]) for d in domains)
+        ]
+        self._cache[key] = ret
+        if len(self._cache) > DISPATCH_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+        return ret
@@ -1,12 +1,15 @@
 """
-Make events hooks non-blocking using async or @concurrent.
+Make events hooks non-blocking using async or @hooks.offload.
+
+@hooks.offload runs blocking handlers in a thread pool (see the hook_threads option).
+The older @concurrent decorator from mitmproxy.script does the same.
 """
 
 import asyncio
 import logging
 import time
 
-from mitmproxy.script import concurrent
+from mitmproxy import hooks
 
 
 if True:
@@ -20,7 +23,7 @@ if True:
 else:
 
 
-    @concurrent
+    @hooks.offload
     def request(flow):
         logging.info(f"handle request: {flow.request.host}{flow.request.path}")
         time.sleep(5)
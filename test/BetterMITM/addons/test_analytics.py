@@ -0,0 +1,59 @@
+import pytest
+
+from mitmproxy import exceptions
+from mitmproxy.addons import analytics
+from mitmproxy.test import taddons
+from mitmproxy.test import tflow
+
+
+def test_configure():
+    a = analytics.Analytics()
+    with taddons.context(a) as tctx:
+        with pytest.raises(exceptions.OptionsError):
+            tctx.configure(a, analytics_retention=1)
+
+
+def test_stats(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(analytics.time, "time", lambda: now)
+    a = analytics.Analytics()
+    with taddons.context(a) as tctx:
+        tctx.configure(a, analytics_retention=60)
+        for status in (200, 200, 404):
+            f = tflow.tflow(resp=True)
+            f.response.status_code = status
+            a.response(f)
+        f = tflow.tflow(resp=True, err=True)
+        a.error(f)
+        a.error(tflow.tflow(err=True))
+        a.tcp_end(tflow.ttcpflow())
+        a.tcp_error(tflow.ttcpflow(err=True))
+        a.udp_end(tflow.tudpflow())
+        a.udp_error(tflow.tudpflow(err=True))
+        a.dns_response(tflow.tdnsflow(resp=True))
+        a.dns_error(tflow.tdnsflow(err=True))
+
+        s = a.stats()
+        assert s["flows"] == 10
+        assert s["flows_by_type"] == {"http": 4, "tcp": 2, "udp": 2, "dns": 2}
+        assert s["errors"] == 4
+        assert s["error_rate"] == 0.4
+        assert s["status_codes"] == {"200": 2, "404": 1}
+        assert s["latency"]["count"] == 3
+        assert s["latency"]["p50"] == pytest.approx(3.0, rel=0.02)
+        assert s["top_hosts"] == [("address", 4)]
+        assert s["top_paths"] == [("/path", 4)]
+        assert s["bytes_in"] > 0 and s["bytes_out"] > 0
+        assert "10 flows in 60s, 40.0% errors" in a.stats_cmd()
+
+        now += 30
+        a.response(tflow.tflow(resp=True))
+        assert a.stats(10)["flows"] == 1
+        assert a.stats(0)["flows"] == 11
+
+        now += 45
+        assert a.stats()["flows"] == 1
+        now += 30
+        assert a.stats()["flows"] == 0
+        assert not a.buckets
+        assert "latency" not in a.stats_cmd()
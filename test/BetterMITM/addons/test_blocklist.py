@@ -1,6 +1,13 @@
+import asyncio
+import os
+from unittest import mock
+
 import pytest
 
+from mitmproxy import dns
+from mitmproxy import tls
 from mitmproxy.addons import blocklist
+from mitmproxy.proxy import server_hooks
 from mitmproxy.exceptions import OptionsError
 from mitmproxy.test import taddons
 from mitmproxy.test import tflow
@@ -92,3 +99,113 @@ class TestBlockList:
         with taddons.context(bl) as tctx:
             with pytest.raises(OptionsError):
                 tctx.configure(bl, block_list=["lalelu"])
+
+
+def test_parse_domains():
+    assert blocklist.parse_domains(
+        [
+            "# comment",
+            "",
+            "127.0.0.1 localhost",
+            "0.0.0.0 ads.example.com tracker.example.org # inline",
+            "Example.NET.",
+            "::1 ip6-localhost",
+        ]
+    ) == {"ads.example.com", "tracker.example.org", "example.net"}
+
+
+@pytest.mark.parametrize(
+    "host,blocked",
+    [
+        ("example.com", True),
+        ("cdn.example.com", True),
+        ("EXAMPLE.com.", True),
+        ("notexample.com", False),
+        ("com", False),
+        ("example.org", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_domain_matches(host, blocked):
+    assert blocklist.domain_matches(frozenset({"example.com"}), host) == blocked
+
+
+class TestBlockDomains:
+    def test_request(self, tmp_path):
+        p = tmp_path / "hosts"
+        p.write_text("0.0.0.0 example.com\n")
+        bl = blocklist.BlockList()
+        with taddons.context(bl) as tctx:
+            tctx.configure(bl, block_domains=[str(p)])
+            f = tflow.tflow()
+            f.request.url = "https://www.example.com/"
+            bl.request(f)
+            assert f.response.status_code == 403
+            assert f.metadata["blocklisted"]
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/"
+            bl.request(f)
+            assert not f.response
+
+            tctx.configure(bl, block_domains_status=444)
+            f = tflow.tflow()
+            f.request.host = "example.com"
+            bl.http_connect(f)
+            assert f.error.msg == f.error.KILLED_MESSAGE
+
+            with pytest.raises(OptionsError, match="Cannot read"):
+                tctx.configure(bl, block_domains=[str(tmp_path / "missing")])
+
+    def test_connections(self, tmp_path):
+        p = tmp_path / "domains"
+        p.write_text("example.com\n")
+        bl = blocklist.BlockList()
+        with taddons.context(bl) as tctx:
+            tctx.configure(bl, block_domains=[str(p)])
+
+            server = tflow.tserver_conn()
+            server.address = ("www.example.com", 443)
+            data = server_hooks.ServerConnectionHookData(server, tflow.tclient_conn())
+            bl.server_connect(data)
+            assert server.error
+
+            server = tflow.tserver_conn()
+            server.address = ("example.org", 443)
+            data = server_hooks.ServerConnectionHookData(server, tflow.tclient_conn())
+            bl.server_connect(data)
+            assert not server.error
+
+            ch = tls.ClientHelloData(mock.Mock(), mock.Mock(sni="example.com"))
+            bl.tls_clienthello(ch)
+            assert ch.establish_server_tls_first
+
+            f = tflow.tdnsflow()
+            f.request.questions[0].name = "ads.example.com"
+            bl.dns_request(f)
+            assert f.response.response_code == dns.response_codes.NXDOMAIN
+
+            f = tflow.tdnsflow()
+            bl.dns_request(f)
+            assert not f.response
+
+    async def test_reload(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(blocklist, "BLOCK_DOMAINS_POLL_INTERVAL", 0.01)
+        p = tmp_path / "domains"
+        p.write_text("example.com\n")
+        bl = blocklist.BlockList()
+        with taddons.context(bl) as tctx:
+            tctx.configure(bl, block_domains=[str(p)])
+            await bl._reload_task
+            assert bl.domains == {"example.com"}
+
+            bl.running()
+            p.write_text("example.org\n")
+            os.utime(p, (0, 0))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if bl.domains == {"example.org"}:
+                    break
+            assert bl.domains == {"example.org"}
+            bl.done()
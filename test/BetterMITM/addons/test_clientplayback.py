@@ -1,16 +1,20 @@
 import asyncio
 import ssl
+import time
 from contextlib import asynccontextmanager
 
 import pytest
 
+from mitmproxy.addons import clientplayback
 from mitmproxy.addons.clientplayback import ClientPlayback
+from mitmproxy.addons.clientplayback import KeepAliveReplayHandler
 from mitmproxy.addons.clientplayback import ReplayHandler
 from mitmproxy.addons.proxyserver import Proxyserver
 from mitmproxy.addons.tlsconfig import TlsConfig
 from mitmproxy.connection import Address
 from mitmproxy.exceptions import CommandError
 from mitmproxy.exceptions import OptionsError
+from mitmproxy.flow import Error
 from mitmproxy.test import taddons
 from mitmproxy.test import tflow
 
@@ -153,6 +157,226 @@ async def test_playback_https_upstream():
         await cp.done()
 
 
+async def test_send_keepalive():
+    connections = 0
+
+    async def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        nonlocal connections
+        connections += 1
+        for path in (b"/one", b"/two"):
+            req = await reader.readuntil(b"\r\n\r\n")
+            assert req.startswith(b"GET " + path + b" HTTP/1.1\r\n")
+            writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 2\r\n\r\nok")
+            await writer.drain()
+        assert not await reader.read()
+
+    cp = ClientPlayback()
+    ps = Proxyserver()
+    with taddons.context(cp, ps):
+        async with tcp_server(handler) as addr:
+            for path in ("one", "two"):
+                f = tflow.tflow(live=False)
+                f.request.host, f.request.port = addr
+                f.request.path = f"/{path}"
+                f.request.content = b""
+                await cp.send(f, 5)
+                assert f.response.content == b"ok"
+                assert f.is_replay == "request"
+            assert len(cp.keepalive) == 1
+            await cp.close_idle(0)
+            assert not cp.keepalive
+        assert connections == 1
+
+
+async def test_send_keepalive_timeout(monkeypatch):
+    monkeypatch.setattr(clientplayback, "KEEPALIVE_TIMEOUT", 0.1)
+
+    async def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 2\r\n\r\nok")
+        await writer.drain()
+        assert not await reader.read()
+
+    cp = ClientPlayback()
+    ps = Proxyserver()
+    with taddons.context(cp, ps):
+        async with tcp_server(handler) as addr:
+            f = tflow.tflow(live=False)
+            f.request.host, f.request.port = addr
+            f.request.content = b""
+            await cp.send(f, 5)
+            assert f.response.content == b"ok"
+            assert cp.keepalive
+            # Idle connections are closed without any further calls to send.
+            await asyncio.wait_for(cp._idle_task, 5)
+            assert not cp.keepalive
+            assert cp._idle_task is None
+        await cp.done()
+
+
+async def test_send_error():
+    async def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        req = await reader.readuntil(b"\r\n\r\n")
+        if b"/hang" in req:
+            await reader.read()
+
+    cp = ClientPlayback()
+    ps = Proxyserver()
+    with taddons.context(cp, ps):
+        async with tcp_server(handler) as addr:
+            f = tflow.tflow(live=False)
+            f.request.host, f.request.port = addr
+            await cp.send(f, 5)
+            assert f.error.msg == "server closed connection"
+            assert not cp.keepalive
+
+            f = tflow.tflow(live=False)
+            f.request.host, f.request.port = addr
+            f.request.path = "/hang"
+            await cp.send(f, 0.1)
+            assert f.error.msg == "Request timed out."
+            assert not cp.keepalive
+
+
+async def test_send_crash(monkeypatch, caplog_async):
+    async def raise_err(*_, **__):
+        raise ValueError("oops")
+
+    monkeypatch.setattr(KeepAliveReplayHandler, "send", raise_err)
+    cp = ClientPlayback()
+    with taddons.context(cp):
+        f = tflow.tflow(live=False)
+        await cp.send(f)
+        await caplog_async.await_log("Sending request has crashed!")
+        assert f.error.msg == "Sending request has crashed."
+        assert not cp.keepalive
+
+
+@pytest.fixture
+def fake_replay(monkeypatch):
+    """Replace network replays with a short sleep, recording start times and concurrency."""
+    stats = {"running": 0, "max_running": 0, "started": []}
+
+    async def replay(self):
+        stats["running"] += 1
+        stats["max_running"] = max(stats["max_running"], stats["running"])
+        stats["started"].append(time.monotonic())
+        await asyncio.sleep(0.01)
+        stats["running"] -= 1
+        if self.flow.request.path == "/err":
+            self.flow.error = Error("oops")
+        else:
+            self.flow.response = tflow.tresp()
+
+    monkeypatch.setattr(ReplayHandler, "replay", replay)
+    return stats
+
+
+async def test_playback_concurrency(fake_replay, caplog_async):
+    caplog_async.set_level("INFO")
+    cp = ClientPlayback()
+    with taddons.context(cp) as tctx:
+        tctx.configure(cp, client_replay_concurrency=3)
+        cp.running()
+        flows = [tflow.tflow(live=False) for _ in range(10)]
+        flows[0].request.path = "/err"
+        cp.start_replay(flows)
+        assert cp.count() == 10
+        await asyncio.wait_for(cp.queue.join(), 5)
+        assert cp.count() == 0
+        assert fake_replay["max_running"] == 3
+        await caplog_async.await_log("Client replay: 10 requests")
+        report = cp.get_report()
+        assert "9 responses, 1 errors" in report
+        assert "Status codes: 200: 9" in report
+        assert "Error: oops (1x)" in report
+        await cp.done()
+
+
+async def test_playback_rate(fake_replay):
+    cp = ClientPlayback()
+    with taddons.context(cp) as tctx:
+        tctx.configure(cp, client_replay_concurrency=-1, client_replay_rate=50)
+        cp.running()
+        cp.start_replay([tflow.tflow(live=False) for _ in range(4)])
+        await asyncio.wait_for(cp.queue.join(), 5)
+        started = fake_replay["started"]
+        assert started[-1] - started[0] >= 0.05
+        await cp.done()
+
+
+async def test_playback_timing(fake_replay):
+    cp = ClientPlayback()
+    with taddons.context(cp) as tctx:
+        tctx.configure(cp, client_replay_concurrency=-1, client_replay_speed=2)
+        cp.running()
+        flows = [tflow.tflow(live=False) for _ in range(3)]
+        for i, f in enumerate(flows):
+            f.request.timestamp_start = 1000 + i * 0.1
+        cp.start_replay(flows)
+        await asyncio.wait_for(cp.queue.join(), 5)
+        started = fake_replay["started"]
+        assert 0.09 <= started[-1] - started[0] < 0.2
+        await cp.done()
+
+
+async def test_playback_timing_replayed(fake_replay):
+    cp = ClientPlayback()
+    with taddons.context(cp) as tctx:
+        tctx.configure(cp, client_replay_concurrency=-1, client_replay_speed=2)
+        cp.running()
+        flows = [tflow.tflow(live=False) for _ in range(2)]
+        for i, f in enumerate(flows):
+            f.request.timestamp_start = 1000 + i * 0.1
+        cp.start_replay(flows)
+        await asyncio.wait_for(cp.queue.join(), 5)
+        # Replaying overwrites the timestamps, the recorded ones are used for the next run.
+        for f in reversed(flows):
+            f.request.timestamp_start = time.time()
+        fake_replay["started"].clear()
+        cp.start_replay(flows)
+        await asyncio.wait_for(cp.queue.join(), 5)
+        started = fake_replay["started"]
+        assert 0.04 <= started[-1] - started[0] < 0.2
+        await cp.done()
+
+
+async def test_stop_waiting(fake_replay):
+    cp = ClientPlayback()
+    with taddons.context(cp) as tctx:
+        tctx.configure(cp, client_replay_rate=1)
+        cp.running()
+        flows = [tflow.tflow(live=False) for _ in range(2)]
+        cp.start_replay(flows)
+        await asyncio.sleep(0.05)
+        assert cp.waiting is flows[1]
+        cp.stop_replay()
+        assert cp.count() == 0
+        assert not flows[1].is_replay
+        await asyncio.wait_for(cp.queue.join(), 1)
+        await asyncio.sleep(0.05)
+        assert len(fake_replay["started"]) == 1
+        await cp.done()
+
+
+async def test_playback_keepalive(monkeypatch):
+    sent = []
+
+    async def send(self, f, timeout=None):
+        sent.append(f)
+
+    monkeypatch.setattr(ClientPlayback, "send", send)
+    cp = ClientPlayback()
+    with taddons.context(cp) as tctx:
+        tctx.configure(cp, client_replay_keepalive=True)
+        cp.running()
+        f = tflow.tflow(live=False)
+        cp.start_replay([f])
+        await asyncio.wait_for(cp.queue.join(), 5)
+        assert sent == [f]
+        await cp.done()
+
+
 async def test_playback_crash(monkeypatch, caplog_async):
     async def raise_err(*_, **__):
         raise ValueError("oops")
@@ -230,5 +454,11 @@ def test_configure(tdata):
         with pytest.raises(OptionsError):
             tctx.configure(cp, client_replay=["nonexistent"])
         tctx.configure(cp, client_replay_concurrency=-1)
+        tctx.configure(cp, client_replay_concurrency=8)
         with pytest.raises(OptionsError):
             tctx.configure(cp, client_replay_concurrency=-2)
+        with pytest.raises(OptionsError):
+            tctx.configure(cp, client_replay_concurrency=0)
+        with pytest.raises(OptionsError):
+            tctx.configure(cp, client_replay_rate=-1)
+        assert cp.get_report() == "No client replay has been run."
@@ -1,8 +1,11 @@
+import os
 import sys
 from pathlib import Path
+from unittest import mock
 
 import pytest
 
+from mitmproxy.addons import maplocal
 from mitmproxy.addons.maplocal import file_candidates
 from mitmproxy.addons.maplocal import MapLocal
 from mitmproxy.addons.maplocal import MapLocalSpec
@@ -141,7 +144,7 @@ class TestMapLocal:
             with pytest.raises(Exception, match="Invalid file path"):
                 tctx.configure(ml, map_local=["/foo/.+/three"])
 
-    def test_simple(self, tmpdir):
+    async def test_simple(self, tmpdir):
         ml = MapLocal()
 
         with taddons.context(ml) as tctx:
@@ -150,7 +153,7 @@ class TestMapLocal:
             tctx.configure(ml, map_local=["|//example.org/images|" + str(tmpdir)])
             f = tflow.tflow()
             f.request.url = b"https://example.org/images/foo.jpg"
-            ml.request(f)
+            await ml.request(f)
             assert f.response.content == b"foo"
 
             tmpfile = tmpdir.join("images", "bar.jpg")
@@ -158,7 +161,7 @@ class TestMapLocal:
             tctx.configure(ml, map_local=["|//example.org|" + str(tmpdir)])
             f = tflow.tflow()
             f.request.url = b"https://example.org/images/bar.jpg"
-            ml.request(f)
+            await ml.request(f)
             assert f.response.content == b"bar"
 
             tmpfile = tmpdir.join("foofoobar.jpg")
@@ -168,7 +171,7 @@ class TestMapLocal:
             )
             f = tflow.tflow()
             f.request.url = b"https://example.org/foo/foo/bar.jpg"
-            ml.request(f)
+            await ml.request(f)
             assert f.response.content == b"foofoobar"
 
     async def test_nonexistent_files(self, tmpdir, monkeypatch, caplog):
@@ -179,7 +182,7 @@ class TestMapLocal:
             tctx.configure(ml, map_local=["|example.org/css|" + str(tmpdir)])
             f = tflow.tflow()
             f.request.url = b"https://example.org/css/nonexistent"
-            ml.request(f)
+            await ml.request(f)
             assert f.response.status_code == 404
             assert "None of the local file candidates exist" in caplog.text
 
@@ -190,10 +193,10 @@ class TestMapLocal:
             monkeypatch.setattr(Path, "is_file", lambda x: True)
             f = tflow.tflow()
             f.request.url = b"https://example.org/images/foo.jpg"
-            ml.request(f)
+            await ml.request(f)
             assert "Could not read" in caplog.text
 
-    def test_is_killed(self, tmpdir):
+    async def test_is_killed(self, tmpdir):
         ml = MapLocal()
         with taddons.context(ml) as tctx:
             tmpfile = tmpdir.join("foo.jpg")
@@ -202,5 +205,130 @@ class TestMapLocal:
             f = tflow.tflow()
             f.request.url = b"https://example.org/images/foo.jpg"
             f.kill()
-            ml.request(f)
+            await ml.request(f)
             assert not f.response
+
+    async def test_cache(self, tmp_path, monkeypatch):
+        ml = MapLocal()
+        with taddons.context(ml) as tctx:
+            p = tmp_path / "foo.js"
+            p.write_bytes(b"foo")
+            tctx.configure(ml, map_local=["|//example.org|" + str(tmp_path)])
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.js"
+            await ml.request(f)
+            assert f.response.content == b"foo"
+            assert f.response.headers["Content-Type"] == "text/javascript"
+
+            with mock.patch("mitmproxy.addons.maplocal.resolve_local_file") as m:
+                f = tflow.tflow()
+                f.request.url = "https://example.org/foo.js"
+                await ml.request(f)
+                assert f.response.content == b"foo"
+                assert not m.called
+
+            monkeypatch.setattr(maplocal, "RESOLVE_CACHE_TTL", 0)
+            p.write_bytes(b"foobar")
+            os.utime(p, ns=(0, 0))
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.js"
+            await ml.request(f)
+            assert f.response.content == b"foobar"
+
+    async def test_conditional(self, tmp_path):
+        ml = MapLocal()
+        with taddons.context(ml) as tctx:
+            p = tmp_path / "foo.txt"
+            p.write_bytes(b"foo")
+            tctx.configure(ml, map_local=["|//example.org|" + str(tmp_path)])
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            await ml.request(f)
+            etag = f.response.headers["ETag"]
+            last_modified = f.response.headers["Last-Modified"]
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["If-None-Match"] = f'"other", {etag}'
+            await ml.request(f)
+            assert f.response.status_code == 304
+            assert "Content-Length" not in f.response.headers
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["If-Modified-Since"] = last_modified
+            await ml.request(f)
+            assert f.response.status_code == 304
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["If-Modified-Since"] = "Thu, 01 Jan 1970 00:00:00 GMT"
+            await ml.request(f)
+            assert f.response.status_code == 200
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["If-Modified-Since"] = "invalid"
+            await ml.request(f)
+            assert f.response.status_code == 200
+
+    async def test_range(self, tmp_path):
+        ml = MapLocal()
+        with taddons.context(ml) as tctx:
+            p = tmp_path / "foo.txt"
+            p.write_bytes(b"0123456789")
+            tctx.configure(ml, map_local=["|//example.org|" + str(tmp_path)])
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["Range"] = "bytes=2-4"
+            await ml.request(f)
+            assert f.response.status_code == 206
+            assert f.response.content == b"234"
+            assert f.response.headers["Content-Range"] == "bytes 2-4/10"
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["Range"] = "bytes=20-"
+            await ml.request(f)
+            assert f.response.status_code == 416
+            assert f.response.headers["Content-Range"] == "bytes */10"
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["Range"] = "bytes=5-2"
+            await ml.request(f)
+            assert f.response.status_code == 200
+            assert f.response.content == b"0123456789"
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.txt"
+            f.request.headers["Range"] = "bytes=2-4"
+            f.request.headers["If-Range"] = '"outdated"'
+            await ml.request(f)
+            assert f.response.status_code == 200
+            assert f.response.content == b"0123456789"
+
+    async def test_large_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(maplocal, "SMALL_FILE_SIZE", 4)
+        ml = MapLocal()
+        with taddons.context(ml) as tctx:
+            p = tmp_path / "foo.bin"
+            p.write_bytes(b"0123456789")
+            tctx.configure(ml, map_local=["|//example.org|" + str(tmp_path)])
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.bin"
+            await ml.request(f)
+            assert f.response.body_file is not None
+            assert f.response.headers["Content-Length"] == "10"
+            assert f.response.raw_content == b"0123456789"
+            assert not ml._contents
+
+            f = tflow.tflow()
+            f.request.url = "https://example.org/foo.bin"
+            f.request.headers["Range"] = "bytes=7-"
+            await ml.request(f)
+            assert f.response.raw_content == b"789"
@@ -37,6 +37,33 @@ class TestMapRemote:
             mr.request(f)
             assert f.request.headers.get("Host", "") == "example.com:4444"
 
+    def test_dispatch(self):
+        mr = mapremote.MapRemote()
+        with taddons.context(mr) as tctx:
+            tctx.configure(
+                mr,
+                map_remote=[
+                    "|~d service-a|//service-a.internal/|//localhost:8001/",
+                    "|~d service-b|//service-b.internal/|//localhost:8002/",
+                    "|~d localhost|:8001/|:9001/",
+                    "|/v1/|/v2/",
+                ],
+            )
+            f = tflow.tflow()
+            f.request.url = b"http://service-a.internal/v1/foo"
+            mr.request(f)
+            assert f.request.url == "http://localhost:9001/v2/foo"
+
+            f = tflow.tflow()
+            f.request.url = b"http://service-b.internal/v1/foo"
+            mr.request(f)
+            assert f.request.url == "http://localhost:8002/v2/foo"
+
+            f = tflow.tflow()
+            f.request.url = b"http://other.internal/v1/foo"
+            mr.request(f)
+            assert f.request.url == "http://other.internal/v2/foo"
+
     def test_is_killed(self):
         mr = mapremote.MapRemote()
         with taddons.context(mr) as tctx:
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 
 from mitmproxy.addons import modifybody
@@ -79,6 +81,40 @@ class TestModifyBody:
             assert f.request.content == b"baz"
 
 
+    def test_combined(self):
+        mb = modifybody.ModifyBody()
+        with taddons.context(mb) as tctx:
+            tctx.configure(mb, modify_body=["/foo/bar", "/~s/baz/qux"])
+            assert mb.combined
+            f = tflow.tflow(resp=True)
+            f.response.content = b"nothing to see"
+            with mock.patch.object(f.response, "set_content") as set_content:
+                mb.response(f)
+            assert not set_content.called
+
+            tctx.configure(mb, modify_body=["/(a)a/b", "/foo/bar"])
+            assert mb.combined is None
+            f = tflow.tflow()
+            f.request.content = b"aa foo"
+            mb.request(f)
+            assert f.request.content == b"b bar"
+
+    def test_compressed(self):
+        mb = modifybody.ModifyBody()
+        with taddons.context(mb) as tctx:
+            tctx.configure(mb, modify_body=["/one/two", "/two/three", "/three/four"])
+            f = tflow.tflow(resp=True)
+            f.response.content = b"one"
+            f.response.encode("gzip")
+            encode_gzip = mock.Mock(return_value=b"gz")
+            with mock.patch.dict(
+                "mitmproxy.net.encoding.custom_encode", gzip=encode_gzip
+            ):
+                mb.response(f)
+                assert f.response.raw_content == b"gz"
+            encode_gzip.assert_called_once_with(b"four")
+
+
 class TestModifyBodyFile:
     def test_simple(self, tmpdir):
         mb = modifybody.ModifyBody()
@@ -98,6 +98,28 @@ class TestModifyHeaders:
             mh.requestheaders(f)
             assert "Definitely not Mozilla ;)" == f.request.headers["user-agent"]
 
+    def test_dispatch(self):
+        mh = ModifyHeaders()
+        with taddons.context(mh) as tctx:
+            tctx.configure(
+                mh,
+                modify_headers=[
+                    "/~d example.com/one/two",
+                    "/~d example.org & ~q/one/three",
+                    "/~q/four/five",
+                ],
+            )
+            f = tflow.tflow()
+            f.request.host = "www.example.com"
+            mh.requestheaders(f)
+            assert f.request.headers["one"] == "two"
+            assert f.request.headers["four"] == "five"
+
+            f = tflow.tflow()
+            f.request.host = "example.org"
+            mh.requestheaders(f)
+            assert f.request.headers["one"] == "three"
+
     @pytest.mark.parametrize("take", [True, False])
     def test_taken(self, take):
         mh = ModifyHeaders()
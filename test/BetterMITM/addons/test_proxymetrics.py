@@ -0,0 +1,94 @@
+import asyncio
+import types
+
+from mitmproxy.addons import proxymetrics
+from mitmproxy.addons.proxyserver import Proxyserver
+from mitmproxy.proxy import context
+from mitmproxy.proxy import layer
+from mitmproxy.proxy import server
+from mitmproxy.proxy.layers.http import HttpLayer
+from mitmproxy.proxy.layers.http import HttpRequestHook
+from mitmproxy.proxy.layers.http import HTTPMode
+from mitmproxy.test import taddons
+from mitmproxy.test import tflow
+from mitmproxy.utils import metrics
+
+
+class HookAddon:
+    def request(self, f):
+        pass
+
+
+async def test_hook_durations():
+    a = proxymetrics.ProxyMetrics()
+    addon = HookAddon()
+    with taddons.context(a, addon) as tctx:
+        try:
+            metrics.registry.clear()
+            await tctx.master.addons.handle_lifecycle(HttpRequestHook(tflow.tflow()))
+            assert ("hookaddon", "request") not in metrics.hook_duration.values
+
+            tctx.configure(a, proxy_metrics=True)
+            assert metrics.registry.enabled
+            await tctx.master.addons.handle_lifecycle(HttpRequestHook(tflow.tflow()))
+            assert metrics.hook_duration.values[("hookaddon", "request")].count == 1
+        finally:
+            a.done()
+            metrics.registry.clear()
+    assert not metrics.registry.enabled
+
+
+async def test_sampler(monkeypatch):
+    monkeypatch.setattr(proxymetrics, "SAMPLE_INTERVAL", 0.01)
+    a = proxymetrics.ProxyMetrics()
+    with taddons.context(a) as tctx:
+        try:
+            metrics.registry.clear()
+            tctx.configure(a, proxy_metrics=True)
+            metrics.bytes_received.inc(100, "client")
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if proxymetrics.event_loop_lag.values:
+                    break
+            assert proxymetrics.event_loop_lag.values[()].count >= 1
+            assert proxymetrics.bytes_per_second.values[()] >= 0
+            tctx.configure(a, proxy_metrics=False)
+            assert a._sampler is None
+        finally:
+            a.done()
+            metrics.registry.clear()
+
+
+def test_collect():
+    a = proxymetrics.ProxyMetrics()
+    ps = Proxyserver()
+    with taddons.context(a, ps) as t:
+        try:
+            tctx = context.Context(tflow.tclient_conn(), t.options)
+            nl = layer.NextLayer(tctx)
+            http_layer = HttpLayer(tctx, HTTPMode.regular)
+            http_layer.streams[1] = layer.NextLayer(tctx.fork())
+            http_layer.streams[1]._paused_event_queue.append(object())
+            handler = types.SimpleNamespace(
+                client=tctx.client,
+                layer=nl,
+                transports={
+                    tctx.client: server.ConnectionIO(writer=object()),
+                    tctx.server: server.ConnectionIO(writer=object()),
+                },
+            )
+            ps.connections[tctx.client.peername] = handler
+
+            state = metrics.registry.get_state()["metrics"]
+            assert state["bettermitm_active_connections"] == [
+                {"side": "client", "value": 1},
+                {"side": "server", "value": 1},
+            ]
+            assert state["bettermitm_active_streams"] == 1
+            queues = {x["queue"]: x["value"] for x in state["bettermitm_queue_depth"]}
+            assert queues["paused_layer_events"] == 1
+            assert queues["offloaded_hooks"] == 0
+            assert "bettermitm_active_streams 1" in metrics.registry.render()
+        finally:
+            a.done()
+            metrics.registry.clear()
@@ -223,11 +223,21 @@ def test_options():
             tctx.configure(ps, body_size_limit="invalid")
         tctx.configure(ps, body_size_limit="1m")
 
+        with pytest.raises(exceptions.OptionsError):
+            tctx.configure(ps, body_spool_size="invalid")
+        tctx.configure(ps, body_spool_size="1m")
+
         with pytest.raises(exceptions.OptionsError):
             tctx.configure(ps, connect_addr="invalid")
         tctx.configure(ps, connect_addr="1.2.3.4")
         assert ps._connect_addr == ("1.2.3.4", 0)
 
+        with pytest.raises(exceptions.OptionsError):
+            tctx.configure(ps, http2_stream_window=1024)
+        with pytest.raises(exceptions.OptionsError):
+            tctx.configure(ps, http2_connection_window=2**31)
+        tctx.configure(ps, http2_stream_window=65535)
+
         with pytest.raises(exceptions.OptionsError):
             tctx.configure(ps, mode=["invalid!"])
         with pytest.raises(exceptions.OptionsError):
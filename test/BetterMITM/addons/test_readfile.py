@@ -119,3 +119,14 @@ class TestReadFileStdin:
                 rf.running()
                 await asyncio.sleep(0)
                 mck.assert_awaited()
+
+    async def test_segments(self, tmp_path):
+        rf = readfile.ReadFile()
+        with taddons.context(rf):
+            w = mitmproxy.io.SegmentedFlowWriter(tmp_path / "capture", max_size=1)
+            for _ in range(3):
+                w.add(tflow.tflow(resp=True))
+            w.close()
+            with mock.patch("mitmproxy.master.Master.load_flow") as mck:
+                assert await rf.load_flows_from_path(str(tmp_path / "capture")) == 3
+                assert mck.await_count == 3
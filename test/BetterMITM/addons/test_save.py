@@ -133,6 +133,21 @@ def test_save_command(tmp_path):
         tctx.master.commands.execute("save.file @shown %s" % p)
 
 
+def test_dedup_bodies(tmp_path):
+    sa = save.Save()
+    with taddons.context(sa) as tctx:
+        p = tmp_path / "foo"
+        tctx.configure(sa, save_stream_file=str(p), dedup_bodies=True)
+        for _ in range(3):
+            f = tflow.tflow(resp=True)
+            f.response.content = b"x" * 10_000
+            sa.request(f)
+            sa.response(f)
+        tctx.configure(sa, save_stream_file=None)
+        assert p.stat().st_size < 20_000
+        assert [f.response.content for f in rd(p)] == [b"x" * 10_000] * 3
+
+
 def test_simple(tmp_path):
     sa = save.Save()
     with taddons.context(sa) as tctx:
@@ -197,3 +212,28 @@ def test_disk_full(tmp_path, monkeypatch, capsys):
             sa.response(f)
 
         assert "Error while writing" in capsys.readouterr().err
+
+
+def test_segments(tmp_path):
+    sa = save.Save()
+    with taddons.context(sa) as tctx:
+        p = tmp_path / "capture"
+        with pytest.raises(exceptions.OptionsError):
+            tctx.configure(sa, save_stream_retain=-1)
+        tctx.configure(
+            sa,
+            save_stream_rotate_size=1,
+            save_stream_retain=2,
+            save_stream_compress=True,
+            save_stream_file=str(p),
+        )
+        for _ in range(3):
+            f = tflow.tflow(resp=True)
+            sa.request(f)
+            sa.response(f)
+        tctx.configure(sa, save_stream_rotate_size=0, save_stream_retain=0)
+        assert sa.stream.max_size == 0
+        tctx.configure(sa, save_stream_file=None)
+        assert io.is_manifest(p)
+        assert len(io.read_flows_from_paths([p])) == 2
+        assert len(list(tmp_path.glob("capture.*.zst"))) == 2
@@ -0,0 +1,128 @@
+from unittest import mock
+
+import pytest
+from mitmproxy import exceptions
+from mitmproxy.addons import securityscan
+from mitmproxy.test import taddons
+from mitmproxy.test import tflow
+from mitmproxy.tools.web import jobs
+
+
+def tflow_with_payloads():
+    f = tflow.tflow(resp=True)
+    f.request.path = "/search?q=' OR 1=1--"
+    f.request.method = "POST"
+    f.request.content = b"name=<script>alert('XSS')</script>"
+    f.request.headers["X-Forwarded-For"] = "http://127.0.0.1"
+    f.response.content = b"<script>alert('XSS')</script> md5"
+    return f
+
+
+def test_resolve_tests():
+    tests = securityscan.resolve_tests(test_ids=["xss", "custom"])
+    assert tests["xss"]["payloads"] == securityscan.TESTS["xss"]["payloads"]
+    assert tests["custom"] == {"name": "custom", "payloads": [], "severity": "medium"}
+
+    tests = securityscan.resolve_tests([{"id": "xss", "payloads": ["foo"]}])
+    assert tests["xss"]["name"] == "Cross-Site Scripting (XSS)"
+    assert tests["xss"]["payloads"] == ["foo"]
+
+
+def test_scan():
+    scanner = securityscan.Scanner(
+        securityscan.resolve_tests(
+            test_ids=[
+                "sql_injection",
+                "xss",
+                "ssrf",
+                "path_traversal",
+                "csrf",
+                "header_security",
+                "ssl_tls",
+                "weak_crypto",
+            ]
+        )
+    )
+    results = {r["test_id"]: r for r in scanner.scan(tflow_with_payloads())}
+    assert results["sql_injection"]["details"] == ["Payload found in URL: ' OR 1=1--"]
+    assert results["xss"]["details"] == [
+        "Payload found in request body: <script>alert('XSS')</script>",
+        "Payload reflected in response: <script>alert('XSS')</script>",
+    ]
+    assert results["xss"]["found_payloads"] == ["<script>alert('XSS')</script>"] * 2
+    assert results["xss"]["recommendations"] == securityscan.RECOMMENDATIONS["xss"]
+    assert results["ssrf"]["details"] == [
+        "Payload found in request header X-Forwarded-For: http://127.0.0.1"
+    ]
+    assert not results["path_traversal"]["vulnerable"]
+    assert results["path_traversal"]["description"] == (
+        "No vulnerabilities detected for Path Traversal"
+    )
+    assert results["csrf"]["vulnerable"]
+    assert results["header_security"]["vulnerable"]
+    assert results["ssl_tls"]["vulnerable"]
+    assert results["weak_crypto"]["details"] == [
+        "Potential weak cryptography detected: md5"
+    ]
+
+    results = scanner.scan(tflow_with_payloads(), stop_on_first=True)
+    assert [r["test_id"] for r in results] == ["sql_injection"]
+
+
+def test_scan_max_bytes():
+    scanner = securityscan.Scanner(securityscan.resolve_tests(test_ids=["xss"]))
+    f = tflow_with_payloads()
+    assert scanner.scan(f)[0]["vulnerable"]
+    assert not scanner.scan(f, max_bytes=30)[0]["vulnerable"]
+
+
+def test_flow_parts_max_bytes():
+    f = tflow.tflow(resp=True)
+    f.response.headers["content-encoding"] = "gzip"
+    f.response.content = b"x" * 100_000
+    f.response.raw_content
+    with mock.patch("mitmproxy.net.encoding.decode") as decode:
+        parts = securityscan.FlowParts.from_flow(f, max_bytes=100)
+        assert not decode.called
+    assert parts.size <= 100
+    assert parts.response_body
+    assert set(parts.response_body) == {"x"}
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_scan_flows(monkeypatch, parallel):
+    if parallel:
+        monkeypatch.setattr(securityscan, "PARALLEL_MIN_BYTES", 0)
+    scanner = securityscan.Scanner(
+        securityscan.resolve_tests(test_ids=["sql_injection", "xss"])
+    )
+    flows = [tflow_with_payloads(), tflow.tflow(resp=True), tflow_with_payloads()]
+    with taddons.context() as tctx:
+        tctx.options.hook_processes = 1
+        executor = tctx.master.addons.executor("process")
+        results = jobs.run_sync(
+            securityscan.scan_flows(scanner, flows, workers=2, executor=executor)
+        )
+        assert results == [r for f in flows for r in scanner.scan(f)]
+        # The pool is shared with offloaded hooks and stays usable.
+        assert executor is tctx.master.addons.executor("process")
+        assert executor.submit(len, "abc").result() == 3
+        tctx.master.addons.shutdown_executors()
+
+
+def test_addon():
+    a = securityscan.SecurityScan()
+    with taddons.context(a) as tctx:
+        with pytest.raises(exceptions.OptionsError, match="Unknown security test"):
+            tctx.configure(a, security_scan=["nope"])
+
+        f = tflow_with_payloads()
+        a.response(f)
+        assert "security_scan" not in f.metadata
+
+        tctx.configure(a, security_scan=["xss", "path_traversal"])
+        a.response(f)
+        assert [r["test_id"] for r in f.metadata["security_scan"]] == ["xss"]
+
+        tctx.configure(a, security_scan=[])
+        assert a.scanner is None
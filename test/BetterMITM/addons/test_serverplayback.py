@@ -439,3 +439,110 @@ def test_server_playback_response_deleted():
         f1.response = f2.response = None
         assert not sp.next_flow(f1)
         assert not sp.flowmap
+
+
+def test_fuzzy():
+    sp = serverplayback.ServerPlayback()
+    with taddons.context(sp) as tctx:
+        tctx.configure(sp, server_replay_fuzzy=True)
+        f1 = tflow.tflow(resp=True)
+        f1.request.path = "/?a=1&t=100"
+        f2 = tflow.tflow(resp=True)
+        f2.request.path = "/?a=2&t=100"
+        sp.load_flows([f1, f2])
+
+        r = tflow.tflow()
+        r.request.path = "/?a=2&t=200"
+        assert sp.next_flow(r) is f2
+        assert sp.count() == 1
+        assert sp.next_flow(r) is f1
+        assert not sp.flowmap
+        assert not sp.fuzzymap
+
+        sp.load_flows([f1])
+        r.request.path = "/?a=2"
+        assert sp.next_flow(r) is None
+        r.request.path = "/?a=1&t=100"
+        assert sp.next_flow(r) is f1
+        assert not sp.fuzzymap
+
+        tctx.configure(sp, server_replay_fuzzy=False)
+        sp.load_flows([f1])
+        r.request.path = "/?a=1&t=200"
+        assert sp.next_flow(r) is None
+        assert not sp.fuzzymap
+
+        tctx.configure(sp, server_replay_fuzzy=True, server_replay_reuse=True)
+        assert sp.next_flow(r) is f1
+        assert sp.next_flow(r) is f1
+
+
+def test_offload_compaction(tmpdir, monkeypatch):
+    monkeypatch.setattr(io.spool, "COMPACT_MIN_SIZE", 0)
+    sp = serverplayback.ServerPlayback()
+    with taddons.context(sp) as tctx:
+        flows = []
+        for i in range(3):
+            f = tflow.tflow(resp=i > 0)
+            f.request.path = "/"
+            f.request.content = b"request %d" % max(i, 1)
+            if f.response:
+                f.response.content = b"response %d" % i
+            flows.append(f)
+        fpath = str(tmpdir.join("flows"))
+        tdump(fpath, flows)
+        tctx.configure(sp, server_replay_offload=True, server_replay=[fpath])
+        spool = sp._spool
+
+        # Consuming a flow releases its bodies, including those of request-only flows.
+        r = tflow.tflow()
+        r.request.path = "/"
+        r.request.content = b"request 1"
+        sp.request(r)
+        assert r.response.content == b"response 1"
+        assert sp._spool is not spool
+        assert sp._offloaded.keys() == {flows[2].id}
+        assert sp._spool.live_bytes == sp._spool.bytes_written
+
+        r.request.content = b"request 2"
+        r.response = None
+        sp.request(r)
+        assert r.response.content == b"response 2"
+        assert not sp._offloaded
+
+
+def test_offload(tmpdir):
+    sp = serverplayback.ServerPlayback()
+    with taddons.context(sp) as tctx:
+        f1 = tflow.tflow(resp=True)
+        f1.request.content = b"one"
+        f1.response.content = b"response one"
+        f2 = tflow.tflow(resp=True)
+        f2.request.content = b"two"
+        f2.response.content = b"response two"
+        fpath = str(tmpdir.join("flows"))
+        tdump(fpath, [f1, f2])
+        tctx.configure(sp, server_replay_offload=True, server_replay=[fpath])
+        assert sp.count() == 2
+        for lst in sp.flowmap.values():
+            for f in lst:
+                assert f.request.data.content is None
+                assert f.response.data.content is None
+                assert f.request.body_file is not None
+        assert sp._spool.live_bytes == 2 * len(b"one" + b"response one")
+
+        tctx.configure(sp, server_replay_ignore_host=True)
+        assert sp.count() == 2
+
+        r = tflow.tflow()
+        r.request.host = "example.org"
+        r.request.content = b"two"
+        sp.request(r)
+        assert r.response.content == b"response two"
+        assert sp.count() == 1
+        assert sp._spool.live_bytes == len(b"one" + b"response one")
+
+        sp.clear()
+        with pytest.raises(exceptions.CommandError):
+            sp.load_file(str(tmpdir))
+        assert not sp.flowmap
@@ -1,3 +1,7 @@
+import asyncio
+import gc
+import os
+
 import pytest
 
 from mitmproxy import exceptions
@@ -267,6 +271,42 @@ async def test_load(tmpdir, caplog):
     assert "Invalid data format." in caplog.text
 
 
+def test_columnar():
+    v = view.View()
+    with taddons.context(v) as tctx:
+        v.requestheaders(tft(method="get"))
+        tctx.configure(v, view_columnar=True)
+        assert len(v.table) == 1
+        for method in ("put", "get", "put"):
+            v.requestheaders(tft(method=method))
+        f = tflow.tflow(resp=True)
+        v.requestheaders(f)
+        v.response(f)
+
+        v.set_filter_cmd("~m get & ~s")
+        assert list(v) == [f]
+        v.set_filter_cmd("~m put | ~b foo")
+        assert [i.request.method for i in v] == ["PUT", "PUT"]
+        assert len(tctx.command(v.resolve, "~m get")) == 3
+
+        v.remove([f])
+        assert len(v.table) == 4
+        v.clear()
+        assert len(v.table) == 0
+        tctx.configure(v, view_columnar=False)
+        assert v.table is None
+
+
+def test_load_segments(tmp_path):
+    w = io.SegmentedFlowWriter(tmp_path / "capture", max_size=1)
+    w.add(tflow.tflow(resp=True))
+    w.add(tflow.tflow(resp=True))
+    w.close()
+    v = view.View()
+    v.load_file(str(tmp_path / "capture"))
+    assert len(v) == 2
+
+
 def test_resolve():
     v = view.View()
     with taddons.context() as tctx:
@@ -677,6 +717,208 @@ def test_configure():
         assert v.focus_follow
 
 
+async def test_refilter_chunked(monkeypatch):
+    monkeypatch.setattr(view, "REFILTER_CHUNK_SIZE", 2)
+    v = view.View()
+    refreshes = []
+
+    def record():
+        refreshes.append(len(v))
+
+    v.sig_view_refresh.connect(record)
+    with taddons.context():
+        v.add([tft(method="get", start=i) for i in range(5)])
+        v.add([tft(method="put", start=i) for i in range(5, 10)])
+        assert len(v) == 10
+
+        v.set_filter(flowfilter.parse("~m get"))
+        assert v.refiltering
+        assert len(v) < 5
+        v.set_filter(flowfilter.parse("~m put"))
+        while v.refiltering:
+            await asyncio.sleep(0)
+        assert len(v) == 5
+        assert all(f.request.method == "PUT" for f in v)
+        assert refreshes[-1] == 5
+
+
+async def test_reorder_chunked(monkeypatch):
+    monkeypatch.setattr(view, "REFILTER_CHUNK_SIZE", 2)
+    v = view.View()
+    with taddons.context():
+        v.add([tft(method=m, start=i) for i, m in enumerate("edcba")])
+        v.set_order("method")
+        assert v.refiltering
+        assert v.order_key is v.default_order
+        v.set_order("time")
+        v.set_order("method")
+        v.update([v[0]])
+        while v.refiltering:
+            await asyncio.sleep(0)
+        assert v.get_order() == "method"
+        assert [f.request.method for f in v] == ["A", "B", "C", "D", "E"]
+
+
+def test_max_flows():
+    v = view.View()
+    with taddons.context(v) as tctx:
+        flows = [tft(start=i) for i in range(5)]
+        for f in flows:
+            f.live = False
+        flows[0].marked = ":default:"
+        v.add(flows)
+        tctx.configure(v, view_max_flows=3)
+        assert v.store_count() == 3
+        assert flows[0].id in v._store
+        assert flows[1].id not in v._store
+        assert flows[2].id not in v._store
+        assert v.store_stats()["evictedFlows"] == 2
+
+        live = tft(start=10)
+        v.add([live])
+        assert live.id in v._store
+        assert flows[3].id not in v._store
+
+        with pytest.raises(exceptions.OptionsError):
+            tctx.configure(v, view_max_flows=-1)
+
+
+def test_max_memory_offload():
+    v = view.View()
+    with taddons.context(v) as tctx:
+        tctx.configure(v, view_max_memory="30k", view_offload_bodies=True)
+        flows = []
+        for i in range(4):
+            f = tflow.tflow(resp=True, live=False)
+            f.response.content = b"x" * 10_000
+            flows.append(f)
+            v.add([f])
+        assert v.store_stats()["bytes"] <= 30 * 1024
+        assert v.store_count() == 4
+        assert v.is_offloaded(flows[0])
+        assert flows[0].response.data.content is None
+        assert flows[0].response.raw_content == b"x" * 10_000
+        assert flows[0].get_state()["response"]["content"] == b"x" * 10_000
+        assert not v.is_offloaded(flows[-1])
+        assert v.store_stats()["offloadedFlows"] >= 1
+        assert v.store_stats()["offloadedBytes"] >= 10_000
+
+        v.restore_bodies(flows[0])
+        assert not v.is_offloaded(flows[0])
+        assert flows[0].response.body_file is None
+        assert flows[0].response.content == b"x" * 10_000
+
+        v.remove([flows[1]])
+        assert not v.is_offloaded(flows[1])
+        v.clear()
+        assert v.store_stats()["bytes"] == 0
+
+        with pytest.raises(exceptions.OptionsError, match="Invalid view_max_memory"):
+            tctx.configure(v, view_max_memory="invalid")
+
+
+def test_offload_compaction(monkeypatch, tmp_path):
+    monkeypatch.setattr(io.spool, "COMPACT_MIN_SIZE", 0)
+    v = view.View()
+    with taddons.context(v) as tctx:
+        tctx.configure(v, view_offload_bodies=True, view_offload_dir=str(tmp_path))
+        flows = []
+        for i in range(4):
+            f = tflow.tflow(resp=True)
+            f.request.content = b""
+            f.response.content = bytes([i]) * 1000
+            flows.append(f)
+        v.add(flows)
+        for f in flows:
+            v.offload_bodies(f)
+        assert v.store_stats()["offloadedBytes"] == 4000
+        (old,) = os.listdir(tmp_path)
+
+        # Replacing an offloaded body releases its space in the spool.
+        flows[0].response.content = b"new"
+        v.update([flows[0]])
+        assert not v.is_offloaded(flows[0])
+        assert v.store_stats()["offloadedBytes"] == 3000
+
+        v.remove(flows[1:3])
+        assert v.store_stats()["offloadedBytes"] == 1000
+        assert flows[3].response.content == bytes([3]) * 1000
+        assert flows[0].response.content == b"new"
+        # Removed flows can still be read.
+        assert flows[1].response.content == bytes([1]) * 1000
+        assert old in os.listdir(tmp_path)
+        del flows[1:3]
+        gc.collect()
+        assert old not in os.listdir(tmp_path)
+        assert len(os.listdir(tmp_path)) == 1
+
+        v.clear()
+        assert v.store_stats()["offloadedBytes"] == 0
+        del flows, f
+        gc.collect()
+        assert os.listdir(tmp_path) == []
+
+
+def test_dedup_bodies():
+    v = view.View()
+    with taddons.context(v) as tctx:
+        tctx.configure(v, dedup_bodies=True)
+        flows = []
+        for i in range(3):
+            f = tflow.tflow(resp=True)
+            f.response.content = b"x" * 10_000
+            flows.append(f)
+        v.add(flows)
+        assert flows[0].response.raw_content is flows[2].response.raw_content
+        s = v.store_stats()
+        assert s["dedupBodies"] == 1
+        assert s["dedupBytes"] == 10_000
+        assert s["dedupSavedBytes"] == 20_000
+        assert s["bytes"] < 20_000
+        assert "saved by deduplicating 1 bodies" in v.store_stats_cmd()
+
+        flows[0].response.content = b"y" * 10_000
+        v.update([flows[0]])
+        assert v.store_stats()["dedupBodies"] == 2
+        assert v.store_stats()["dedupSavedBytes"] == 10_000
+
+        v.remove(flows[1:])
+        s = v.store_stats()
+        assert s["dedupBodies"] == 1
+        assert s["dedupSavedBytes"] == 0
+
+        tctx.configure(v, dedup_bodies=False)
+        assert v.store_stats()["dedupBodies"] == 0
+        assert not v._body_refs
+
+        tctx.configure(v, dedup_bodies=True)
+        v.clear()
+        assert v.store_stats()["bytes"] == 0
+        assert v.store_stats()["dedupBodies"] == 0
+
+
+def test_max_memory_evict(tmpdir):
+    path = str(tmpdir.join("evicted"))
+    v = view.View()
+    with taddons.context(v) as tctx:
+        tctx.configure(v, view_max_memory="25k", view_evict_file=path)
+        flows = []
+        for i in range(3):
+            f = tflow.tflow(resp=True, live=False)
+            f.response.content = b"x" * 10_000
+            flows.append(f)
+            v.add([f])
+        assert v.store_count() == 2
+        assert flows[0].id not in v._store
+        assert "1 evicted" in v.store_stats_cmd()
+        v.done()
+
+    with open(path, "rb") as f:
+        evicted = list(io.FlowReader(f).stream())
+    assert [f.id for f in evicted] == [flows[0].id]
+    assert evicted[0].response.content == b"x" * 10_000
+
+
 @pytest.mark.parametrize(
     "marker, expected",
     [
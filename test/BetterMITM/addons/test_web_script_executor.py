@@ -0,0 +1,41 @@
+from mitmproxy.addons import web_script_executor
+from mitmproxy.test import taddons
+from mitmproxy.test import tflow
+
+
+def test_scripts_snapshot():
+    ex = web_script_executor.WebScriptExecutor()
+    with taddons.context(ex) as tctx:
+        tctx.master._scripts = {"a": {"id": "a", "language": "python", "code": ""}}
+        ex.running()
+        assert list(ex.scripts) == ["a"]
+
+        snapshot = ex.scripts
+        ex.register_script("b", {"id": "b", "language": "python", "code": ""})
+        ex.unregister_script("a")
+        assert list(ex.scripts) == ["b"]
+        assert list(snapshot) == ["a"]
+
+        # Offloaded hooks don't touch the scripts registered on the event loop.
+        tctx.master._scripts = {}
+        ex.request(tflow.tflow())
+        assert list(ex.scripts) == ["b"]
+
+
+def test_python_script():
+    ex = web_script_executor.WebScriptExecutor()
+    with taddons.context(ex):
+        ex.register_script(
+            "a",
+            {
+                "id": "a",
+                "language": "python",
+                "trigger": "response",
+                "code": "flow.response.set_status_code(418)",
+            },
+        )
+        f = tflow.tflow(resp=True)
+        ex.request(f)
+        assert f.response.status_code == 200
+        ex.response(f)
+        assert f.response.status_code == 418
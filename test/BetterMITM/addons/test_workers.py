@@ -0,0 +1,77 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from mitmproxy import exceptions
+from mitmproxy.addons import proxyserver
+from mitmproxy.addons import workers
+from mitmproxy.test import taddons
+from mitmproxy.test import tflow
+
+
+def test_worker_modes():
+    assert workers.worker_modes(
+        ["regular", "reverse:https://example.com", "reverse:quic://example.com", "dns"]
+    ) == ["regular", "reverse:https://example.com"]
+
+
+@pytest.mark.parametrize("with_bodies", [True, False])
+async def test_encode_read(with_bodies):
+    f = tflow.tflow(resp=True)
+    reader = asyncio.StreamReader()
+    reader.feed_data(workers.encode_flow(f, with_bodies))
+    reader.feed_data(workers.encode_flow(tflow.ttcpflow(), with_bodies))
+    reader.feed_eof()
+
+    received = await workers.read_flow(reader)
+    assert received.id == f.id
+    assert received.request.url == f.request.url
+    if with_bodies:
+        assert received.response.content == f.response.content
+    else:
+        assert received.response.raw_content is None
+    assert (await workers.read_flow(reader)).type == "tcp"
+    with pytest.raises(asyncio.IncompleteReadError):
+        await workers.read_flow(reader)
+
+
+def test_configure():
+    ps = proxyserver.Proxyserver()
+    with taddons.context(ps) as tctx:
+        with pytest.raises(exceptions.OptionsError, match="must not be negative"):
+            tctx.configure(ps, proxy_workers=-1)
+        with mock.patch("mitmproxy.addons.proxyserver.socket") as sock:
+            del sock.SO_REUSEPORT
+            with pytest.raises(exceptions.OptionsError, match="not supported"):
+                tctx.configure(ps, proxy_workers=2)
+
+
+async def test_handle_worker(caplog_async):
+    w = workers.Workers()
+    with taddons.context(w, proxyserver.Proxyserver()) as tctx:
+        tctx.master.load_flow = mock.AsyncMock()
+        reader = asyncio.StreamReader()
+        reader.feed_data(workers.encode_flow(tflow.tflow(resp=True), False))
+        reader.feed_data(b"3:abc#")
+        reader.feed_eof()
+        writer = mock.Mock()
+        await w.handle_worker(reader, writer)
+        assert w.received == 1
+        assert tctx.master.load_flow.call_count == 1
+        assert writer.close.called
+        await caplog_async.await_log("Invalid data from proxy worker")
+
+
+async def test_forward():
+    w = workers.Workers()
+    with taddons.context(w, proxyserver.Proxyserver()):
+        f = tflow.tflow(resp=True)
+        w.response(f)
+
+        w._primary = mock.Mock()
+        w._primary.is_closing.return_value = False
+        w.response(f)
+        w.error(tflow.tflow(ws=True))
+        w.tcp_end(tflow.ttcpflow())
+        assert w._primary.write.call_count == 2
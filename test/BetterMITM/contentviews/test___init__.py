@@ -1,5 +1,7 @@
 from .test__api import FailingPrettifyContentview
+from mitmproxy.contentviews import Contentview
 from mitmproxy.contentviews import ContentviewRegistry
+from mitmproxy.contentviews import json_view
 from mitmproxy.contentviews import Metadata
 from mitmproxy.contentviews import prettify_message
 from mitmproxy.contentviews import raw
@@ -47,6 +49,20 @@ def test_view_selection():
     assert registry.get_view(b"", Metadata()).name == "Raw"
 
 
+class CountingContentview(Contentview):
+    def __init__(self):
+        self.prettified = 0
+        self.prioritized = 0
+
+    def prettify(self, data, metadata):
+        self.prettified += 1
+        return data.decode()
+
+    def render_priority(self, data, metadata):
+        self.prioritized += 1
+        return 1
+
+
 class TestPrettifyMessage:
     def test_empty_content(self):
         with taddons.context():
@@ -95,3 +111,61 @@ class TestPrettifyMessage:
             assert "Couldn't parse as FailingPrettify" in result.text
             assert result.syntax_highlight == "error"
             assert result.view_name == "FailingPrettify"
+
+    def test_max_lines(self):
+        with taddons.context():
+            f = tflow.tflow(resp=True)
+            f.response.headers["content-type"] = "application/json"
+            f.response.content = b'{"a": 1, "b": [1, 2]}'
+            result = prettify_message(f.response, f, max_lines=3)
+            assert result.text == '{\n    "a": 1,\n    "b": [\n'
+            assert result.view_name == "JSON"
+            full = prettify_message(f.response, f).text
+            assert full == json_view.prettify(f.response.content, Metadata())
+            assert prettify_message(f.response, f, max_lines=100).text == full
+
+            f.response.content = b"\xff" * 40
+            result = prettify_message(f.response, f, "hex dump", max_lines=1)
+            assert result.text.count("\n") == 1
+
+            f.response.content = b'{"a": '
+            result = prettify_message(f.response, f, max_lines=1)
+            assert result.view_name == "Raw"
+            assert result.text == '{"a": '
+
+    def test_render_cache(self):
+        registry = ContentviewRegistry()
+        view = CountingContentview()
+        registry.register(view)
+        with taddons.context():
+            f = tflow.tflow()
+            f.request.content = b"content"
+
+            result = prettify_message(f.request, f, registry=registry)
+            result.text = "modified"
+            result = prettify_message(f.request, f, registry=registry)
+            assert result.text == "content"
+            assert view.prettified == 1
+            assert view.prioritized == 1
+
+            prettify_message(f.request, f, registry=registry, max_lines=1)
+            assert view.prettified == 2
+            assert view.prioritized == 1
+
+            f.request.content = b"changed"
+            assert prettify_message(f.request, f, registry=registry).text == "changed"
+            assert view.prettified == 3
+
+            registry.register(raw)
+            prettify_message(f.request, f, registry=registry)
+            assert view.prettified == 4
+
+            f2 = tflow.tflow()
+            f2.request.content = b"changed"
+            prettify_message(f2.request, f2, registry=registry)
+            assert view.prettified == 5
+
+            tcp = tflow.ttcpflow()
+            prettify_message(tcp.messages[0], tcp, registry=registry)
+            prettify_message(tcp.messages[0], tcp, registry=registry)
+            assert view.prettified == 7
@@ -2,6 +2,7 @@ from unittest import mock
 
 from mitmproxy.contentviews._api import Metadata
 from mitmproxy.contentviews._registry import ContentviewRegistry
+from mitmproxy.contentviews._registry import RenderCache
 from test.BetterMITM.contentviews.test__api import ExampleContentview
 from test.BetterMITM.contentviews.test__api import FailingRenderPriorityContentview
 
@@ -69,3 +70,32 @@ def test_render_priority_error(caplog):
     v = registry.get_view(b"data", Metadata())
     assert v.name == "Example"
     assert "Error in FailingRenderPriority.render_priority" in caplog.text
+
+
+def test_render_cache():
+    cache = RenderCache(max_entries=3, max_size=10)
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 4)
+    assert cache.get("b") is None
+    assert cache.size == 8
+    cache.put("d", 4)
+    cache.put("e", 5)
+    assert len(cache) == 3
+    assert cache.get("a") is None
+    cache.put("c", 6, 2)
+    assert cache.get("c") == 6
+    assert cache.size == 2
+    cache.put("huge", 7, 11)
+    assert cache.get("huge") is None
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_register_clears_render_cache():
+    registry = ContentviewRegistry()
+    registry.render_cache.put("key", "value")
+    registry.register(ExampleContentview())
+    assert registry.render_cache.get("key") is None
@@ -1,6 +1,7 @@
 from mitmproxy import tcp
 from mitmproxy.contentviews._utils import byte_pairs_to_str_pairs
 from mitmproxy.contentviews._utils import get_data
+from mitmproxy.contentviews._utils import iter_lines
 from mitmproxy.contentviews._utils import make_metadata
 from mitmproxy.contentviews._utils import merge_repeated_keys
 from mitmproxy.contentviews._utils import yaml_dumps
@@ -83,6 +84,12 @@ class TestGetData:
         assert enc == "[cannot decode]"
 
 
+def test_iter_lines():
+    assert list(iter_lines([])) == []
+    assert list(iter_lines(["a\nb", "c", "\n\nd"])) == ["a\n", "bc\n", "\n", "d"]
+    assert list(iter_lines(["a\n", ""])) == ["a\n"]
+
+
 def test_yaml_dumps():
     assert yaml_dumps({}) == ""
     assert yaml_dumps({"foo": "bar"}) == "foo: bar\n"
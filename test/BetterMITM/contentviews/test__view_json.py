@@ -17,6 +17,16 @@ def test_view_json():
     assert json_view.syntax_highlight == "yaml"
 
 
+def test_prettify_lines():
+    meta = Metadata()
+    for data in [b"null", b"[]", b'{"a": [1, {"b": "\xc3\xa4"}], "c": {}}']:
+        lines = list(json_view.prettify_lines(data, meta))
+        assert "".join(lines) == json_view.prettify(data, meta)
+        assert all(line.endswith("\n") for line in lines[:-1])
+    with pytest.raises(ValueError):
+        json_view.prettify_lines(b"{", meta)
+
+
 def test_view_json_nonascii():
     """https://github.com/mitmproxy/mitmproxy/issues/7739"""
     assert (
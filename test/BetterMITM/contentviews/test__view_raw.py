@@ -11,5 +11,16 @@ def test_view_raw():
     assert raw.prettify(b"\xff", meta) == r"\xff"
 
 
+def test_prettify_lines():
+    meta = Metadata()
+    assert list(raw.prettify_lines(b"", meta)) == []
+    assert list(raw.prettify_lines(b"foo\n\xff\nbar", meta)) == [
+        "foo\n",
+        "\\xff\n",
+        "bar",
+    ]
+    assert list(raw.prettify_lines("🫠\n".encode(), meta)) == ["🫠\n"]
+
+
 def test_render_priority():
     assert raw.render_priority(b"data", Metadata()) == 0.1
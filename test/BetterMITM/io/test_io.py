@@ -7,9 +7,14 @@ from hypothesis import given
 from hypothesis.strategies import binary
 
 from mitmproxy import exceptions
+from mitmproxy import http
 from mitmproxy import version
+from mitmproxy.io import body_digest
 from mitmproxy.io import FlowReader
+from mitmproxy.io import FlowWriter
+from mitmproxy.io import io as io_module
 from mitmproxy.io import tnetstring
+from mitmproxy.test import tflow
 
 here = Path(__file__).parent.parent / "data"
 
@@ -58,3 +63,71 @@ class TestFlowReader:
         ):
             for _ in FlowReader(io.BytesIO(b"14:7:version;1:0#}")).stream():
                 pass
+
+
+class TestFlowWriter:
+    def test_body_file(self, tmp_path):
+        p = tmp_path / "body"
+        p.write_bytes(b"spooled body")
+        f = tflow.tflow(resp=True)
+        f.response.data.content = None
+        f.response.body_file = http.BodyFile.from_path(str(p))
+
+        out = io.BytesIO()
+        FlowWriter(out).add(f)
+        out.seek(0)
+        (loaded,) = FlowReader(out).stream()
+        assert loaded.response.raw_content == b"spooled body"
+        assert loaded.response.body_file is None
+
+    def test_dedup_bodies(self):
+        flows = [tflow.tflow(resp=True) for _ in range(3)]
+        for f in flows:
+            f.response.content = b"x" * 10_000
+        flows[2].response.content = b"y" * 10_000
+
+        out = io.BytesIO()
+        w = FlowWriter(out, dedup_bodies=True)
+        for f in flows:
+            w.add(f)
+        assert len(out.getvalue()) < 35_000
+        out.seek(0)
+        loaded = list(FlowReader(out).stream())
+        assert [f.response.content for f in loaded] == [
+            f.response.content for f in flows
+        ]
+        assert loaded[0].response.raw_content is loaded[1].response.raw_content
+
+    def test_dedup_max_bodies(self, monkeypatch):
+        monkeypatch.setattr(io_module, "DEDUP_MAX_BODIES", 2)
+        flows = [tflow.tflow(resp=True) for _ in range(4)]
+        for f, c in zip(flows, b"xyxz"):
+            f.response.content = bytes([c]) * 10_000
+        flows.append(flows[1].copy())
+
+        out = io.BytesIO()
+        w = FlowWriter(out, dedup_bodies=True)
+        for f in flows:
+            w.add(f)
+        assert len(w._written_bodies) == 2
+        out.seek(0)
+        r = FlowReader(out)
+        loaded = list(r.stream())
+        assert len(r._bodies) == 2
+        assert [f.response.content for f in loaded] == [
+            f.response.content for f in flows
+        ]
+        # x is still remembered when z is written, y has to be written again.
+        assert len(out.getvalue()) > 40_000
+        assert loaded[0].response.raw_content is loaded[2].response.raw_content
+
+    def test_dedup_unknown_reference(self):
+        f = tflow.tflow(resp=True)
+        f.response.content = b"x" * 10_000
+        out = io.BytesIO()
+        w = FlowWriter(out, dedup_bodies=True)
+        w._written_bodies[body_digest(f.response.raw_content)] = None
+        w.add(f)
+        out.seek(0)
+        with pytest.raises(exceptions.FlowReadException, match="Unknown body"):
+            list(FlowReader(out).stream())
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from mitmproxy import exceptions
+from mitmproxy import flowfilter
+from mitmproxy.io import read_flows_from_paths
+from mitmproxy.io import segments
+from mitmproxy.test import tflow
+
+
+def write(path, n, **kwargs) -> segments.SegmentedFlowWriter:
+    w = segments.SegmentedFlowWriter(path, **kwargs)
+    for i in range(n):
+        f = tflow.tflow(resp=True)
+        f.request.path = f"/{i}"
+        w.add(f)
+    w.close()
+    return w
+
+
+def paths(flows) -> list[str]:
+    return [f.request.path for f in flows]
+
+
+def test_rotate_size(tmp_path):
+    p = tmp_path / "capture"
+    w = write(p, 5, max_size=1)
+    assert [s["flows"] for s in w.segments] == [1] * 5
+    assert segments.is_manifest(p)
+    assert paths(segments.SegmentedFlowReader(p).stream()) == [
+        f"/{i}" for i in range(5)
+    ]
+    assert paths(read_flows_from_paths([p])) == [f"/{i}" for i in range(5)]
+
+
+def test_rotate_interval(tmp_path, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(segments.time, "time", lambda: now)
+    w = segments.SegmentedFlowWriter(tmp_path / "capture", max_age=60)
+    w.add(tflow.tflow())
+    now += 30
+    w.add(tflow.tflow())
+    now += 30
+    w.add(tflow.tflow())
+    w.add(tflow.tflow())
+    w.close()
+    assert [s["flows"] for s in w.segments] == [3, 1]
+
+
+def test_retain(tmp_path):
+    p = tmp_path / "capture"
+    write(p, 5, max_size=1, retain=2)
+    assert paths(segments.SegmentedFlowReader(p).stream()) == ["/3", "/4"]
+    assert sorted(x.name for x in tmp_path.iterdir()) == [
+        "capture",
+        "capture.000004",
+        "capture.000005",
+    ]
+
+
+def test_compress(tmp_path):
+    p = tmp_path / "capture"
+    w = write(p, 3, max_size=1, compress=True)
+    assert all(s["compression"] == "zstd" for s in w.segments)
+    assert not list(tmp_path.glob("capture.00000?"))
+    assert paths(segments.SegmentedFlowReader(p).stream()) == ["/0", "/1", "/2"]
+
+
+def test_filter_and_append(tmp_path):
+    p = tmp_path / "capture"
+    write(p, 2, max_size=1)
+    write(p, 3, max_size=1, append=True, flt=flowfilter.parse("~u /[01]"))
+    assert paths(segments.SegmentedFlowReader(p).stream()) == ["/0", "/1", "/0", "/1"]
+    write(p, 1, max_size=1)
+    assert paths(segments.SegmentedFlowReader(p).stream()) == ["/0"]
+
+
+def test_invalid_manifest(tmp_path):
+    p = tmp_path / "capture"
+    p.write_text(json.dumps({segments.MANIFEST_KEY: 2, "segments": []}))
+    assert segments.is_manifest(p)
+    with pytest.raises(exceptions.FlowReadException, match="version"):
+        segments.SegmentedFlowReader(p)
+    p.write_text(json.dumps({segments.MANIFEST_KEY: 1}))
+    with pytest.raises(exceptions.FlowReadException, match="Invalid"):
+        segments.SegmentedFlowReader(p)
+
+    write(p, 1)
+    manifest = json.loads(p.read_text())
+    manifest["segments"][0]["compression"] = "lz4"
+    p.write_text(json.dumps(manifest))
+    with pytest.raises(exceptions.FlowReadException, match="lz4"):
+        list(segments.SegmentedFlowReader(p).stream())
+    assert not segments.is_manifest(tmp_path / "nonexistent")
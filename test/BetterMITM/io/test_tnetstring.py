@@ -120,6 +120,11 @@ class Test_FileLoading(unittest.TestCase):
             self.assertEqual(v, tnetstring.load(s))
             self.assertEqual(b"OK", s.read())
 
+    def test_dump_memoryview(self):
+        s = io.BytesIO()
+        tnetstring.dump({"content": memoryview(b"hello")}, s)
+        self.assertEqual(b"18:7:content;5:hello,}", s.getvalue())
+
     def test_error_on_absurd_lengths(self):
         s = io.BytesIO()
         s.write(b"1000000000000:pwned!,")
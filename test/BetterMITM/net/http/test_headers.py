@@ -5,6 +5,7 @@ import pytest
 from mitmproxy.net.http.headers import assemble_content_type
 from mitmproxy.net.http.headers import infer_content_encoding
 from mitmproxy.net.http.headers import parse_content_type
+from mitmproxy.net.http.headers import parse_range
 
 
 def test_parse_content_type():
@@ -102,3 +103,30 @@ def test_assemble_content_type():
 def test_infer_content_encoding(content_type, content, expected):
 
     assert infer_content_encoding(content_type, content) == expected
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, None),
+        ("", None),
+        ("lines=1-2", None),
+        ("bytes=-", None),
+        ("bytes=2-4", (2, 5)),
+        ("bytes=2-", (2, 10)),
+        ("bytes=5-100", (5, 10)),
+        ("bytes=-3", (7, 10)),
+        ("bytes=-100", (0, 10)),
+        ("bytes=5-2", None),
+        ("bytes=12-11", None),
+    ],
+)
+def test_parse_range(value, expected):
+    assert parse_range(value, 10) == expected
+
+
+def test_parse_range_unsatisfiable():
+    with pytest.raises(ValueError, match="not satisfiable"):
+        parse_range("bytes=10-", 10)
+    with pytest.raises(ValueError, match="not satisfiable"):
+        parse_range("bytes=12-20", 10)
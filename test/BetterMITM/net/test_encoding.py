@@ -49,6 +49,31 @@ def test_encoders(encoder):
         encoding.decode(b"foobar", encoder)
 
 
+@pytest.mark.parametrize(
+    "encoder", ["identity", "gzip", "br", "deflate", "deflateraw", "zstd"]
+)
+def test_decode_prefix(encoder, monkeypatch):
+    monkeypatch.setattr(encoding, "DECODE_PREFIX_CHUNK_SIZE", 16)
+    content = bytes(range(256)) * 64
+    encoded = encoding.encode(content, encoder)
+    assert encoding.decode_prefix(encoded, encoder, 100) == content[:100]
+    assert encoding.decode_prefix(encoded, encoder, 1_000_000) == content
+    assert encoding.decode_prefix(b"", encoder, 100) == b""
+
+
+def test_decode_prefix_raw_deflate():
+    content = b"foo" * 1000
+    raw = encoding.encode(content, "deflate")[2:-4]
+    assert encoding.decode_prefix(raw, "deflate", 5) == b"foofo"
+
+
+def test_decode_prefix_invalid():
+    with pytest.raises(ValueError):
+        encoding.decode_prefix(b"foobar", "gzip", 100)
+    with pytest.raises(ValueError, match="Unsupported encoding"):
+        encoding.decode_prefix(b"foobar", "utf8", 100)
+
+
 @pytest.mark.parametrize("encoder", ["utf8", "latin-1"])
 def test_encoders_strings(encoder):
     """
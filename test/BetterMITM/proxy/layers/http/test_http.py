@@ -5,12 +5,15 @@ import pytest
 
 from mitmproxy.connection import ConnectionState
 from mitmproxy.connection import Server
+from mitmproxy.http import BodyFile
 from mitmproxy.http import HTTPFlow
 from mitmproxy.http import Response
 from mitmproxy.proxy import layer
 from mitmproxy.proxy.commands import CloseConnection
 from mitmproxy.proxy.commands import Log
 from mitmproxy.proxy.commands import OpenConnection
+from mitmproxy.proxy.commands import RelayConnection
+from mitmproxy.proxy.commands import RequestWakeup
 from mitmproxy.proxy.commands import SendData
 from mitmproxy.proxy.events import ConnectionClosed
 from mitmproxy.proxy.events import DataReceived
@@ -63,6 +66,85 @@ def test_http_proxy(tctx):
     assert server().address == ("example.com", 80)
 
 
+def test_http_proxy_body_spool(tctx):
+    """Test that large bodies are kept in a temporary file"""
+    tctx.options.body_spool_size = "8"
+    server = Placeholder(Server)
+    flow = Placeholder(HTTPFlow)
+    assert (
+        Playbook(http.HttpLayer(tctx, HTTPMode.regular))
+        >> DataReceived(
+            tctx.client,
+            b"GET http://example.com/ HTTP/1.1\r\nHost: example.com\r\n\r\n",
+        )
+        << http.HttpRequestHeadersHook(flow)
+        >> reply()
+        << http.HttpRequestHook(flow)
+        >> reply()
+        << OpenConnection(server)
+        >> reply(None)
+        << SendData(server, b"GET / HTTP/1.1\r\nHost: example.com\r\n\r\n")
+        >> DataReceived(
+            server, b"HTTP/1.1 200 OK\r\nContent-Length: 12\r\n\r\nHello World"
+        )
+        << http.HttpResponseHeadersHook(flow)
+        >> reply()
+        >> DataReceived(server, b"!")
+        << http.HttpResponseHook(flow)
+        >> reply()
+        << SendData(
+            tctx.client, b"HTTP/1.1 200 OK\r\nContent-Length: 12\r\n\r\nHello World!"
+        )
+        << RequestWakeup(0)
+        >> reply()
+        << None
+    )
+    assert flow().request.body_file is None
+    assert flow().response.body_file is not None
+    assert flow().response.content == b"Hello World!"
+
+
+def test_http_response_body_file(tctx, tmp_path):
+    """Test that responses from a file are sent in chunks, with a wakeup in between"""
+    p = tmp_path / "body"
+    p.write_bytes(b"a" * 1024 * 1024 + b"bc")
+    flow = Placeholder(HTTPFlow)
+
+    def set_response(flow: HTTPFlow):
+        flow.response = Response.make(200)
+        flow.response.data.content = None
+        flow.response.body_file = BodyFile.from_path(str(p))
+        flow.response.headers["Content-Length"] = str(len(flow.response.body_file))
+
+    assert (
+        Playbook(http.HttpLayer(tctx, HTTPMode.regular))
+        >> DataReceived(
+            tctx.client,
+            b"GET http://example.com/ HTTP/1.1\r\nHost: example.com\r\n\r\n",
+        )
+        << http.HttpRequestHeadersHook(flow)
+        >> reply()
+        << http.HttpRequestHook(flow)
+        >> reply(side_effect=set_response)
+        << http.HttpResponseHeadersHook(flow)
+        >> reply()
+        << http.HttpResponseHook(flow)
+        >> reply()
+        << SendData(
+            tctx.client,
+            b"HTTP/1.1 200 OK\r\ncontent-length: 1048578\r\n\r\n"
+            + b"a" * 1024 * 1024,
+        )
+        << RequestWakeup(0)
+        >> reply()
+        << SendData(tctx.client, b"bc")
+        << RequestWakeup(0)
+        >> reply()
+        << None
+    )
+    assert flow().response.body_file is not None
+
+
 @pytest.mark.parametrize("strategy", ["lazy", "eager"])
 @pytest.mark.parametrize("http_connect_send_host_header", [True, False])
 def test_https_proxy(strategy, http_connect_send_host_header, tctx):
@@ -939,6 +1021,44 @@ def test_upstream_proxy(tctx, redirect, domain, scheme):
     assert playbook
 
 
+@pytest.mark.parametrize("mode", ["regular", "upstream"])
+def test_http_proxy_tcp_relay(tctx, mode):
+    """Ignored connections over HTTP/1 CONNECT can be relayed without the layer stack."""
+    server = Placeholder(Server)
+    tctx.options.connection_strategy = "lazy"
+
+    if mode == "upstream":
+        tctx.client.proxy_mode = ProxyMode.parse("upstream:http://proxy:8080")
+        toplayer = http.HttpLayer(tctx, HTTPMode.upstream)
+    else:
+        tctx.client.proxy_mode = ProxyMode.parse("regular")
+        toplayer = http.HttpLayer(tctx, HTTPMode.regular)
+
+    playbook = Playbook(toplayer, hooks=False)
+    assert (
+        playbook
+        >> DataReceived(
+            tctx.client, b"CONNECT example:443 HTTP/1.1\r\nHost: example:443\r\n\r\n"
+        )
+        << SendData(tctx.client, b"HTTP/1.1 200 Connection established\r\n\r\n")
+        >> DataReceived(tctx.client, b"this is not http")
+        << layer.NextLayerHook(Placeholder())
+        >> reply_next_layer(lambda ctx: TCPLayer(ctx, ignore=True))
+        << OpenConnection(server)
+    )
+    playbook >> reply(None)
+    if mode == "upstream":
+        playbook << SendData(
+            server, b"CONNECT example:443 HTTP/1.1\r\nHost: example:443\r\n\r\n"
+        )
+        playbook >> DataReceived(server, b"HTTP/1.1 200 Connection established\r\n\r\n")
+    assert (
+        playbook
+        << SendData(server, b"this is not http")
+        << RelayConnection(tctx.client, server)
+    )
+
+
 @pytest.mark.parametrize("mode", ["regular", "upstream"])
 @pytest.mark.parametrize("close_first", ["client", "server"])
 def test_http_proxy_tcp(tctx, mode, close_first):
@@ -16,7 +16,9 @@ from mitmproxy.http import Request
 from mitmproxy.proxy.commands import CloseConnection
 from mitmproxy.proxy.commands import Log
 from mitmproxy.proxy.commands import OpenConnection
+from mitmproxy.proxy.commands import PauseReading
 from mitmproxy.proxy.commands import RequestWakeup
+from mitmproxy.proxy.commands import ResumeReading
 from mitmproxy.proxy.commands import SendData
 from mitmproxy.proxy.context import Context
 from mitmproxy.proxy.events import ConnectionClosed
@@ -1321,6 +1323,95 @@ def test_alt_svc(tctx):
     )
 
 
+def test_stream_backpressure(tctx):
+    """A fast server must not be able to fill our memory while the client is slow to read."""
+    tctx.options.http2_stream_window = 65535
+    tctx.options.http2_connection_window = 65535
+    playbook, cff = start_h2_client(tctx)
+    flow = Placeholder(HTTPFlow)
+    server = Placeholder(Server)
+
+    def enable_streaming(flow: HTTPFlow) -> None:
+        flow.response.stream = True
+
+    assert (
+        playbook
+        >> DataReceived(
+            tctx.client,
+            cff.build_headers_frame(
+                example_request_headers, flags=["END_STREAM"]
+            ).serialize(),
+        )
+        << http.HttpRequestHeadersHook(flow)
+        >> reply()
+        << http.HttpRequestHook(flow)
+        >> reply()
+        << OpenConnection(server)
+        >> reply(None, side_effect=make_h2)
+        << SendData(server, Placeholder(bytes))
+    )
+    sff = FrameFactory()
+    chunk = sff.build_data_frame(b"a" * 16384).serialize()
+    window_update = (
+        sff.build_window_update_frame(0, 32768).serialize()
+        + sff.build_window_update_frame(1, 32768).serialize()
+    )
+    assert (
+        playbook
+        >> DataReceived(
+            server, sff.build_headers_frame(example_response_headers).serialize()
+        )
+        << http.HttpResponseHeadersHook(flow)
+        >> reply(side_effect=enable_streaming)
+        << SendData(
+            tctx.client, cff.build_headers_frame(example_response_headers).serialize()
+        )
+        << Log("Streaming response from example.com.")
+        >> DataReceived(server, chunk)
+        << SendData(tctx.client, chunk)
+        >> DataReceived(server, chunk)
+        << SendData(tctx.client, chunk)
+        << SendData(server, window_update)
+        >> DataReceived(server, chunk)
+        << SendData(tctx.client, chunk)
+        >> DataReceived(server, chunk)
+        << SendData(tctx.client, cff.build_data_frame(b"a" * 16383).serialize())
+        << SendData(server, window_update)
+        # the client's window is exhausted, so we start buffering.
+        >> DataReceived(server, chunk)
+        >> DataReceived(server, chunk)
+        << SendData(server, window_update)
+        # our send buffer is now above the stream window, so we stop acknowledging data.
+        >> DataReceived(server, chunk)
+        >> DataReceived(server, chunk)
+        >> DataReceived(server, chunk)
+        >> DataReceived(server, sff.build_data_frame(b"a" * 16383).serialize())
+    )
+    client_conn = playbook.layer.connections[tctx.client]
+    server_conn = playbook.layer.connections[server()].child_layer
+    assert server_conn.h2_conn.remote_flow_control_window(1) == 0
+    assert client_conn.h2_conn.buffered_bytes[1] <= 2 * 65535
+
+    sent = Placeholder(bytes)
+    resumed = Placeholder(bytes)
+    assert (
+        playbook
+        >> DataReceived(
+            tctx.client,
+            cff.build_window_update_frame(0, 1_000_000).serialize()
+            + cff.build_window_update_frame(1, 1_000_000).serialize(),
+        )
+        << SendData(tctx.client, sent)
+        << SendData(server, resumed)
+    )
+    assert sum(len(f.data) for f in decode_frames(sent())) == 16384 * 6
+    assert 1 not in client_conn.h2_conn.buffered_bytes
+    assert [(f.stream_id, f.window_increment) for f in decode_frames(resumed())] == [
+        (0, 65535),
+        (1, 65535),
+    ]
+
+
 def test_no_extra_empty_data_frame(tctx):
     """Ensure we don't send empty data frames without EOS bit set when streaming, https://github.com/mitmproxy/mitmproxy/pull/7480"""
     playbook, cff = start_h2_client(tctx)
@@ -1423,3 +1514,62 @@ def test_forward_empty_data_frame(tctx):
         >> DataReceived(server, cff.build_data_frame(b"").serialize())
         << SendData(tctx.client, cff.build_data_frame(b"").serialize())
     )
+
+
+def test_stream_backpressure_http1_server(tctx):
+    """An HTTP/1 server has no flow control, so we stop reading from it while the HTTP/2 client is slow."""
+    tctx.options.http2_stream_window = 65535
+    playbook, cff = start_h2_client(tctx)
+    flow = Placeholder(HTTPFlow)
+    server = Placeholder(Server)
+    chunk = b"a" * 32768
+
+    def enable_streaming(flow: HTTPFlow) -> None:
+        flow.response.stream = True
+
+    assert (
+        playbook
+        >> DataReceived(
+            tctx.client,
+            cff.build_headers_frame(
+                example_request_headers, flags=["END_STREAM"]
+            ).serialize(),
+        )
+        << http.HttpRequestHeadersHook(flow)
+        >> reply()
+        << http.HttpRequestHook(flow)
+        >> reply()
+        << OpenConnection(server)
+        >> reply(None)
+        << SendData(server, b"GET / HTTP/1.1\r\nHost: example.com\r\n\r\n")
+        >> DataReceived(
+            server, b"HTTP/1.1 200 OK\r\ntransfer-encoding: chunked\r\n\r\n"
+        )
+        << http.HttpResponseHeadersHook(flow)
+        >> reply(side_effect=enable_streaming)
+        << SendData(tctx.client, Placeholder(bytes))
+        << Log("Streaming response from example.com.")
+        >> DataReceived(server, b"8000\r\n" + chunk + b"\r\n")
+        << SendData(tctx.client, Placeholder(bytes))
+        >> DataReceived(server, b"8000\r\n" + chunk + b"\r\n")
+        << SendData(tctx.client, Placeholder(bytes))
+        # the client's window is exhausted, so we start buffering.
+        >> DataReceived(server, b"8000\r\n" + chunk + b"\r\n")
+        >> DataReceived(server, b"8000\r\n" + chunk + b"\r\n")
+        << PauseReading(server)
+        >> DataReceived(
+            tctx.client,
+            cff.build_window_update_frame(0, 1_000_000).serialize()
+            + cff.build_window_update_frame(1, 1_000_000).serialize(),
+        )
+        << SendData(tctx.client, Placeholder(bytes))
+        << ResumeReading(server)
+        >> DataReceived(server, b"0\r\n\r\n")
+        << http.HttpResponseHook(flow)
+        << CloseConnection(server)
+        >> reply(to=-2)
+        << SendData(
+            tctx.client, cff.build_data_frame(b"", flags=["END_STREAM"]).serialize()
+        )
+    )
+    assert not playbook.layer.paused_peers
@@ -6,6 +6,7 @@ from ..tutils import reply
 from mitmproxy.proxy.commands import CloseConnection
 from mitmproxy.proxy.commands import CloseTcpConnection
 from mitmproxy.proxy.commands import OpenConnection
+from mitmproxy.proxy.commands import RelayConnection
 from mitmproxy.proxy.commands import SendData
 from mitmproxy.proxy.events import ConnectionClosed
 from mitmproxy.proxy.events import DataReceived
@@ -116,6 +117,7 @@ def test_ignore(tctx, ignore):
             >> reply(None)
             >> DataReceived(tctx.client, b"hello!")
             << SendData(tctx.server, b"hello!")
+            << RelayConnection(tctx.client, tctx.server)
         )
 
     if ignore:
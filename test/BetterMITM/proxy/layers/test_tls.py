@@ -665,6 +665,7 @@ class TestClientTLS:
         assert (
             playbook
             << commands.SendData(tctx.server, client_hello)
+            << commands.RelayConnection(tctx.client, tctx.server)
             >> events.DataReceived(
                 tctx.server, b"ServerHello"
             )
@@ -104,3 +104,101 @@ async def test_no_reentrancy(capsys):
         Hook completed (must not happen before start is completed).
         """
     )
+
+
+async def test_relay():
+    handler = MockConnectionHandler()
+    handler.client.transport_protocol = "tcp"
+    handler.client.peername = ("client", 1234)
+    client_io = handler.transports[handler.client]
+    client_io.writer.is_closing.return_value = False
+    client_io.writer.drain = mock.AsyncMock()
+    srv = Server(address=("server", 1234), transport_protocol="tcp")
+    server_io = handler.transports[srv] = server.ConnectionIO(
+        handler=mock.Mock(), reader=mock.Mock(), writer=mock.Mock()
+    )
+    server_io.writer.is_closing.return_value = False
+    server_io.writer.drain = mock.AsyncMock(side_effect=OSError("broken pipe"))
+
+    handler.start_relay(commands.RelayConnection(handler.client, Server(address=None)))
+    assert client_io.relay_to is None
+
+    handler.start_relay(commands.RelayConnection(handler.client, srv))
+    assert client_io.relay_to is srv
+    assert server_io.relay_to is handler.client
+
+    await handler.relay(server_io, b"hello")
+    client_io.writer.write.assert_called_once_with(b"hello")
+    assert server_io.bytes_relayed == 5
+
+    await handler.relay(client_io, b"world")
+    server_io.writer.write.assert_called_once_with(b"world")
+    assert server_io.handler.cancel.called
+
+
+async def test_coalesce_writes():
+    class WriteTestLayer(layer.Layer):
+        def _handle_event(self, event: Event) -> layer.CommandGenerator[None]:
+            yield commands.SendData(self.context.client, b"a")
+            yield commands.SendData(self.context.client, b"b")
+            yield commands.CloseConnection(self.context.client)
+            yield commands.SendData(self.context.client, b"c")
+
+    handler = MockConnectionHandler()
+    handler.layer = WriteTestLayer(handler.layer.context)
+    client_io = handler.transports[handler.client]
+    client_io.handler = mock.Mock()
+    client_io.writer.is_closing.return_value = False
+    client_io.writer.drain = mock.AsyncMock()
+    srv = Server(address=("server", 1234))
+    handler.transports[srv] = server.ConnectionIO(
+        handler=mock.Mock(), reader=mock.Mock(), writer=mock.Mock()
+    )
+
+    await handler.server_event(Start())
+    assert client_io.writer.write.call_args_list == [
+        mock.call(b"ab"),
+        mock.call(b"c"),
+    ]
+
+    await handler.drain_writers()
+    client_io.writer.drain.assert_awaited_once()
+    assert not handler.transports[srv].writer.drain.called
+
+
+async def test_pause_reading():
+    class PauseTestLayer(layer.Layer):
+        paused = True
+
+        def _handle_event(self, event: Event) -> layer.CommandGenerator[None]:
+            if self.paused:
+                yield commands.PauseReading(self.context.client)
+            else:
+                yield commands.ResumeReading(self.context.client)
+            yield commands.PauseReading(Server(address=None))
+
+    handler = MockConnectionHandler()
+    handler.layer = PauseTestLayer(handler.layer.context)
+    client_io = handler.transports[handler.client]
+    assert client_io.reading.is_set()
+
+    await handler.server_event(Start())
+    assert not client_io.reading.is_set()
+
+    handler.layer.paused = False
+    await handler.server_event(Start())
+    assert client_io.reading.is_set()
+
+
+def test_read_size():
+    io = server.ConnectionIO()
+    io.adjust_read_size(server.READ_SIZE_MIN)
+    assert io.read_size == 2 * server.READ_SIZE_MIN
+    for _ in range(100):
+        io.adjust_read_size(io.read_size)
+    assert io.read_size == server.READ_SIZE_MAX
+    io.adjust_read_size(io.read_size // 2)
+    assert io.read_size == server.READ_SIZE_MAX
+    for _ in range(100):
+        io.adjust_read_size(1)
+    assert io.read_size == server.READ_SIZE_MIN
@@ -8,6 +8,9 @@ from mitmproxy.proxy.commands import CloseConnection
 from mitmproxy.proxy.commands import CloseTcpConnection
 from mitmproxy.proxy.commands import Log
 from mitmproxy.proxy.commands import OpenConnection
+from mitmproxy.proxy.commands import PauseReading
+from mitmproxy.proxy.commands import RelayConnection
+from mitmproxy.proxy.commands import ResumeReading
 from mitmproxy.proxy.commands import SendData
 from mitmproxy.proxy.context import Context
 from mitmproxy.proxy.events import ConnectionClosed
@@ -31,6 +34,11 @@ class TChildLayer(layer.Layer):
         elif isinstance(event, DataReceived) and event.data == b"open":
             err = yield OpenConnection(self.context.server)
             yield Log(f"Opened: {err=}. Server state: {self.context.server.state.name}")
+        elif isinstance(event, DataReceived) and event.data == b"relay":
+            yield RelayConnection(self.context.client, self.context.server)
+        elif isinstance(event, DataReceived) and event.data == b"pause":
+            yield PauseReading(self.context.server)
+            yield ResumeReading(self.context.server)
         elif isinstance(event, DataReceived) and event.data == b"half-close":
             err = yield CloseTcpConnection(event.connection, half_close=True)
         elif isinstance(event, ConnectionClosed):
@@ -176,6 +184,43 @@ def test_tunnel_default_impls(tctx: Context):
     )
 
 
+@pytest.mark.parametrize("transparent", [True, False])
+def test_tunnel_relay(tctx: Context, transparent):
+    tctx.server.state = ConnectionState.OPEN
+    if transparent:
+        tl = tunnel.TunnelLayer(tctx, tctx.server, tctx.server)
+    else:
+        tl = TTunnelLayer(tctx, tctx.server, tctx.server)
+    tl.child_layer = TChildLayer(tctx)
+    playbook = Playbook(tl)
+    if not transparent:
+        (
+            playbook
+            << SendData(tctx.server, b"handshake-hello")
+            >> DataReceived(tctx.server, b"handshake-success")
+            << SendData(tctx.server, b"handshake-success")
+        )
+    playbook >> DataReceived(tctx.client, b"relay")
+    if transparent:
+        playbook << RelayConnection(tctx.client, tctx.server)
+    assert playbook
+    assert tl.is_transparent == transparent
+
+
+def test_tunnel_pause_reading(tctx: Context):
+    tctx.server.state = ConnectionState.OPEN
+    tunnel_conn = Server(address=("proxy", 1234))
+    tl = tunnel.TunnelLayer(tctx, tunnel_conn, tctx.server)
+    tl.child_layer = TChildLayer(tctx)
+    tl.tunnel_state = tunnel.TunnelState.OPEN
+    assert (
+        Playbook(tl)
+        >> DataReceived(tctx.client, b"pause")
+        << PauseReading(tunnel_conn)
+        << ResumeReading(tunnel_conn)
+    )
+
+
 def test_tunnel_openconnection_error(tctx: Context):
     server = Server(address=("proxy", 1234))
 
@@ -1,5 +1,9 @@
+import hashlib
+import os
+
 import pytest
 
+from mitmproxy import http
 from mitmproxy.proxy.utils import expect
 from mitmproxy.proxy.utils import ReceiveBuffer
 
@@ -42,3 +46,55 @@ def test_receive_buffer():
     assert len(buf) == 0
     assert bytes(buf) == b""
     assert not buf
+
+
+def test_receive_buffer_spool():
+    buf = ReceiveBuffer(spool_size=4)
+    buf += b"foo"
+    assert buf.take() == b"foo"
+    assert not buf
+
+    buf += b"foo"
+    buf += b"bar"
+    buf += b"baz"
+    assert len(buf) == 9
+    assert bytes(buf) == b"foobarbaz"
+    body = buf.take()
+    assert isinstance(body, http.BodyFile)
+    assert len(body) == 9
+    assert body.read() == b"foobarbaz"
+    assert body.file is None
+    assert not buf
+
+    path = body.path
+    assert os.path.exists(path)
+    del body
+    assert not os.path.exists(path)
+
+    buf += b"12345"
+    buf.clear()
+    assert bytes(buf) == b""
+
+
+def test_receive_buffer_spool_dir(tmp_path):
+    buf = ReceiveBuffer(spool_size=4, spool_dir=str(tmp_path))
+    buf += b"foo"
+    buf += b"bar"
+    body = buf.take()
+    assert isinstance(body, http.BodyFile)
+    assert body.path == str(tmp_path / hashlib.sha256(b"foobar").hexdigest())
+    assert body.read() == b"foobar"
+
+    buf += b"foobar"
+    body2 = buf.take()
+    assert body2.path == body.path
+    assert os.listdir(tmp_path) == [os.path.basename(body.path)]
+
+    buf += b"12345"
+    buf.clear()
+    assert os.listdir(tmp_path) == [os.path.basename(body.path)]
+
+    del body
+    assert body2.read() == b"foobar"
+    del body2
+    assert os.listdir(tmp_path) == []
@@ -27,6 +27,11 @@ class TestConcurrent:
                 assert 0.5 <= end - start
             else:
                 assert 0.5 <= end - start < 1
+            # @concurrent handlers run in the addon manager's hook pool.
+            assert any(
+                t.calls == 2 and t.pool == "thread"
+                for t in tctx.master.addons.hook_timings.values()
+            )
 
     def test_concurrent_err(self, tdata, caplog):
         with taddons.context() as tctx:
@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 
 from mitmproxy import addonmanager
@@ -54,6 +56,25 @@ class AsyncTHalt:
         raise exceptions.AddonHalt
 
 
+class OffloadAddon:
+    def __init__(self):
+        self.thread = None
+
+    @hooks.offload
+    def response(self, f):
+        self.thread = threading.current_thread()
+        f.response.content = b"offloaded"
+
+
+def set_process_comment(f):
+    f.comment = "from process"
+
+
+class ProcessOffloadAddon:
+    response = staticmethod(hooks.offload(pool="process")(set_process_comment))
+    running = staticmethod(hooks.offload(pool="process")(set_process_comment))
+
+
 class AOption:
     def load(self, loader: Loader):
         loader.add_option("custom_option", bool, False, "help")
@@ -252,3 +273,45 @@ async def test_old_api(caplog):
     with taddons.context(loadcore=False) as tctx:
         tctx.master.addons.add(AOldAPI())
         assert "clientconnect event has been removed" in caplog.text
+
+
+async def test_offload():
+    with taddons.context(loadcore=False) as tctx:
+        a = tctx.master.addons
+        addon = OffloadAddon()
+        a.add(addon)
+        f = tflow.tflow(resp=True)
+        await a.handle_lifecycle(HttpResponseHook(f))
+        assert f.response.content == b"offloaded"
+        assert addon.thread is not threading.current_thread()
+
+        timing = a.hook_timings["offloadaddon.response"]
+        assert timing.calls == 1
+        assert timing.get_state()["pool"] == "thread"
+        assert timing.get_state()["maxElapsed"] >= 0
+
+        a.trigger(HttpResponseHook(tflow.tflow(resp=True)))
+        assert timing.calls == 1
+
+        tctx.options.hook_threads = 2
+        assert a._thread_pool is None
+        await a.handle_lifecycle(HttpResponseHook(f))
+        assert a._thread_pool._max_workers == 2
+        a.shutdown_executors()
+
+
+async def test_offload_process(caplog):
+    with taddons.context(loadcore=False) as tctx:
+        tctx.options.hook_processes = 1
+        a = tctx.master.addons
+        a.add(ProcessOffloadAddon())
+        f = tflow.tflow(resp=True)
+        client_conn = f.client_conn
+        await a.handle_lifecycle(HttpResponseHook(f))
+        assert f.comment == "from process"
+        assert f.client_conn is client_conn
+        assert a.hook_timings["processoffloadaddon.response"].calls == 1
+
+        await a.trigger_event(hooks.RunningHook())
+        assert "cannot run in a process pool" in caplog.text
+        a.shutdown_executors()
@@ -10,6 +10,7 @@ from cryptography.x509 import NameOID
 
 from ..conftest import skip_windows
 from mitmproxy import certs
+from mitmproxy.utils import metrics
 
 
 
@@ -73,6 +74,14 @@ class TestCertStore:
         assert ca.default_chain_file == (tmp_path / "mitmproxy-ca.pem")
         assert len(ca.default_chain_certs) == 2
 
+    def test_generation_metrics(self, tstore, monkeypatch):
+        monkeypatch.setattr(metrics.registry, "enabled", True)
+        metrics.cert_generation_duration.clear()
+        tstore.get_cert("foo.com", [])
+        tstore.get_cert("foo.com", [])
+        assert metrics.cert_generation_duration.values[()].count == 1
+        metrics.cert_generation_duration.clear()
+
     def test_sans(self, tstore):
         c1 = tstore.get_cert("foo.com", [x509.DNSName("*.bar.com")])
         tstore.get_cert("foo.bar.com", [])
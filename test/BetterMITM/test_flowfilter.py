@@ -86,6 +86,38 @@ class TestParsing:
         assert isinstance(a, flowfilter.FHeadRequest)
         self._dump(a)
 
+    def test_optimize(self):
+        a = flowfilter.parse("~b secret & ~h foo & ~d example.com & ~q")
+        assert [type(i) for i in a.lst] == [
+            flowfilter.FReq,
+            flowfilter.FDomain,
+            flowfilter.FHead,
+            flowfilter.FBod,
+        ]
+        a = flowfilter.parse("~b x | (~c 200 | ~m GET)")
+        assert [type(i) for i in a.lst] == [
+            flowfilter.FCode,
+            flowfilter.FMethod,
+            flowfilter.FBod,
+        ]
+        a = flowfilter.parse("~d foo & ~d foo & ~d bar")
+        assert [i.expr for i in a.lst] == ["foo", "bar"]
+        assert isinstance(flowfilter.parse("!!~d foo"), flowfilter.FDomain)
+        assert isinstance(flowfilter.parse("~all & ~d foo"), flowfilter.FDomain)
+        assert isinstance(flowfilter.parse("~all | ~d foo"), flowfilter.FAll)
+        assert isinstance(flowfilter.parse("!~all | ~d foo"), flowfilter.FDomain)
+        assert isinstance(flowfilter.parse("!~all & ~d foo"), flowfilter.FNot)
+        assert isinstance(flowfilter.parse("~all & ~all"), flowfilter.FAll)
+        a = flowfilter.parse("!~all | !~all")
+        assert not a(tflow.tflow())
+        a = flowfilter.parse("!(~d foo & ~d foo)")
+        assert isinstance(a.itm, flowfilter.FDomain)
+        self._dump(a)
+
+    def test_parse_cache(self):
+        assert flowfilter.parse("~d foo & ~q") is flowfilter.parse("~d foo & ~q")
+        assert flowfilter.parse("~d foo & ~q").pattern == "~d foo & ~q"
+
 
 class TestMatchingHTTPFlow:
     def req(self):
@@ -35,3 +35,26 @@ def test_hook():
         name = ""
 
     assert AnotherABC not in hooks.all_hooks.values()
+
+
+def test_offload():
+    @hooks.offload
+    def response(flow):
+        pass
+
+    assert response.offload_pool == "thread"
+
+    @hooks.offload(pool="process")
+    def request(flow):
+        pass
+
+    assert request.offload_pool == "process"
+
+    with pytest.raises(ValueError, match="Unknown executor pool"):
+        hooks.offload(pool="gpu")
+
+    @hooks.offload
+    async def error(flow):
+        pass
+
+    assert error.offload_pool == "thread"
@@ -1,6 +1,7 @@
 import asyncio
 import email
 import json
+import tempfile
 import time
 from typing import Any
 from unittest import mock
@@ -9,6 +10,8 @@ import pytest
 
 from mitmproxy import flow
 from mitmproxy import flowfilter
+from mitmproxy.http import BodyFile
+from mitmproxy.http import body_file_views
 from mitmproxy.http import Headers
 from mitmproxy.http import HTTPFlow
 from mitmproxy.http import Message
@@ -1013,6 +1016,114 @@ class TestMessageContentEncoding:
         with pytest.raises(TypeError):
             r.content = "foo"
 
+    def test_deferred_encode(self):
+        r = tresp()
+        r.encode("gzip")
+        encode_gzip = mock.Mock(return_value=b"compressed")
+        with mock.patch.dict("mitmproxy.net.encoding.custom_encode", gzip=encode_gzip):
+            r.content = b"foo"
+            r.content = r.content + b"bar"
+            assert r.content == b"foobar"
+            # Reading headers does not compress the body.
+            assert r.headers["content-encoding"] == "gzip"
+            assert r.headers.get("content-type") is None
+            assert r.raw_size == 6
+            assert not encode_gzip.called
+
+            assert r.raw_content == b"compressed"
+            assert r.headers["content-length"] == "10"
+            assert r.raw_content == b"compressed"
+            assert r.raw_size == 10
+            encode_gzip.assert_called_once_with(b"foobar")
+
+            r.content = b"baz"
+            assert r.raw_content == b"compressed"
+            assert encode_gzip.call_count == 2
+
+            r.text = "qux"
+            assert r.text == "qux"
+            assert encode_gzip.call_count == 2
+
+        r.content = b"foo"
+        assert r.get_state()["content"] != b"foo"
+        r.content = b"bar"
+        r.raw_content = b"raw"
+        assert r.raw_content == b"raw"
+
+    def test_body_file(self):
+        f = tempfile.TemporaryFile()
+        f.write(b"spooled")
+        f.flush()
+        r = tresp(content=None)
+        r.body_file = BodyFile(f, 7)
+        f.seek(0)
+        assert r.raw_size == 7
+        assert f.tell() == 0
+        assert r.raw_content == b"spooled"
+        assert r.content == b"spooled"
+        assert r.get_state()["content"] == b"spooled"
+        assert r.copy().raw_content == b"spooled"
+
+        r.content = b"foo"
+        assert r.body_file is None
+        assert r.raw_content == b"foo"
+        r.content = None
+        assert r.raw_size == 0
+
+        assert BodyFile(tempfile.TemporaryFile(), 0).read() == b""
+
+    def test_body_file_path(self, tmp_path):
+        p = tmp_path / "body"
+        p.write_bytes(b"0123456789")
+        body = BodyFile.from_path(str(p))
+        assert len(body) == 10
+        assert body.read() == b"0123456789"
+        assert body.read(2, 5) == b"234"
+        assert list(body.iter_chunks(4)) == [b"0123", b"4567", b"89"]
+        assert list(body.iter_chunks(4, start=3, stop=7)) == [b"3456"]
+        with body.view() as v:
+            assert v[:3] == b"012"
+
+        assert BodyFile(None, 3, str(p), offset=5).read() == b"567"
+        assert BodyFile(None, 5, str(p), offset=8).read() == b"89"
+        assert BodyFile(None, 5, str(p), offset=20).read() == b""
+
+        with pytest.raises(ValueError):
+            BodyFile(None, 0)
+
+    def test_body_file_views(self, tmp_path):
+        p = tmp_path / "body"
+        p.write_bytes(b"spooled")
+        r = tresp(content=None)
+        r.body_file = BodyFile.from_path(str(p))
+        with body_file_views():
+            content = r.get_state()["content"]
+            assert isinstance(content, memoryview)
+            assert content == b"spooled"
+        assert r.get_state()["content"] == b"spooled"
+
+    def test_get_content_limit(self, tmp_path):
+        r = tresp()
+        r.encode("gzip")
+        r.content = b"foobar" * 1000
+        assert r.get_content(limit=9) == b"foobarfoo"
+        p = tmp_path / "body"
+        p.write_bytes(r.raw_content)
+        assert r.get_content(limit=9) == b"foobarfoo"
+        assert r.get_content(limit=9000) == b"foobar" * 1000
+
+        r.body_file = BodyFile.from_path(str(p))
+        r.data.content = None
+        assert r.get_content(limit=3) == b"foo"
+
+        r.headers["content-encoding"] = "zopfli"
+        with pytest.raises(ValueError):
+            r.get_content(limit=3)
+        assert r.get_content(strict=False, limit=3) == p.read_bytes()[:3]
+
+        r = tresp(content=None)
+        assert r.get_content(limit=3) is None
+
     def test_unknown_ce(self):
         r = tresp()
         r.headers["content-encoding"] = "zopfli"
@@ -2,6 +2,7 @@ import gzip
 import importlib
 import json
 import logging
+import tempfile
 from pathlib import Path
 from unittest import mock
 
@@ -12,6 +13,7 @@ from tornado import websocket
 from tornado.web import create_signed_value
 
 import mitmproxy_rs
+from mitmproxy import http
 from mitmproxy import log
 from mitmproxy import options
 from mitmproxy.test import tflow
@@ -117,6 +119,130 @@ class TestApp(tornado.testing.AsyncHTTPTestCase):
         assert get_json(resp)[0]["request"]["contentHash"]
         assert get_json(resp)[2]["error"]
 
+    def test_analytics_stats(self):
+        stats = get_json(self.fetch("/analytics/stats"))
+        assert stats["total_flows"] == stats["http_flows"] == 3
+        assert stats["error_flows"] == 1
+        self.master.options.view_columnar = True
+        assert get_json(self.fetch("/analytics/stats")) == stats
+        self.view.set_filter_cmd("~e")
+        assert get_json(self.fetch("/analytics/stats"))["total_flows"] == 1
+        self.view.set_filter_cmd("")
+        self.master.options.view_columnar = False
+
+    def test_analytics_traffic(self):
+        self.master.addons.get("analytics").response(tflow.tflow(resp=True))
+        stats = get_json(self.fetch("/analytics/traffic?window=60"))
+        assert stats["window"] == 60
+        assert stats["flows"] == 1
+        assert self.fetch("/analytics/traffic?window=foo").code == 400
+        assert self.fetch("/analytics/traffic?window=-1").code == 400
+
+    def test_prometheus_metrics(self):
+        resp = self.fetch("/metrics")
+        assert resp.code == 200
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert b"# TYPE bettermitm_hook_duration_seconds histogram" in resp.body
+        assert b'bettermitm_active_connections{side="client"} 0' in resp.body
+
+    def test_performance_metrics(self):
+        metrics = get_json(self.fetch("/performance/metrics"))
+        assert metrics["slow_operations"] == []
+        assert metrics["proxy"]["enabled"] is False
+
+    def test_jobs(self):
+        resp = self.fetch("/flows/dump?background=1")
+        assert resp.code == 202
+        job = get_json(resp)
+        assert job["kind"] == "dump"
+        for _ in range(100):
+            job = get_json(self.fetch(f"/jobs/{job['id']}"))
+            if job["state"] == "done":
+                break
+        assert job["state"] == "done"
+        assert [j["id"] for j in get_json(self.fetch("/jobs"))] == [job["id"]]
+
+        resp = self.fetch(f"/jobs/{job['id']}/result")
+        assert resp.headers["Content-Disposition"] == "attachment; filename=flows"
+        assert resp.body == self.fetch("/flows/dump").body
+        assert self.fetch(f"/jobs/{job['id']}/cancel", method="POST").code == 409
+        assert self.fetch("/jobs/0123").code == 404
+        assert self.fetch("/jobs/0123/result").code == 404
+
+    def test_job_cancel(self):
+        def forever():
+            while True:
+                yield 0, 0
+
+        async def submit():
+            return self.master.jobs.submit("forever", forever())
+
+        job = self.io_loop.asyncio_loop.run_until_complete(submit())
+        assert self.fetch(f"/jobs/{job.id}/result").code == 409
+        assert self.fetch(f"/jobs/{job.id}/cancel", method="POST").code == 200
+        assert self.fetch(f"/jobs/{job.id}").code == 200
+        assert job.state == "cancelled"
+
+    def test_security_test_background(self):
+        body = json.dumps({"flow_ids": ["42"], "test_ids": ["header_security"]})
+        sync = get_json(self.fetch("/security/test", method="POST", body=body))
+        assert sync["tests"][0]["vulnerable"]
+
+        resp = self.fetch("/security/test?background=1", method="POST", body=body)
+        assert resp.code == 202
+        job_id = get_json(resp)["id"]
+        for _ in range(100):
+            resp = self.fetch(f"/jobs/{job_id}/result")
+            if resp.code == 200:
+                break
+        assert get_json(resp) == sync
+
+    def test_request_builder_send(self):
+        sent = []
+
+        async def send(f, timeout):
+            sent.append((f, timeout))
+
+        body = json.dumps(
+            {
+                "method": "post",
+                "url": "https://example.com/path",
+                "headers": {"foo": "bar"},
+                "body": "data",
+                "timeout": 1000,
+            }
+        )
+        with mock.patch.object(self.master.addons.get("clientplayback"), "send", send):
+            resp = self.fetch(
+                "/request-builder/send",
+                method="POST",
+                body=body,
+                headers={"Content-Type": "application/json"},
+            )
+        assert resp.code == 202
+        f, timeout = sent[0]
+        assert get_json(resp) == {"id": f.id}
+        assert timeout == 1
+        assert f.request.method == "POST"
+        assert f.request.url == "https://example.com/path"
+        assert f.request.headers.fields[0] == (b"Host", b"example.com")
+        assert f.request.headers["foo"] == "bar"
+        assert f.request.content == b"data"
+
+        for data in (
+            {"url": ""},
+            {"url": "invalid"},
+            {"url": "https://example.com", "timeout": "5s"},
+            {"url": "https://example.com", "timeout": 0},
+        ):
+            resp = self.fetch(
+                "/request-builder/send",
+                method="POST",
+                body=json.dumps(data),
+                headers={"Content-Type": "application/json"},
+            )
+            assert resp.code == 400
+
     def test_flows_dump(self):
         resp = self.fetch("/flows/dump")
         assert b"address" in resp.body
@@ -279,6 +405,40 @@ class TestApp(tornado.testing.AsyncHTTPTestCase):
 
         f.revert()
 
+    def test_flow_content_body_file(self):
+        f = self.view.get_by_id("42")
+        f.backup()
+        body = tempfile.TemporaryFile()
+        body.write(b"0123456789")
+        body.flush()
+        f.response.data.content = None
+        f.response.body_file = http.BodyFile(body, 10)
+
+        r = self.fetch("/flows/42/response/content.data")
+        assert r.code == 200
+        assert r.body == b"0123456789"
+        assert r.headers["Accept-Ranges"] == "bytes"
+
+        r = self.fetch(
+            "/flows/42/response/content.data", headers={"Range": "bytes=2-4"}
+        )
+        assert r.code == 206
+        assert r.body == b"234"
+        assert r.headers["Content-Range"] == "bytes 2-4/10"
+
+        r = self.fetch("/flows/42/response/content.data", headers={"Range": "bytes=-3"})
+        assert r.code == 206
+        assert r.body == b"789"
+
+        r = self.fetch("/flows/42/response/content.data", headers={"Range": "bytes=20-"})
+        assert r.code == 416
+
+        r = self.fetch("/flows/42/response/content.data", headers={"Range": "lines=1"})
+        assert r.code == 200
+        assert r.body == b"0123456789"
+
+        f.revert()
+
     def test_flow_content_returns_raw_content_when_decoding_fails(self):
         f = self.view.get_by_id("42")
         f.backup()
@@ -513,6 +673,33 @@ class TestApp(tornado.testing.AsyncHTTPTestCase):
 
         ws_client.close()
 
+    @tornado.testing.gen_test
+    def test_websocket_filter_chunked(self):
+        ws_req = httpclient.HTTPRequest(
+            f"ws://localhost:{self.get_http_port()}/updates",
+            headers={"Cookie": self.auth_cookie},
+        )
+        ws_client = yield tornado.websocket.websocket_connect(ws_req)
+
+        with mock.patch("mitmproxy.addons.view.REFILTER_CHUNK_SIZE", 1):
+            message = json.dumps(
+                {
+                    "type": "flows/updateFilter",
+                    "payload": {"name": "search", "expr": "~bq foo"},
+                }
+            ).encode()
+            yield ws_client.write_message(message)
+            response = yield ws_client.read_message()
+
+        assert json.loads(response) == {
+            "type": "flows/filterUpdate",
+            "payload": {
+                "name": "search",
+                "matching_flow_ids": ["42"],
+            },
+        }
+        ws_client.close()
+
     @tornado.testing.gen_test
     def test_websocket_filter_command_error(self):
 
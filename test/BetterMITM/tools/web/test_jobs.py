@@ -0,0 +1,104 @@
+import asyncio
+import concurrent.futures
+
+from mitmproxy.tools.web import jobs
+
+
+def count(n: int, fail: bool = False) -> jobs.Work:
+    for i in range(n):
+        yield i + 1, n
+    if fail:
+        raise ValueError("failed")
+    return n
+
+
+def test_run_sync():
+    assert jobs.run_sync(count(3)) == 3
+
+
+async def wait_finished(job: jobs.Job) -> None:
+    for _ in range(100):
+        if job.is_finished:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+async def test_job(monkeypatch):
+    monkeypatch.setattr(jobs, "CHUNK_SECONDS", 0)
+    manager = jobs.JobManager()
+    updates = []
+
+    def on_update(job):
+        updates.append(job.state)
+
+    manager.sig_update.connect(on_update)
+
+    job = manager.submit("count", count(5), {"Content-Type": "text/plain"})
+    assert manager.get(job.id) is job
+    await wait_finished(job)
+    assert job.state == "done"
+    assert job.result == 5
+    assert (job.done, job.total) == (5, 5)
+    assert job.to_json()["finished"]
+    assert updates[-1] == "done"
+    assert not manager.cancel(job)
+
+
+async def test_future():
+    manager = jobs.JobManager()
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+
+        def work():
+            result = yield pool.submit(sum, [1, 2])
+            yield 1, 1
+            return result
+
+        assert jobs.run_sync(work()) == 3
+        job = manager.submit("future", work())
+        await wait_finished(job)
+        assert job.result == 3
+
+
+async def test_job_failed():
+    manager = jobs.JobManager()
+    job = manager.submit("count", count(2, fail=True))
+    await wait_finished(job)
+    assert job.state == "failed"
+    assert job.error == "failed"
+
+
+async def test_cancel(monkeypatch):
+    monkeypatch.setattr(jobs, "CHUNK_SECONDS", 0)
+    manager = jobs.JobManager()
+
+    loop = asyncio.get_running_loop()
+    factory = loop.get_task_factory()
+    loop.set_task_factory(None)
+    try:
+        job = manager.submit("count", count(10))
+        assert job.state == "pending"
+        assert manager.cancel(job)
+        assert job.state == "cancelled"
+    finally:
+        loop.set_task_factory(factory)
+
+    job = manager.submit("count", count(10**9))
+    await asyncio.sleep(0.01)
+    assert job.state == "running"
+    assert job.done > 0
+    assert manager.cancel(job)
+    await wait_finished(job)
+    assert job.state == "cancelled"
+
+
+async def test_expire(monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_FINISHED_JOBS", 2)
+    manager = jobs.JobManager()
+    for _ in range(3):
+        await wait_finished(manager.submit("count", count(1)))
+    job = manager.submit("count", count(1))
+    await wait_finished(job)
+    manager.submit("count", count(1))
+    assert len(manager.jobs) <= 3
+    assert job.id in manager.jobs
@@ -0,0 +1,111 @@
+from unittest import mock
+
+import pytest
+
+from mitmproxy import flowfilter
+from mitmproxy import http
+from mitmproxy.test import tflow
+from mitmproxy.utils import flowtable
+from mitmproxy.utils.flowtable import FlowTable
+
+
+def flows():
+    ret = [
+        tflow.tflow(),
+        tflow.tflow(resp=True),
+        tflow.tflow(err=True),
+        tflow.ttcpflow(),
+        tflow.tudpflow(),
+        tflow.tdnsflow(resp=True),
+        tflow.tdnsflow(),
+    ]
+    f = tflow.tflow(resp=True)
+    f.request.method = "POST"
+    f.request.host = "api.example.com"
+    f.response.status_code = 404
+    f.response.content = b"secret"
+    ret.append(f)
+    return ret
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "~all",
+        "~http",
+        "~tcp | ~udp",
+        "~dns & ~s",
+        "~q",
+        "~e",
+        "~c 200",
+        "~c 404 | ~c 500",
+        "~m POST",
+        "!~m GET",
+        "~d example & ~s",
+        "~d address",
+        "~b secret & ~d example",
+        "~bs secret | ~c 200",
+        "!(~d example & ~bs secret)",
+    ],
+)
+def test_filter(expr):
+    fs = flows()
+    table = FlowTable.from_flows(fs)
+    flt = flowfilter.parse(expr)
+    assert table.filter(flt) == [f for f in fs if flt(f)]
+
+
+def test_is_columnar():
+    table = FlowTable()
+    assert table.is_columnar(flowfilter.parse("~c 200 & !(~m GET | ~d foo)"))
+    assert not table.is_columnar(flowfilter.parse("~c 200 & ~b foo"))
+
+
+def test_update_remove(monkeypatch):
+    monkeypatch.setattr(flowtable, "COMPACT_MIN_ROWS", 2)
+    fs = flows()
+    table = FlowTable.from_flows(fs)
+    code = flowfilter.parse("~c 500")
+    assert table.filter(code) == []
+    fs[1].response.status_code = 500
+    table.update(fs[1])
+    assert table.filter(code) == [fs[1]]
+
+    table.remove(fs[0].id)
+    table.remove(fs[0].id)
+    assert len(table) == len(fs) - 1
+    for f in fs[2:6]:
+        table.remove(f.id)
+    assert len(table.flows) == len(table) == 3
+    assert table.filter(flowfilter.match_all) == [fs[1], fs[6], fs[7]]
+    assert table.filter(code) == [fs[1]]
+
+
+def test_stats():
+    fs = flows()
+    table = FlowTable.from_flows(fs)
+    stats = table.stats()
+    assert stats["total_flows"] == 8
+    assert stats["http_flows"] == 4
+    assert stats["tcp_flows"] == stats["udp_flows"] == 1
+    assert stats["dns_flows"] == 2
+    assert stats["error_flows"] == 1
+    assert stats["status_codes"] == {"200": 1, "404": 1}
+    assert stats["methods"] == {"GET": 3, "POST": 1}
+    assert stats["top_hosts"][0] == ["address", 3]
+    assert stats["response_bytes"] > 0
+    assert stats["duration_p95"] is not None
+
+    stats = table.stats(fs[3:5])
+    assert stats["total_flows"] == 2
+    assert stats["duration_avg"] is None
+
+
+def test_spooled_body_size(tmp_path):
+    p = tmp_path / "body"
+    p.write_bytes(b"x" * 100)
+    f = tflow.tflow(resp=True)
+    f.response.body_file = http.BodyFile.from_path(str(p))
+    with mock.patch.object(http.BodyFile, "read", side_effect=AssertionError):
+        table = FlowTable.from_flows([f])
+    assert table.response_size[0] == 100
@@ -0,0 +1,72 @@
+import pytest
+
+from mitmproxy.utils import metrics
+
+
+def test_counter():
+    r = metrics.Registry()
+    c = r.counter("requests_total", "Number of requests.", ("method",))
+    assert r.counter("requests_total", "Number of requests.", ("method",)) is c
+    with pytest.raises(ValueError):
+        r.gauge("requests_total", "Number of requests.")
+    c.inc(1, "GET")
+    c.inc(2, "GET")
+    c.inc(1, 'P"O\nST')
+    assert c.get_state() == [
+        {"method": "GET", "value": 3},
+        {"method": 'P"O\nST', "value": 1},
+    ]
+    assert r.render() == (
+        "# HELP requests_total Number of requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{method="GET"} 3\n'
+        'requests_total{method="P\\"O\\nST"} 1\n'
+    )
+
+
+def test_gauge():
+    r = metrics.Registry()
+    g = r.gauge("lag", "Lag.")
+    assert g.get_state() == 0
+    g.set(0.5)
+    assert r.render().endswith("lag 0.5\n")
+    r.clear()
+    assert g.get_state() == 0
+
+
+def test_histogram():
+    r = metrics.Registry()
+    h = r.histogram("duration_seconds", "Duration.", ("hook",), buckets=(0.1, 1))
+    h.observe(0.05, "request")
+    h.observe(0.5, "request")
+    h.observe(5, "request")
+    assert h.get_state() == [
+        {"hook": "request", "count": 3, "sum": 5.55, "avg": 5.55 / 3, "max": 5}
+    ]
+    lines = r.render().splitlines()
+    assert lines[2:] == [
+        'duration_seconds_bucket{hook="request",le="0.1"} 1',
+        'duration_seconds_bucket{hook="request",le="1"} 2',
+        'duration_seconds_bucket{hook="request",le="+Inf"} 3',
+        'duration_seconds_sum{hook="request"} 5.55',
+        'duration_seconds_count{hook="request"} 3',
+    ]
+
+
+def test_registry_collect():
+    r = metrics.Registry()
+    g = r.gauge("connections", "Connections.")
+    r.collectors.append(lambda: g.set(3))
+    state = r.get_state()
+    assert state["enabled"] is False
+    assert state["metrics"] == {"connections": 3}
+    assert state["slow_operations"] == []
+
+
+def test_record_hook():
+    metrics.registry.clear()
+    metrics.record_hook("addon", "request", 0.001)
+    metrics.record_hook("addon", "response", 1.0)
+    assert [x["name"] for x in metrics.registry.slow_operations] == ["addon.response"]
+    assert metrics.hook_duration.values[("addon", "request")].count == 1
+    metrics.registry.clear()
@@ -0,0 +1,21 @@
+from mitmproxy.utils import patternset
+
+
+def test_search():
+    ps = patternset.PatternSet(
+        ["../", "../../", "..%2F", "admin", "admin'--", "", "../"]
+    )
+    assert len(ps) == 5
+    assert ps.search("") == set()
+    assert ps.search("GET /foo") == set()
+    assert ps.search("/a/../../b") == {"../", "../../"}
+    assert ps.search("user=admin'--") == {"admin", "admin'--"}
+    assert ps.search("..%2F") == {"..%2F"}
+
+
+def test_search_all():
+    assert patternset.search_all(("a", "bc"), ["abc", "b", ""]) == [
+        {"a", "bc"},
+        set(),
+        set(),
+    ]
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from mitmproxy.utils.sketches import DDSketch
+from mitmproxy.utils.sketches import TopK
+
+
+def test_ddsketch():
+    s = DDSketch(0.01)
+    assert s.quantile(0.5) is None
+    values = [random.lognormvariate(0, 2) for _ in range(10_000)] + [0.0] * 100
+    for v in values:
+        s.add(v)
+    values.sort()
+    for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+        expected = values[int(q * (len(values) - 1))]
+        assert s.quantile(q) == pytest.approx(expected, rel=0.011, abs=1e-9)
+
+    a, b = DDSketch(), DDSketch()
+    for v in values[::2]:
+        a.add(v)
+    for v in values[1::2]:
+        b.add(v)
+    a.merge(b)
+    assert a.count == s.count
+    assert a.quantile(0.5) == s.quantile(0.5)
+    with pytest.raises(ValueError):
+        a.merge(DDSketch(0.05))
+
+
+def test_topk():
+    t = TopK(k=3)
+    for i in range(100):
+        for _ in range(1000 if i < 3 else 5):
+            t.add(f"key{i}")
+    assert {k for k, _ in t.top()} == {"key0", "key1", "key2"}
+    assert all(t.estimate(f"key{i}") >= 5 for i in range(100))
+    assert len(t.candidates) <= 6
+
+    other = TopK(k=3)
+    other.add("key99", 2000)
+    merged = TopK.combine([t, other])
+    assert merged.top()[0] == ("key99", merged.estimate("key99"))
+    assert merged.estimate("key99") >= 2005
+    assert merged.estimate("key0") >= 1000
+    assert TopK.combine([]).top() == []
+    with pytest.raises(ValueError):
+        TopK.combine([t, TopK(width=8)])
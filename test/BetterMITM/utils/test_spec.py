@@ -1,6 +1,15 @@
+import re
+import re._parser
+import sys
+
 import pytest
 
+from mitmproxy import flowfilter
+from mitmproxy.test import tflow
+from mitmproxy.utils.spec import domain_filters
 from mitmproxy.utils.spec import parse_spec
+from mitmproxy.utils.spec import required_literal
+from mitmproxy.utils.spec import SpecDispatch
 
 
 def test_parse_spec():
@@ -19,3 +28,56 @@ def test_parse_spec():
 
     with pytest.raises(ValueError, match="Invalid filter expression"):
         parse_spec("/~b/one/two")
+
+
+def test_domain_filters():
+    assert domain_filters(flowfilter.match_all) == []
+    assert len(domain_filters(flowfilter.parse("~d foo"))) == 1
+    assert len(domain_filters(flowfilter.parse("~d foo & ~q & ~d bar"))) == 2
+    assert domain_filters(flowfilter.parse("~d foo | ~q")) == []
+    assert domain_filters(flowfilter.parse("!~d foo")) == []
+
+
+@pytest.mark.parametrize(
+    "regex,literal",
+    [
+        ("//service-a\\.internal/", "//service-a.internal/"),
+        ("^https?://(foo)\\.bar/x", "://foo.bar/x"),
+        ("ab[cd]efgh", "efgh"),
+        ("a|bcd", None),
+        ("x(abc)?yz", None),
+        ("(?i)abcdef", None),
+        ("ab", None),
+    ],
+)
+def test_required_literal(regex, literal):
+    assert required_literal(re.compile(regex)) == literal
+
+
+def test_required_literal_unavailable(monkeypatch):
+    pattern = re.compile("abcdef")
+    monkeypatch.setattr(re._parser, "parse", lambda *args: [("unexpected",)])
+    assert required_literal(pattern) is None
+    monkeypatch.undo()
+    assert required_literal(pattern) == "abcdef"
+    monkeypatch.setitem(sys.modules, "re._parser", None)
+    assert required_literal(pattern) is None
+
+
+def test_spec_dispatch():
+    d = SpecDispatch(
+        [
+            flowfilter.parse("~d example.com"),
+            flowfilter.match_all,
+            flowfilter.parse("~d example.org & ~q"),
+        ]
+    )
+    f = tflow.tflow()
+    f.request.host = "www.example.com"
+    assert d.candidates(f) == [0, 1]
+    assert d.candidates(f) == [0, 1]
+    f.request.host = "example.org"
+    assert d.candidates(f) == [1, 2]
+    assert len(d._cache) == 2
+
+    assert SpecDispatch([flowfilter.match_all]).candidates(f) == [0]
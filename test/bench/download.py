@@ -0,0 +1,127 @@
+"""
+Measure the throughput of large downloads through the proxy.
+
+This starts a small HTTP backend that serves a large response body, runs mitmdump
+as a regular proxy with body streaming enabled and downloads the body on several
+connections in parallel. Use it to compare the impact of changes to the
+connection handler's read and write paths.
+
+    python download.py --megabytes 256 --connections 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import subprocess
+import sys
+import time
+
+CHUNK = b"x" * 65536
+
+
+def backend(port: int, megabytes: int) -> None:
+    async def handle(reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n"
+                % (megabytes * 16 * len(CHUNK))
+            )
+            for _ in range(megabytes * 16):
+                writer.write(CHUNK)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def download(proxy_port: int, backend_port: int) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", proxy_port)
+    writer.write(
+        b"GET http://127.0.0.1:%d/ HTTP/1.1\r\nHost: 127.0.0.1:%d\r\n\r\n"
+        % (backend_port, backend_port)
+    )
+    headers = await reader.readuntil(b"\r\n\r\n")
+    length = int(headers.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+    total = 0
+    while total < length:
+        data = await reader.read(262144)
+        if not data:
+            break
+        total += len(data)
+    writer.close()
+    return total
+
+
+def wait_for_port(port: int, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Port {port} did not open.")
+
+
+def run(args) -> float:
+    proxy = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from BetterMITM.tools.main import mitmdump; mitmdump()",
+            "-q",
+            "--listen-port",
+            str(args.proxy_port),
+            "--set",
+            "stream_large_bodies=1",
+        ]
+    )
+    try:
+        wait_for_port(args.proxy_port)
+        time.sleep(1)
+
+        async def main():
+            return await asyncio.gather(
+                *(
+                    download(args.proxy_port, args.backend_port)
+                    for _ in range(args.connections)
+                )
+            )
+
+        start = time.monotonic()
+        total = sum(asyncio.run(main()))
+        return total / (time.monotonic() - start) / 1024**2
+    finally:
+        proxy.terminate()
+        proxy.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=256)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--proxy-port", type=int, default=18080)
+    parser.add_argument("--backend-port", type=int, default=18081)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(
+        target=backend, args=(args.backend_port, args.megabytes)
+    )
+    server.start()
+    try:
+        wait_for_port(args.backend_port)
+        print(f"{run(args):.0f} MB/s")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
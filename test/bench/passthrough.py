@@ -0,0 +1,122 @@
+"""
+Measure the throughput of ignored (passthrough) connections with and without the
+transport-level relay (see the `passthrough_relay` option).
+
+This starts a raw TCP backend that streams a fixed amount of data, runs mitmdump
+as a regular proxy with `--ignore-hosts .*` and downloads the stream through a
+CONNECT tunnel on several connections in parallel.
+
+    python passthrough.py --megabytes 256 --connections 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import subprocess
+import sys
+import time
+
+CHUNK = b"x" * 65536
+
+
+def backend(port: int, megabytes: int) -> None:
+    async def handle(reader, writer):
+        try:
+            for _ in range(megabytes * 16):
+                writer.write(CHUNK)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def download(proxy_port: int, backend_port: int) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", proxy_port)
+    writer.write(
+        b"CONNECT 127.0.0.1:%d HTTP/1.1\r\nHost: 127.0.0.1:%d\r\n\r\n"
+        % (backend_port, backend_port)
+    )
+    await reader.readuntil(b"\r\n\r\n")
+    total = 0
+    while data := await reader.read(262144):
+        total += len(data)
+    writer.close()
+    return total
+
+
+def wait_for_port(port: int, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Port {port} did not open.")
+
+
+def run(relay: bool, args) -> float:
+    proxy = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from BetterMITM.tools.main import mitmdump; mitmdump()",
+            "-q",
+            "--listen-port",
+            str(args.proxy_port),
+            "--ignore-hosts",
+            ".*",
+            "--set",
+            f"passthrough_relay={str(relay).lower()}",
+        ]
+    )
+    try:
+        wait_for_port(args.proxy_port)
+        time.sleep(1)
+
+        async def main():
+            return await asyncio.gather(
+                *(
+                    download(args.proxy_port, args.backend_port)
+                    for _ in range(args.connections)
+                )
+            )
+
+        start = time.monotonic()
+        total = sum(asyncio.run(main()))
+        return total / (time.monotonic() - start) / 1024**2
+    finally:
+        proxy.terminate()
+        proxy.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=256)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--proxy-port", type=int, default=18080)
+    parser.add_argument("--backend-port", type=int, default=18081)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(
+        target=backend, args=(args.backend_port, args.megabytes)
+    )
+    server.start()
+    try:
+        wait_for_port(args.backend_port)
+        print("relay   MB/s")
+        for relay in (False, True):
+            print(f"{str(relay):<5}  {run(relay, args):>6.0f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure the per-request cost of MapRemote and ModifyHeaders depending on the number
+of configured specs.
+
+Every spec routes one service host (`~d service-N.internal`), as it is common for
+microservice routing setups. For comparison, the naive approach of evaluating
+every spec's filter and regex for each request is measured as well. Each
+measurement is preceded by one request per host, so that the numbers reflect the
+steady state once the per-host dispatch cache is populated.
+
+    python specs.py --specs 10 100 1000
+"""
+
+import argparse
+import gc
+import re
+import time
+
+from BetterMITM.addons import mapremote
+from BetterMITM.addons import modifyheaders
+from BetterMITM.test import taddons
+from BetterMITM.test import tflow
+
+
+def make_flows(count: int, specs: int) -> list:
+    flows = []
+    for i in range(count):
+        f = tflow.tflow()
+        f.request.url = f"http://service-{i % specs}.internal/api/v1/items/{i}"
+        flows.append(f)
+    return flows
+
+
+def naive_map_remote(mr: mapremote.MapRemote, f) -> None:
+    for spec in mr.replacements:
+        if spec.matches(f):
+            url = f.request.pretty_url
+            new_url = re.sub(spec.subject, spec.replacement, url)
+            if url != new_url:
+                f.request.url = new_url
+
+
+def naive_modify_headers(mh: modifyheaders.ModifyHeaders, f) -> None:
+    for spec in mh.replacements:
+        if spec.matches(f):
+            f.request.headers.pop(spec.subject, None)
+            f.request.headers.add(spec.subject, spec.read_replacement())
+
+
+def measure(fn, count: int, specs: int) -> float:
+    for f in make_flows(specs, specs):
+        fn(f)
+    flows = make_flows(count, specs)
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for f in flows:
+            fn(f)
+        return (time.perf_counter() - start) / len(flows) * 1e6
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--specs", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    print("specs  map_remote (naive)  modify_headers (naive)  [µs/request]")
+    for n in args.specs:
+        mr = mapremote.MapRemote()
+        mh = modifyheaders.ModifyHeaders()
+        with taddons.context(mr, mh) as tctx:
+            tctx.configure(
+                mr,
+                map_remote=[
+                    f"|~d service-{i}.internal|//service-{i}.internal/|//localhost:{8000 + i}/"
+                    for i in range(n)
+                ],
+            )
+            tctx.configure(
+                mh,
+                modify_headers=[
+                    f"|~d service-{i}.internal|x-service|{i}" for i in range(n)
+                ],
+            )
+            results = [
+                measure(mr.request, args.requests, n),
+                measure(lambda f: naive_map_remote(mr, f), args.requests, n),
+                measure(mh.requestheaders, args.requests, n),
+                measure(lambda f: naive_modify_headers(mh, f), args.requests, n),
+            ]
+        print(
+            f"{n:>5}  {results[0]:>10.1f} ({results[1]:>6.1f})"
+            f"  {results[2]:>14.1f} ({results[3]:>6.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
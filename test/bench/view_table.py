@@ -0,0 +1,73 @@
+"""
+Measure refiltering the view and computing flow statistics with and without the
+columnar flow table (view_columnar).
+
+    python view_table.py --flows 100000
+"""
+
+import argparse
+import random
+import time
+
+from BetterMITM.addons import view
+from BetterMITM.test import taddons
+from BetterMITM.test import tflow
+from BetterMITM.utils.flowtable import FlowTable
+
+EXPRESSIONS = [
+    "~c 404",
+    "~m POST & ~d api",
+    "~s & !~d cdn",
+    "~c 500 & ~bs error",
+]
+
+
+def make_flows(count: int) -> list:
+    rng = random.Random(0)
+    template = tflow.tflow(resp=True)
+    flows = []
+    for i in range(count):
+        f = template.copy()
+        f.request.host = (
+            f"{rng.choice(['api', 'cdn', 'www'])}{rng.randrange(50)}.example"
+        )
+        f.request.method = rng.choice(["GET", "GET", "GET", "POST"])
+        f.response.status_code = rng.choice([200, 200, 200, 304, 404, 500])
+        flows.append(f)
+    return flows
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    flows = make_flows(args.flows)
+    print(f"{'':<24}  per-flow  columnar  [ms, {args.flows} flows]")
+    results: dict[str, list[float]] = {}
+    for columnar in (False, True):
+        v = view.View()
+        with taddons.context(v) as tctx:
+            tctx.configure(v, view_columnar=columnar)
+            v.add(flows)
+            for expr in EXPRESSIONS:
+                t = timed(lambda: v.set_filter_cmd(expr))
+                results.setdefault(expr, []).append(t)
+            v.set_filter_cmd("")
+            if columnar:
+                t = timed(lambda: v.table.stats())
+            else:
+                t = timed(lambda: FlowTable.from_flows(v).stats())
+            results.setdefault("stats", []).append(t)
+    for name, (plain, columnar) in results.items():
+        print(f"{name:<24}  {plain:>8.1f}  {columnar:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
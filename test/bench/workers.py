@@ -0,0 +1,139 @@
+"""
+Measure how proxy throughput scales with the number of worker processes (see the
+`proxy_workers` option).
+
+For each worker count, this starts mitmdump as a reverse proxy in front of a small
+keep-alive HTTP backend and hammers it with several load generator processes.
+
+    python workers.py --max-workers 4 --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BODY = b"x" * 1024
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\nContent-Type: text/plain\r\n\r\n"
+    % len(BODY)
+) + BODY
+
+
+def backend(port: int) -> None:
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(RESPONSE)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def load(port: int, connections: int, duration: float, results) -> None:
+    request = b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n"
+
+    async def client(deadline: float) -> int:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        count = 0
+        while time.monotonic() < deadline:
+            writer.write(request)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = int(
+                headers.lower().split(b"content-length: ")[1].split(b"\r\n")[0]
+            )
+            await reader.readexactly(length)
+            count += 1
+        writer.close()
+        return count
+
+    async def main():
+        deadline = time.monotonic() + duration
+        counts = await asyncio.gather(*(client(deadline) for _ in range(connections)))
+        results.put(sum(counts))
+
+    asyncio.run(main())
+
+
+def wait_for_port(port: int, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Port {port} did not open.")
+
+
+def run(workers: int, args) -> float:
+    proxy = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from BetterMITM.tools.main import mitmdump; mitmdump()",
+            "-q",
+            "--listen-port",
+            str(args.proxy_port),
+            "--mode",
+            f"reverse:http://127.0.0.1:{args.backend_port}",
+            "--set",
+            f"proxy_workers={workers}",
+        ]
+    )
+    try:
+        wait_for_port(args.proxy_port)
+        time.sleep(2)
+        results: multiprocessing.Queue = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(
+                target=load,
+                args=(args.proxy_port, args.connections, args.duration, results),
+            )
+            for _ in range(args.clients)
+        ]
+        for p in procs:
+            p.start()
+        total = sum(results.get() for _ in procs)
+        for p in procs:
+            p.join()
+        return total / args.duration
+    finally:
+        proxy.terminate()
+        proxy.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--connections", type=int, default=25)
+    parser.add_argument("--proxy-port", type=int, default=18080)
+    parser.add_argument("--backend-port", type=int, default=18081)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=backend, args=(args.backend_port,))
+    server.start()
+    try:
+        wait_for_port(args.backend_port)
+        print("processes  requests/s")
+        for workers in range(args.max_workers):
+            rps = run(workers, args)
+            print(f"{workers + 1:>9}  {rps:>10.0f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
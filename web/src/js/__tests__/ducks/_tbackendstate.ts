@@ -53,6 +53,18 @@ export function TBackendState(): Required<BackendStateExtra> {
                 "type": "tun"
             }
         },
-        "version": "1.2.3"
+        "version": "1.2.3",
+        "viewStore": {
+            "bytes": 0,
+            "dedupBodies": 0,
+            "dedupBytes": 0,
+            "dedupSavedBytes": 0,
+            "evictedFlows": 0,
+            "flows": 0,
+            "maxFlows": 0,
+            "maxMemory": null,
+            "offloadedBytes": 0,
+            "offloadedFlows": 0
+        }
     }
 }
@@ -1,6 +1,8 @@
 import * as React from "react";
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { fetchApi } from "../../utils";
+import { useAppSelector } from "../../ducks";
+import { MessageUtils } from "../../flow/utils";
 
 interface RequestData {
     method: string;
@@ -28,6 +30,36 @@ export default function RequestBuilder() {
     const [maxRedirects, setMaxRedirects] = useState(5);
     const [verifySSL, setVerifySSL] = useState(false);
     const [saveToHistory, setSaveToHistory] = useState(true);
+    const [pendingId, setPendingId] = useState<string | null>(null);
+    const pendingFlow = useAppSelector((state) =>
+        pendingId ? state.flows.byId.get(pendingId) : undefined,
+    );
+
+    useEffect(() => {
+        if (!pendingFlow || pendingFlow.type !== "http") {
+            return;
+        }
+        const flowResponse = pendingFlow.response;
+        if (pendingFlow.error) {
+            setPendingId(null);
+            setError(pendingFlow.error.msg);
+            setLoading(false);
+        } else if (flowResponse) {
+            setPendingId(null);
+            fetchApi(MessageUtils.getContentURL(pendingFlow, flowResponse))
+                .then((r) => r.text())
+                .then((body) =>
+                    setResponse({
+                        status: flowResponse.status_code,
+                        statusText: flowResponse.reason,
+                        headers: Object.fromEntries(flowResponse.headers),
+                        body,
+                    }),
+                )
+                .catch((err) => setError(err.message || "Failed to load response"))
+                .finally(() => setLoading(false));
+        }
+    }, [pendingFlow]);
 
     const methods = ["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS", "TRACE", "CONNECT"];
 
@@ -58,6 +90,7 @@ export default function RequestBuilder() {
         setLoading(true);
         setError(null);
         setResponse(null);
+        setPendingId(null);
 
         try {
             const headers: Record<string, string> = {};
@@ -92,14 +125,17 @@ export default function RequestBuilder() {
                 }),
             });
 
+            if (!response.ok) {
+                throw new Error(await response.text());
+            }
             const result = await response.json();
-            setResponse(result);
+            // The response arrives asynchronously as an update of the flow.
+            setPendingId(result.id);
             if (saveToHistory) {
                 setHistory([requestData, ...history.slice(0, 9)]);
             }
         } catch (err: any) {
             setError(err.message || "Failed to send request");
-        } finally {
             setLoading(false);
         }
     };
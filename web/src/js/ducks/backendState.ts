@@ -16,12 +16,26 @@ export interface ServerInfo {
     tun_name?: string;
 }
 
+export interface ViewStoreStats {
+    flows: number;
+    bytes: number;
+    maxFlows: number;
+    maxMemory: number | null;
+    offloadedFlows: number;
+    offloadedBytes: number;
+    evictedFlows: number;
+    dedupBodies: number;
+    dedupBytes: number;
+    dedupSavedBytes: number;
+}
+
 export interface BackendState {
     version: string;
     contentViews: string[];
     servers: { [key: string]: ServerInfo };
     platform: string;
     localModeUnavailable: string | null;
+    viewStore: ViewStoreStats;
 }
 export interface BackendStateExtra extends BackendState {
     available: boolean;
@@ -34,6 +48,18 @@ export const defaultState: BackendStateExtra = {
     servers: {},
     platform: "",
     localModeUnavailable: null,
+    viewStore: {
+        flows: 0,
+        bytes: 0,
+        maxFlows: 0,
+        maxMemory: null,
+        offloadedFlows: 0,
+        offloadedBytes: 0,
+        evictedFlows: 0,
+        dedupBodies: 0,
+        dedupBytes: 0,
+        dedupSavedBytes: 0,
+    },
 };
 
 const backendStateSlice = createSlice({